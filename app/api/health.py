@@ -1,4 +1,6 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.container import ServiceContainer
 
 router = APIRouter(tags=["health"])
 
@@ -7,3 +9,13 @@ router = APIRouter(tags=["health"])
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 only once every dependency has been warmed up"""
+    readiness = ServiceContainer.get_instance().readiness
+    return JSONResponse(
+        status_code=200 if readiness.ready else 503,
+        content=readiness.to_dict(),
+    )
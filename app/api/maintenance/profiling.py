@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Any, Dict
+from app.core.container import ServiceContainer
+from app.core.diagnostics import collapsed
+
+router = APIRouter()
+
+# Collapsed stacks, one "frame;frame;frame count" line each: flamegraph.pl, speedscope, inferno
+
+
+def _diagnostics():
+    return ServiceContainer.get_instance().diagnostics
+
+
+@router.get("/maintenance/profiling")
+async def profiling_status() -> Dict[str, Any]:
+    """Recent request profiles, event-loop lag and memory snapshots"""
+    diagnostics = _diagnostics()
+    return {
+        "status": "success",
+        "data": {
+            "requests": diagnostics.requests.get_stats(),
+            "loop": diagnostics.loop.get_stats() if diagnostics.loop is not None else None,
+            "memory": list(diagnostics.memory.snapshots) if diagnostics.memory is not None else None,
+        },
+    }
+
+
+@router.post("/maintenance/profiling/arm")
+async def arm_profiling(count: int = Query(1, ge=0, le=100)) -> Dict[str, Any]:
+    """Profile the next ``count`` search requests; 0 disarms"""
+    _diagnostics().requests.arm(count)
+    return {"status": "success", "message": f"Profiling the next {count} search requests"}
+
+
+@router.get("/maintenance/profiling/requests/{profile_id}", response_class=PlainTextResponse)
+async def request_profile(profile_id: str) -> str:
+    """Collapsed stacks of one request; each sample is one interval of wall time per task"""
+    profile = _diagnostics().requests.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Unknown profile")
+    return collapsed(profile.stacks)
+
+
+@router.get("/maintenance/profiling/loop", response_class=PlainTextResponse)
+async def loop_stall_stacks() -> str:
+    """Collapsed stacks that blocked the event loop, weighted in milliseconds"""
+    loop = _diagnostics().loop
+    if loop is None:
+        raise HTTPException(status_code=404, detail="Event-loop monitor is disabled")
+    return collapsed(loop.stacks)
+
+
+@router.get("/maintenance/profiling/memory", response_class=PlainTextResponse)
+async def allocation_stacks() -> str:
+    """Collapsed stacks of live traced memory at the last snapshot, weighted in kilobytes"""
+    memory = _diagnostics().memory
+    if memory is None or memory.tracemalloc_frames <= 0:
+        raise HTTPException(status_code=404, detail="Allocation tracing is disabled")
+    return collapsed(memory.allocation_stacks())
+
+
+@router.delete("/maintenance/profiling")
+async def reset_profiling() -> Dict[str, Any]:
+    """Forget request profiles and collected stall stacks"""
+    diagnostics = _diagnostics()
+    diagnostics.requests.clear()
+    if diagnostics.loop is not None:
+        diagnostics.loop.clear()
+    return {"status": "success", "message": "Profiles cleared"}
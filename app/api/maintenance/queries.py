@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Dict
+from app.core.container import ServiceContainer
+
+router = APIRouter()
+
+
+@router.get("/maintenance/slow-queries")
+async def list_slow_queries(
+    limit: int = Query(20, ge=1, le=500),
+    sort: str = "total_took_ms",
+) -> Dict[str, Any]:
+    """Top DSL fingerprints by cost, with the natural-language questions behind them"""
+    profiler = ServiceContainer.get_instance().profiler
+    try:
+        top = profiler.top(limit, sort)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "status": "success",
+        "data": {"summary": profiler.get_stats(), "fingerprints": top},
+    }
+
+
+@router.get("/maintenance/top-queries")
+async def list_top_queries(limit: int = Query(50, ge=1, le=500)) -> Dict[str, Any]:
+    """Example DSL of the most executed query shapes, e.g. to warm a new index with"""
+    profiler = ServiceContainer.get_instance().profiler
+    return {"status": "success", "data": profiler.most_executed(limit)}
+
+
+@router.get("/maintenance/slow-queries/{fingerprint}")
+async def get_slow_query(fingerprint: str) -> Dict[str, Any]:
+    """Stats, query shape, an example and the last profile tree for one fingerprint"""
+    detail = ServiceContainer.get_instance().profiler.detail(fingerprint)
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Unknown fingerprint")
+    return {"status": "success", "data": detail}
+
+
+@router.delete("/maintenance/slow-queries")
+async def reset_slow_queries() -> Dict[str, Any]:
+    """Forget collected fingerprint statistics, e.g. after a prompt change"""
+    ServiceContainer.get_instance().profiler.reset()
+    return {"status": "success", "message": "Query statistics cleared"}
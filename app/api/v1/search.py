@@ -1,69 +1,246 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any, AsyncGenerator
-from pydantic import BaseModel
-from app.core.search_agent import SearchAgent
-from app.core.elasticsearch_client import ElasticsearchClient
-from app.core.cache_stats import CacheStats
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncGenerator, List, Optional
+from pydantic import BaseModel, Field
+from app.core import columnar_export
+from app.core.admission import OverloadedError
+from app.core.cache_feedback import KnownBadQueryError, summarize_response
+from app.core.cache_namespace import references_fields
+from app.core.conditional import if_none_match, search_etag
+from app.core.container import ServiceContainer
+from app.core.deadline import DeadlineExceededError
+from app.core.projection import SourceProjector
 from app.config import Config
+from app.utils.json_utils import RawJSON, splice_object
 from app.utils.logger import logger
+import asyncio
 import time
-from app.core.vector_cache import VectorCache
 
 
 class SearchRequest(BaseModel):
     query: str
+    # Restrict returned fields explicitly; otherwise derived from the query
+    fields: Optional[List[str]] = None
+    use_docvalues: bool = False
+
+
+class ExportRequest(BaseModel):
+    query: str
+    # arrow (IPC stream) or parquet
+    format: str = "arrow"
+    # A nested path exports its records as a child table; otherwise one row per employee
+    table: Optional[str] = None
+    fields: Optional[List[str]] = None
+    batch_size: Optional[int] = Field(None, ge=100, le=10000)
+
+
+class InvalidateRequest(BaseModel):
+    # Mapping fields whose meaning changed; parents cover their sub-fields
+    fields: List[str]
 
 
 router = APIRouter()
 
+projector = SourceProjector()
+response_config = Config.get_config()["api"]
+export_config = Config.get_config()["export"]
+
+
 async def get_services() -> AsyncGenerator[tuple, None]:
-    """Initialize services with proper configuration"""
-    config = Config.get_config()
-    
-    # Initialize services
-    es_client = ElasticsearchClient(config["elasticsearch"])
-    
-    # Get or create VectorCache singleton
-    vector_cache = VectorCache({
-        "host": config["milvus"]["host"],
-        "port": config["milvus"]["port"]
-    })
-    
-    # Initialize only if not already initialized
-    if not VectorCache._initialized:
-        await vector_cache.initialize()
-    
-    search_agent = SearchAgent(es_client, vector_cache)
-    
+    """Shared services, waiting for startup warm-up if it is still running"""
+    container = ServiceContainer.get_instance()
     try:
-        yield es_client, vector_cache, search_agent
-    finally:
-        await es_client.close()
+        await container.ensure_ready()
+    except RuntimeError as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=503, detail="Search services unavailable")
+
+    yield (
+        container.get_es_client(),
+        container.get_vector_cache(),
+        container.get_search_agent(),
+    )
+
+
+def get_rollups():
+    return ServiceContainer.get_instance().get_rollups()
+
+
+def get_profiler():
+    return ServiceContainer.get_instance().profiler
+
+
+def get_change_marker():
+    return ServiceContainer.get_instance().get_change_marker()
+
 
 @router.post("/search")
 async def search(
     request: SearchRequest,
-    services: tuple = Depends(get_services)
-) -> Dict[str, Any]:
-    """Execute a natural language search query"""
+    http_request: Request,
+    services: tuple = Depends(get_services),
+    rollups=Depends(get_rollups),
+    profiler=Depends(get_profiler),
+    marker=Depends(get_change_marker),
+) -> Response:
+    """Execute a natural language search query.
+
+    Responses carry an ETag for the resolved DSL, the index state and the
+    cache namespace; a matching If-None-Match is answered with 304 without
+    running the search.
+    """
     es_client, vector_cache, search_agent = services
+
+    if request.fields:
+        try:
+            projector.validate_fields(request.fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
     try:
         es_query, metrics = await search_agent.generate_es_query(request.query)
-        results = await es_client.search(body=es_query)
-        
-        return {
+        es_query, projection = projector.apply(
+            es_query, request.query, request.fields, request.use_docvalues
+        )
+        # Whole-index aggregations are served from precomputed summaries when fresh
+        rollup = rollups.answer(es_query) if rollups is not None else None
+
+        etag = None
+        if marker is not None:
+            index_state = await marker.current()
+            if index_state is not None:
+                etag = search_etag(
+                    es_query, index_state, vector_cache.partition, rollup[1]["refreshed_at"] if rollup else None
+                )
+        conditional = http_request.headers.get("if-none-match")
+        if etag is not None and if_none_match(conditional, etag):
+            ServiceContainer.get_instance().conditional.record_not_modified(etag)
+            return Response(status_code=304, headers={"ETag": etag})
+
+        executed = time.perf_counter()
+        if rollup is not None:
+            results = rollup[0]
+        else:
+            source = metrics.get("cache_entry", {}).get("query_text") or request.query
+            started = time.perf_counter()
+            try:
+                if response_config["raw_passthrough"]:
+                    response = await es_client.search_raw(body=es_query)
+                    results = RawJSON(response)
+                else:
+                    response = results = await es_client.search(body=es_query)
+            except Exception as e:
+                round_trip_ms = (time.perf_counter() - started) * 1000
+                profiler.observe(es_client, es_query, source, None, round_trip_ms, error=True)
+                search_agent.report_execution(metrics, error=e)
+                raise
+            round_trip_ms = (time.perf_counter() - started) * 1000
+            took_ms, _ = summarize_response(response)
+            profiler.observe(es_client, es_query, source, took_ms, round_trip_ms)
+            # Feeds per-entry error, zero-hit and latency stats back to the cache
+            search_agent.report_execution(metrics, response)
+
+        # Encoded directly so FastAPI does not walk and re-validate the ES body
+        content = splice_object({
             "results": results,
             "metrics": {
                 "cache_hit": metrics["cache_hit"],
+                # local_cache, cache, llm, or a degraded tier when a provider is unhealthy
+                "tier": metrics.get("tier"),
+                "degraded": metrics.get("degraded", False),
+                "projection": projection["mode"],
+                "rollup": rollup[1]["dimension"] if rollup else None,
                 "search_time": time.time() - metrics.get("start_time", 0)
             }
-        }
+        })
+        if etag is None:
+            return Response(content=content, media_type="application/json")
+        ServiceContainer.get_instance().conditional.record_full(
+            etag, len(content), time.perf_counter() - executed, conditional is not None
+        )
+        return Response(content=content, media_type="application/json", headers={"ETag": etag})
+    except (OverloadedError, KnownBadQueryError, DeadlineExceededError):
+        # Rendered with Retry-After (or 504) by the error handlers
+        raise
     except Exception as e:
         logger.error(f"Search failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Search failed")
 
 
+@router.post("/search/export")
+async def export_search(
+    request: ExportRequest,
+    services: tuple = Depends(get_services),
+) -> StreamingResponse:
+    """Stream every hit of a natural language search as typed columns (Arrow IPC or Parquet)"""
+    es_client, _, search_agent = services
+
+    if columnar_export.pa is None:
+        raise HTTPException(
+            status_code=501, detail=f"Columnar export requires pyarrow: {columnar_export.IMPORT_ERROR}"
+        )
+    if request.format not in columnar_export.FORMATS:
+        raise HTTPException(
+            status_code=400, detail=f"format must be one of {', '.join(columnar_export.FORMATS)}"
+        )
+    try:
+        if request.fields:
+            projector.validate_fields(request.fields)
+        exporter = columnar_export.ColumnarExporter(
+            request.fields, request.table, export_config["parquet_compression"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        es_query, _ = await search_agent.generate_es_query(request.query)
+    except (OverloadedError, KnownBadQueryError, DeadlineExceededError):
+        raise
+    except Exception as e:
+        logger.error(f"Export failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Export failed")
+
+    pages = es_client.iter_pages(
+        columnar_export.export_body(es_query, exporter.source_fields),
+        batch_size=request.batch_size or export_config["batch_size"],
+        keep_alive=export_config["keep_alive"],
+    )
+    media_type, extension = columnar_export.FORMATS[request.format]
+    return StreamingResponse(
+        exporter.stream(pages, request.format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{request.table or "employees"}.{extension}"'},
+    )
+
+
+@router.get("/search/suggest")
+async def suggest(
+    q: str = Query("", max_length=500),
+    limit: Optional[int] = Query(None, ge=1, le=50),
+) -> Dict[str, Any]:
+    """Cached questions completing what the user has typed, most used first.
+
+    Answered from memory without waiting for warm-up; every suggestion is a
+    cache hit when searched.
+    """
+    suggestions = ServiceContainer.get_instance().suggestions
+    if not suggestions.enabled:
+        raise HTTPException(status_code=404, detail="Suggestions are disabled")
+    return {
+        "status": "success",
+        "data": suggestions.suggest(q, limit),
+    }
+
+
+@router.get("/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    """Runtime metrics: LLM admission, speculation, rollups, transport and logging pipeline"""
+    return {
+        "status": "success",
+        "data": ServiceContainer.get_instance().get_metrics()
+    }
+
+
 @router.get("/cache/stats")
 async def get_cache_stats(
     services: tuple = Depends(get_services)
@@ -90,10 +267,11 @@ async def clear_cache(
 ) -> Dict[str, Any]:
     """Clear cache and statistics"""
     try:
-        _, vector_cache, _ = services
+        _, vector_cache, search_agent = services
         
-        # Clear Milvus vector cache
+        # Clear Milvus vector cache and the in-process exact-match layer in front of it
         await vector_cache.clear()
+        search_agent.local_cache.clear()
         
         return {
             "status": "success",
@@ -106,3 +284,30 @@ async def clear_cache(
             "error": "Failed to clear cache",
             "detail": str(e)
         }
+
+
+@router.post("/cache/invalidate")
+async def invalidate_cache(
+    request: InvalidateRequest,
+    services: tuple = Depends(get_services)
+) -> Dict[str, Any]:
+    """Drop cached DSL that references the given fields, keeping everything else"""
+    if not request.fields:
+        raise HTTPException(status_code=400, detail="At least one field is required")
+    try:
+        _, vector_cache, search_agent = services
+        removed = await asyncio.to_thread(vector_cache.invalidate_fields, request.fields)
+        local = search_agent.local_cache.discard_where(
+            lambda dsl: references_fields(dsl, request.fields)
+        )
+        return {
+            "status": "success",
+            "data": {"invalidated": removed, "local_invalidated": local, "namespace": vector_cache.partition}
+        }
+    except Exception as e:
+        logger.error(f"Failed to invalidate cache: {str(e)}")
+        return {
+            "status": "error",
+            "error": "Failed to invalidate cache",
+            "detail": str(e)
+        }
@@ -44,17 +44,184 @@ class Config:
     def get_config() -> Dict[str, Any]:
         return {
             "elasticsearch": {
-                "hosts": [os.getenv("ES_HOSTS", "http://localhost:9200")],
+                "hosts": [
+                    host.strip()
+                    for host in os.getenv("ES_HOSTS", "http://localhost:9200").split(",")
+                    if host.strip()
+                ],
                 "verify_certs": os.getenv("ES_VERIFY_CERTS", "true").lower() == "true",
+                # Alias over versioned indices, see app/core/index_manager.py
                 "elasticsearch_index": os.getenv("ELASTICSEARCH_INDEX", "hr_lens"),
+                "transport": {
+                    "connections_per_node": int(os.getenv("ES_CONNECTIONS_PER_NODE", "25")),
+                    "http_compress": os.getenv("ES_HTTP_COMPRESS", "true").lower() == "true",
+                    "request_timeout": float(os.getenv("ES_REQUEST_TIMEOUT", "10")),
+                    "max_retries": int(os.getenv("ES_MAX_RETRIES", "2")),
+                    "retry_on_timeout": os.getenv("ES_RETRY_ON_TIMEOUT", "true").lower() == "true",
+                    "sniff_on_start": os.getenv("ES_SNIFF_ON_START", "false").lower() == "true",
+                    "sniff_on_node_failure": os.getenv("ES_SNIFF_ON_NODE_FAILURE", "false").lower() == "true",
+                    "min_delay_between_sniffing": float(os.getenv("ES_SNIFF_MIN_DELAY", "60")),
+                },
+                "hedging": {
+                    "enabled": os.getenv("ES_HEDGE_ENABLED", "false").lower() == "true",
+                    "percentile": float(os.getenv("ES_HEDGE_PERCENTILE", "95")),
+                    "min_delay": float(os.getenv("ES_HEDGE_MIN_DELAY_MS", "20")) / 1000,
+                    "window": int(os.getenv("ES_HEDGE_WINDOW", "1000")),
+                },
             },
             "milvus": {
                 "host": os.getenv("MILVUS_HOST", "localhost"),
                 "port": int(os.getenv("MILVUS_PORT", "19530")),
+                # Embedding size requested from the model; also the collection schema
+                "embedding_dim": int(os.getenv("EMBEDDING_DIM", "768")),
+                # none | float16 | int8 | binary, see app/core/vector_codec.py
+                "quantization": os.getenv("VECTOR_QUANTIZATION", "none").lower(),
+                "rerank_candidates": int(os.getenv("VECTOR_RERANK_CANDIDATES", "16")),
+                # host:port,host:port of proxies in the cluster; defaults to MILVUS_HOST:MILVUS_PORT
+                "endpoints": os.getenv("MILVUS_ENDPOINTS", ""),
+                # In-memory replicas to load the collection with (needs as many query nodes)
+                "replicas": int(os.getenv("MILVUS_REPLICAS", "1")),
+                "probe_interval": float(os.getenv("MILVUS_PROBE_INTERVAL", "5")),
+                "probe_timeout": float(os.getenv("MILVUS_PROBE_TIMEOUT", "2")),
+                "connect_timeout": float(os.getenv("MILVUS_CONNECT_TIMEOUT", "5")),
+                "failure_threshold": int(os.getenv("MILVUS_FAILURE_THRESHOLD", "3")),
+                "backoff_max": float(os.getenv("MILVUS_RECONNECT_BACKOFF_MAX", "30")),
+                # Hours a namespace of another schema version is kept after its last store
+                "namespace_grace_period": float(os.getenv("CACHE_NAMESPACE_GRACE_HOURS", "24")) * 3600,
+            },
+            "deadline": {
+                # Per-request deadline in milliseconds from this header, else the default
+                "header": os.getenv("REQUEST_DEADLINE_HEADER", "X-Request-Timeout-Ms"),
+                "default": float(os.getenv("REQUEST_DEADLINE_MS", "30000")) / 1000,
+                "maximum": float(os.getenv("REQUEST_DEADLINE_MAX_MS", "120000")) / 1000,
+            },
+            "export": {
+                # Hits per point-in-time page; each page becomes one Arrow batch / Parquet row group
+                "batch_size": int(os.getenv("EXPORT_BATCH_SIZE", "5000")),
+                "keep_alive": os.getenv("EXPORT_PIT_KEEP_ALIVE", "2m"),
+                "parquet_compression": os.getenv("EXPORT_PARQUET_COMPRESSION", "zstd"),
+            },
+            "degraded": {
+                # Answer from fallback tiers instead of waiting on a slow or failing provider
+                "enabled": os.getenv("DEGRADED_MODE", "true").lower() == "true",
+                "latency_budget": float(os.getenv("LATENCY_BUDGET_MS", "8000")) / 1000,
+                "embedding_slow": float(os.getenv("EMBEDDING_SLOW_MS", "1000")) / 1000,
+                "failure_threshold": int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+                "reset_timeout": float(os.getenv("CIRCUIT_RESET_SECONDS", "30")),
+                "cached_floor": float(os.getenv("DEGRADED_CACHE_FLOOR", "0.7")),
+            },
+            "embeddings": {
+                # openai | local | hashing, see app/core/embeddings.py
+                "provider": os.getenv("EMBEDDING_PROVIDER", "openai").lower(),
+                # OpenAI model; must support shortened embeddings (``dimensions``)
+                "model": os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
+                "model_path": os.getenv("EMBEDDING_MODEL_PATH", ""),
+                "batch_size": int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+                "workers": int(os.getenv("EMBEDDING_WORKERS", "2")),
+                "ngram": int(os.getenv("EMBEDDING_NGRAM", "3")),
+                # Coalesce concurrent lookups into one provider call
+                "micro_batching": os.getenv("EMBEDDING_MICRO_BATCHING", "true").lower() == "true",
+                "max_batch": int(os.getenv("EMBEDDING_MAX_BATCH", "64")),
+                "max_wait": float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5")) / 1000,
             },
             "logging": {
                 "level": os.getenv("LOG_LEVEL", "INFO"),
                 "file_path": os.getenv("LOG_FILE", "logs/app.log"),
+                "format": os.getenv("LOG_FORMAT", "json"),
+                "queue_size": int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+                "payload_sample_rate": float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01")),
+                "payload_max_per_second": float(os.getenv("LOG_PAYLOAD_MAX_PER_SECOND", "5")),
+            },
+            "admission": {
+                "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                "max_queue": int(os.getenv("LLM_MAX_QUEUE", "32")),
+                "queue_timeout": float(os.getenv("LLM_QUEUE_TIMEOUT", "10")),
+            },
+            "rollups": {
+                # Answer whole-index aggregations from precomputed summaries, see app/core/rollups.py
+                "enabled": os.getenv("ROLLUPS_ENABLED", "false").lower() == "true",
+                "index": os.getenv(
+                    "ROLLUP_INDEX", f"{os.getenv('ELASTICSEARCH_INDEX', 'hr_lens')}_rollups"
+                ),
+                "max_staleness": float(os.getenv("ROLLUPS_MAX_STALENESS", "300")),
+                # 0 leaves refreshing to `manage_index.py rollups`; workers only reload
+                "refresh_interval": float(os.getenv("ROLLUPS_REFRESH_INTERVAL", "60")),
+                "full_rebuild_interval": float(os.getenv("ROLLUPS_FULL_REBUILD_INTERVAL", "3600")),
+            },
+            "feedback": {
+                # Quarantine cached DSL that Elasticsearch rejects or runs over budget
+                "latency_budget_ms": float(os.getenv("CACHE_LATENCY_BUDGET_MS", "2000")),
+                "max_errors": int(os.getenv("CACHE_MAX_ERRORS", "3")),
+                "max_slow": int(os.getenv("CACHE_MAX_SLOW", "2")),
+                "negative_ttl": float(os.getenv("NEGATIVE_CACHE_TTL", "60")),
+                # Questions remembered as bad at once; the oldest go first
+                "max_negative": int(os.getenv("NEGATIVE_CACHE_SIZE", "10000")),
+            },
+            "diagnostics": {
+                # Requests carrying this header are sampled when PROFILE_HEADER_ENABLED is set;
+                # otherwise only after POST /api/v1/maintenance/profiling/arm
+                "profile_header": os.getenv("PROFILE_HEADER", "X-Profile"),
+                "header_enabled": os.getenv("PROFILE_HEADER_ENABLED", "false").lower() == "true",
+                "sample_interval": float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000,
+                "max_profile_seconds": float(os.getenv("PROFILE_MAX_SECONDS", "60")),
+                "max_profiles": int(os.getenv("PROFILE_MAX_KEPT", "20")),
+                "loop_monitor": os.getenv("LOOP_MONITOR_ENABLED", "false").lower() == "true",
+                "loop_interval": float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50")) / 1000,
+                "stall_threshold": float(os.getenv("LOOP_STALL_MS", "100")) / 1000,
+                # 0 disables; tracemalloc (allocation sites) slows every allocation, off unless > 0
+                "memory_interval": float(os.getenv("MEMORY_SNAPSHOT_INTERVAL", "0")),
+                "tracemalloc_frames": int(os.getenv("MEMORY_TRACEMALLOC_FRAMES", "0")),
+            },
+            "profiler": {
+                # Queries slower than slow_ms are sometimes re-run with "profile": true
+                "slow_ms": float(os.getenv("SLOW_QUERY_MS", "500")),
+                "sample_rate": float(os.getenv("SLOW_QUERY_PROFILE_RATE", "0.1")),
+                "profile_cooldown": float(os.getenv("SLOW_QUERY_PROFILE_COOLDOWN", "300")),
+                "max_fingerprints": int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "2000")),
+            },
+            "speculation": {
+                # Start LLM generation alongside the cache lookup for queries predicted to miss
+                "enabled": os.getenv("SPECULATIVE_GENERATION", "false").lower() == "true",
+                "miss_threshold": float(os.getenv("SPECULATION_MISS_THRESHOLD", "0.7")),
+                "max_wasted_per_minute": float(os.getenv("SPECULATION_MAX_WASTED_PER_MINUTE", "10")),
+            },
+            "local_cache": {
+                "max_entries": int(os.getenv("LOCAL_CACHE_SIZE", "1024")),
+                # Seconds an entry is served before it must come from the semantic cache again; 0 keeps it
+                "ttl": float(os.getenv("LOCAL_CACHE_TTL", "3600")),
+            },
+            "suggestions": {
+                # Typeahead over cached questions, ranked by hits decayed with this half-life
+                "enabled": os.getenv("SUGGEST_ENABLED", "true").lower() == "true",
+                "max_results": int(os.getenv("SUGGEST_MAX_RESULTS", "10")),
+                "half_life_hours": float(os.getenv("SUGGEST_HALF_LIFE_HOURS", "168")),
+                # Re-read the cache to pick up other processes' entries; 0 reads it once
+                "reload_interval": float(os.getenv("SUGGEST_RELOAD_INTERVAL", "300")),
+            },
+            "cache_snapshot": {
+                # Snapshot directory (see manage_cache.py) to preload the local cache from
+                "warm_path": os.getenv("CACHE_SNAPSHOT_PATH", ""),
+            },
+            "startup": {
+                # background: serve /health at once and warm up behind /ready
+                # blocking: warm up before accepting requests; lazy: on first request
+                "warmup": os.getenv("STARTUP_WARMUP", "background"),
+            },
+            "api": {
+                "version": "v1",
+                "prefix": "/api/v1",
+                # Splice Elasticsearch's response bytes into /search responses without decoding
+                "raw_passthrough": os.getenv("API_RAW_PASSTHROUGH", "true").lower() == "true",
+                "etag": {
+                    # /search answers If-None-Match with 304 when the DSL, index and cache are unchanged
+                    "enabled": os.getenv("API_ETAG_ENABLED", "true").lower() == "true",
+                    # How often the index change marker is re-read; bounds how long a 304 can trail a write
+                    "marker_ttl": float(os.getenv("API_ETAG_MARKER_TTL_MS", "1000")) / 1000,
+                },
+                "compression": {
+                    "minimum_size": int(os.getenv("API_COMPRESSION_MIN_SIZE", "1024")),
+                    "gzip_level": int(os.getenv("API_GZIP_LEVEL", "5")),
+                    "brotli_quality": int(os.getenv("API_BROTLI_QUALITY", "4")),
+                },
             },
-            "api": {"version": "v1", "prefix": "/api/v1"},
         }
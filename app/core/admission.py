@@ -0,0 +1,91 @@
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+import asyncio
+import math
+import time
+
+
+class OverloadedError(Exception):
+    """Raised instead of queueing indefinitely when the LLM pool is saturated"""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """Bounded concurrency and a bounded wait queue for LLM generation.
+
+    Only cache misses pass through here; cache hits never touch the pool, so a
+    burst of novel questions cannot slow down answers that are already cached.
+    A full queue is rejected immediately with 429, and a request that waited
+    longer than ``queue_timeout`` gets 503, both with a Retry-After estimate.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 32, queue_timeout: float = 10.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._active = 0
+        self._waiting = 0
+        self._avg_seconds = 2.0  # EWMA of generation time, seeded with a typical LLM call
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.max_queue_depth_seen = 0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, given the queue ahead"""
+        rounds = (self._waiting + 1) / self.max_concurrency
+        return max(1, math.ceil(self._avg_seconds * rounds))
+
+    def has_capacity(self) -> bool:
+        """True if a generation could start right now without queueing"""
+        return not self._semaphore.locked()
+
+    @asynccontextmanager
+    async def admit(self):
+        if self._semaphore.locked():
+            if self._waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise OverloadedError(429, self.retry_after(), "LLM queue is full")
+
+            self._waiting += 1
+            self.max_queue_depth_seen = max(self.max_queue_depth_seen, self._waiting)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise OverloadedError(503, self.retry_after(), "Timed out waiting for an LLM slot")
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self._active += 1
+        self.admitted += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+            self._active -= 1
+            self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active": self._active,
+            "queue_depth": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "max_queue_depth_seen": self.max_queue_depth_seen,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_generation_seconds": round(self._avg_seconds, 3),
+        }
@@ -0,0 +1,208 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Union
+from app.core.local_cache import normalize_query
+import math
+import re
+import time
+
+# took and hits.total lead every search response, so a raw body can be summarized
+# without decoding it
+_TOOK = re.compile(rb'"took"\s*:\s*(\d+)')
+_TOTAL = re.compile(rb'"total"\s*:\s*\{\s*"value"\s*:\s*(\d+)')
+
+
+def summarize_response(response: Union[bytes, Dict[str, Any]]) -> Tuple[Optional[int], Optional[int]]:
+    """(took in ms, total hits) of a search response, parsed or raw"""
+    if isinstance(response, dict):
+        total = response.get("hits", {}).get("total")
+        if isinstance(total, dict):
+            total = total.get("value")
+        return response.get("took"), total
+
+    head = response[:512]
+    took = _TOOK.search(head)
+    total = _TOTAL.search(head)
+    return (
+        int(took.group(1)) if took else None,
+        int(total.group(1)) if total else None,
+    )
+
+
+class KnownBadQueryError(Exception):
+    """Raised instead of calling the LLM again for a question that recently failed"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = 422
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class EntryStats:
+    __slots__ = ("query_text", "executions", "errors", "zero_hits", "slow", "took_ms", "max_took_ms", "last_error")
+
+    def __init__(self, query_text: str):
+        self.query_text = query_text
+        self.executions = 0
+        self.errors = 0
+        self.zero_hits = 0
+        self.slow = 0
+        self.took_ms = 0.0
+        self.max_took_ms = 0.0
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        succeeded = self.executions - self.errors
+        return {
+            "query_text": self.query_text,
+            "executions": self.executions,
+            "errors": self.errors,
+            "zero_hit_rate": round(self.zero_hits / succeeded, 3) if succeeded else None,
+            "avg_took_ms": round(self.took_ms / succeeded, 1) if succeeded else None,
+            "max_took_ms": self.max_took_ms,
+            "slow_executions": self.slow,
+            "last_error": self.last_error,
+        }
+
+
+class CacheFeedback:
+    """Execution outcomes per semantic-cache entry, and a negative cache for bad inputs.
+
+    An entry is quarantined when Elasticsearch rejects its DSL (400), after
+    ``max_errors`` other failures, or after ``max_slow`` executions over the
+    latency budget. Zero-hit rates are tracked for review but never quarantine:
+    an empty result is often the right answer.
+    """
+
+    def __init__(
+        self,
+        latency_budget_ms: float = 2000,
+        max_errors: int = 3,
+        max_slow: int = 2,
+        negative_ttl: float = 60,
+        max_entries: int = 10000,
+        max_negative: int = 10000,
+    ):
+        self.latency_budget_ms = latency_budget_ms
+        self.max_errors = max_errors
+        self.max_slow = max_slow
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_negative = max_negative
+        self._entries: "OrderedDict[int, EntryStats]" = OrderedDict()
+        # normalized question -> (expires at, reason); one TTL, so insertion order is expiry order
+        self._negative: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.negative_evicted = 0
+
+        self.quarantined = 0
+        self.negative_hits = 0
+        self.regenerated = 0
+        self.regeneration_failures = 0
+
+    def _entry(self, entry_id: int, query_text: str) -> EntryStats:
+        stats = self._entries.get(entry_id)
+        if stats is None:
+            stats = self._entries[entry_id] = EntryStats(query_text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(entry_id)
+        return stats
+
+    def record_success(
+        self, entry_id: int, query_text: str, took_ms: Optional[float], total_hits: Optional[int]
+    ) -> Optional[str]:
+        """Record a successful execution; returns a quarantine reason if it was too slow"""
+        stats = self._entry(entry_id, query_text)
+        stats.executions += 1
+        if total_hits == 0:
+            stats.zero_hits += 1
+        if took_ms is None:
+            return None
+
+        stats.took_ms += took_ms
+        stats.max_took_ms = max(stats.max_took_ms, took_ms)
+        if took_ms > self.latency_budget_ms:
+            stats.slow += 1
+            if stats.slow >= self.max_slow:
+                return f"took {took_ms:.0f}ms, over the {self.latency_budget_ms:.0f}ms budget"
+        return None
+
+    def record_error(
+        self, entry_id: int, query_text: str, status: Optional[int], error: str
+    ) -> Optional[str]:
+        """Record a failed execution; returns a quarantine reason if the entry should go"""
+        stats = self._entry(entry_id, query_text)
+        stats.executions += 1
+        stats.errors += 1
+        stats.last_error = error[:300]
+        if status == 400:
+            return f"rejected by Elasticsearch: {stats.last_error}"
+        if stats.errors >= self.max_errors:
+            return f"failed {stats.errors} times, last: {stats.last_error}"
+        return None
+
+    def forget(self, entry_id: int) -> None:
+        self._entries.pop(entry_id, None)
+
+    def add_negative(self, query: str, reason: str) -> None:
+        now = time.monotonic()
+        key = normalize_query(query)
+        self._negative[key] = (now + self.negative_ttl, reason)
+        self._negative.move_to_end(key)
+        self._prune_negative(now)
+
+    def _prune_negative(self, now: float) -> None:
+        """Drop expired questions, then the oldest beyond ``max_negative``"""
+        negative = self._negative
+        while negative:
+            key, (expires, _) = next(iter(negative.items()))
+            if expires > now:
+                break
+            del negative[key]
+        while len(negative) > self.max_negative:
+            negative.popitem(last=False)
+            self.negative_evicted += 1
+
+    def check_negative(self, query: str) -> None:
+        """Raise KnownBadQueryError if the question failed within the negative TTL"""
+        key = normalize_query(query)
+        entry = self._negative.get(key)
+        if entry is None:
+            return
+        expires, reason = entry
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            del self._negative[key]
+            return
+        self.negative_hits += 1
+        raise KnownBadQueryError(reason, math.ceil(remaining))
+
+    def get_stats(self, top: int = 10) -> Dict[str, Any]:
+        self._prune_negative(time.monotonic())
+        worst = sorted(
+            self._entries.items(),
+            key=lambda item: (item[1].errors, item[1].slow, item[1].max_took_ms),
+            reverse=True,
+        )
+        return {
+            "tracked_entries": len(self._entries),
+            "quarantined": self.quarantined,
+            "regenerated": self.regenerated,
+            "regeneration_failures": self.regeneration_failures,
+            "negative_cache_size": len(self._negative),
+            "negative_cache_hits": self.negative_hits,
+            "negative_cache_evicted": self.negative_evicted,
+            "settings": {
+                "latency_budget_ms": self.latency_budget_ms,
+                "max_errors": self.max_errors,
+                "max_slow": self.max_slow,
+                "negative_ttl": self.negative_ttl,
+                "max_negative": self.max_negative,
+            },
+            "worst_entries": [
+                {"id": entry_id, **stats.to_dict()}
+                for entry_id, stats in worst[:top]
+                if stats.errors or stats.slow
+            ],
+        }
@@ -0,0 +1,31 @@
+from typing import Any, Dict, Iterable
+from app.core.projection import dsl_field_names
+from app.schema.templates.hr_system_template import (
+    HR_SYSTEM_TEMPLATE,
+    get_documentation,
+    get_es_mapping,
+)
+import hashlib
+
+
+def schema_version(llm_model: str, embedding_model: str) -> str:
+    """Short hash of everything cached DSL depends on.
+
+    Entries generated against another mapping, documentation, prompt or model
+    live in another namespace and are never served.
+    """
+    digest = hashlib.sha1()
+    for part in (get_es_mapping(), get_documentation(), HR_SYSTEM_TEMPLATE, llm_model, embedding_model):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:12]
+
+
+def references_fields(dsl: Dict[str, Any], fields: Iterable[str]) -> bool:
+    """True when the DSL touches one of ``fields``, a sub-field or a parent object of one"""
+    fields = list(fields)
+    for name in dsl_field_names(dsl):
+        for field in fields:
+            if name == field or name.startswith(f"{field}.") or field.startswith(f"{name}."):
+                return True
+    return False
@@ -0,0 +1,232 @@
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+from app.utils.logger import logger
+import gzip
+import heapq
+import json
+import numpy as np
+import struct
+import time
+
+FORMAT_VERSION = 1
+VECTORS_FILE = "vectors.npy"
+ENTRIES_FILE = "entries.jsonl.gz"
+MANIFEST_FILE = "manifest.json"
+
+# Fixed-size .npy header so the row count can be filled in after streaming
+_NPY_HEADER_SIZE = 128
+
+
+def _npy_header(count: int, dim: int) -> bytes:
+    header = repr({"descr": "<f2", "fortran_order": False, "shape": (count, dim)}).encode()
+    padding = _NPY_HEADER_SIZE - 10 - len(header) - 1
+    if padding < 0:
+        raise ValueError(f"Snapshot too large for header: {count} x {dim}")
+    header += b" " * padding + b"\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header
+
+
+class SnapshotWriter:
+    """Streams entries into a snapshot directory without holding them in memory.
+
+    ``vectors.npy`` is one contiguous float16 (count, dim) block that
+    ``np.load(mmap_mode="r")`` maps directly; ``entries.jsonl.gz`` holds the
+    entry id, question, DSL and timestamp of each row in the same order.
+    """
+
+    def __init__(self, path: str, dim: int):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.count = 0
+        self._vectors = open(self.path / VECTORS_FILE, "wb")
+        self._vectors.write(_npy_header(0, dim))
+        self._entries = gzip.open(self.path / ENTRIES_FILE, "wt", compresslevel=6, encoding="utf-8")
+
+    def add(self, vectors: np.ndarray, rows: List[Dict[str, Any]]) -> None:
+        if len(vectors) != len(rows):
+            raise ValueError("vectors and rows must have the same length")
+        block = np.asarray(vectors, dtype="<f2").reshape(len(rows), self.dim)
+        self._vectors.write(block.tobytes())
+        self._entries.writelines(
+            json.dumps(row, separators=(",", ":"), ensure_ascii=False) + "\n" for row in rows
+        )
+        self.count += len(rows)
+
+    def close(self, **metadata: Any) -> Dict[str, Any]:
+        self._vectors.seek(0)
+        self._vectors.write(_npy_header(self.count, self.dim))
+        self._vectors.close()
+        self._entries.close()
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "count": self.count,
+            "dim": self.dim,
+            "dtype": "float16",
+            "created_at": datetime.now().isoformat(),
+            **metadata,
+        }
+        with open(self.path / MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+
+class SnapshotReader:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path / MANIFEST_FILE, "r") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format: {self.manifest.get('format_version')}")
+        self.vectors = np.load(self.path / VECTORS_FILE, mmap_mode="r")
+        if self.vectors.shape != (self.manifest["count"], self.manifest["dim"]):
+            raise ValueError(f"Snapshot vectors have shape {self.vectors.shape}, manifest disagrees")
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        with gzip.open(self.path / ENTRIES_FILE, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def batches(self, batch_size: int) -> Iterator[Tuple[np.ndarray, List[Dict[str, Any]]]]:
+        """(float32 vectors, rows) in order, reading only one batch of the mapped block at a time"""
+        rows: List[Dict[str, Any]] = []
+        start = 0
+        for row in self.rows():
+            rows.append(row)
+            if len(rows) == batch_size:
+                yield np.asarray(self.vectors[start:start + batch_size], dtype=np.float32), rows
+                start += batch_size
+                rows = []
+        if rows:
+            yield np.asarray(self.vectors[start:start + len(rows)], dtype=np.float32), rows
+
+
+def export_collection(vector_cache, path: str, batch_size: int = 5000) -> Dict[str, Any]:
+    """Stream the semantic cache collection into a snapshot directory"""
+    started = time.perf_counter()
+    collection = vector_cache.collection
+    codec = vector_cache.codec
+    writer = SnapshotWriter(path, vector_cache.dimension)
+    iterator = collection.query_iterator(
+        batch_size=batch_size,
+        expr="id >= 0",
+        output_fields=["id", codec.full_field, "query_text", "es_query", "created_at"],
+        partition_names=[vector_cache.partition],
+    )
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+            writer.add(
+                np.stack([codec.decode(row[codec.full_field]) for row in batch]),
+                [
+                    {
+                        "id": row["id"],
+                        "query_text": row["query_text"],
+                        "es_query": row["es_query"],
+                        "created_at": row["created_at"],
+                    }
+                    for row in batch
+                ],
+            )
+    finally:
+        iterator.close()
+
+    manifest = writer.close(
+        collection=vector_cache.collection_name,
+        namespace=vector_cache.partition,
+        quantization=codec.quantization,
+    )
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Exported {manifest['count']} cache entries to {path} in {elapsed:.1f}s "
+        f"({manifest['count'] / max(elapsed, 1e-9):.0f} entries/s)"
+    )
+    return {**manifest, "seconds": round(elapsed, 3)}
+
+
+def _same_schema(manifest: Dict[str, Any], vector_cache) -> bool:
+    return (manifest.get("namespace") or "").startswith(vector_cache._partition_prefix())
+
+
+def import_collection(
+    vector_cache, path: str, batch_size: int = 10000, replace: bool = False, force: bool = False
+) -> Dict[str, Any]:
+    """Bulk-load a snapshot: large inserts, one flush, and one index build when replacing.
+
+    A snapshot taken under another schema version is refused unless ``force``:
+    its DSL was generated for a different mapping, prompt or model and would
+    be served as cache hits.
+    """
+    started = time.perf_counter()
+    reader = SnapshotReader(path)
+
+    if reader.manifest["dim"] != vector_cache.dimension:
+        raise ValueError(
+            f"Snapshot dimension {reader.manifest['dim']} does not match "
+            f"collection dimension {vector_cache.dimension}"
+        )
+    if not force and not _same_schema(reader.manifest, vector_cache):
+        raise ValueError(
+            f"Snapshot namespace {reader.manifest.get('namespace') or 'unknown'} is not schema version "
+            f"{vector_cache.schema_version}; pass force to import it anyway"
+        )
+    if replace:
+        vector_cache.recreate_collection()
+
+    collection = vector_cache.collection
+    inserted = 0
+    for vectors, rows in reader.batches(batch_size):
+        collection.insert([
+            *vector_cache.codec.encode(vectors),
+            [row["query_text"] for row in rows],
+            [row["es_query"] for row in rows],
+            [row["created_at"] for row in rows],
+        ], partition_name=vector_cache.partition)
+        inserted += len(rows)
+        logger.info(f"Imported {inserted}/{reader.manifest['count']} cache entries")
+
+    collection.flush()
+    if replace:
+        vector_cache._create_index()
+    collection.load()
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Imported {inserted} cache entries from {path} in {elapsed:.1f}s "
+        f"({inserted / max(elapsed, 1e-9):.0f} entries/s)"
+    )
+    return {"imported": inserted, "seconds": round(elapsed, 3)}
+
+
+def load_local_cache(local_cache, path: str, vector_cache=None, limit: Optional[int] = None) -> int:
+    """Fill the in-process exact-match cache with the newest entries of a snapshot.
+
+    With ``vector_cache``, a snapshot taken under another schema version, or
+    of a generation that is no longer current, is skipped: its DSL was
+    generated for a different mapping, prompt or model, or has been cleared.
+    """
+    reader = SnapshotReader(path)
+    namespace = reader.manifest.get("namespace") or ""
+    if vector_cache is not None:
+        current = vector_cache.partition
+        if not _same_schema(reader.manifest, vector_cache) or (current is not None and namespace != current):
+            logger.warning(
+                f"Not loading snapshot {path} into the local cache: namespace {namespace or 'unknown'} "
+                f"is not the current one ({current or f'schema version {vector_cache.schema_version}'})"
+            )
+            return 0
+    limit = limit or local_cache.max_entries
+    newest = heapq.nlargest(limit, reader.rows(), key=lambda row: row.get("created_at", 0))
+    # Without ids: a restore on another cluster gives the entries new ones. Oldest first so
+    # the newest end up most recently used
+    for row in reversed(newest):
+        local_cache.put(row["query_text"], json.loads(row["es_query"]))
+    # Warmed before Milvus is up, the entries are dropped if the namespace turns out to be another
+    if namespace:
+        local_cache.set_namespace(namespace)
+    logger.info(f"Loaded {len(newest)} snapshot entries into the local cache")
+    return len(newest)
@@ -0,0 +1,278 @@
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.utils.logger import logger
+from app.utils.mapping_utils import load_mapping, nested_paths
+import asyncio
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    IMPORT_ERROR = None
+except ImportError as e:
+    pa = None
+    # Also raised by a pyarrow built against another numpy major version, so keep the reason
+    IMPORT_ERROR = str(e)
+    logger.warning(f"Columnar export disabled, pyarrow unavailable: {IMPORT_ERROR}")
+
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Elasticsearch field types as Arrow types; dates are parsed from strings in one cast per batch
+NUMERIC_TYPES = {
+    "long": "int64",
+    "integer": "int32",
+    "short": "int16",
+    "byte": "int8",
+    "double": "float64",
+    "float": "float32",
+    "half_float": "float32",
+    "scaled_float": "float64",
+}
+
+# Parts of the resolved DSL that decide which documents match; sorting, paging and aggs are dropped
+BODY_KEYS = ("query", "post_filter", "runtime_mappings")
+
+
+def export_body(dsl: Dict[str, Any], source_fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """The resolved DSL's filtering parts only: exports page over every hit in index order"""
+    body = {key: dsl[key] for key in BODY_KEYS if key in dsl}
+    body.setdefault("query", {"match_all": {}})
+    if source_fields:
+        body["_source"] = {"includes": source_fields}
+    return body
+
+
+class _ChunkSink:
+    """Write-only file collecting what a writer produced since the last drain"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.closed = False
+        self.position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+class ColumnarExporter:
+    """Flattens search hits into typed columns from mapping.json, one Arrow batch per page.
+
+    Objects become dotted columns (``employment_details.department.name``),
+    geo points ``.lat``/``.lon`` columns and every row carries the hit's
+    ``_id``. Nested objects are list-of-struct columns, or with ``table`` set
+    to a nested path, the export is that child table: one row per record,
+    keyed by the parent's ``_id`` and ``employee_id``.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[List[str]] = None,
+        table: Optional[str] = None,
+        parquet_compression: str = "zstd",
+    ):
+        if pa is None:
+            raise RuntimeError("Columnar export requires pyarrow")
+        if table is not None and table not in nested_paths():
+            raise ValueError(f"Unknown table '{table}'; expected one of {', '.join(nested_paths())}")
+        self.fields = fields
+        self.table = table
+        self.parquet_compression = parquet_compression
+        properties = load_mapping()["mappings"]["properties"]
+        self._leaves: List[str] = []
+        self._source_type = self._struct(properties, "", parse_dates=False)
+        self._target_type = self._struct(properties, "", parse_dates=True)
+        self.schema = self.to_batch([]).schema
+
+    def _included(self, path: str) -> bool:
+        if self.table is not None and path == "employee_id":
+            return True
+        if self.table is not None and not (
+            path.startswith(f"{self.table}.") or self.table.startswith(f"{path}.") or path == self.table
+        ):
+            return False
+        if not self.fields:
+            return True
+        return any(
+            path == field or path.startswith(f"{field}.") or field.startswith(f"{path}.")
+            for field in self.fields
+        )
+
+    def _leaf_type(self, kind: str, parse_dates: bool) -> "pa.DataType":
+        if kind in NUMERIC_TYPES:
+            return pa.type_for_alias(NUMERIC_TYPES[kind])
+        if kind == "boolean":
+            return pa.bool_()
+        if kind == "date":
+            return pa.timestamp("us") if parse_dates else pa.string()
+        if kind == "geo_point":
+            return pa.struct([("lat", pa.float64()), ("lon", pa.float64())])
+        return pa.string()
+
+    def _struct(self, properties: Dict[str, Any], prefix: str, parse_dates: bool) -> "pa.StructType":
+        members = []
+        for name, spec in properties.items():
+            path = f"{prefix}{name}"
+            if not self._included(path):
+                continue
+            if "properties" in spec:
+                member = self._struct(spec["properties"], f"{path}.", parse_dates)
+                if member.num_fields == 0:
+                    continue
+                if spec.get("type") == "nested":
+                    member = pa.list_(member)
+            else:
+                member = self._leaf_type(spec.get("type", "object"), parse_dates)
+                if parse_dates:
+                    self._leaves.append(path)
+            members.append(pa.field(name, member))
+        return pa.struct(members)
+
+    @property
+    def source_fields(self) -> Optional[List[str]]:
+        """``_source`` includes for the search, or None to fetch whole documents"""
+        if not self.fields and self.table is None:
+            return None
+        return list(self._leaves)
+
+    def _convert(self, sources: List[Dict[str, Any]]) -> "pa.StructArray":
+        try:
+            array = pa.array(sources, type=self._source_type)
+            return pc.cast(array, self._target_type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            # Unusual values (epoch dates, zoned timestamps, arrays, numbers in keywords): coerce in Python
+            logger.warning(f"Columnar export falling back to per-value conversion: {str(e)}")
+            sources = [_coerce(source, self._target_type) for source in sources]
+            return pc.cast(pa.array(sources, type=self._source_type), self._target_type)
+
+    def to_batch(self, hits: List[Dict[str, Any]]) -> "pa.RecordBatch":
+        ids = pa.array([hit.get("_id") for hit in hits], type=pa.string())
+        array = self._convert([hit.get("_source") or {} for hit in hits])
+        columns = {"_id": ids}
+        columns.update(_flatten(array, ""))
+        if self.table is None:
+            return pa.RecordBatch.from_pydict(columns)
+
+        records = columns.pop(self.table)
+        parents = pc.list_parent_indices(records)
+        child = {"_id": ids.take(parents)}
+        if "employee_id" in columns:
+            child["employee_id"] = columns["employee_id"].take(parents)
+        child.update(_flatten(pc.list_flatten(records), f"{self.table}."))
+        return pa.RecordBatch.from_pydict(child)
+
+    def _writer(self, sink: _ChunkSink, fmt: str):
+        if fmt == "parquet":
+            return pq.ParquetWriter(sink, self.schema, compression=self.parquet_compression)
+        return pa.ipc.new_stream(sink, self.schema)
+
+    async def stream(self, pages: AsyncIterator[List[Dict[str, Any]]], fmt: str) -> AsyncIterator[bytes]:
+        """Encode pages of hits as they arrive, yielding bytes; memory stays at about one page"""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}'; expected one of {', '.join(FORMATS)}")
+        sink = _ChunkSink()
+        writer = self._writer(sink, fmt)
+        rows = 0
+        try:
+            async for hits in pages:
+                # Conversion and compression are CPU work; keep them off the event loop
+                batch = await asyncio.to_thread(self._write, writer, hits)
+                rows += batch.num_rows
+                data = sink.drain()
+                if data:
+                    yield data
+            writer.close()
+            yield sink.drain()
+            logger.info(f"Exported {rows} rows as {fmt}")
+        except Exception as e:
+            logger.error(f"Columnar export failed after {rows} rows: {str(e)}")
+            raise
+
+    def _write(self, writer, hits: List[Dict[str, Any]]) -> "pa.RecordBatch":
+        batch = self.to_batch(hits)
+        writer.write_batch(batch)
+        return batch
+
+
+def _flatten(array: "pa.Array", prefix: str) -> Dict[str, "pa.Array"]:
+    """Struct members as dotted columns, recursively; lists of structs stay whole"""
+    if not pa.types.is_struct(array.type):
+        return {prefix.rstrip("."): array}
+    columns: Dict[str, "pa.Array"] = {}
+    for field, child in zip(array.type, array.flatten()):
+        columns.update(_flatten(child, f"{prefix}{field.name}."))
+    return columns
+
+
+def _coerce(value: Any, arrow_type: "pa.DataType") -> Any:
+    """Shape one value from _source to what ``pa.array`` accepts for the column.
+
+    ``arrow_type`` is the parsed column type; dates come back as naive UTC
+    ISO strings for the batch's vectorized cast.
+    """
+    if value is None:
+        return None
+    if pa.types.is_struct(arrow_type):
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if isinstance(value, str) and {field.name for field in arrow_type} == {"lat", "lon"}:
+            lat, _, lon = value.partition(",")
+            return {"lat": float(lat), "lon": float(lon)}
+        if not isinstance(value, dict):
+            return None
+        return {field.name: _coerce(value.get(field.name), field.type) for field in arrow_type}
+    if pa.types.is_list(arrow_type):
+        items = value if isinstance(value, list) else [value]
+        return [_coerce(item, arrow_type.value_type) for item in items]
+    if isinstance(value, list):
+        # Multi-valued scalar fields: strings are joined, other types keep the first value
+        if pa.types.is_string(arrow_type):
+            return "; ".join(str(item) for item in value if item is not None)
+        value = value[0] if value else None
+        if value is None:
+            return None
+    if pa.types.is_timestamp(arrow_type):
+        return _coerce_date(value)
+    if pa.types.is_string(arrow_type):
+        return str(value)
+    if pa.types.is_boolean(arrow_type):
+        return value if isinstance(value, bool) else str(value).lower() == "true"
+    if pa.types.is_integer(arrow_type):
+        return int(float(value))
+    if pa.types.is_floating(arrow_type):
+        return float(value)
+    return value
+
+
+def _coerce_date(value: Any) -> Optional[str]:
+    # Numbers are epoch milliseconds; zoned timestamps are converted to UTC
+    if isinstance(value, (int, float)):
+        parsed = datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
@@ -0,0 +1,182 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from app.utils.logger import logger
+import asyncio
+import hashlib
+import json
+import re
+import time
+
+# Date math in the DSL ("now-7d/d"); results depend on the clock as well as the index
+DATE_MATH = re.compile(r"\bnow(?:[+-]\d+[yMwdhHms])*(?:/([yMwdhHms]))?")
+
+# strftime pattern per rounding unit, coarsest first
+ROUNDING = {"y": "%Y", "M": "%Y-%m", "w": "%G-W%V", "d": "%Y-%m-%d", "h": "%Y-%m-%dT%H",
+            "H": "%Y-%m-%dT%H", "m": "%Y-%m-%dT%H:%M", "s": "%Y-%m-%dT%H:%M:%S"}
+UNITS = list(ROUNDING)
+
+
+def date_math_bucket(encoded_dsl: str) -> Optional[str]:
+    """The current period for the DSL's date math: "" without any, None if it is not rounded.
+
+    ``now/d`` gives the same results all day, so the day goes into the ETag;
+    unrounded ``now`` changes every millisecond and makes the response uncacheable.
+    """
+    finest = None
+    for match in DATE_MATH.finditer(encoded_dsl):
+        unit = match.group(1)
+        if unit is None:
+            return None
+        if finest is None or UNITS.index(unit) > UNITS.index(finest):
+            finest = unit
+    if finest is None:
+        return ""
+    return datetime.now(timezone.utc).strftime(ROUNDING[finest])
+
+
+def search_etag(dsl: Dict[str, Any], *parts: Any) -> Optional[str]:
+    """Weak ETag for the results of ``dsl`` given the state markers in ``parts``.
+
+    Weak because the body also carries per-request timings and may be
+    compressed; two responses with the same tag have the same results.
+    """
+    encoded = json.dumps(dsl, sort_keys=True, separators=(",", ":"), default=str)
+    bucket = date_math_bucket(encoded)
+    if bucket is None:
+        return None
+    digest = hashlib.sha1(encoded.encode())
+    for part in (*parts, bucket):
+        digest.update(b"\x00" + str(part).encode())
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class IndexChangeMarker:
+    """Changes whenever a search over the index could return something different.
+
+    Built from the index stats: the UUIDs of the concrete indices behind the
+    alias (a migration or full load swaps them), document writes and deletes
+    on the primaries (counted as they happen, before a refresh makes them
+    visible) and external refreshes. Read at most every ``ttl`` seconds,
+    which bounds how long a 304 can trail a write; concurrent callers share
+    one request.
+    """
+
+    def __init__(self, es, index: str, ttl: float = 1.0, timeout: float = 2.0):
+        self.es = es
+        self.index = index
+        self.ttl = ttl
+        self.timeout = timeout
+        self.value: Optional[str] = None
+        self.fetched_at = 0.0
+        self.fetches = 0
+        self.failures = 0
+        self.changes = 0
+        self._pending: Optional[asyncio.Task] = None
+
+    async def current(self) -> Optional[str]:
+        """The marker, or None when the stats could not be read"""
+        if self.value is not None and time.monotonic() - self.fetched_at < self.ttl:
+            return self.value
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self._fetch())
+        # Shielded: a cancelled request must not cancel the read other requests wait on
+        return await asyncio.shield(self._pending)
+
+    async def _fetch(self) -> Optional[str]:
+        self.fetches += 1
+        try:
+            stats = await self.es.options(request_timeout=self.timeout).indices.stats(
+                index=self.index,
+                metric=["indexing", "refresh"],
+                filter_path=[
+                    "indices.*.uuid",
+                    "_all.primaries.indexing.index_total",
+                    "_all.primaries.indexing.delete_total",
+                    "_all.primaries.refresh.external_total",
+                ],
+            )
+        except Exception as e:
+            self.failures += 1
+            self.value = None
+            logger.error(f"Failed to read index change marker: {str(e)}")
+            return None
+        primaries = stats.get("_all", {}).get("primaries", {})
+        indexing = primaries.get("indexing", {})
+        value = "{}:{}:{}:{}".format(
+            ",".join(sorted(index["uuid"] for index in stats.get("indices", {}).values())),
+            indexing.get("index_total"),
+            indexing.get("delete_total"),
+            primaries.get("refresh", {}).get("external_total"),
+        )
+        if self.value is not None and value != self.value:
+            self.changes += 1
+        self.value = value
+        self.fetched_at = time.monotonic()
+        return value
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "ttl_ms": self.ttl * 1000,
+            "fetches": self.fetches,
+            "failures": self.failures,
+            "changes": self.changes,
+        }
+
+
+class ConditionalStats:
+    """How many searches were answered with 304, and the bytes and time that saved.
+
+    The size and execution time of the last full response for each ETag
+    stand in for what a 304 on that tag avoided.
+    """
+
+    def __init__(self, max_tracked: int = 10000):
+        self.max_tracked = max_tracked
+        self._full: "OrderedDict[str, tuple]" = OrderedDict()
+        self.tagged = 0
+        self.conditional = 0
+        self.not_modified = 0
+        self.bytes_saved = 0
+        self.seconds_saved = 0.0
+
+    def record_full(self, etag: str, size: int, seconds: float, conditional: bool) -> None:
+        self.tagged += 1
+        self.conditional += conditional
+        self._full[etag] = (size, seconds)
+        self._full.move_to_end(etag)
+        while len(self._full) > self.max_tracked:
+            self._full.popitem(last=False)
+
+    def record_not_modified(self, etag: str) -> None:
+        self.conditional += 1
+        self.not_modified += 1
+        size, seconds = self._full.get(etag, (0, 0.0))
+        self.bytes_saved += size
+        self.seconds_saved += seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tagged_responses": self.tagged,
+            "conditional_requests": self.conditional,
+            "not_modified": self.not_modified,
+            "not_modified_rate": f"{self.not_modified / self.conditional:.2%}" if self.conditional else None,
+            "bytes_saved": self.bytes_saved,
+            "execution_seconds_saved": round(self.seconds_saved, 3),
+        }
@@ -1,62 +1,107 @@
-from typing import Optional
-from app.core.elasticsearch_client import ElasticsearchClient
-from app.core.vector_cache import VectorCache
-from app.core.cache_stats import CacheStats
-from app.core.search_agent import SearchAgent
+from typing import Optional, Dict, Any, TYPE_CHECKING
 from app.core.services import (
     IElasticsearchClient,
-    ICacheStats,
     IVectorCache,
     ISearchAgent,
 )
-from app.config import Config
-from app.utils.logger import logger
+from app.core.admission import AdmissionController
+from app.core.cache_feedback import CacheFeedback
+from app.core.conditional import ConditionalStats, IndexChangeMarker
+from app.core.deadline import CancellationStats
+from app.core.degraded import DegradedMode
+from app.core.diagnostics import Diagnostics
+from app.core.embedding_batcher import EmbeddingBatcher
+from app.core.embeddings import create_embedding_provider
+from app.core.local_cache import LocalQueryCache
+from app.core.query_profiler import QueryProfiler
+from app.core.speculation import Speculator
+from app.core.suggestions import SuggestionIndex
+from app.config import Config, get_settings
+from app.utils.logger import LoggerSetup, logger
+import asyncio
+import importlib
+import time
 
+if TYPE_CHECKING:
+    from app.core.elasticsearch_client import ElasticsearchClient
+    from app.core.rollups import RollupManager
+    from app.core.search_agent import SearchAgent
+    from app.core.vector_cache import VectorCache
 
-class ServiceContainer:
-    _instance = None
-    _initialized = False
+# Imported off the event loop during warm-up instead of when the app module loads
+HEAVY_MODULES = [
+    "elasticsearch",
+    "pymilvus",
+    "langchain_openai",
+    "langchain.prompts",
+]
 
-    # Service instances
-    es_client: Optional[IElasticsearchClient] = None
-    cache_stats: Optional[ICacheStats] = None
-    vector_cache: Optional[IVectorCache] = None
-    search_agent: Optional[ISearchAgent] = None
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(ServiceContainer, cls).__new__(cls)
-        return cls._instance
+class Readiness:
+    """Tracks warm-up of each dependency for the /ready endpoint"""
 
     def __init__(self):
-        if self._initialized:
-            return
-        self._initialize_services()
-        self._initialized = True
+        self.started_at = time.perf_counter()
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.ready_after: Optional[float] = None
+        self.app_import_seconds: Optional[float] = None
 
-    def _initialize_services(self):
-        """Initialize all service dependencies"""
-        try:
-            # Get config
-            config = Config.get_config()
+    def mark(self, name: str, status: str, started: float, error: str = None) -> None:
+        self.components[name] = {
+            "status": status,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        if error:
+            self.components[name]["error"] = error
 
-            # Initialize ES client first
-            self.es_client = ElasticsearchClient(config["elasticsearch"])
+    @property
+    def ready(self) -> bool:
+        return bool(self.components) and all(
+            c["status"] == "ready" for c in self.components.values()
+        )
 
-            # Initialize cache stats
-            self.cache_stats = CacheStats.get_instance(self.es_client)
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "app_import_seconds": self.app_import_seconds,
+            "ready_after_seconds": self.ready_after,
+            "components": self.components,
+        }
 
-            # Initialize vector cache
-            self.vector_cache = VectorCache(config, self.es_client)
 
-            # Initialize search agent
-            self.search_agent = SearchAgent(self.es_client, self.vector_cache)
+class ServiceContainer:
+    """Process-wide services, created once and warmed concurrently at startup"""
 
-            logger.info("Service container initialized successfully")
+    _instance = None
 
-        except Exception as e:
-            logger.error(f"Failed to initialize service container: {str(e)}")
-            raise
+    def __init__(self):
+        self.config = Config.get_config()
+        self.readiness = Readiness()
+        self._es_client: Optional[IElasticsearchClient] = None
+        self._vector_cache: Optional[IVectorCache] = None
+        self._search_agent: Optional[ISearchAgent] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self._rollups: Optional["RollupManager"] = None
+        self._rollup_task: Optional[asyncio.Task] = None
+        self._suggestion_task: Optional[asyncio.Task] = None
+        self._change_marker: Optional[IndexChangeMarker] = None
+        self.admission = AdmissionController(**self.config["admission"])
+        self.speculator = Speculator(**self.config["speculation"])
+        self.local_cache = LocalQueryCache(**self.config["local_cache"])
+        self.feedback = CacheFeedback(**self.config["feedback"])
+        self.profiler = QueryProfiler(**self.config["profiler"])
+        self.degraded = DegradedMode(**self.config["degraded"])
+        self.cancellations = CancellationStats()
+        self.suggestions = SuggestionIndex(**self.config["suggestions"])
+        self.diagnostics = Diagnostics(**self.config["diagnostics"])
+        self.conditional = ConditionalStats()
+        # Cheap to build: clients and models load during warm-up
+        embeddings = self.config["embeddings"]
+        self.embedder = create_embedding_provider(embeddings, dim=self.config["milvus"]["embedding_dim"])
+        if embeddings["micro_batching"]:
+            self.embedder = EmbeddingBatcher(
+                self.embedder, max_batch=embeddings["max_batch"], max_wait=embeddings["max_wait"]
+            )
 
     @classmethod
     def get_instance(cls) -> "ServiceContainer":
@@ -65,14 +110,197 @@ class ServiceContainer:
             cls._instance = cls()
         return cls._instance
 
-    def get_es_client(self) -> IElasticsearchClient:
-        return self.es_client
+    def get_es_client(self) -> "ElasticsearchClient":
+        if self._es_client is None:
+            from app.core.elasticsearch_client import ElasticsearchClient
+
+            self._es_client = ElasticsearchClient(self.config["elasticsearch"])
+        return self._es_client
+
+    def get_vector_cache(self) -> "VectorCache":
+        if self._vector_cache is None:
+            from app.core.vector_cache import VectorCache
+
+            from app.core.cache_namespace import schema_version
+
+            self._vector_cache = VectorCache({
+                **self.config["milvus"],
+                "namespace": self.embedder.namespace,
+                "schema_version": schema_version(get_settings().model_name, self.embedder.name),
+            }, suggestions=self.suggestions)
+        return self._vector_cache
+
+    def get_search_agent(self) -> "SearchAgent":
+        if self._search_agent is None:
+            from app.core.search_agent import SearchAgent
+
+            self._search_agent = SearchAgent(
+                self.get_es_client(),
+                self.get_vector_cache(),
+                admission=self.admission,
+                speculator=self.speculator,
+                local_cache=self.local_cache,
+                feedback=self.feedback,
+                embedder=self.embedder,
+                degraded=self.degraded,
+                cancellations=self.cancellations,
+                suggestions=self.suggestions,
+            )
+        return self._search_agent
+
+    def get_change_marker(self) -> Optional[IndexChangeMarker]:
+        """Index change marker for search ETags, or None when ETags are disabled"""
+        settings = self.config["api"]["etag"]
+        if self._change_marker is None and settings["enabled"]:
+            self._change_marker = IndexChangeMarker(
+                self.get_es_client().client,
+                self.config["elasticsearch"]["elasticsearch_index"],
+                ttl=settings["marker_ttl"],
+            )
+        return self._change_marker
+
+    def get_rollups(self) -> Optional["RollupManager"]:
+        """Rollup answers for aggregation queries, or None when disabled"""
+        settings = self.config["rollups"]
+        if self._rollups is None and settings["enabled"]:
+            from app.core.rollups import RollupManager
 
-    def get_cache_stats(self) -> ICacheStats:
-        return self.cache_stats
+            self._rollups = RollupManager(
+                self.get_es_client().client,
+                self.config["elasticsearch"]["elasticsearch_index"],
+                settings["index"],
+                max_staleness=settings["max_staleness"],
+                full_rebuild_interval=settings["full_rebuild_interval"],
+            )
+        return self._rollups
+
+    def _start_rollups(self) -> None:
+        rollups = self.get_rollups()
+        if rollups is not None and self._rollup_task is None:
+            self._rollup_task = asyncio.create_task(
+                rollups.run(self.config["rollups"]["refresh_interval"])
+            )
+
+    def _start_suggestions(self) -> None:
+        if self.suggestions.enabled and self._suggestion_task is None:
+            self._suggestion_task = asyncio.create_task(self.suggestions.run(self.get_vector_cache()))
+
+    def _is_ready(self, name: str) -> bool:
+        return self.readiness.components.get(name, {}).get("status") == "ready"
+
+    async def _step(self, name: str, func) -> None:
+        started = time.perf_counter()
+        try:
+            await func()
+            self.readiness.mark(name, "ready", started)
+        except Exception as e:
+            logger.error(f"Warm-up step '{name}' failed: {str(e)}")
+            self.readiness.mark(name, "failed", started, str(e))
+
+    async def _import_modules(self) -> None:
+        def load():
+            # Sequential: concurrent imports of shared dependencies can deadlock
+            for module in HEAVY_MODULES:
+                importlib.import_module(module)
+
+        await asyncio.to_thread(load)
+
+    async def _warm_elasticsearch(self) -> None:
+        es_client = self.get_es_client()
+        if not await es_client.client.ping():
+            raise ConnectionError("Elasticsearch ping failed")
+
+    async def _warm_milvus(self) -> None:
+        await self.get_vector_cache().initialize()
+
+    async def _warm_agent(self) -> None:
+        agent = await asyncio.to_thread(self.get_search_agent)
+        await asyncio.to_thread(agent.warm_up)
+
+    async def _warm_local_cache(self) -> None:
+        from app.core.cache_snapshot import load_local_cache
+
+        path = self.config["cache_snapshot"]["warm_path"]
+        vector_cache = self.get_vector_cache()
+        await asyncio.to_thread(load_local_cache, self.local_cache, path, vector_cache)
+
+    async def _run_warm_up(self) -> None:
+        steps = {
+            "elasticsearch": self._warm_elasticsearch,
+            "milvus": self._warm_milvus,
+            "search_agent": self._warm_agent,
+        }
+        if self.config["cache_snapshot"]["warm_path"]:
+            steps["local_cache"] = self._warm_local_cache
+        if not self._is_ready("imports"):
+            await self._step("imports", self._import_modules)
+
+        # Create the shared clients here so the concurrent steps never race to build them
+        self.get_es_client()
+        self.get_vector_cache()
+        await asyncio.gather(
+            *(self._step(name, step) for name, step in steps.items() if not self._is_ready(name))
+        )
+        if self.readiness.ready:
+            self._start_rollups()
+            self._start_suggestions()
+            self.readiness.ready_after = round(time.perf_counter() - self.readiness.started_at, 3)
+            logger.info(
+                f"Services ready in {self.readiness.ready_after}s",
+                extra={"startup": self.readiness.components},
+            )
+
+    def start_warm_up(self) -> asyncio.Task:
+        """Start warming dependencies in the background, or return the running warm-up"""
+        if self._warm_up_task is None or (
+            self._warm_up_task.done() and not self.readiness.ready
+        ):
+            self._warm_up_task = asyncio.create_task(self._run_warm_up())
+        return self._warm_up_task
+
+    async def ensure_ready(self) -> None:
+        """Wait for warm-up, retrying failed steps, so requests never race it"""
+        if self.readiness.ready:
+            return
+        await asyncio.shield(self.start_warm_up())
+        failed = {n: c for n, c in self.readiness.components.items() if c["status"] != "ready"}
+        if failed:
+            raise RuntimeError(f"Services not ready: {', '.join(failed)}")
 
-    def get_vector_cache(self) -> IVectorCache:
-        return self.vector_cache
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics: Dict[str, Any] = {
+            "admission": self.admission.get_stats(),
+            "speculation": self.speculator.get_stats(),
+            "local_cache": self.local_cache.get_stats(),
+            "cache_feedback": self.feedback.get_stats(),
+            "query_profiler": self.profiler.get_stats(),
+            "embeddings": self.embedder.get_stats(),
+            "degraded": self.degraded.get_stats(),
+            "cancellation": self.cancellations.get_stats(),
+            "suggestions": self.suggestions.get_stats(),
+            "diagnostics": self.diagnostics.get_stats(),
+            "logging": LoggerSetup.get_stats(),
+        }
+        if self._rollups is not None:
+            metrics["rollups"] = self._rollups.get_stats()
+        if self._es_client is not None and self._es_client.hedger is not None:
+            metrics["hedging"] = self._es_client.hedger.get_stats()
+        if self._change_marker is not None:
+            metrics["conditional"] = {
+                **self.conditional.get_stats(),
+                "marker": self._change_marker.get_stats(),
+            }
+        if self._vector_cache is not None:
+            metrics["milvus"] = self._vector_cache.connections.get_stats()
+        return metrics
 
-    def get_search_agent(self) -> ISearchAgent:
-        return self.search_agent
+    async def close(self) -> None:
+        self.diagnostics.close()
+        for task in (self._warm_up_task, self._rollup_task, self._suggestion_task):
+            if task and not task.done():
+                task.cancel()
+        if self._es_client is not None:
+            await self._es_client.close()
+            self._es_client = None
+        if self._vector_cache is not None:
+            await self._vector_cache.close()
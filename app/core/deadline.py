@@ -0,0 +1,95 @@
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+import time
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request's deadline passes before its answer is ready"""
+
+    status_code = 504
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.reason = f"Request deadline exceeded during {stage}"
+        super().__init__(self.reason)
+
+
+class Deadline:
+    """Absolute deadline of one request, shared by every task working on it.
+
+    ``stage`` names the downstream call in progress, so a disconnect or an
+    expiry can be attributed to the work it interrupted.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.stage = "request"
+
+    @classmethod
+    def from_header(cls, value: Optional[str], default: float, maximum: float) -> "Deadline":
+        """Deadline from a header in milliseconds, falling back to ``default``"""
+        seconds = default
+        if value:
+            try:
+                seconds = float(value) / 1000
+            except ValueError:
+                pass
+        return cls(min(max(seconds, 0.0), maximum))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, stage: str) -> float:
+        """Seconds left for the next downstream call; raises when none are"""
+        self.stage = stage
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceededError(stage)
+        return remaining
+
+
+deadline_var: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return deadline_var.get()
+
+
+def clear_deadline() -> None:
+    """Detach background work started by a request from that request's deadline"""
+    deadline_var.set(None)
+
+
+class CancellationStats:
+    """Work abandoned because the client disconnected or its deadline passed"""
+
+    def __init__(self):
+        self.disconnects: Counter = Counter()
+        self.deadline_exceeded: Counter = Counter()
+        self.llm_cancelled = 0
+        self.llm_kept = 0
+        self.llm_kept_cached = 0
+
+    def record_disconnect(self, stage: str) -> None:
+        self.disconnects[stage] += 1
+
+    def record_deadline(self, stage: str) -> None:
+        self.deadline_exceeded[stage] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "disconnects": sum(self.disconnects.values()),
+            "disconnects_by_stage": dict(self.disconnects),
+            "deadline_exceeded": sum(self.deadline_exceeded.values()),
+            "deadline_exceeded_by_stage": dict(self.deadline_exceeded),
+            # Generations dropped before reaching the LLM vs. left to finish and fill the cache
+            "llm_cancelled": self.llm_cancelled,
+            "llm_kept": self.llm_kept,
+            "llm_kept_cached": self.llm_kept_cached,
+        }
@@ -0,0 +1,148 @@
+from collections import Counter
+from typing import Any, Awaitable, Dict, Optional, Tuple
+from app.core.deadline import DeadlineExceededError, current_deadline
+from app.core.rule_compiler import RuleCompiler
+from app.utils.mapping_utils import field_types, nested_paths
+import asyncio
+import time
+
+
+class CircuitBreaker:
+    """Provider health from consecutive failures; calls slower than ``slow_call`` count as failures.
+
+    Open after ``failure_threshold`` failures in a row, then let one probe
+    through every ``reset_timeout`` seconds until a call succeeds in time.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30, slow_call: float = 10):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call = slow_call
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self.last_failure: Optional[str] = None
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == "open" and now - self._opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open":
+            # One probe at a time; a probe that never reported expires
+            if self._probe_started is None or now - self._probe_started >= self.reset_timeout:
+                self._probe_started = now
+                return True
+        if self.state == "closed":
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self, seconds: float) -> None:
+        if seconds > self.slow_call:
+            self.record_failure(f"slow call ({seconds:.1f}s)")
+            return
+        self.failures = 0
+        self.state = "closed"
+        self._probe_started = None
+
+    def record_failure(self, reason: str) -> None:
+        self.failures += 1
+        self.last_failure = reason
+        self._probe_started = None
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.trips += 1
+            self._opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "last_failure": self.last_failure,
+        }
+
+
+class DegradedMode:
+    """Answers within a latency budget when the LLM or embedding provider is unhealthy.
+
+    Fallback tiers, best first: the closest cached DSL even below the hit
+    threshold (down to ``cached_floor``), the rule compiler, and a
+    ``multi_match`` over the mapping's text fields.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        latency_budget: float = 8.0,
+        embedding_slow: float = 1.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        cached_floor: float = 0.7,
+    ):
+        self.enabled = enabled
+        self.latency_budget = latency_budget
+        self.cached_floor = cached_floor
+        self.llm = CircuitBreaker("llm", failure_threshold, reset_timeout, slow_call=latency_budget)
+        self.embeddings = CircuitBreaker("embeddings", failure_threshold, reset_timeout, slow_call=embedding_slow)
+        self.rules = RuleCompiler()
+        self.text_fields = sorted(
+            field for field, kind in field_types().items()
+            if kind == "text" and not any(field.startswith(f"{path}.") for path in nested_paths())
+        )
+        self.tiers: Counter = Counter()
+
+    def llm_available(self) -> bool:
+        return not self.enabled or self.llm.allow()
+
+    def embeddings_available(self) -> bool:
+        return not self.enabled or self.embeddings.allow()
+
+    async def within_budget(self, awaitable: Awaitable, started: float, stage: str) -> Any:
+        """Await with whatever is left of the latency budget or the request deadline.
+
+        Running out of budget raises asyncio.TimeoutError, which degrades; running out
+        of deadline raises DeadlineExceededError, since nobody waits for a fallback.
+        """
+        budget = None
+        if self.enabled:
+            budget = max(0.0, self.latency_budget - (time.perf_counter() - started))
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.stage = stage
+            remaining = deadline.remaining()
+            if budget is None or remaining < budget:
+                try:
+                    return await asyncio.wait_for(awaitable, remaining)
+                except asyncio.TimeoutError:
+                    raise DeadlineExceededError(stage) from None
+        if budget is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, budget)
+
+    def record_tier(self, tier: str) -> None:
+        self.tiers[tier] += 1
+
+    def fallback(self, query: str, candidate: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], str]:
+        if candidate is not None:
+            return candidate["es_query"], "cached_below_threshold"
+        compiled = self.rules.compile(query)
+        if compiled is not None:
+            return compiled, "rules"
+        return {
+            "size": 20,
+            "query": {"multi_match": {"query": query, "fields": self.text_fields, "lenient": True}},
+        }, "multi_match"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "latency_budget_ms": self.latency_budget * 1000,
+            "tiers": dict(self.tiers),
+            "breakers": {"llm": self.llm.get_stats(), "embeddings": self.embeddings.get_stats()},
+        }
@@ -0,0 +1,100 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+# Values with a column of their own under derived.leave_days; others are mapped dynamically
+LEAVE_TYPES = ["Annual Leave", "Sick Leave", "Maternity Leave", "Paternity Leave", "Unpaid Leave"]
+LEAVE_STATUSES = ["Pending", "Approved", "Rejected", "Cancelled"]
+
+
+def slug(value: str) -> str:
+    """Field name for a keyword value: "Sick Leave" -> "sick_leave" """
+    return "_".join(str(value).lower().replace("&", " ").split())
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date()
+    except ValueError:
+        return None
+
+
+def _salary_changes(history: List[Dict[str, Any]], as_of: date) -> List[Dict[str, Any]]:
+    dated = [
+        (effective, entry)
+        for entry in history
+        if (effective := _parse_date(entry.get("effective_date"))) and effective <= as_of
+    ]
+    return [entry for _, entry in sorted(dated, key=lambda item: item[0])]
+
+
+def _leave_days(record: Dict[str, Any], start: date, end: date) -> int:
+    """Calendar days of a leave record inside [start, end], both ends inclusive"""
+    first, last = _parse_date(record.get("start_date")), _parse_date(record.get("end_date"))
+    if first is None:
+        return 0
+    last = last or first
+    return max(0, (min(last, end) - max(first, start)).days + 1)
+
+
+def derive_fields(employee: Dict[str, Any], as_of: Optional[date] = None) -> Dict[str, Any]:
+    """Denormalized facts about an employee for flat range/term queries.
+
+    Everything here can otherwise only be asked with nested queries over
+    ``salary_history``/``leave_records`` or with scripts. Values that move
+    with time (tenure, this year's leave, on leave now) are as of ``as_of``,
+    stored alongside; ``manage_index.py derive`` recomputes them.
+    """
+    as_of = as_of or date.today()
+    employment = employee.get("employment_details") or {}
+    salary = employee.get("salary_info") or {}
+    leaves = employee.get("leave_records") or []
+
+    derived: Dict[str, Any] = {"as_of": as_of.isoformat()}
+
+    hired = _parse_date(employment.get("hire_date"))
+    derived["tenure_years"] = round((as_of - hired).days / 365.25, 2) if hired else None
+
+    changes = _salary_changes(salary.get("salary_history") or [], as_of)
+    raises = [
+        current for previous, current in zip(changes, changes[1:])
+        if (current.get("amount") or 0) > (previous.get("amount") or 0)
+    ]
+    derived["current_salary"] = changes[-1].get("amount") if changes else salary.get("base_salary")
+    derived["raise_count"] = len(raises)
+    derived["last_raise_date"] = raises[-1]["effective_date"] if raises else None
+
+    year_start, year_end = date(as_of.year, 1, 1), date(as_of.year, 12, 31)
+    totals = {
+        "total": 0,
+        "approved": 0,
+        "approved_this_year": 0,
+        "by_status": {slug(status): 0 for status in LEAVE_STATUSES},
+        "approved_by_type": {slug(leave_type): 0 for leave_type in LEAVE_TYPES},
+    }
+    on_leave = False
+    for record in leaves:
+        days = _leave_days(record, date.min, date.max)
+        status = record.get("status")
+        totals["total"] += days
+        if status:
+            totals["by_status"][slug(status)] = totals["by_status"].get(slug(status), 0) + days
+        if status != "Approved":
+            continue
+        totals["approved"] += days
+        totals["approved_this_year"] += _leave_days(record, year_start, year_end)
+        leave_type = record.get("leave_type")
+        if leave_type:
+            by_type = totals["approved_by_type"]
+            by_type[slug(leave_type)] = by_type.get(slug(leave_type), 0) + days
+        on_leave = on_leave or _leave_days(record, as_of, as_of) > 0
+    derived["leave_days"] = totals
+    derived["on_leave"] = on_leave
+    return derived
+
+
+def with_derived_fields(employee: Dict[str, Any], as_of: Optional[date] = None) -> Dict[str, Any]:
+    """The employee document with its ``derived`` object (re)computed, in place"""
+    employee["derived"] = derive_fields(employee, as_of)
+    return employee
@@ -0,0 +1,449 @@
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from app.utils.logger import logger
+import asyncio
+import gc
+import os
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+import uuid
+
+# Stacks are reported in the collapsed format read by flamegraph.pl, speedscope and inferno:
+# one "outer;...;inner count" line per distinct stack
+
+_STDLIB = sysconfig.get_paths()["stdlib"] + os.sep
+
+
+@lru_cache(maxsize=4096)
+def _short_path(path: str) -> str:
+    if "site-packages" + os.sep in path:
+        return path.split("site-packages" + os.sep, 1)[1]
+    if path.startswith(_STDLIB):
+        return path[len(_STDLIB):]
+    try:
+        relative = os.path.relpath(path)
+    except ValueError:
+        return path
+    return path if relative.startswith("..") else relative
+
+
+def _label(code, lineno: Optional[int]) -> str:
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{lineno})"
+
+
+def thread_stack(frame) -> List[str]:
+    """Frames of a running thread, outermost first, starting below the event loop's callback runner"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    for i in range(len(frames) - 1, -1, -1):
+        code = frames[i].f_code
+        if code.co_name == "_run" and code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+            frames = frames[i + 1:]
+            break
+    return [_label(f.f_code, f.f_lineno) for f in frames]
+
+
+def await_stack(coro) -> List[str]:
+    """Where a suspended coroutine is waiting, outermost first, following its awaits"""
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        stack.append(_label(frame.f_code, frame.f_lineno))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return stack
+
+
+def collapsed(stacks: Counter) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+class StackProfile:
+    """Wall-time samples of one request's tasks"""
+
+    def __init__(self, profile_id: str, path: str, interval: float):
+        self.id = profile_id
+        self.path = path
+        self.interval = interval
+        self.started_at = datetime.now().isoformat()
+        self._started = time.perf_counter()
+        self.seconds: Optional[float] = None
+        self.samples = 0
+        self.truncated = False
+        self.stacks: Counter = Counter()
+        # The request's task and every task created from it
+        self.tasks: set = set()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "path": self.path,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "truncated": self.truncated,
+        }
+
+
+class RequestProfiler:
+    """Samples where a request spends wall time, for requests that ask for it.
+
+    While a profile is active a thread wakes every ``interval`` seconds and
+    records, for each task of the request, either the stack executing on the
+    event loop or the chain of awaits it is suspended in (ending in
+    ``(waiting)``). Tasks created by the request's tasks join its profile
+    through a task factory installed only while profiles are active, so
+    nothing is sampled or wrapped otherwise.
+    """
+
+    def __init__(
+        self,
+        header_enabled: bool = False,
+        interval: float = 0.005,
+        max_seconds: float = 60,
+        max_profiles: int = 20,
+    ):
+        self.header_enabled = header_enabled
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.active: Dict[str, StackProfile] = {}
+        self.profiles: "OrderedDict[str, StackProfile]" = OrderedDict()
+        self.max_profiles = max_profiles
+        # Admin toggle: profile this many upcoming requests
+        self.armed = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._previous_factory = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def wanted(self, header_value: Optional[str]) -> bool:
+        if self.header_enabled and header_value:
+            return True
+        if self.armed > 0:
+            self.armed -= 1
+            return True
+        return False
+
+    def arm(self, count: int) -> None:
+        self.armed = count
+
+    def start(self, path: str, profile_id: Optional[str] = None) -> StackProfile:
+        """Profile the current task and its children until ``stop``"""
+        profile = StackProfile(profile_id or uuid.uuid4().hex, path, self.interval)
+        profile.tasks.add(asyncio.current_task())
+        if not self.active:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._previous_factory = self._loop.get_task_factory()
+            self._loop.set_task_factory(self._task_factory)
+        with self._lock:
+            self.active[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: StackProfile) -> None:
+        self.active.pop(profile.id, None)
+        profile.seconds = round(time.perf_counter() - profile._started, 3)
+        profile.tasks = set()
+        if not self.active and self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+        self.profiles[profile.id] = profile
+        while len(self.profiles) > self.max_profiles:
+            self.profiles.popitem(last=False)
+
+    def _task_factory(self, loop, coro, context=None):
+        if self._previous_factory is not None:
+            if context is None:
+                task = self._previous_factory(loop, coro)
+            else:
+                task = self._previous_factory(loop, coro, context=context)
+        else:
+            task = asyncio.Task(coro, loop=loop, context=context)
+        parent = asyncio.current_task(loop)
+        if parent is not None:
+            for profile in list(self.active.values()):
+                if parent in profile.tasks:
+                    profile.tasks.add(task)
+        return task
+
+    def _sample_loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self.active:
+                    self._thread = None
+                    return
+            try:
+                self._sample()
+            except Exception as e:
+                logger.error(f"Profile sampling failed: {str(e)}")
+
+    def _sample(self) -> None:
+        running = asyncio.current_task(self._loop)
+        loop_frame = sys._current_frames().get(self._loop_thread)
+        now = time.perf_counter()
+        for profile in list(self.active.values()):
+            if now - profile._started > self.max_seconds:
+                profile.truncated = True
+                continue
+            profile.samples += 1
+            for task in tuple(profile.tasks):
+                if task.done():
+                    continue
+                root = f"task {getattr(task.get_coro(), '__qualname__', task.get_name())}"
+                if task is running and loop_frame is not None:
+                    stack = [root, *thread_stack(loop_frame)]
+                else:
+                    stack = [root, *await_stack(task.get_coro()), "(waiting)"]
+                profile.stacks[";".join(stack)] += 1
+
+    def get(self, profile_id: str) -> Optional[StackProfile]:
+        return self.active.get(profile_id) or self.profiles.get(profile_id)
+
+    def clear(self) -> None:
+        self.profiles.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "header_enabled": self.header_enabled,
+            "armed": self.armed,
+            "active": len(self.active),
+            "profiles": [profile.summary() for profile in reversed(self.profiles.values())],
+        }
+
+
+class LoopLagMonitor:
+    """How late the event loop runs, and the stacks of whatever blocked it.
+
+    A coroutine sleeps ``interval`` seconds at a time and records how much
+    longer the sleep took. A watchdog thread samples the loop thread's stack
+    every ``stall_threshold / 2`` while the loop has been stuck for more than
+    ``stall_threshold``, adding the milliseconds blocked since the previous
+    sample to that stack, and every stall is logged with its stack.
+    """
+
+    def __init__(self, interval: float = 0.05, stall_threshold: float = 0.1, max_stalls: int = 50, window: int = 1200):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.lags: deque = deque(maxlen=window)
+        self.stalls: deque = deque(maxlen=max_stalls)
+        self.stacks: Counter = Counter()
+        self.stall_count = 0
+        self.blocked_seconds = 0.0
+        self.max_lag = 0.0
+        self._beat = time.monotonic()
+        self._stall_stack: Optional[List[str]] = None
+        self._loop_thread: Optional[int] = None
+        self._stopped = threading.Event()
+
+    async def run(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                started = time.monotonic()
+                await asyncio.sleep(self.interval)
+                self._beat = time.monotonic()
+                self._record(max(0.0, self._beat - started - self.interval))
+        finally:
+            self._stopped.set()
+
+    def _record(self, lag: float) -> None:
+        self.lags.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        stack, self._stall_stack = self._stall_stack, None
+        if lag < self.stall_threshold:
+            return
+        self.stall_count += 1
+        self.blocked_seconds += lag
+        self.stalls.append({
+            "at": datetime.now().isoformat(),
+            "blocked_ms": round(lag * 1000, 1),
+            "stack": stack,
+        })
+        where = " <- ".join(reversed(stack[-3:])) if stack else "unknown"
+        logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms in {where}")
+
+    def _watch(self) -> None:
+        tick = self.stall_threshold / 2
+        beat, counted = None, 0.0
+        while not self._stopped.wait(tick):
+            late = time.monotonic() - self._beat - self.interval
+            if late < self.stall_threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            if beat != self._beat:
+                beat, counted = self._beat, 0.0
+            stack = thread_stack(frame)
+            if self._stall_stack is None:
+                self._stall_stack = stack
+            self.stacks[";".join(stack)] += round((late - counted) * 1000)
+            counted = late
+
+    def clear(self) -> None:
+        self.stacks.clear()
+        self.stalls.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lags = sorted(self.lags)
+        p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else None
+        return {
+            "interval_ms": self.interval * 1000,
+            "stall_threshold_ms": self.stall_threshold * 1000,
+            "lag_p99_ms": round(p99 * 1000, 2) if p99 is not None else None,
+            "lag_max_ms": round(self.max_lag * 1000, 2),
+            "stalls": self.stall_count,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "recent_stalls": list(self.stalls)[-10:],
+        }
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        try:
+            import resource
+
+            # Peak rather than current where /proc is unavailable; kilobytes on Linux, bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+        except ImportError:
+            return None
+
+
+class MemorySnapshots:
+    """Periodic process memory snapshots; with tracemalloc, the top allocation sites too.
+
+    tracemalloc slows every allocation, so it only starts when
+    ``tracemalloc_frames`` is above zero.
+    """
+
+    def __init__(self, interval: float = 0, tracemalloc_frames: int = 0, top: int = 15, keep: int = 48):
+        self.interval = interval
+        self.tracemalloc_frames = tracemalloc_frames
+        self.top = top
+        self.snapshots: deque = deque(maxlen=keep)
+        self._last_trace: Optional[tracemalloc.Snapshot] = None
+
+    def take(self) -> Dict[str, Any]:
+        rss = _rss_bytes()
+        snapshot: Dict[str, Any] = {
+            "at": datetime.now().isoformat(),
+            "rss_mb": round(rss / 2**20, 1) if rss is not None else None,
+            "gc_counts": gc.get_count(),
+            "gc_collections": [stats["collections"] for stats in gc.get_stats()],
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            trace = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+            ])
+            snapshot["traced_mb"] = round(current / 2**20, 1)
+            snapshot["traced_peak_mb"] = round(peak / 2**20, 1)
+            snapshot["top"] = [
+                {"site": str(stat.traceback[-1]), "kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in trace.statistics("lineno")[:self.top]
+            ]
+            if self._last_trace is not None:
+                snapshot["growth"] = [
+                    {"site": str(stat.traceback[-1]), "kb": round(stat.size_diff / 1024, 1)}
+                    for stat in trace.compare_to(self._last_trace, "lineno")[:self.top]
+                    if stat.size_diff > 0
+                ]
+            self._last_trace = trace
+        self.snapshots.append(snapshot)
+        return snapshot
+
+    def allocation_stacks(self) -> Counter:
+        """Live traced memory by allocating stack, in kilobytes"""
+        stacks: Counter = Counter()
+        if self._last_trace is None:
+            return stacks
+        for stat in self._last_trace.statistics("traceback"):
+            stack = ";".join(f"{_short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback)
+            stacks[stack] += max(1, round(stat.size / 1024))
+        return stacks
+
+    async def run(self) -> None:
+        if self.tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        while True:
+            try:
+                await asyncio.to_thread(self.take)
+            except Exception as e:
+                logger.error(f"Memory snapshot failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        latest = self.snapshots[-1] if self.snapshots else None
+        return {
+            "interval_seconds": self.interval,
+            "tracemalloc": tracemalloc.is_tracing(),
+            "rss_mb": latest["rss_mb"] if latest else None,
+            "traced_mb": latest.get("traced_mb") if latest else None,
+        }
+
+
+class Diagnostics:
+    """Opt-in profiling: per-request stack samples, event-loop lag and memory snapshots"""
+
+    def __init__(
+        self,
+        profile_header: str = "X-Profile",
+        header_enabled: bool = False,
+        sample_interval: float = 0.005,
+        max_profile_seconds: float = 60,
+        max_profiles: int = 20,
+        loop_monitor: bool = False,
+        loop_interval: float = 0.05,
+        stall_threshold: float = 0.1,
+        memory_interval: float = 0,
+        tracemalloc_frames: int = 0,
+    ):
+        self.profile_header = profile_header
+        self.requests = RequestProfiler(header_enabled, sample_interval, max_profile_seconds, max_profiles)
+        self.loop = LoopLagMonitor(loop_interval, stall_threshold) if loop_monitor else None
+        self.memory = MemorySnapshots(memory_interval, tracemalloc_frames) if memory_interval > 0 else None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the enabled background monitors on the running loop"""
+        if self._tasks:
+            return
+        if self.loop is not None:
+            self._tasks.append(asyncio.create_task(self.loop.run()))
+        if self.memory is not None:
+            self._tasks.append(asyncio.create_task(self.memory.run()))
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "request_profiles": len(self.requests.profiles),
+            "active_profiles": len(self.requests.active),
+            "loop": self.loop.get_stats() if self.loop is not None else None,
+            "memory": self.memory.get_stats() if self.memory is not None else None,
+        }
@@ -1,14 +1,36 @@
-from elasticsearch import AsyncElasticsearch
-from typing import Dict, Any, Optional
-from app.utils.logger import logger
-import json
+from elasticsearch import AsyncElasticsearch, ConnectionTimeout
+from elasticsearch.serializer import JsonSerializer
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+from app.core.deadline import DeadlineExceededError, current_deadline
+from app.core.derived_fields import with_derived_fields
+from app.core.hedging import HedgedSearcher
+from app.utils.logger import logger, log_payload
 from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+try:
+    from elasticsearch.serializer import OrjsonSerializer
+except ImportError:
+    OrjsonSerializer = None
+
+
+# Shards get part of the remaining deadline, so partial results return before the client gives up
+SHARD_TIMEOUT_SHARE = 0.8
+
+
+class RawJSONSerializer(JsonSerializer):
+    """Serializes requests as usual but leaves response bodies as raw bytes"""
+
+    def loads(self, data: bytes) -> bytes:
+        return data
 
 
 class ElasticsearchClient:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self._client: Optional[AsyncElasticsearch] = None
+        self._raw_client: Optional[AsyncElasticsearch] = None
+        self._hedger: Optional[HedgedSearcher] = None
 
     async def __aenter__(self):
         """Async context manager entry"""
@@ -24,39 +46,193 @@ class ElasticsearchClient:
             self._client = self._create_client()
         return self._client
 
+    @property
+    def raw_client(self) -> AsyncElasticsearch:
+        """Client whose responses are the undecoded JSON bytes from Elasticsearch"""
+        if self._raw_client is None:
+            raw = RawJSONSerializer()
+            self._raw_client = AsyncElasticsearch(
+                hosts=self.config["hosts"],
+                serializers={"application/json": raw},
+                **self._client_options(),
+            )
+        return self._raw_client
+
     @property
     def indices(self):
         """Expose the indices API of the native client"""
         return self.client.indices
 
+    @property
+    def hedger(self) -> Optional[HedgedSearcher]:
+        """Hedged read path, only when enabled and more than one host is configured"""
+        hedging = self.config.get("hedging", {})
+        if self._hedger is None and hedging.get("enabled") and len(self.config["hosts"]) > 1:
+            self._hedger = HedgedSearcher(
+                self.config["hosts"],
+                self._client_options(),
+                percentile=hedging.get("percentile", 95),
+                min_delay=hedging.get("min_delay", 0.02),
+                window=hedging.get("window", 1000),
+                raw_serializers={"application/json": RawJSONSerializer()},
+            )
+        return self._hedger
+
+    def _client_options(self) -> Dict[str, Any]:
+        """Transport options shared by the pooled client and the hedging clients"""
+        return {
+            "verify_certs": self.config.get("verify_certs", True),
+            **self.config.get("transport", {}),
+        }
+
+    def _decoding_options(self) -> Dict[str, Any]:
+        """Faster response decoding for the parsed clients when orjson is installed"""
+        if OrjsonSerializer is None:
+            return {}
+        return {"serializers": {"application/json": OrjsonSerializer()}}
+
     def _create_client(self) -> AsyncElasticsearch:
         try:
             return AsyncElasticsearch(
-                hosts=self.config["hosts"],
-                verify_certs=self.config.get("verify_certs", True),
+                hosts=self.config["hosts"], **self._client_options(), **self._decoding_options()
             )
         except Exception as e:
             logger.error(f"Failed to create Elasticsearch client: {str(e)}")
             raise
 
+    def _with_deadline(self, body: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[float]]:
+        """Search body with a shard timeout, and the request timeout, from the request deadline"""
+        deadline = current_deadline()
+        if deadline is None:
+            return body, None
+        remaining = deadline.timeout("elasticsearch")
+        if "timeout" not in body:
+            body = {**body, "timeout": f"{max(1, int(remaining * SHARD_TIMEOUT_SHARE * 1000))}ms"}
+        return body, remaining
+
+    @staticmethod
+    def _bounded(client: AsyncElasticsearch, request_timeout: Optional[float]) -> AsyncElasticsearch:
+        # An explicit None would disable the transport's own timeout
+        return client if request_timeout is None else client.options(request_timeout=request_timeout)
+
+    @staticmethod
+    def _raise_if_deadline(e: Exception) -> None:
+        deadline = current_deadline()
+        if isinstance(e, ConnectionTimeout) and deadline is not None and deadline.expired:
+            raise DeadlineExceededError("elasticsearch") from e
+
     async def search(self, body: Dict[str, Any]) -> Dict[str, Any]:
         """Execute the provided search query"""
         try:
-            logger.info(f"Executing search with query:\n{json.dumps(body, indent=2)}")
-            response = await self.client.search(
-                index=self.config["elasticsearch_index"], 
-                body=body
-            )
-            return dict(response)
+            log_payload("Executing search with query: %s", body)
+            body, request_timeout = self._with_deadline(body)
+            if self.hedger is not None:
+                response = await self.hedger.search(
+                    request_timeout=request_timeout,
+                    index=self.config["elasticsearch_index"],
+                    body=body,
+                )
+            else:
+                response = await self._bounded(self.client, request_timeout).search(
+                    index=self.config["elasticsearch_index"], 
+                    body=body
+                )
+            return response.body
         except Exception as e:
             logger.error(f"Search failed: {str(e)}")
+            self._raise_if_deadline(e)
             raise
 
+    async def search_raw(self, body: Dict[str, Any]) -> bytes:
+        """Execute the search and return Elasticsearch's JSON body undecoded"""
+        try:
+            log_payload("Executing search with query: %s", body)
+            body, request_timeout = self._with_deadline(body)
+            if self.hedger is not None:
+                response = await self.hedger.search(
+                    request_timeout=request_timeout,
+                    raw=True,
+                    index=self.config["elasticsearch_index"],
+                    body=body,
+                )
+            else:
+                response = await self._bounded(self.raw_client, request_timeout).search(
+                    index=self.config["elasticsearch_index"],
+                    body=body
+                )
+            return response.body
+        except Exception as e:
+            logger.error(f"Search failed: {str(e)}")
+            self._raise_if_deadline(e)
+            raise
+
+    async def index_employee(self, document: Dict[str, Any], refresh: bool = False) -> str:
+        """Write a full employee document, computing its derived fields and stamping ``updated_at``.
+
+        Incremental rollups and the migration catch-up find changed documents by ``updated_at``.
+        """
+        try:
+            document = {**document, "updated_at": datetime.now(timezone.utc).isoformat()}
+            response = await self.client.index(
+                index=self.config["elasticsearch_index"],
+                id=document["employee_id"],
+                document=with_derived_fields(document),
+                refresh=refresh,
+            )
+            return response["result"]
+        except Exception as e:
+            logger.error(f"Failed to index employee {document.get('employee_id')}: {str(e)}")
+            raise
+
+    async def iter_pages(
+        self, body: Dict[str, Any], batch_size: int = 5000, keep_alive: str = "2m"
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Every hit of a query, page by page, from a point in time with ``search_after``.
+
+        Unlike ``from``/``size`` paging this is consistent while the index
+        changes and has no result window limit.
+        """
+        pit = await self.client.open_point_in_time(
+            index=self.config["elasticsearch_index"], keep_alive=keep_alive
+        )
+        pit_id = pit["id"]
+        search_after = None
+        try:
+            while True:
+                page = {
+                    **body,
+                    "size": batch_size,
+                    "pit": {"id": pit_id, "keep_alive": keep_alive},
+                    "sort": [{"_shard_doc": "asc"}],
+                    "track_total_hits": False,
+                }
+                if search_after is not None:
+                    page["search_after"] = search_after
+                response = await self.client.search(body=page)
+                pit_id = response.get("pit_id", pit_id)
+                hits = response["hits"]["hits"]
+                if hits:
+                    yield hits
+                if len(hits) < batch_size:
+                    return
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                await self.client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.warning(f"Failed to close point in time: {str(e)}")
+
     async def close(self):
         """Close the client connection"""
         if self._client:
             await self._client.close()
             self._client = None
+        if self._raw_client:
+            await self._raw_client.close()
+            self._raw_client = None
+        if self._hedger:
+            await self._hedger.close()
+            self._hedger = None
 
 # Add dependency function for ElasticsearchClient
 def get_es_client() -> ElasticsearchClient:
@@ -0,0 +1,142 @@
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.embeddings import EmbeddingProvider
+from app.utils.logger import logger
+import asyncio
+import time
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent ``embed_query`` calls into one ``embed_documents`` call.
+
+    A request waits at most ``max_wait`` seconds, and only when traffic is
+    heavy enough that others are likely to join: the window follows the
+    smoothed arrival rate, so a lone request is dispatched on the next loop
+    iteration. Identical questions in a batch are embedded once. If a batch
+    call fails, its questions are retried one by one so each caller gets its
+    own result or error.
+    """
+
+    def __init__(self, provider: EmbeddingProvider, max_batch: int = 64, max_wait: float = 0.005):
+        self.provider = provider
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._background = set()
+        self._last_arrival: Optional[float] = None
+        self._interval = max_wait * 10  # smoothed seconds between requests
+
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.deduplicated = 0
+        self.fallbacks = 0
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    @property
+    def dim(self) -> int:
+        return self.provider.dim
+
+    @property
+    def namespace(self) -> Optional[str]:
+        return self.provider.namespace
+
+    def warm_up(self) -> None:
+        self.provider.warm_up()
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.provider.embed_documents(texts)
+
+    def window(self) -> float:
+        """Seconds to hold a new batch open, from the current arrival rate"""
+        expected = self.max_wait / max(self._interval, 1e-9)
+        if expected < 1:
+            return 0.0
+        return min(self.max_wait, self.max_batch * self._interval)
+
+    def _observe_arrival(self) -> None:
+        now = time.monotonic()
+        if self._last_arrival is not None:
+            self._interval = 0.8 * self._interval + 0.2 * (now - self._last_arrival)
+        self._last_arrival = now
+
+    async def embed_query(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+        self._observe_arrival()
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            window = self.window()
+            # call_soon still collects requests started in the same loop iteration
+            self._flush_handle = (
+                loop.call_later(window, self._flush) if window else loop.call_soon(self._flush)
+            )
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            # Callers that gave up (client disconnects) are not embedded
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if batch:
+                task = asyncio.create_task(self._run(batch))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.deduplicated += len(batch) - len(texts)
+        try:
+            vectors = await self.provider.embed_documents(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Embedding provider returned {len(vectors)} vectors for {len(texts)} texts")
+            by_text = dict(zip(texts, vectors))
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            if len(texts) == 1:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            logger.warning(f"Batched embedding of {len(texts)} texts failed, retrying individually: {str(e)}")
+            self.fallbacks += 1
+            await asyncio.gather(*(self._run_one(text, future) for text, future in batch))
+
+    async def _run_one(self, text: str, future: asyncio.Future) -> None:
+        try:
+            vector = (await self.provider.embed_documents([text]))[0]
+            if not future.done():
+                future.set_result(vector)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.provider.get_stats(),
+            "batching": {
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else None,
+                "largest_batch": self.largest_batch,
+                "deduplicated": self.deduplicated,
+                "fallbacks": self.fallbacks,
+                "window_ms": round(self.window() * 1000, 2),
+                "max_batch": self.max_batch,
+            },
+        }
@@ -0,0 +1,235 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+from app.core.local_cache import normalize_query
+from app.utils.logger import logger
+import asyncio
+import numpy as np
+import re
+import threading
+import time
+import zlib
+
+PROVIDERS = ("openai", "local", "hashing")
+
+# The OpenAI model the cache was first built with keeps the un-namespaced collection
+DEFAULT_OPENAI_MODEL = "text-embedding-3-small"
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^0-9a-z]+", "_", value.lower()).strip("_")
+
+
+def fit_dimension(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """Truncate to ``dim`` and re-normalise; a model narrower than ``dim`` is a config error"""
+    if vectors.shape[1] < dim:
+        raise ValueError(f"Embedding model produces {vectors.shape[1]} dimensions, cache expects {dim}")
+    vectors = vectors[:, :dim].astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingProvider(ABC):
+    """Turns questions into cache vectors; ``namespace`` keeps each model's vectors apart.
+
+    Abstract, so a provider missing its hook fails when it is built, not on the first request.
+    """
+
+    name = "base"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.calls = 0
+        self.texts = 0
+        self.total_seconds = 0.0
+
+    @property
+    def namespace(self) -> Optional[str]:
+        return _slug(self.name)
+
+    def warm_up(self) -> None:
+        """Build clients or load the model ahead of the first request (runs in a thread)"""
+
+    @abstractmethod
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Vectors of exactly ``dim`` dimensions, one per text"""
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        vectors = await self._embed(texts)
+        self.calls += 1
+        self.texts += len(texts)
+        self.total_seconds += time.perf_counter() - started
+        return vectors
+
+    async def embed_query(self, text: str) -> List[float]:
+        return (await self.embed_documents([text]))[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.name,
+            "dimension": self.dim,
+            "calls": self.calls,
+            "texts": self.texts,
+            "avg_call_ms": round(self.total_seconds / self.calls * 1000, 2) if self.calls else None,
+        }
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API, asking for shortened vectors of the cache dimension"""
+
+    def __init__(self, dim: int, model: str = DEFAULT_OPENAI_MODEL):
+        super().__init__(dim)
+        self.model = model
+        self.name = f"openai:{model}"
+        self._client = None
+
+    @property
+    def namespace(self) -> Optional[str]:
+        return None if self.model == DEFAULT_OPENAI_MODEL else super().namespace
+
+    @property
+    def client(self):
+        if self._client is None:
+            # langchain is slow to import; load it with the agent, not the app
+            from langchain_openai import OpenAIEmbeddings
+
+            self._client = OpenAIEmbeddings(model=self.model, dimensions=self.dim)
+        return self._client
+
+    def warm_up(self) -> None:
+        self.client
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        return await self.client.aembed_documents(texts)
+
+
+class ThreadPoolEmbeddingProvider(EmbeddingProvider):
+    """CPU embedders: batches of ``batch_size`` run on a small thread pool, off the event loop"""
+
+    def __init__(self, dim: int, batch_size: int = 32, workers: int = 2):
+        super().__init__(dim)
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed")
+
+    @abstractmethod
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """A batch of raw model vectors, fitted to ``dim`` by the caller"""
+
+    def _encode_batch(self, texts: List[str]) -> List[List[float]]:
+        return fit_dimension(self._encode(texts), self.dim).tolist()
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        batches = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self._encode_batch, texts[i:i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ))
+        return [vector for batch in batches for vector in batch]
+
+
+class LocalEmbeddingProvider(ThreadPoolEmbeddingProvider):
+    """A model loaded from a local directory: ONNX when it holds ``model.onnx``, else sentence-transformers"""
+
+    def __init__(self, dim: int, path: str, batch_size: int = 32, workers: int = 2):
+        super().__init__(dim, batch_size, workers)
+        if not path:
+            raise ValueError("EMBEDDING_MODEL_PATH is required for the local embedding provider")
+        self.path = Path(path)
+        self.backend = "onnx" if (self.path / "model.onnx").exists() else "sentence-transformers"
+        self.name = f"local:{self.path.name}"
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is not None:
+                return self._model
+            started = time.perf_counter()
+            if self.backend == "onnx":
+                try:
+                    import onnxruntime
+                    from tokenizers import Tokenizer
+                except ImportError as e:
+                    raise ImportError("ONNX embeddings need `pip install onnxruntime tokenizers`") from e
+                tokenizer = Tokenizer.from_file(str(self.path / "tokenizer.json"))
+                tokenizer.enable_padding()
+                tokenizer.enable_truncation(max_length=256)
+                session = onnxruntime.InferenceSession(
+                    str(self.path / "model.onnx"), providers=["CPUExecutionProvider"]
+                )
+                self._model = (tokenizer, session)
+            else:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError as e:
+                    raise ImportError("Local embeddings need `pip install sentence-transformers`") from e
+                self._model = SentenceTransformer(str(self.path), device="cpu")
+            logger.info(
+                f"Loaded {self.backend} embedding model {self.path} "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+            return self._model
+
+    def warm_up(self) -> None:
+        self._load()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        model = self._load()
+        if self.backend != "onnx":
+            return model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+
+        tokenizer, session = model
+        encoded = tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encoded], dtype=np.int64),
+        }
+        inputs = {i.name for i in session.get_inputs()}
+        hidden = session.run(None, {k: v for k, v in feeds.items() if k in inputs})[0]
+        # Mean pooling over real tokens
+        weights = mask[:, :, np.newaxis].astype(np.float32)
+        return (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+
+
+class HashingEmbeddingProvider(ThreadPoolEmbeddingProvider):
+    """Dependency-free signed hashing of words and character n-grams.
+
+    No model and no network: similar wording gives similar vectors, which is
+    enough for tests, benchmarks and near-duplicate questions, not paraphrases.
+    """
+
+    def __init__(self, dim: int, ngram: int = 3, batch_size: int = 256, workers: int = 1):
+        super().__init__(dim, batch_size, workers)
+        self.ngram = ngram
+        self.name = f"hashing:{ngram}gram"
+
+    def _features(self, text: str) -> List[str]:
+        text = normalize_query(text)
+        padded = f" {text} "
+        grams = [padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1)]
+        return grams + [f"w:{word}" for word in text.split()]
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode())
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vectors
+
+
+def create_embedding_provider(config: Dict[str, Any], dim: int) -> EmbeddingProvider:
+    provider = config["provider"]
+    if provider == "openai":
+        return OpenAIEmbeddingProvider(dim, model=config["model"])
+    if provider == "local":
+        return LocalEmbeddingProvider(
+            dim, config["model_path"], batch_size=config["batch_size"], workers=config["workers"]
+        )
+    if provider == "hashing":
+        return HashingEmbeddingProvider(dim, ngram=config["ngram"])
+    raise ValueError(f"Unknown embedding provider '{provider}' (available: {', '.join(PROVIDERS)})")
@@ -1,10 +1,18 @@
 from fastapi import FastAPI
+from typing import Optional
 from app.config import get_settings, Settings
-from app.middleware import add_cors_middleware, add_error_handlers
+from app.middleware import (
+    add_cors_middleware,
+    add_compression_middleware,
+    add_deadline_middleware,
+    add_error_handlers,
+    add_profiling_middleware,
+    add_request_context_middleware,
+)
 from app.routes.base import add_routes
 
 
-def create_app(settings: Settings | None = None) -> FastAPI:
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
     if settings is None:
         settings = get_settings()
 
@@ -19,6 +27,11 @@ def create_app(settings: Settings | None = None) -> FastAPI:
     )
 
     add_cors_middleware(app)
+    add_compression_middleware(app)
+    add_deadline_middleware(app)
+    # Routes are mounted under /api here, not /api/v1
+    add_profiling_middleware(app, prefix="/api/search")
+    add_request_context_middleware(app)
     add_error_handlers(app)
 
     add_routes(app)
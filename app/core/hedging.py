@@ -0,0 +1,143 @@
+from elasticsearch import AsyncElasticsearch
+from typing import Dict, Any, List, Optional
+from collections import deque
+from app.utils.logger import logger
+import asyncio
+import itertools
+import time
+
+
+class LatencyTracker:
+    """Rolling window of observed latencies with a cached percentile"""
+
+    def __init__(self, window: int = 1000, refresh_every: int = 50):
+        self.samples = deque(maxlen=window)
+        self.refresh_every = refresh_every
+        self._since_refresh = 0
+        self._cached: Dict[float, float] = {}
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self._since_refresh += 1
+        if self._since_refresh >= self.refresh_every:
+            self._cached.clear()
+            self._since_refresh = 0
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.samples) < 20:
+            return None
+        if p not in self._cached:
+            ordered = sorted(self.samples)
+            index = min(len(ordered) - 1, int(len(ordered) * p / 100))
+            self._cached[p] = ordered[index]
+        return self._cached[p]
+
+
+class HedgedSearcher:
+    """Send a duplicate search to another node when the first is slower than its p95.
+
+    Each node gets its own single-host client so the duplicate is guaranteed to
+    land elsewhere; whichever answers first wins and the other is cancelled.
+    With ``raw_serializers`` each node also gets a client for undecoded
+    bodies, so the raw pass-through path is hedged as well.
+    """
+
+    def __init__(
+        self,
+        hosts: List[str],
+        client_options: Dict[str, Any],
+        percentile: float = 95,
+        min_delay: float = 0.02,
+        window: int = 1000,
+        raw_serializers: Optional[Dict[str, Any]] = None,
+    ):
+        if len(hosts) < 2:
+            raise ValueError("Hedged requests need at least two Elasticsearch hosts")
+
+        # Retries and sniffing would defeat the point of picking the node ourselves
+        options = {
+            key: value
+            for key, value in client_options.items()
+            if not key.startswith("sniff") and key != "min_delay_between_sniffing"
+        }
+        options["max_retries"] = 0
+        self.clients = [AsyncElasticsearch(hosts=[host], **options) for host in hosts]
+        # Same nodes, responses left as bytes for the pass-through path
+        self.raw_clients = [
+            AsyncElasticsearch(hosts=[host], serializers=raw_serializers, **options) for host in hosts
+        ] if raw_serializers else self.clients
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.latency = LatencyTracker(window=window)
+        self._next = itertools.cycle(range(len(self.clients)))
+
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def hedge_delay(self) -> float:
+        observed = self.latency.percentile(self.percentile)
+        return max(self.min_delay, observed) if observed is not None else float("inf")
+
+    async def _timed(self, client: AsyncElasticsearch, request_timeout: Optional[float], **kwargs):
+        if request_timeout is not None:
+            client = client.options(request_timeout=request_timeout)
+        started = time.perf_counter()
+        response = await client.search(**kwargs)
+        self.latency.record(time.perf_counter() - started)
+        return response
+
+    async def search(self, request_timeout: Optional[float] = None, raw: bool = False, **kwargs):
+        """First of the primary and, when it is slow, the hedge; ``raw`` uses the undecoded-body clients"""
+        clients = self.raw_clients if raw else self.clients
+        self.requests += 1
+        first = next(self._next)
+        primary = asyncio.create_task(self._timed(clients[first], request_timeout, **kwargs))
+
+        # Cancelling the caller, during the hedge delay too, cancels whatever is still in flight
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            delay = self.hedge_delay()
+            done, pending = await asyncio.wait(
+                pending, timeout=None if delay == float("inf") else delay
+            )
+            if done:
+                return primary.result()
+
+            second = (first + 1) % len(clients)
+            hedge = asyncio.create_task(self._timed(clients[second], request_timeout, **kwargs))
+            self.hedges_sent += 1
+
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "hedge_delay_ms": (
+                round(self.hedge_delay() * 1000, 2)
+                if self.hedge_delay() != float("inf")
+                else None
+            ),
+        }
+
+    async def close(self):
+        for client in {*self.clients, *self.raw_clients}:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close hedging client: {str(e)}")
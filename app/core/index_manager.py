@@ -0,0 +1,294 @@
+from elasticsearch import Elasticsearch, NotFoundError, helpers
+from typing import Dict, Any, List, Optional
+from datetime import date, datetime, timedelta, timezone
+from app.core.derived_fields import derive_fields
+from app.utils.logger import logger
+from app.utils.mapping_utils import load_mapping
+from app.utils.path_utils import get_schema_path
+import json
+import time
+
+# Catch-up after a migration copies documents updated this long before the copy started,
+# covering refresh delay and clock skew between writers
+CATCH_UP_MARGIN = timedelta(minutes=1)
+
+
+class IndexManager:
+    """Versioned indices behind an alias, swapped atomically.
+
+    The app reads through ``alias`` (``ELASTICSEARCH_INDEX``), so a mapping or
+    settings change is rolled out by building ``<alias>_v<timestamp>`` next to
+    the live index, warming it, and moving the alias in a single request.
+    """
+
+    def __init__(self, es: Elasticsearch, alias: str):
+        self.es = es
+        self.alias = alias
+
+    @staticmethod
+    def load_mapping() -> Dict[str, Any]:
+        return load_mapping()
+
+    @staticmethod
+    def load_profile(name: str) -> Dict[str, Any]:
+        with open(get_schema_path() / "elasticsearch" / "index_profiles.json", "r") as f:
+            profiles = json.load(f)
+        if name not in profiles:
+            raise ValueError(f"Unknown index profile '{name}' (available: {', '.join(profiles)})")
+        return profiles[name]
+
+    @classmethod
+    def build_index_body(cls, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine mapping.json with a settings profile into a create-index body"""
+        mapping = cls.load_mapping()
+
+        for path in profile.get("eager_global_ordinals", []):
+            field = cls._find_field(mapping["mappings"], path)
+            if field.get("type") != "keyword":
+                raise ValueError(f"eager_global_ordinals requires a keyword field: {path}")
+            field["eager_global_ordinals"] = True
+
+        settings: Dict[str, Any] = {
+            "number_of_shards": profile.get("number_of_shards", 1),
+            "number_of_replicas": profile.get("number_of_replicas", 1),
+            "refresh_interval": profile.get("refresh_interval", "1s"),
+        }
+        if "sort" in profile:
+            settings["sort.field"] = profile["sort"]["field"]
+            settings["sort.order"] = profile["sort"]["order"]
+
+        return {"settings": {"index": settings}, "mappings": mapping["mappings"]}
+
+    @staticmethod
+    def _find_field(mappings: Dict[str, Any], path: str) -> Dict[str, Any]:
+        node = mappings
+        for part in path.split("."):
+            try:
+                node = node["properties"][part]
+            except KeyError:
+                raise ValueError(f"Field not found in mapping: {path}")
+        return node
+
+    def versioned_name(self) -> str:
+        return f"{self.alias}_v{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+
+    def current_indices(self) -> List[str]:
+        """Concrete indices the alias currently points at"""
+        try:
+            return sorted(self.es.indices.get_alias(name=self.alias).keys())
+        except NotFoundError:
+            return []
+
+    def is_legacy_index(self) -> bool:
+        """True when ``alias`` is still a concrete index rather than an alias"""
+        return bool(self.es.indices.exists(index=self.alias)) and not self.current_indices()
+
+    def create_index(self, profile_name: str = "default", name: Optional[str] = None) -> str:
+        """Create a new versioned index from mapping.json and a settings profile"""
+        name = name or self.versioned_name()
+        body = self.build_index_body(self.load_profile(profile_name))
+        self.es.indices.create(index=name, settings=body["settings"], mappings=body["mappings"])
+        logger.info(f"Created index {name} with profile '{profile_name}'")
+        return name
+
+    def relax_for_load(self, index: str) -> None:
+        """Disable refresh and replicas while an index is being filled"""
+        self.es.indices.put_settings(
+            index=index,
+            settings={"index.refresh_interval": "-1", "index.number_of_replicas": 0},
+        )
+
+    def restore_profile(self, index: str, profile_name: str) -> None:
+        profile = self.load_profile(profile_name)
+        self.es.indices.put_settings(
+            index=index,
+            settings={
+                "index.refresh_interval": profile.get("refresh_interval", "1s"),
+                "index.number_of_replicas": profile.get("number_of_replicas", 1),
+            },
+        )
+        self.es.indices.refresh(index=index)
+
+    def reindex(
+        self,
+        source: str,
+        dest: str,
+        slices: Any = "auto",
+        poll_interval: float = 2.0,
+        query: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Copy all documents, or those matching ``query``, from source to dest using sliced reindexing"""
+        started = time.perf_counter()
+        task = self.es.reindex(
+            source={"index": source, "size": 2000, **({"query": query} if query else {})},
+            dest={"index": dest},
+            slices=slices,
+            wait_for_completion=False,
+        )
+        task_id = task["task"]
+
+        while True:
+            status = self.es.tasks.get(task_id=task_id)
+            if status.get("completed"):
+                break
+            progress = status["task"]["status"]
+            logger.info(
+                f"Reindex {source} -> {dest}: "
+                f"{progress.get('created', 0)}/{progress.get('total', 0)} documents"
+            )
+            time.sleep(poll_interval)
+
+        if status.get("error"):
+            raise RuntimeError(f"Reindex failed: {status['error']}")
+        response = status.get("response", {})
+        if response.get("failures"):
+            raise RuntimeError(f"Reindex failed: {response['failures'][:3]}")
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Reindexed {response.get('total', 0)} documents from {source} to {dest} "
+            f"in {elapsed:.1f}s"
+        )
+        return response
+
+    def refresh_derived(
+        self, index: Optional[str] = None, as_of: Optional[date] = None, chunk_size: int = 1000
+    ) -> Dict[str, int]:
+        """Recompute every document's ``derived`` fields, writing only the ones that changed.
+
+        Run daily so tenure, this year's leave and the on-leave flag stay
+        current, and after loading documents written without them. Changed
+        documents get a new ``updated_at`` so incremental rollups see them.
+        """
+        index = index or self.alias
+        as_of = as_of or date.today()
+        updated_at = datetime.now(timezone.utc).isoformat()
+        scanned = 0
+
+        def updates():
+            nonlocal scanned
+            for hit in helpers.scan(self.es, index=index, query={"query": {"match_all": {}}}, size=chunk_size):
+                scanned += 1
+                source = hit["_source"]
+                derived = derive_fields(source, as_of)
+                # as_of alone moving is not worth a write
+                if {**derived, "as_of": None} != {**(source.get("derived") or {}), "as_of": None}:
+                    yield {
+                        "_op_type": "update",
+                        "_index": hit["_index"],
+                        "_id": hit["_id"],
+                        "doc": {"derived": derived, "updated_at": updated_at},
+                    }
+
+        updated, errors = helpers.bulk(self.es, updates(), chunk_size=chunk_size, raise_on_error=False)
+        if errors:
+            raise RuntimeError(f"Derived field refresh failed: {errors[:3]}")
+        logger.info(f"Refreshed derived fields on {index}: {updated}/{scanned} documents changed")
+        return {"scanned": scanned, "updated": updated}
+
+    def warm(self, index: str, queries: List[Dict[str, Any]]) -> int:
+        """Run cached DSL against the new index to populate its caches before the swap"""
+        warmed = 0
+        for es_query in queries:
+            try:
+                self.es.search(index=index, body=es_query, request_cache=True)
+                warmed += 1
+            except Exception as e:
+                logger.warning(f"Warm-up query failed on {index}: {str(e)}")
+        logger.info(f"Warmed {index} with {warmed}/{len(queries)} cached queries")
+        return warmed
+
+    def block_writes(self, index: str, blocked: bool = True) -> None:
+        """Make index read-only (or writable again); writes to it fail with a cluster block"""
+        self.es.indices.put_settings(index=index, settings={"index.blocks.write": blocked})
+
+    def swap_alias(self, new_index: str) -> List[str]:
+        """Atomically point the alias at new_index, returning the indices it left.
+
+        A pre-alias concrete index with the alias name is removed in the same
+        request, so the name never stops resolving.
+        """
+        old_indices = self.current_indices()
+        actions: List[Dict[str, Any]] = []
+
+        if self.is_legacy_index():
+            actions.append({"remove_index": {"index": self.alias}})
+        for index in old_indices:
+            if index != new_index:
+                actions.append({"remove": {"index": index, "alias": self.alias}})
+        actions.append({"add": {"index": new_index, "alias": self.alias, "is_write_index": True}})
+
+        self.es.indices.update_aliases(actions=actions)
+        logger.info(f"Alias {self.alias} now points at {new_index} (was: {old_indices or 'none'})")
+        return [index for index in old_indices if index != new_index]
+
+    def delete_indices(self, indices: List[str]) -> None:
+        for index in indices:
+            self.es.indices.delete(index=index)
+            logger.info(f"Deleted index {index}")
+
+    def migrate(
+        self,
+        profile_name: str = "default",
+        slices: Any = "auto",
+        warm_queries: Optional[List[Dict[str, Any]]] = None,
+        keep_old: bool = False,
+    ) -> str:
+        """Rebuild the live data into a new versioned index and swap the alias to it.
+
+        Writes keep going to the live index during the copy. Before the swap
+        the live index is made read-only and documents whose ``updated_at``
+        moved since the copy started are copied again, so only that short
+        catch-up rejects writes. Deletions made during the copy are not
+        carried over.
+        """
+        source = self.alias
+        if not self.es.indices.exists(index=source):
+            raise ValueError(f"Nothing to migrate: {source} does not exist")
+
+        new_index = self.create_index(profile_name)
+        blocked = False
+        try:
+            copy_started = datetime.now(timezone.utc) - CATCH_UP_MARGIN
+            self.es.indices.refresh(index=source)
+            self.relax_for_load(new_index)
+            self.reindex(source, new_index, slices=slices)
+            # Backfills documents copied from an index written before derived fields existed
+            self.refresh_derived(new_index)
+            self.restore_profile(new_index, profile_name)
+            if warm_queries:
+                self.warm(new_index, warm_queries)
+
+            self.block_writes(source)
+            blocked = True
+            self.es.indices.refresh(index=source)
+            self.reindex(
+                source,
+                new_index,
+                slices=slices,
+                query={"range": {"updated_at": {"gte": copy_started.isoformat()}}},
+            )
+            self.es.indices.refresh(index=new_index)
+            old_indices = self.swap_alias(new_index)
+        except Exception:
+            logger.error(f"Migration to {new_index} failed, removing it")
+            if blocked:
+                self.block_writes(source, False)
+            self.es.indices.delete(index=new_index, ignore_unavailable=True)
+            raise
+
+        if keep_old:
+            for index in old_indices:
+                self.block_writes(index, False)
+        else:
+            self.delete_indices(old_indices)
+        return new_index
+
+    def status(self) -> Dict[str, Any]:
+        versions = self.es.indices.get(index=f"{self.alias}_v*", allow_no_indices=True)
+        return {
+            "alias": self.alias,
+            "legacy_index": self.is_legacy_index(),
+            "live": self.current_indices(),
+            "versions": sorted(versions.keys()),
+        }
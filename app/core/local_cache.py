@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+import copy
+import re
+import time
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive key for exact-match lookups"""
+    return _WHITESPACE.sub(" ", query.strip().lower())
+
+
+class LocalQueryCache:
+    """In-process LRU of exact query text to generated DSL.
+
+    Sits in front of the Milvus cache: a repeated question is answered without
+    an embedding call or a vector search. Entries belong to the semantic
+    cache's namespace and are dropped when it switches (a clear, here or in
+    another process); ``ttl`` bounds how long one survives changes it cannot
+    see, such as another process invalidating fields.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.namespace: Optional[str] = None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.namespace_switches = 0
+
+    def __contains__(self, query: str) -> bool:
+        return normalize_query(query) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set_namespace(self, namespace: Optional[str]) -> None:
+        """Follow the semantic cache's namespace, forgetting entries from the previous one"""
+        if namespace is None or namespace == self.namespace:
+            return
+        # Entries made before the semantic cache was up were generated for this schema version
+        if self.namespace is not None:
+            self._entries.clear()
+            self.namespace_switches += 1
+        self.namespace = namespace
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Entry for the exact question, shaped like ``VectorCache.find_entry``"""
+        key = normalize_query(query)
+        entry = self._entries.get(key)
+        if entry is not None and entry["expires"] is not None and entry["expires"] <= time.monotonic():
+            del self._entries[key]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Callers may rewrite the DSL; never hand out the cached object itself
+        return {
+            "id": entry["id"],
+            "query_text": entry["query_text"],
+            "es_query": copy.deepcopy(entry["es_query"]),
+        }
+
+    def put(
+        self, query: str, es_query: Dict, entry_id: Optional[int] = None, query_text: str = None
+    ) -> None:
+        """Remember the DSL for a question, with the semantic-cache entry it came from"""
+        key = normalize_query(query)
+        self._entries[key] = {
+            "id": entry_id,
+            "query_text": query_text or query,
+            "es_query": copy.deepcopy(es_query),
+            "expires": time.monotonic() + self.ttl if self.ttl > 0 else None,
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard_entry(self, entry_id: int) -> None:
+        """Drop every question answered by a semantic-cache entry"""
+        for key in [k for k, v in self._entries.items() if v["id"] == entry_id]:
+            del self._entries[key]
+
+    def discard_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """Drop entries whose DSL matches, e.g. after selective invalidation"""
+        keys = [k for k, v in self._entries.items() if predicate(v["es_query"])]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "namespace_switches": self.namespace_switches,
+        }
@@ -0,0 +1,266 @@
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from app.utils.logger import logger
+import asyncio
+import itertools
+import random
+import time
+
+
+def parse_endpoints(value: str, default_port: int = 19530) -> List[Dict[str, Any]]:
+    """``host:port,host:port`` as endpoint dicts; the port is optional"""
+    endpoints = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":") if ":" in item else (item, "", "")
+        endpoints.append({"host": host, "port": int(port) if port else default_port})
+    return endpoints
+
+
+class MilvusEndpoint:
+    """One Milvus proxy: its pymilvus alias, health and reconnect schedule"""
+
+    def __init__(self, alias: str, host: str, port: int):
+        self.alias = alias
+        self.host = host
+        self.port = port
+        self.connected = False
+        self.failures = 0
+        self.attempts = 0
+        self.next_attempt = 0.0
+        self.reconnects = 0
+        self.requests = 0
+        self.last_error: Optional[str] = None
+        self.down_since: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "address": f"{self.host}:{self.port}",
+            "connected": self.connected,
+            "consecutive_failures": self.failures,
+            "reconnects": self.reconnects,
+            "requests": self.requests,
+            "last_error": self.last_error,
+            "down_for_seconds": round(time.monotonic() - self.down_since, 1) if self.down_since else None,
+        }
+
+
+class MilvusConnectionManager:
+    """Connections to every configured Milvus endpoint, kept healthy in the background.
+
+    Endpoints are proxies of the same cluster. Writes and schema changes go
+    to the first healthy one (the primary); searches rotate over all healthy
+    ones, and the collection is loaded with ``replicas`` in-memory replicas
+    so the query nodes behind them share the load too. An endpoint is taken
+    out after ``failure_threshold`` failed calls or probes in a row and
+    reconnected with exponential backoff. Periods with no healthy endpoint,
+    when the semantic cache is unavailable and misses go to the LLM, are
+    recorded.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Dict[str, Any]],
+        replicas: int = 1,
+        probe_interval: float = 5,
+        probe_timeout: float = 2,
+        connect_timeout: float = 5,
+        failure_threshold: int = 3,
+        backoff_initial: float = 0.5,
+        backoff_max: float = 30,
+        max_outages: int = 20,
+    ):
+        if not endpoints:
+            raise ValueError("At least one Milvus endpoint is required")
+        self.endpoints = [
+            MilvusEndpoint(f"milvus_{i}", endpoint["host"], endpoint["port"])
+            for i, endpoint in enumerate(endpoints)
+        ]
+        self.replicas = replicas
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.connect_timeout = connect_timeout
+        self.failure_threshold = failure_threshold
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        # Called with the endpoint whenever one goes up or down, usually from the probing thread
+        self.on_change: Optional[Callable[[MilvusEndpoint], None]] = None
+        self._rotation = itertools.count()
+        self._by_alias = {endpoint.alias: endpoint for endpoint in self.endpoints}
+
+        self.outages: deque = deque(maxlen=max_outages)
+        self._outage_started: Optional[float] = None
+        self._outage_reason: Optional[str] = None
+        self.outage_seconds = 0.0
+        self.skipped_lookups = 0
+        self.skipped_writes = 0
+
+    @property
+    def available(self) -> bool:
+        return any(endpoint.connected for endpoint in self.endpoints)
+
+    @property
+    def primary(self) -> Optional[str]:
+        """Alias for writes: the first healthy endpoint in configured order"""
+        for endpoint in self.endpoints:
+            if endpoint.connected:
+                return endpoint.alias
+        return None
+
+    def next_reader(self) -> Optional[str]:
+        """Alias for the next search, rotating over healthy endpoints"""
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.connected]
+        if not healthy:
+            return None
+        endpoint = healthy[next(self._rotation) % len(healthy)]
+        endpoint.requests += 1
+        return endpoint.alias
+
+    def _connect(self, endpoint: MilvusEndpoint) -> None:
+        from pymilvus import connections
+
+        if connections.has_connection(endpoint.alias):
+            connections.disconnect(endpoint.alias)
+        connections.connect(
+            alias=endpoint.alias, host=endpoint.host, port=endpoint.port, timeout=self.connect_timeout
+        )
+        self._ping(endpoint)
+
+    def _ping(self, endpoint: MilvusEndpoint) -> None:
+        from pymilvus import utility
+
+        utility.get_server_version(using=endpoint.alias, timeout=self.probe_timeout)
+
+    def connect(self) -> None:
+        """Connect every endpoint; raises if none is reachable"""
+        for endpoint in self.endpoints:
+            try:
+                self._connect(endpoint)
+                self._mark_up(endpoint)
+            except Exception as e:
+                self._mark_down(endpoint, str(e))
+        if not self.available:
+            raise ConnectionError(
+                f"No Milvus endpoint reachable: {self.endpoints[-1].last_error}"
+            )
+
+    def record_success(self, alias: str) -> None:
+        endpoint = self._by_alias.get(alias)
+        if endpoint is not None:
+            endpoint.failures = 0
+
+    def record_failure(self, alias: str, error: Exception) -> None:
+        """A call through ``alias`` failed; enough in a row take the endpoint out"""
+        endpoint = self._by_alias.get(alias)
+        if endpoint is None or not endpoint.connected:
+            return
+        endpoint.failures += 1
+        endpoint.last_error = str(error)[:300]
+        if endpoint.failures >= self.failure_threshold:
+            self._mark_down(endpoint, endpoint.last_error)
+
+    def _mark_up(self, endpoint: MilvusEndpoint) -> None:
+        was_down = endpoint.down_since is not None
+        endpoint.connected = True
+        endpoint.failures = 0
+        endpoint.attempts = 0
+        endpoint.down_since = None
+        if was_down:
+            endpoint.reconnects += 1
+            logger.info(f"Milvus endpoint {endpoint.host}:{endpoint.port} reconnected")
+        self._changed(endpoint)
+
+    def _mark_down(self, endpoint: MilvusEndpoint, reason: str) -> None:
+        if endpoint.connected:
+            logger.error(f"Milvus endpoint {endpoint.host}:{endpoint.port} is down: {reason}")
+        endpoint.connected = False
+        endpoint.last_error = reason
+        endpoint.down_since = endpoint.down_since or time.monotonic()
+        self._schedule(endpoint)
+        self._changed(endpoint)
+
+    def _schedule(self, endpoint: MilvusEndpoint) -> None:
+        # Exponential backoff with jitter, so workers don't reconnect in lockstep
+        delay = min(self.backoff_max, self.backoff_initial * 2 ** endpoint.attempts)
+        endpoint.next_attempt = time.monotonic() + delay * random.uniform(0.5, 1)
+        endpoint.attempts += 1
+
+    def _changed(self, endpoint: MilvusEndpoint) -> None:
+        now = time.monotonic()
+        if not self.available and self._outage_started is None:
+            self._outage_started = now
+            self._outage_reason = endpoint.last_error
+            logger.error("Semantic cache unavailable: no healthy Milvus endpoint")
+        elif self.available and self._outage_started is not None:
+            seconds = now - self._outage_started
+            self.outage_seconds += seconds
+            self.outages.append({
+                "started": datetime.fromtimestamp(time.time() - seconds).isoformat(),
+                "seconds": round(seconds, 1),
+                "reason": self._outage_reason,
+            })
+            self._outage_started = None
+            logger.info(f"Semantic cache available again after {seconds:.1f}s")
+        if self.on_change is not None:
+            try:
+                self.on_change(endpoint)
+            except Exception as e:
+                logger.error(f"Milvus endpoint change handler failed: {str(e)}")
+
+    def probe(self) -> None:
+        """Check connected endpoints and retry due reconnects; blocking, run off the event loop"""
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if endpoint.connected:
+                try:
+                    self._ping(endpoint)
+                    self.record_success(endpoint.alias)
+                except Exception as e:
+                    self.record_failure(endpoint.alias, e)
+            elif now >= endpoint.next_attempt:
+                try:
+                    self._connect(endpoint)
+                    self._mark_up(endpoint)
+                except Exception as e:
+                    endpoint.last_error = str(e)[:300]
+                    self._schedule(endpoint)
+
+    async def run(self) -> None:
+        """Probe every ``probe_interval`` seconds, sooner while a reconnect is due"""
+        while True:
+            try:
+                await asyncio.to_thread(self.probe)
+            except Exception as e:
+                logger.error(f"Milvus health probe failed: {str(e)}")
+            delay = self.probe_interval
+            pending = [e.next_attempt for e in self.endpoints if not e.connected]
+            if pending:
+                delay = min(delay, max(0.05, min(pending) - time.monotonic()))
+            await asyncio.sleep(delay)
+
+    def disconnect(self) -> None:
+        from pymilvus import connections
+
+        for endpoint in self.endpoints:
+            if connections.has_connection(endpoint.alias):
+                connections.disconnect(endpoint.alias)
+            endpoint.connected = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        current = None
+        if self._outage_started is not None:
+            current = round(time.monotonic() - self._outage_started, 1)
+        return {
+            "available": self.available,
+            "primary": self.primary,
+            "replicas": self.replicas,
+            "endpoints": {endpoint.alias: endpoint.to_dict() for endpoint in self.endpoints},
+            "current_outage_seconds": current,
+            "total_outage_seconds": round(self.outage_seconds + (current or 0), 1),
+            "outages": list(self.outages),
+            "skipped_lookups": self.skipped_lookups,
+            "skipped_writes": self.skipped_writes,
+        }
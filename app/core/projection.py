@@ -0,0 +1,188 @@
+from typing import Dict, Any, List, Optional, Set
+from app.utils.mapping_utils import field_types, nested_paths
+import copy
+import re
+
+# Returned for every listed employee unless the caller asks for specific fields
+SUMMARY_FIELDS = [
+    "employee_id",
+    "personal_info.first_name",
+    "personal_info.last_name",
+    "employment_details.position",
+    "employment_details.department.name",
+    "employment_details.employment_status",
+]
+
+# Words in the question that imply a group of fields should be returned
+INTENT_FIELDS = {
+    r"\b(salar\w*|pay|paid|earn\w*|compensation|raise\w*)\b": ["salary_info.base_salary", "salary_info.currency"],
+    r"\b(salary history|raises?|pay history|increments?)\b": ["salary_info.salary_history"],
+    r"\b(leaves?|vacation|absen\w*|sick|maternity|paternity)\b": ["leave_records"],
+    r"\b(address|city|cities|state|country|countries|live|lives|living|located)\b": [
+        "address.city",
+        "address.state",
+        "address.country",
+    ],
+    r"\b(branch\w*|office\w*|near|within|km|miles)\b": ["branch.branch_id", "branch.branch_name"],
+    r"\b(e-?mail\w*|phone\w*|contact\w*)\b": ["personal_info.email", "personal_info.phone"],
+    r"\b(hired|hire date|joined|tenure|seniority)\b": ["employment_details.hire_date"],
+    r"\b(manager\w*|reports? to)\b": ["employment_details.manager_id"],
+    r"\b(age|born|birth\w*|gender|married|marital)\b": [
+        "personal_info.date_of_birth",
+        "personal_info.gender",
+        "personal_info.marital_status",
+    ],
+}
+
+# Query clauses whose object keys are field names
+FIELD_KEYED_CLAUSES = {
+    "term", "terms", "range", "match", "match_phrase", "match_phrase_prefix",
+    "match_bool_prefix", "prefix", "wildcard", "regexp", "fuzzy",
+    "geo_distance", "geo_bounding_box", "geo_shape",
+}
+
+# Parameters that can appear next to field names inside those clauses
+CLAUSE_PARAMETERS = {
+    "boost", "distance", "distance_type", "validation_method", "_name",
+    "ignore_unmapped", "minimum_should_match", "format", "time_zone", "relation",
+    "case_insensitive",
+}
+
+DOCVALUE_TYPES = {"keyword", "long", "integer", "short", "byte", "double", "float",
+                  "half_float", "scaled_float", "date", "boolean", "geo_point", "ip"}
+
+
+def dsl_field_names(node: Any) -> Set[str]:
+    """Every field name a DSL fragment queries, sorts or aggregates on, mapped or not"""
+    found: Set[str] = set()
+
+    def add(name: Any) -> None:
+        if isinstance(name, str):
+            found.add(name.split("^")[0])
+
+    def walk(node: Any) -> None:
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key in ("field", "path"):
+                    add(value)
+                elif key == "fields" and isinstance(value, list):
+                    for item in value:
+                        add(item if isinstance(item, str) else item.get("field"))
+                elif key in FIELD_KEYED_CLAUSES and isinstance(value, dict):
+                    for name in value:
+                        if name not in CLAUSE_PARAMETERS:
+                            add(name)
+                elif key == "sort":
+                    for item in value if isinstance(value, list) else [value]:
+                        if isinstance(item, str):
+                            add(item)
+                        elif isinstance(item, dict):
+                            for name in item:
+                                add(name)
+                walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(node)
+    return found
+
+
+class SourceProjector:
+    """Restrict the fields Elasticsearch returns for list queries.
+
+    Employee documents carry nested salary and leave history that most list
+    queries never display; shipping only the fields the question and the DSL
+    need shrinks the response by an order of magnitude.
+    """
+
+    def __init__(self):
+        self.known_fields = field_types()
+        self.nested = nested_paths()
+
+    def referenced_fields(self, dsl: Dict[str, Any]) -> Set[str]:
+        """Collect the mapped fields a DSL body queries or sorts on"""
+        names = dsl_field_names(dsl.get("query", {}))
+        names |= dsl_field_names({"sort": dsl["sort"]} if "sort" in dsl else {})
+        return {
+            field for field in names
+            if field in self.known_fields
+            or any(known.startswith(f"{field}.") for known in self.known_fields)
+        }
+
+    def intent_fields(self, query: str) -> List[str]:
+        fields: List[str] = []
+        lowered = query.lower()
+        for pattern, group in INTENT_FIELDS.items():
+            if re.search(pattern, lowered):
+                fields.extend(group)
+        return fields
+
+    def _source_field(self, field: str) -> str:
+        """Map a queried field to the _source path that holds it"""
+        for suffix in (".keyword",):
+            if field.endswith(suffix) and field[: -len(suffix)] in self.known_fields:
+                field = field[: -len(suffix)]
+        return field
+
+    def needed_fields(self, query: str, dsl: Dict[str, Any]) -> List[str]:
+        fields = list(SUMMARY_FIELDS)
+        fields.extend(self.intent_fields(query))
+        fields.extend(self._source_field(f) for f in self.referenced_fields(dsl))
+
+        # A nested object is only useful whole; collapse its sub-fields to the parent
+        collapsed = []
+        for field in fields:
+            for path in self.nested:
+                if field.startswith(f"{path}."):
+                    field = path
+            collapsed.append(field)
+        return sorted(set(collapsed))
+
+    def validate_fields(self, fields: List[str]) -> List[str]:
+        unknown = [
+            field
+            for field in fields
+            if field not in self.known_fields
+            and not any(known.startswith(f"{field}.") for known in self.known_fields)
+        ]
+        if unknown:
+            raise ValueError(f"Unknown fields requested: {', '.join(unknown)}")
+        return fields
+
+    def apply(
+        self,
+        dsl: Dict[str, Any],
+        query: str,
+        fields: Optional[List[str]] = None,
+        use_docvalues: bool = False,
+    ) -> tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return a projected copy of dsl and a description of what was applied.
+
+        The input is never modified because it may be the cached DSL.
+        """
+        if dsl.get("size") == 0:
+            # Aggregation-only: hits are never returned, nothing to project
+            return dsl, {"mode": "none", "reason": "aggregation"}
+
+        if not fields and any(key in dsl for key in ("_source", "fields", "docvalue_fields")):
+            # The DSL already chose what to return
+            return dsl, {"mode": "none", "reason": "explicit_in_dsl"}
+
+        projected = copy.deepcopy(dsl)
+
+        if fields:
+            fields = self.validate_fields(fields)
+            if use_docvalues and all(
+                self.known_fields.get(field) in DOCVALUE_TYPES for field in fields
+            ):
+                projected["_source"] = False
+                projected["docvalue_fields"] = fields
+                return projected, {"mode": "docvalues", "fields": fields}
+            projected["_source"] = {"includes": fields}
+            return projected, {"mode": "source", "fields": fields}
+
+        includes = self.needed_fields(query, dsl)
+        excludes = [path for path in self.nested if path not in includes]
+        projected["_source"] = {"includes": includes, "excludes": excludes}
+        return projected, {"mode": "source", "fields": includes}
@@ -0,0 +1,243 @@
+from collections import Counter, OrderedDict, deque
+from typing import Dict, Any, List, Optional, Set, Tuple
+from datetime import datetime
+from app.core.deadline import clear_deadline
+from app.utils.logger import logger
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+# Values under these keys name fields or paths, so they are structure, not literals
+STRUCTURAL_KEYS = {"field", "fields", "path", "_source", "includes", "excludes", "order"}
+
+# Sizes are bucketed rather than stripped: size 10 and size 10000 are different shapes
+SIZE_KEYS = {"size", "shard_size", "terminate_after"}
+
+
+def _size_class(value: Any) -> str:
+    if not isinstance(value, (int, float)):
+        return "?"
+    for limit in (10, 100, 1000, 10000):
+        if value <= limit:
+            return f"<={limit}"
+    return ">10000"
+
+
+def query_shape(dsl: Any, key: Optional[str] = None) -> Any:
+    """DSL with literal values replaced by ``?``, keeping keys, field names and nesting"""
+    if isinstance(dsl, dict):
+        return {k: query_shape(v, k) for k, v in dsl.items()}
+    if isinstance(dsl, list):
+        if key in STRUCTURAL_KEYS:
+            return dsl
+        shapes = [query_shape(item, key) for item in dsl]
+        # A terms list of 3 or 30 values is the same shape
+        if all(not isinstance(item, (dict, list)) for item in dsl):
+            return ["?"] if dsl else []
+        return shapes
+    if key in SIZE_KEYS:
+        return _size_class(dsl)
+    if key in STRUCTURAL_KEYS:
+        return dsl
+    return "?"
+
+
+def _shape_hash(shape: Any) -> str:
+    encoded = json.dumps(shape, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def fingerprint(dsl: Dict[str, Any]) -> str:
+    """Stable id for the structure of a query, independent of its literal values"""
+    return _shape_hash(query_shape(dsl))
+
+
+def _percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 2)
+
+
+class FingerprintStats:
+    def __init__(self, shape: Any, window: int):
+        self.shape = shape
+        self.count = 0
+        self.errors = 0
+        self.total_took_ms = 0.0
+        self.total_round_trip_ms = 0.0
+        self.took = deque(maxlen=window)
+        self.round_trip = deque(maxlen=window)
+        self.sources: Counter = Counter()
+        self.example: Optional[Dict[str, Any]] = None
+        self.last_seen: Optional[str] = None
+        self.profile: Optional[Dict[str, Any]] = None
+        self.last_profiled = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        took = list(self.took)
+        round_trip = list(self.round_trip)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_took_ms": round(self.total_took_ms, 1),
+            "total_round_trip_ms": round(self.total_round_trip_ms, 1),
+            "took_ms": {
+                "p50": _percentile(took, 50),
+                "p95": _percentile(took, 95),
+                "max": max(took, default=None),
+            },
+            "round_trip_ms": {
+                "p50": _percentile(round_trip, 50),
+                "p95": _percentile(round_trip, 95),
+                "max": round(max(round_trip), 2) if round_trip else None,
+            },
+            "sources": [text for text, _ in self.sources.most_common(5)],
+            "last_seen": self.last_seen,
+            "profiled_at": self.profile["profiled_at"] if self.profile else None,
+        }
+
+
+class QueryProfiler:
+    """In-memory latency statistics per DSL fingerprint, with sampled ES profiles.
+
+    Queries slower than ``slow_ms`` are re-run in the background with
+    ``"profile": true`` (at most once per ``profile_cooldown`` per
+    fingerprint) and the resulting profile tree is kept with the stats.
+    """
+
+    def __init__(
+        self,
+        slow_ms: float = 500,
+        sample_rate: float = 0.1,
+        profile_cooldown: float = 300,
+        max_fingerprints: int = 2000,
+        window: int = 500,
+    ):
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.profile_cooldown = profile_cooldown
+        self.max_fingerprints = max_fingerprints
+        self.window = window
+        self._stats: "OrderedDict[str, FingerprintStats]" = OrderedDict()
+        self._profiling: Set[str] = set()
+        self._background: Set[asyncio.Task] = set()
+        self.profiles_taken = 0
+
+    def _get(self, dsl: Dict[str, Any]) -> Tuple[str, FingerprintStats]:
+        shape = query_shape(dsl)
+        fp = _shape_hash(shape)
+        stats = self._stats.get(fp)
+        if stats is None:
+            stats = self._stats[fp] = FingerprintStats(shape, self.window)
+            stats.example = dsl
+            while len(self._stats) > self.max_fingerprints:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(fp)
+        return fp, stats
+
+    def observe(
+        self,
+        es_client,
+        dsl: Dict[str, Any],
+        source: str,
+        took_ms: Optional[float],
+        round_trip_ms: float,
+        error: bool = False,
+    ) -> str:
+        """Record one execution; may schedule a background profile of the query"""
+        fp, stats = self._get(dsl)
+        stats.count += 1
+        stats.errors += int(error)
+        stats.sources[source] += 1
+        stats.last_seen = datetime.now().isoformat()
+        stats.round_trip.append(round_trip_ms)
+        stats.total_round_trip_ms += round_trip_ms
+        if took_ms is not None:
+            stats.took.append(took_ms)
+            stats.total_took_ms += took_ms
+
+        slow = (took_ms if took_ms is not None else round_trip_ms) >= self.slow_ms
+        if (
+            slow
+            and not error
+            and fp not in self._profiling
+            and time.monotonic() - stats.last_profiled >= self.profile_cooldown
+            and random.random() < self.sample_rate
+        ):
+            self._profiling.add(fp)
+            stats.last_profiled = time.monotonic()
+            task = asyncio.create_task(self._profile(es_client, fp, dsl))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        return fp
+
+    async def _profile(self, es_client, fp: str, dsl: Dict[str, Any]) -> None:
+        clear_deadline()
+        try:
+            started = time.perf_counter()
+            response = await es_client.search(body={**dsl, "profile": True})
+            stats = self._stats.get(fp)
+            if stats is not None:
+                stats.profile = {
+                    "profiled_at": datetime.now().isoformat(),
+                    "took_ms": response.get("took"),
+                    "round_trip_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "dsl": dsl,
+                    "profile": response.get("profile"),
+                }
+            self.profiles_taken += 1
+            logger.info(f"Profiled slow query fingerprint {fp}")
+        except Exception as e:
+            logger.error(f"Profiling query fingerprint {fp} failed: {str(e)}")
+        finally:
+            self._profiling.discard(fp)
+
+    def top(self, limit: int = 20, sort: str = "total_took_ms") -> List[Dict[str, Any]]:
+        keys = {
+            "total_took_ms": lambda s: s.total_took_ms,
+            "total_round_trip_ms": lambda s: s.total_round_trip_ms,
+            "count": lambda s: s.count,
+            "p95_took_ms": lambda s: _percentile(list(s.took), 95) or 0,
+            "errors": lambda s: s.errors,
+        }
+        if sort not in keys:
+            raise ValueError(f"Unknown sort '{sort}' (available: {', '.join(keys)})")
+        ranked = sorted(self._stats.items(), key=lambda item: keys[sort](item[1]), reverse=True)
+        return [{"fingerprint": fp, **stats.summary()} for fp, stats in ranked[:limit]]
+
+    def most_executed(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """An example DSL per fingerprint, most executed first, skipping ones that only failed"""
+        ranked = sorted(self._stats.items(), key=lambda item: item[1].count, reverse=True)
+        return [
+            {"fingerprint": fp, "count": stats.count, "dsl": stats.example}
+            for fp, stats in ranked
+            if stats.count > stats.errors
+        ][:limit]
+
+    def detail(self, fp: str) -> Optional[Dict[str, Any]]:
+        stats = self._stats.get(fp)
+        if stats is None:
+            return None
+        return {
+            "fingerprint": fp,
+            **stats.summary(),
+            "shape": stats.shape,
+            "example": stats.example,
+            "profile": stats.profile,
+        }
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "fingerprints": len(self._stats),
+            "profiles_taken": self.profiles_taken,
+            "profiling": len(self._profiling),
+            "slow_ms": self.slow_ms,
+            "sample_rate": self.sample_rate,
+        }
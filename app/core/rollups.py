@@ -0,0 +1,471 @@
+from elasticsearch import AsyncElasticsearch, NotFoundError
+from elasticsearch.helpers import async_bulk
+from typing import Dict, Any, List, Optional, Set, Tuple
+from datetime import datetime, timezone
+from app.utils.logger import logger
+import asyncio
+import time
+
+# Upper bound on distinct groups per dimension; HR dimensions have tens of values
+MAX_BUCKETS = 1000
+
+SALARY = "salary_info.base_salary"
+
+# Precomputed dimensions. Each one answers a terms aggregation on ``group``
+# (inside ``nested`` when set), optionally with metric sub-aggregations on ``metrics``.
+ROLLUP_DIMENSIONS: Dict[str, Dict[str, Any]] = {
+    "department": {"group": "employment_details.department.name", "metrics": [SALARY]},
+    "branch": {"group": "branch.branch_name", "metrics": [SALARY]},
+    "leave_type": {"group": "leave_records.leave_type", "nested": "leave_records", "metrics": []},
+}
+
+METRIC_AGGS = {"avg", "min", "max", "sum", "stats", "value_count"}
+
+ROLLUP_MAPPING = {
+    "properties": {
+        "type": {"type": "keyword"},
+        "dimension": {"type": "keyword"},
+        "key": {"type": "keyword"},
+        "doc_count": {"type": "long"},
+        "metrics": {"type": "object", "enabled": False},
+        "total": {"type": "long"},
+        "refreshed_at": {"type": "date"},
+        "rebuilt_at": {"type": "date"},
+        "watermark": {"type": "date"},
+        "live_ms": {"type": "float"},
+    }
+}
+
+SHARDS = {"total": 1, "successful": 1, "skipped": 0, "failed": 0}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class RollupManager:
+    """Precomputed HR aggregates kept in a side index.
+
+    One document per (dimension, group) holds the doc count and salary stats,
+    and one meta document per dimension records when it was last verified.
+    ``refresh`` recomputes only the groups touched by documents whose
+    ``updated_at`` moved past the watermark, then checks per-dimension totals
+    and rebuilds a dimension whose totals drifted (moves, deletions).
+
+    ``answer`` serves matching ``size: 0`` aggregation DSL from an in-memory
+    snapshot of the side index, without touching the employee index.
+    """
+
+    def __init__(
+        self,
+        es: AsyncElasticsearch,
+        source_index: str,
+        index: str,
+        max_staleness: float = 300,
+        full_rebuild_interval: float = 3600,
+    ):
+        self.es = es
+        self.source_index = source_index
+        self.index = index
+        self.max_staleness = max_staleness
+        self.full_rebuild_interval = full_rebuild_interval
+        # dimension -> {"meta": {...}, "buckets": {key: doc}}
+        self.snapshot: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+
+        self.answered = 0
+        self.stale = 0
+        self.answer_seconds = 0.0
+        self.refreshes = 0
+        self.rebuilds = 0
+
+    # -- maintenance ------------------------------------------------------------
+
+    async def ensure_index(self) -> None:
+        if not await self.es.indices.exists(index=self.index):
+            await self.es.indices.create(
+                index=self.index,
+                settings={"number_of_shards": 1, "auto_expand_replicas": "0-1"},
+                mappings=ROLLUP_MAPPING,
+            )
+            logger.info(f"Created rollup index {self.index}")
+
+    async def load(self) -> None:
+        """Replace the in-memory snapshot with the contents of the side index"""
+        try:
+            response = await self.es.search(
+                index=self.index, size=len(ROLLUP_DIMENSIONS) * (MAX_BUCKETS + 1)
+            )
+        except NotFoundError:
+            self.snapshot = {}
+            return
+
+        snapshot: Dict[str, Dict[str, Any]] = {}
+        for hit in response["hits"]["hits"]:
+            doc = hit["_source"]
+            entry = snapshot.setdefault(doc["dimension"], {"meta": None, "buckets": {}})
+            if doc["type"] == "meta":
+                entry["meta"] = doc
+            else:
+                entry["buckets"][doc["key"]] = doc
+        self.snapshot = {dim: entry for dim, entry in snapshot.items() if entry["meta"]}
+
+    def _aggregation(self, dimension: str, keys: Optional[Set[str]] = None) -> Dict[str, Any]:
+        spec = ROLLUP_DIMENSIONS[dimension]
+        terms: Dict[str, Any] = {"field": spec["group"], "size": MAX_BUCKETS}
+        if keys is not None:
+            terms["include"] = sorted(keys)
+        agg: Dict[str, Any] = {"terms": terms}
+        if spec["metrics"]:
+            agg["aggs"] = {field: {"stats": {"field": field}} for field in spec["metrics"]}
+        if spec.get("nested"):
+            return {"nested": {"path": spec["nested"]}, "aggs": {"groups": agg}}
+        return agg
+
+    @staticmethod
+    def _buckets(dimension: str, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if ROLLUP_DIMENSIONS[dimension].get("nested"):
+            result = result["groups"]
+        return result["buckets"]
+
+    def _bucket_doc(self, dimension: str, bucket: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "type": "bucket",
+            "dimension": dimension,
+            "key": bucket["key"],
+            "doc_count": bucket["doc_count"],
+            "metrics": {
+                field: bucket[field] for field in ROLLUP_DIMENSIONS[dimension]["metrics"]
+            },
+        }
+
+    async def _totals(self) -> Tuple[int, Dict[str, int]]:
+        """Documents in the index and values per dimension, via cheap exists filters"""
+        aggs: Dict[str, Any] = {}
+        for dimension, spec in ROLLUP_DIMENSIONS.items():
+            exists = {"filter": {"exists": {"field": spec["group"]}}}
+            if spec.get("nested"):
+                aggs[dimension] = {"nested": {"path": spec["nested"]}, "aggs": {"present": exists}}
+            else:
+                aggs[dimension] = exists
+        response = await self.es.search(
+            index=self.source_index, size=0, track_total_hits=True, aggs=aggs
+        )
+        totals = {}
+        for dimension, spec in ROLLUP_DIMENSIONS.items():
+            result = response["aggregations"][dimension]
+            totals[dimension] = (result["present"] if spec.get("nested") else result)["doc_count"]
+        return response["hits"]["total"]["value"], totals
+
+    async def _rebuild(self, dimension: str) -> Tuple[Dict[str, Dict[str, Any]], float]:
+        """Recompute every group of a dimension; this is the live aggregation"""
+        started = time.perf_counter()
+        response = await self.es.search(
+            index=self.source_index, size=0, aggs={"rollup": self._aggregation(dimension)}
+        )
+        live_ms = (time.perf_counter() - started) * 1000
+        buckets = {
+            bucket["key"]: self._bucket_doc(dimension, bucket)
+            for bucket in self._buckets(dimension, response["aggregations"]["rollup"])
+        }
+        return buckets, live_ms
+
+    async def _changed_groups(
+        self, since: Optional[str]
+    ) -> Tuple[Dict[str, Set[str]], Optional[str]]:
+        """Group keys of documents updated at or after ``since``, and the new watermark.
+
+        Without ``since`` only the watermark is read.
+        """
+        aggs: Dict[str, Any] = {"watermark": {"max": {"field": "updated_at"}}}
+        if since is not None:
+            for dimension, spec in ROLLUP_DIMENSIONS.items():
+                terms = {"terms": {"field": spec["group"], "size": MAX_BUCKETS}}
+                aggs[dimension] = (
+                    {"nested": {"path": spec["nested"]}, "aggs": {"groups": terms}}
+                    if spec.get("nested") else terms
+                )
+        query = {"range": {"updated_at": {"gte": since}}} if since else {"match_all": {}}
+        response = await self.es.search(
+            index=self.source_index, size=0, query=query, aggs=aggs
+        )
+        result = response["aggregations"]
+        changed = {
+            dimension: {bucket["key"] for bucket in self._buckets(dimension, result[dimension])}
+            for dimension in ROLLUP_DIMENSIONS
+            if dimension in result
+        }
+        return changed, result["watermark"].get("value_as_string")
+
+    async def refresh(self, full: bool = False) -> Dict[str, Any]:
+        """Bring the side index up to date with the employee index"""
+        async with self._lock:
+            await self.ensure_index()
+            await self.load()
+            now = _now()
+
+            watermarks = [
+                entry["meta"].get("watermark") for entry in self.snapshot.values()
+            ]
+            rebuilt_at = [
+                _parse_time(entry["meta"].get("rebuilt_at")) for entry in self.snapshot.values()
+            ]
+            full = (
+                full
+                or len(self.snapshot) < len(ROLLUP_DIMENSIONS)
+                or None in watermarks
+                or any(
+                    (now - at).total_seconds() > self.full_rebuild_interval for at in rebuilt_at
+                )
+            )
+
+            # Using gte re-reads the newest documents once more, which is harmless
+            changed, watermark = await self._changed_groups(None if full else min(watermarks))
+            total, totals = await self._totals()
+
+            actions: List[Dict[str, Any]] = []
+            summary: Dict[str, Any] = {}
+            for dimension in ROLLUP_DIMENSIONS:
+                entry = self.snapshot.get(dimension, {"meta": {}, "buckets": {}})
+                buckets = dict(entry["buckets"])
+                meta = dict(entry["meta"] or {})
+
+                mode = "unchanged"
+                if not full and changed[dimension]:
+                    response = await self.es.search(
+                        index=self.source_index,
+                        size=0,
+                        aggs={"rollup": self._aggregation(dimension, changed[dimension])},
+                    )
+                    fresh = {
+                        bucket["key"]: self._bucket_doc(dimension, bucket)
+                        for bucket in self._buckets(dimension, response["aggregations"]["rollup"])
+                    }
+                    for key in changed[dimension]:
+                        if key in fresh:
+                            buckets[key] = fresh[key]
+                        else:
+                            buckets.pop(key, None)
+                    mode = "incremental"
+
+                # Moves and deletions leave no trace in updated_at; totals catch them
+                if full or sum(b["doc_count"] for b in buckets.values()) != totals[dimension]:
+                    buckets, meta["live_ms"] = await self._rebuild(dimension)
+                    meta["rebuilt_at"] = now.isoformat()
+                    mode = "full"
+
+                for key in set(entry["buckets"]) - set(buckets):
+                    actions.append(
+                        {"_op_type": "delete", "_index": self.index, "_id": f"{dimension}:{key}"}
+                    )
+                for key, doc in buckets.items():
+                    if mode != "unchanged" and doc != entry["buckets"].get(key):
+                        actions.append(
+                            {"_index": self.index, "_id": f"{dimension}:{key}", "_source": doc}
+                        )
+                meta.update({
+                    "type": "meta",
+                    "dimension": dimension,
+                    "total": total,
+                    "refreshed_at": now.isoformat(),
+                    "watermark": watermark or meta.get("watermark") or now.isoformat(),
+                })
+                actions.append(
+                    {"_index": self.index, "_id": f"{dimension}:_meta", "_source": meta}
+                )
+                summary[dimension] = {"mode": mode, "groups": len(buckets)}
+
+            await async_bulk(self.es, actions, raise_on_error=True)
+            await self.es.indices.refresh(index=self.index)
+            await self.load()
+
+            self.refreshes += 1
+            self.rebuilds += sum(1 for s in summary.values() if s["mode"] == "full")
+            logger.info("Rollups refreshed", extra={"rollups": summary})
+            return summary
+
+    async def run(self, interval: float) -> None:
+        """Refresh periodically; with no interval, only pick up refreshes made elsewhere"""
+        while True:
+            try:
+                if interval > 0:
+                    await self.refresh()
+                else:
+                    await self.load()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Rollup refresh failed: {str(e)}")
+            await asyncio.sleep(interval if interval > 0 else self.max_staleness / 2)
+
+    # -- query path -------------------------------------------------------------
+
+    def _match_terms(self, terms: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Validate terms options the rollup can honour; return them normalized"""
+        if set(terms) - {"field", "size", "order", "min_doc_count"}:
+            return None
+        order = terms.get("order", {"_count": "desc"})
+        if isinstance(order, list):
+            if len(order) != 1:
+                return None
+            order = order[0]
+        if order not in ({"_count": "desc"}, {"_key": "asc"}, {"_key": "desc"}):
+            return None
+        if terms.get("min_doc_count", 1) < 1:
+            return None
+        return {"size": terms.get("size", 10), "order": order}
+
+    def _match(self, dsl: Dict[str, Any]) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """Return (dimension, agg name, agg body) when the DSL is a whole-index rollup shape"""
+        if set(dsl) - {"size", "from", "query", "aggs", "aggregations", "track_total_hits", "_source"}:
+            return None
+        if dsl.get("size") != 0 or dsl.get("from", 0) != 0:
+            return None
+        if dsl.get("query", {"match_all": {}}) != {"match_all": {}}:
+            return None
+        aggs = dsl.get("aggs") or dsl.get("aggregations") or {}
+        if len(aggs) != 1:
+            return None
+
+        name, body = next(iter(aggs.items()))
+        for dimension, spec in ROLLUP_DIMENSIONS.items():
+            if spec.get("nested"):
+                if set(body) - {"nested", "aggs", "aggregations"}:
+                    continue
+                if body.get("nested", {}).get("path") != spec["nested"]:
+                    continue
+                inner = body.get("aggs") or body.get("aggregations") or {}
+                if len(inner) != 1:
+                    continue
+                inner_body = next(iter(inner.values()))
+                if set(inner_body) == {"terms"} and inner_body["terms"].get("field") == spec["group"]:
+                    return dimension, name, body
+            elif "terms" in body and body["terms"].get("field") == spec["group"]:
+                if set(body) - {"terms", "aggs", "aggregations"}:
+                    continue
+                sub = body.get("aggs") or body.get("aggregations") or {}
+                if all(
+                    len(metric) == 1
+                    and next(iter(metric)) in METRIC_AGGS
+                    and set(next(iter(metric.values()))) == {"field"}
+                    and next(iter(metric.values()))["field"] in spec["metrics"]
+                    for metric in sub.values()
+                ):
+                    return dimension, name, body
+        return None
+
+    @staticmethod
+    def _metric_value(kind: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+        if kind == "stats":
+            return {k: stats[k] for k in ("count", "min", "max", "avg", "sum")}
+        if kind == "value_count":
+            return {"value": stats["count"]}
+        return {"value": stats[kind]}
+
+    def _terms_result(
+        self, dimension: str, terms: Dict[str, Any], sub: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        options = self._match_terms(terms)
+        if options is None:
+            return None
+
+        docs = list(self.snapshot[dimension]["buckets"].values())
+        (order_key, direction), = options["order"].items()
+        if order_key == "_count":
+            docs.sort(key=lambda d: (-d["doc_count"], d["key"]))
+        else:
+            docs.sort(key=lambda d: d["key"], reverse=direction == "desc")
+
+        buckets = []
+        for doc in docs[:options["size"]]:
+            bucket = {"key": doc["key"], "doc_count": doc["doc_count"]}
+            for sub_name, metric in sub.items():
+                (kind, params), = metric.items()
+                bucket[sub_name] = self._metric_value(kind, doc["metrics"][params["field"]])
+            buckets.append(bucket)
+        return {
+            "doc_count_error_upper_bound": 0,
+            "sum_other_doc_count": sum(d["doc_count"] for d in docs[options["size"]:]),
+            "buckets": buckets,
+        }
+
+    def answer(self, dsl: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Build an Elasticsearch-shaped response from the rollups, or None to run it live"""
+        started = time.perf_counter()
+        matched = self._match(dsl)
+        if matched is None:
+            return None
+        dimension, name, body = matched
+
+        entry = self.snapshot.get(dimension)
+        if entry is None:
+            return None
+        age = (_now() - _parse_time(entry["meta"]["refreshed_at"])).total_seconds()
+        if age > self.max_staleness:
+            self.stale += 1
+            return None
+
+        if ROLLUP_DIMENSIONS[dimension].get("nested"):
+            inner_name, inner = next(iter((body.get("aggs") or body.get("aggregations")).items()))
+            terms = self._terms_result(dimension, inner["terms"], {})
+            if terms is None:
+                return None
+            result = {
+                "doc_count": sum(d["doc_count"] for d in entry["buckets"].values()),
+                inner_name: terms,
+            }
+        else:
+            result = self._terms_result(
+                dimension, body["terms"], body.get("aggs") or body.get("aggregations") or {}
+            )
+            if result is None:
+                return None
+
+        total = entry["meta"]["total"]
+        if dsl.get("track_total_hits") is not True and total > 10000:
+            hits_total = {"value": 10000, "relation": "gte"}
+        else:
+            hits_total = {"value": total, "relation": "eq"}
+
+        response = {
+            "took": 0,
+            "timed_out": False,
+            "_shards": SHARDS,
+            "hits": {"total": hits_total, "max_score": None, "hits": []},
+            "aggregations": {name: result},
+        }
+        self.answered += 1
+        self.answer_seconds += time.perf_counter() - started
+        return response, {
+            "dimension": dimension,
+            "age_seconds": round(age, 1),
+            "refreshed_at": entry["meta"]["refreshed_at"],
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        answer_ms = self.answer_seconds / self.answered * 1000 if self.answered else None
+        dimensions = {}
+        for dimension, entry in self.snapshot.items():
+            live_ms = entry["meta"].get("live_ms")
+            dimensions[dimension] = {
+                "groups": len(entry["buckets"]),
+                "refreshed_at": entry["meta"].get("refreshed_at"),
+                "live_ms": round(live_ms, 2) if live_ms else None,
+                "speedup": round(live_ms / answer_ms) if live_ms and answer_ms else None,
+            }
+        return {
+            "index": self.index,
+            "answered": self.answered,
+            "stale_skipped": self.stale,
+            "avg_answer_ms": round(answer_ms, 4) if answer_ms else None,
+            "refreshes": self.refreshes,
+            "rebuilds": self.rebuilds,
+            "dimensions": dimensions,
+        }
@@ -0,0 +1,123 @@
+from typing import Any, Dict, List, Optional
+import re
+
+# Keyword values documented in DOCUMENT.md, matched case-insensitively in the question
+VOCABULARY = {
+    "employment_details.department.name": [
+        "Engineering", "Human Resources", "Finance", "Marketing", "Sales",
+        "Operations", "Legal", "Research & Development",
+    ],
+    "employment_details.position": [
+        "Software Engineer", "HR Manager", "Financial Analyst", "Marketing Specialist",
+        "Sales Representative", "Operations Manager", "Legal Counsel", "Research Scientist",
+    ],
+    "employment_details.employment_type": ["Full-time", "Part-time", "Contract", "Intern", "Consultant"],
+    "employment_details.employment_status": ["Active", "Inactive", "On Leave", "Terminated"],
+}
+
+ALIASES = {
+    "hr": ("employment_details.department.name", "Human Resources"),
+    "r&d": ("employment_details.department.name", "Research & Development"),
+    "full time": ("employment_details.employment_type", "Full-time"),
+    "part time": ("employment_details.employment_type", "Part-time"),
+    "contractors": ("employment_details.employment_type", "Contract"),
+    "interns": ("employment_details.employment_type", "Intern"),
+    "women": ("personal_info.gender", "Female"),
+    "female": ("personal_info.gender", "Female"),
+    "men": ("personal_info.gender", "Male"),
+    "male": ("personal_info.gender", "Male"),
+}
+
+LEAVE_TYPES = ["Annual Leave", "Sick Leave", "Maternity Leave", "Paternity Leave", "Unpaid Leave"]
+
+_COMPARATORS = {
+    "over": "gt", "above": "gt", "more than": "gt", "greater than": "gt", "at least": "gte",
+    "under": "lt", "below": "lt", "less than": "lt", "at most": "lte",
+}
+_COMPARATOR = "|".join(sorted(_COMPARATORS, key=len, reverse=True))
+
+SALARY = re.compile(
+    rf"\b(?:earn\w*|making|paid|salar\w*|pay)\b[^\d$]*?\b({_COMPARATOR})\s*\$?\s*([\d,.]+)\s*(k\b)?"
+)
+HIRED = re.compile(r"\b(?:hired|joined|started)\s+(after|before|since|in)\s+(\d{4})\b")
+COUNT = re.compile(r"^\s*(?:how many|count|number of)\b")
+
+
+# (phrase, field, value), longest phrase first so "Sales Representative" wins over "Sales"
+PHRASES = sorted(
+    [(value.lower(), field, value) for field, values in VOCABULARY.items() for value in values]
+    + [(phrase, field, value) for phrase, (field, value) in ALIASES.items()],
+    key=lambda item: -len(item[0]),
+)
+
+
+def _find(text: str, phrase: str) -> Optional[re.Match]:
+    # Plurals count: "software engineers" names the position "Software Engineer"
+    return re.search(rf"(?<![\w&-]){re.escape(phrase)}(?:e?s)?(?![\w&-])", text)
+
+
+def _amount(number: str, thousands: Optional[str]) -> float:
+    value = float(number.replace(",", ""))
+    return value * 1000 if thousands else value
+
+
+class RuleCompiler:
+    """Pattern rules that turn common HR questions into DSL without the LLM.
+
+    Covers keyword filters from the documented vocabulary, salary thresholds,
+    hire-date years and leave types. Returns None when no rule matches, so
+    callers can fall through to a broader query.
+    """
+
+    def __init__(self, size: int = 100):
+        self.size = size
+
+    def compile(self, question: str) -> Optional[Dict[str, Any]]:
+        text = question.lower()
+        filters: List[Dict[str, Any]] = []
+
+        taken = set()
+        for phrase, field, value in PHRASES:
+            match = _find(text, phrase)
+            if match is None or field in taken:
+                continue
+            taken.add(field)
+            filters.append({"term": {field: value}})
+            # Blank the match so a shorter value cannot match inside it
+            text = text[:match.start()] + " " * (match.end() - match.start()) + text[match.end():]
+
+        salary = SALARY.search(text)
+        if salary:
+            op = _COMPARATORS[salary.group(1)]
+            filters.append({"range": {"salary_info.base_salary": {
+                op: _amount(salary.group(2).rstrip("."), salary.group(3))
+            }}})
+
+        hired = HIRED.search(text)
+        if hired:
+            relation, year = hired.group(1), int(hired.group(2))
+            bounds = {
+                "after": {"gte": f"{year + 1}-01-01"},
+                "before": {"lt": f"{year}-01-01"},
+                "since": {"gte": f"{year}-01-01"},
+                "in": {"gte": f"{year}-01-01", "lte": f"{year}-12-31"},
+            }[relation]
+            filters.append({"range": {"employment_details.hire_date": bounds}})
+
+        if re.search(r"\bleaves?\b", text):
+            for leave_type in LEAVE_TYPES:
+                if _find(text, leave_type.split()[0].lower()):
+                    filters.append({"nested": {
+                        "path": "leave_records",
+                        "query": {"term": {"leave_records.leave_type": leave_type}},
+                    }})
+                    break
+
+        if not filters:
+            return None
+        dsl: Dict[str, Any] = {"query": {"bool": {"filter": filters}}}
+        if COUNT.search(text):
+            dsl.update(size=0, track_total_hits=True)
+        else:
+            dsl["size"] = self.size
+        return dsl
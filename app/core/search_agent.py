@@ -1,13 +1,22 @@
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain.prompts import ChatPromptTemplate
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Set, Tuple, Union
+from elasticsearch import ConnectionError as ESConnectionError, ConnectionTimeout
 from app.config import get_settings
+from app.core.admission import AdmissionController, OverloadedError
+from app.core.cache_feedback import CacheFeedback, summarize_response
+from app.core.deadline import CancellationStats, DeadlineExceededError, clear_deadline
+from app.core.degraded import DegradedMode
+from app.core.embeddings import OpenAIEmbeddingProvider
+from app.core.services import IEmbeddingProvider
+from app.core.local_cache import LocalQueryCache
+from app.core.speculation import Speculator
+from app.core.suggestions import SuggestionIndex
 from app.utils.logger import logger
 from app.schema.templates.hr_system_template import (
     HR_SYSTEM_TEMPLATE,
-    documentation,
-    es_mapping,
+    get_documentation,
+    get_es_mapping,
 )
+import asyncio
 import json
 import time
 
@@ -15,44 +24,325 @@ import time
 class SearchAgent:
     """Agent for converting natural language queries to Elasticsearch DSL"""
 
-    def __init__(self, es_client, vector_cache):
+    def __init__(
+        self,
+        es_client,
+        vector_cache,
+        admission: Optional[AdmissionController] = None,
+        speculator: Optional[Speculator] = None,
+        local_cache: Optional[LocalQueryCache] = None,
+        feedback: Optional[CacheFeedback] = None,
+        embedder: Optional[IEmbeddingProvider] = None,
+        degraded: Optional[DegradedMode] = None,
+        cancellations: Optional[CancellationStats] = None,
+        suggestions: Optional[SuggestionIndex] = None,
+    ):
+        # langchain is slow to import; load it when the agent is built, not with the app
+        from langchain_openai import ChatOpenAI
+        from langchain.prompts import ChatPromptTemplate
+
         settings = get_settings()
         self.chat_model = ChatOpenAI(temperature=0, model=settings.model_name)
-        self.embeddings = OpenAIEmbeddings()
-        self.prompt = ChatPromptTemplate.from_messages([("system", HR_SYSTEM_TEMPLATE)])
+        # Same dimension as the cache collection, so lookups compare like with like
+        self.embedder = embedder or OpenAIEmbeddingProvider(vector_cache.codec.dim)
+        # Documentation and mapping never change at runtime, so bind them once
+        self.prompt = ChatPromptTemplate.from_messages(
+            [("system", HR_SYSTEM_TEMPLATE)]
+        ).partial(documentation=get_documentation(), mapping=get_es_mapping())
+        self.chain = self.prompt | self.chat_model
         self.es_client = es_client
         self.vector_cache = vector_cache
+        self.admission = admission or AdmissionController()
+        self.speculator = speculator or Speculator()
+        # An empty cache is falsy, so test for None to keep the shared instance
+        self.local_cache = local_cache if local_cache is not None else LocalQueryCache()
+        self.feedback = feedback or CacheFeedback()
+        self.degraded = degraded or DegradedMode()
+        self.cancellations = cancellations or CancellationStats()
+        self.suggestions = suggestions if suggestions is not None else SuggestionIndex(enabled=False)
+        self._regenerating: Set[int] = set()
+        # Generation tasks holding an LLM slot, i.e. already paying for a completion
+        self._calling: Set[asyncio.Task] = set()
+        self._background: Set[asyncio.Task] = set()
+
+    def warm_up(self) -> None:
+        """Render the prompt and ready the embedder so the first request doesn't pay for it"""
+        self.prompt.format_messages(query="")
+        self.embedder.warm_up()
+
+    async def _generate(self, query: str) -> Dict:
+        """Ask the LLM for a query, within the bounded LLM pool"""
+        async with self.admission.admit():
+            task = asyncio.current_task()
+            self._calling.add(task)
+            try:
+                response = await self.chain.ainvoke({"query": query})
+            finally:
+                self._calling.discard(task)
+        return json.loads(response.content)
+
+    async def _timed_generate(self, query: str) -> Tuple[Dict, float]:
+        started = time.perf_counter()
+        es_query = await self._generate(query)
+        return es_query, time.perf_counter() - started
+
+    def _start_generation(self, query: str) -> asyncio.Task:
+        generation = asyncio.create_task(self._timed_generate(query))
+        # Retrieve the outcome so a discarded failure is not reported as unhandled
+        generation.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return generation
+
+    def _degrade(
+        self, query: str, metrics: Dict[str, Any], candidate: Optional[Dict[str, Any]], reason: str
+    ) -> Tuple[Dict, Dict[str, Any]]:
+        es_query, tier = self.degraded.fallback(query, candidate)
+        self.degraded.record_tier(tier)
+        metrics.update(tier=tier, degraded=True, degraded_reason=reason)
+        if candidate is not None:
+            metrics["similarity"] = round(candidate["similarity"], 4)
+        logger.warning(f"Degraded answer ({tier}) for query '{query}': {reason}")
+        return es_query, metrics
+
+    async def _store(self, query: str, query_vector: Optional[list], es_query: Dict) -> Optional[int]:
+        # Without an embedding only the exact-match cache can remember the answer
+        entry_id = None
+        if query_vector is not None:
+            entry_id = await self.vector_cache.store_query(query, query_vector, es_query)
+        self.local_cache.put(query, es_query, entry_id)
+        return entry_id
+
+    def _keep(self, query: str, query_vector: Optional[list], generation: asyncio.Task, abandoned: bool) -> None:
+        task = asyncio.create_task(self._store_late(query, query_vector, generation, abandoned))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _store_late(
+        self, query: str, query_vector: Optional[list], generation: asyncio.Task, abandoned: bool
+    ) -> None:
+        """Cache a generation that missed the latency budget or lost its client once it finishes"""
+        clear_deadline()
+        try:
+            es_query, _ = await generation
+            await self._store(query, query_vector, es_query)
+            if abandoned:
+                self.cancellations.llm_kept_cached += 1
+        except Exception as e:
+            logger.warning(f"Late generation for query '{query}' failed: {str(e)}")
 
     async def generate_es_query(self, query: str) -> Tuple[Dict, Dict[str, Any]]:
-        """Generate Elasticsearch query with vector caching"""
-        metrics = {"cache_hit": False, "start_time": time.time()}
+        """Generate Elasticsearch query with vector caching.
+
+        When speculation is enabled and the query looks novel, LLM generation
+        starts alongside the embedding and cache lookup and is cancelled if
+        the cache answers first. In degraded mode a slow or failing provider
+        is answered from a fallback tier within the latency budget, and a
+        generation that overruns the budget still fills the cache afterwards.
+        The same holds when the client disconnects or its deadline passes
+        while the LLM call is under way; a queued generation is cancelled.
+        """
+        started = time.perf_counter()
+        metrics = {"cache_hit": False, "speculated": False, "start_time": time.time(), "tier": None}
+
+        # Questions that just produced unusable DSL are not sent to the LLM again
+        self.feedback.check_negative(query)
+
+        # A clear here or in another process switches the namespace; the entries go with it
+        self.local_cache.set_namespace(self.vector_cache.partition)
+        local_entry = self.local_cache.get(query)
+        if local_entry is not None:
+            metrics.update(cache_hit=True, cache_entry=local_entry, tier="local_cache")
+            self.suggestions.record_hit(local_entry["id"])
+            self.degraded.record_tier("local_cache")
+            return local_entry["es_query"], metrics
+
+        degraded = self.degraded
+        generation = None
+        if self.speculator.should_speculate(query, self.admission.has_capacity()) and degraded.llm_available():
+            generation = self._start_generation(query)
+            metrics["speculated"] = True
+        speculated = generation is not None
+        # Set once the lookup missed and the request is only waiting on the LLM
+        awaiting_generation = False
 
         try:
-            # Generate embeddings for the query
-            query_vector = await self.embeddings.aembed_query(query)
-            
-            # Check vector cache
-            cached_query = await self.vector_cache.find_query(query, query_vector)
-            if cached_query:
+            lookup_started = time.perf_counter()
+
+            # Generate embeddings for the query; without them the LLM can still answer, uncached
+            query_vector, cached_entry, embedding_failure = None, None, None
+            if not degraded.embeddings_available():
+                embedding_failure = "embedding provider circuit open"
+            else:
+                try:
+                    query_vector = await degraded.within_budget(
+                        self.embedder.embed_query(query), started, "embedding"
+                    )
+                    degraded.embeddings.record_success(time.perf_counter() - lookup_started)
+                except DeadlineExceededError:
+                    raise
+                except asyncio.TimeoutError:
+                    degraded.embeddings.record_failure("over latency budget")
+                    embedding_failure = "embedding over latency budget"
+                except Exception as e:
+                    degraded.embeddings.record_failure(type(e).__name__)
+                    if not degraded.enabled:
+                        raise
+                    embedding_failure = f"embedding failed: {str(e)}"
+
+            # Check vector cache; the closest entry below the threshold is kept for degraded answers
+            if query_vector is not None:
+                cached_entry = await self.vector_cache.find_entry(
+                    query, query_vector, floor=degraded.cached_floor if degraded.enabled else None
+                )
+            lookup_seconds = time.perf_counter() - lookup_started
+
+            if cached_entry and not cached_entry.get("below_threshold"):
                 logger.info(f"Cache hit for query: '{query}'")
-                metrics["cache_hit"] = True
-                return cached_query, metrics
-            
+                metrics.update(cache_hit=True, cache_entry=cached_entry, tier="cache")
+                self.suggestions.record_hit(cached_entry["id"])
+                degraded.record_tier("cache")
+                if generation is not None:
+                    generation.cancel()
+                    generation = None
+                self.speculator.record(query, speculated, hit=True)
+                self.local_cache.put(
+                    query, cached_entry["es_query"], cached_entry["id"], cached_entry["query_text"]
+                )
+                return cached_entry["es_query"], metrics
+
             # Generate new query if cache miss
-            chain = self.prompt | self.chat_model
-            response = await chain.ainvoke({
-                "documentation": documentation,
-                "mapping": es_mapping,
-                "query": query
-            })
-            
-            es_query = json.loads(response.content)
-            
+            if generation is None:
+                if not degraded.llm_available():
+                    reason = "; ".join(filter(None, [embedding_failure, "LLM circuit open"]))
+                    return self._degrade(query, metrics, cached_entry, reason)
+                generation = self._start_generation(query)
+            awaiting_generation = True
+            try:
+                # Shielded: on timeout the generation keeps running and is cached later
+                es_query, generated_seconds = await degraded.within_budget(
+                    asyncio.shield(generation), started, "llm"
+                )
+            except asyncio.TimeoutError:
+                degraded.llm.record_failure("over latency budget")
+                self._keep(query, query_vector, generation, abandoned=False)
+                generation = None
+                return self._degrade(query, metrics, cached_entry, "LLM over latency budget")
+            except (OverloadedError, json.JSONDecodeError, DeadlineExceededError):
+                raise
+            except Exception as e:
+                degraded.llm.record_failure(type(e).__name__)
+                if not degraded.enabled:
+                    raise
+                return self._degrade(query, metrics, cached_entry, f"LLM failed: {str(e)}")
+            degraded.llm.record_success(generated_seconds)
+
+            if speculated:
+                # Sequential cost is lookup + generation; overlapped it is the longer of the two
+                self.speculator.record(
+                    query, True, hit=False, seconds_saved=min(lookup_seconds, generated_seconds)
+                )
+            else:
+                self.speculator.record(query, False, hit=False)
+
             # Store in vector cache
-            await self.vector_cache.store_query(query, query_vector, es_query)
-            
+            entry_id = await self._store(query, query_vector, es_query)
+            metrics["cache_entry"] = {"id": entry_id, "query_text": query, "es_query": es_query}
+            metrics["tier"] = "llm"
+            if embedding_failure:
+                metrics.update(degraded=True, degraded_reason=embedding_failure)
+            degraded.record_tier("llm")
+
             return es_query, metrics
-            
+
+        except OverloadedError as e:
+            logger.warning(f"Query generation rejected: {e.reason}")
+            raise
+        except json.JSONDecodeError as e:
+            logger.error(f"LLM returned invalid JSON for query '{query}': {str(e)}")
+            self.feedback.add_negative(query, "Could not generate a valid query for this question")
+            raise
+        except (asyncio.CancelledError, DeadlineExceededError) as e:
+            # Nobody is waiting any more; a completion already being paid for still fills the cache
+            if awaiting_generation and generation in self._calling:
+                self.cancellations.llm_kept += 1
+                self._keep(query, query_vector, generation, abandoned=True)
+                generation = None
+            if isinstance(e, DeadlineExceededError):
+                logger.warning(f"Query generation for '{query}' abandoned: {e.reason}")
+            raise
         except Exception as e:
             logger.error(f"Query generation failed: {str(e)}")
             raise
+        finally:
+            # Covers lookup failures and client disconnects before the LLM call started
+            if generation is not None and not generation.done():
+                generation.cancel()
+                self.cancellations.llm_cancelled += 1
+
+    def report_execution(
+        self,
+        metrics: Dict[str, Any],
+        response: Union[bytes, Dict[str, Any], None] = None,
+        error: Optional[Exception] = None,
+    ) -> None:
+        """Record how a cache entry's DSL fared in Elasticsearch, quarantining bad ones"""
+        entry = metrics.get("cache_entry")
+        if not entry or entry.get("id") is None:
+            return
+
+        if error is None:
+            took_ms, total_hits = summarize_response(response)
+            reason = self.feedback.record_success(entry["id"], entry["query_text"], took_ms, total_hits)
+        elif isinstance(error, DeadlineExceededError) or (
+            isinstance(error, ESConnectionError) and not isinstance(error, ConnectionTimeout)
+        ):
+            # Cluster unreachable or the caller's deadline ran out: not the query's fault
+            return
+        else:
+            reason = self.feedback.record_error(
+                entry["id"], entry["query_text"], getattr(error, "status_code", None), str(error)
+            )
+
+        if reason:
+            self._quarantine(entry, reason)
+
+    def _quarantine(self, entry: Dict[str, Any], reason: str) -> None:
+        entry_id = entry["id"]
+        if entry_id in self._regenerating:
+            return
+        logger.warning(f"Quarantined cache entry {entry_id} ('{entry['query_text']}'): {reason}")
+        self.vector_cache.quarantine(entry_id)
+        self.local_cache.discard_entry(entry_id)
+        self.feedback.quarantined += 1
+
+        self._regenerating.add(entry_id)
+        task = asyncio.create_task(self._regenerate(entry, reason))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _regenerate(self, entry: Dict[str, Any], reason: str) -> None:
+        """Replace a quarantined entry with freshly generated DSL, off the request path"""
+        entry_id, query_text = entry["id"], entry["query_text"]
+        clear_deadline()
+        try:
+            query_vector = await self.embedder.embed_query(query_text)
+            es_query = await self._generate(
+                f"{query_text}\n\nA previous query for this question failed ({reason}). "
+                f"Write a different, valid query."
+            )
+            if es_query == entry.get("es_query"):
+                raise ValueError("the LLM produced the same query again")
+
+            await self.vector_cache.delete_entry(entry_id)
+            await self.vector_cache.store_query(query_text, query_vector, es_query)
+            self.feedback.forget(entry_id)
+            self.feedback.regenerated += 1
+            logger.info(f"Regenerated quarantined cache entry for '{query_text}'")
+        except OverloadedError:
+            # Stays quarantined; the next miss for this question generates it anew
+            logger.warning(f"Skipped regenerating '{query_text}': LLM pool is saturated")
+        except Exception as e:
+            self.feedback.regeneration_failures += 1
+            self.feedback.add_negative(query_text, "Could not generate a working query for this question")
+            logger.error(f"Failed to regenerate cache entry for '{query_text}': {str(e)}")
+        finally:
+            self._regenerating.discard(entry_id)
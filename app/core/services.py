@@ -19,5 +19,12 @@ class IVectorCache(Protocol):
     def get_stats(self) -> Dict[str, Any]: ...
 
 
+class IEmbeddingProvider(Protocol):
+    namespace: Optional[str]
+
+    async def embed_query(self, text: str) -> list: ...
+    async def embed_documents(self, texts: list) -> list: ...
+
+
 class ISearchAgent(Protocol):
     async def generate_es_query(self, query: str) -> tuple[Dict, Dict[str, Any]]: ...
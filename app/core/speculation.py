@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from typing import Dict, Any
+from app.core.local_cache import normalize_query
+import re
+import threading
+import time
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def query_tokens(query: str) -> set:
+    return set(_TOKEN.findall(normalize_query(query)))
+
+
+class MissPredictor:
+    """Cheap, local estimate of whether a query will miss the semantic cache.
+
+    Two signals, both learned from the outcomes of earlier queries:
+    the share of tokens never seen before, and the historical hit rate of
+    queries sharing the tokens that have been seen.
+    """
+
+    def __init__(self, max_tokens: int = 50000, prior_hit_rate: float = 0.5):
+        self.max_tokens = max_tokens
+        self.prior_hit_rate = prior_hit_rate
+        # token -> [hits, lookups], bounded LRU so the vocabulary cannot grow forever
+        self._tokens: "OrderedDict[str, list]" = OrderedDict()
+
+    def miss_probability(self, query: str) -> float:
+        tokens = query_tokens(query)
+        if not tokens:
+            return 1.0
+
+        known = [self._tokens[t] for t in tokens if t in self._tokens]
+        novel_share = 1 - len(known) / len(tokens)
+        if not known:
+            return 1.0
+
+        # Laplace-smoothed hit rate across the known tokens
+        hits = sum(h for h, _ in known)
+        lookups = sum(n for _, n in known)
+        hit_rate = (hits + self.prior_hit_rate) / (lookups + 1)
+        return max(novel_share, 1 - hit_rate)
+
+    def record(self, query: str, hit: bool) -> None:
+        for token in query_tokens(query):
+            counts = self._tokens.get(token)
+            if counts is None:
+                counts = self._tokens[token] = [0, 0]
+            else:
+                self._tokens.move_to_end(token)
+            counts[0] += int(hit)
+            counts[1] += 1
+        while len(self._tokens) > self.max_tokens:
+            self._tokens.popitem(last=False)
+
+
+class WasteBudget:
+    """Token bucket limiting how many speculative LLM calls may be thrown away per minute"""
+
+    def __init__(self, max_wasted_per_minute: float):
+        self.capacity = max_wasted_per_minute
+        self._tokens = max_wasted_per_minute
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.capacity / 60)
+        self._last = now
+
+    def available(self) -> bool:
+        with self._lock:
+            self._refill()
+            return self._tokens >= 1
+
+    def charge(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+
+
+class Speculator:
+    """Decides when to start LLM generation alongside the cache lookup, and keeps score"""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        miss_threshold: float = 0.7,
+        max_wasted_per_minute: float = 10,
+    ):
+        self.enabled = enabled
+        self.miss_threshold = miss_threshold
+        self.predictor = MissPredictor()
+        self.budget = WasteBudget(max_wasted_per_minute)
+
+        self.speculated_misses = 0     # speculation paid off
+        self.speculated_hits = 0       # generation thrown away
+        self.unspeculated_misses = 0   # could have speculated
+        self.unspeculated_hits = 0
+        self.skipped_budget = 0
+        self.skipped_capacity = 0
+        self.seconds_saved = 0.0
+
+    def should_speculate(self, query: str, has_capacity: bool) -> bool:
+        if not self.enabled:
+            return False
+        if self.predictor.miss_probability(query) < self.miss_threshold:
+            return False
+        if not self.budget.available():
+            self.skipped_budget += 1
+            return False
+        if not has_capacity:
+            # Never queue behind real misses for a call that may be discarded
+            self.skipped_capacity += 1
+            return False
+        return True
+
+    def record(self, query: str, speculated: bool, hit: bool, seconds_saved: float = 0.0) -> None:
+        self.predictor.record(query, hit)
+        if speculated and hit:
+            self.speculated_hits += 1
+            self.budget.charge()
+        elif speculated:
+            self.speculated_misses += 1
+            self.seconds_saved += seconds_saved
+        elif hit:
+            self.unspeculated_hits += 1
+        else:
+            self.unspeculated_misses += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        speculated = self.speculated_hits + self.speculated_misses
+        misses = self.speculated_misses + self.unspeculated_misses
+        return {
+            "enabled": self.enabled,
+            "miss_threshold": self.miss_threshold,
+            "speculated": speculated,
+            "wasted_generations": self.speculated_hits,
+            "precision": round(self.speculated_misses / speculated, 3) if speculated else None,
+            "miss_recall": round(self.speculated_misses / misses, 3) if misses else None,
+            "skipped_budget": self.skipped_budget,
+            "skipped_capacity": self.skipped_capacity,
+            "seconds_saved": round(self.seconds_saved, 3),
+            "avg_ms_saved_per_speculated_miss": (
+                round(self.seconds_saved / self.speculated_misses * 1000, 1)
+                if self.speculated_misses else None
+            ),
+        }
@@ -0,0 +1,250 @@
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from app.core.local_cache import normalize_query
+from app.utils.logger import logger
+import asyncio
+import heapq
+import re
+import time
+
+_TOKEN = re.compile(r"\w+")
+# Scores are relative to an epoch; rebase before 2 ** exponent nears the float limit
+_MAX_EXPONENT = 512
+# Fields swapped in whole by a reload
+_STATE = ("_epoch", "_entries", "_postings", "_vocabulary")
+
+
+class _Entry:
+    __slots__ = ("id", "text", "key", "tokens", "score", "hits", "last_used")
+
+    def __init__(self, entry_id: int, text: str, score: float, last_used: float):
+        self.id = entry_id
+        self.text = text
+        self.key = normalize_query(text)
+        self.tokens = frozenset(_TOKEN.findall(self.key))
+        self.score = score
+        self.hits = 0
+        self.last_used = last_used
+
+
+class SuggestionIndex:
+    """Typeahead over the questions in the semantic cache, most used and most recent first.
+
+    Every complete word typed must appear in a suggestion and the word being
+    typed must start one of its words. Each cache hit adds
+    ``2 ** (age / half_life)`` to the entry's score, so the score is a hit
+    count decayed by recency that only changes on a hit.
+
+    Each word has the set of entries using it, and the distinct words are kept
+    sorted so the word being typed is expanded with a bisect. The entries with
+    every complete word and a completion of the last one are collected and the
+    best scoring taken off a heap.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_results: int = 10,
+        half_life_hours: float = 168,
+        reload_interval: float = 300,
+    ):
+        self.enabled = enabled
+        self.max_results = max_results
+        self.half_life = half_life_hours * 3600
+        self.reload_interval = reload_interval
+        self._reset()
+        # Adds (text, created_at) and removals (None) made while a reload reads the cache
+        self._changes: Optional[Dict[int, Optional[Tuple[str, float]]]] = None
+        self._clears = 0
+
+        self.lookups = 0
+        self.reloads = 0
+        self.last_reload: Optional[str] = None
+
+    def _reset(self) -> None:
+        self._epoch = time.time()
+        self._entries: Dict[int, _Entry] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        # Sorted distinct words, for expanding the word being typed
+        self._vocabulary: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _weight(self, at: float) -> float:
+        exponent = (at - self._epoch) / self.half_life
+        if exponent > _MAX_EXPONENT:
+            # Dividing every score by the same factor keeps their order
+            factor = 2.0 ** exponent
+            for entry in self._entries.values():
+                entry.score /= factor
+            self._epoch = at
+            exponent = 0.0
+        return 2.0 ** exponent
+
+    def add(self, entry_id: int, text: str, created_at: Optional[float] = None) -> None:
+        """Index a stored cache entry; its creation counts as one use"""
+        if not self.enabled or not text:
+            return
+        created_at = created_at or time.time()
+        self.remove(entry_id)
+        if self._changes is not None:
+            self._changes[entry_id] = (text, created_at)
+        entry = self._entries[entry_id] = _Entry(entry_id, text, self._weight(created_at), created_at)
+        for token in entry.tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = set()
+                insort(self._vocabulary, token)
+            posting.add(entry_id)
+
+    def remove(self, entry_id: int) -> None:
+        """Drop an evicted, replaced or quarantined cache entry"""
+        if self._changes is not None:
+            self._changes[entry_id] = None
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for token in entry.tokens:
+            posting = self._postings[token]
+            posting.discard(entry_id)
+            if not posting:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def record_hit(self, entry_id: Optional[int]) -> None:
+        """Count a request answered from a cache entry"""
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return
+        now = time.time()
+        entry.score += self._weight(now)
+        entry.hits += 1
+        entry.last_used = now
+
+    def clear(self) -> None:
+        self._reset()
+        self._clears += 1
+
+    def _expand(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_left(self._vocabulary, prefix + "\uffff", lo=start)
+        return self._vocabulary[start:end]
+
+    def suggest(self, prefix: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Up to ``limit`` cached questions matching what has been typed so far"""
+        self.lookups += 1
+        limit = min(limit or self.max_results, self.max_results * 5)
+        key = normalize_query(prefix)
+        words = _TOKEN.findall(key)
+        # A trailing space or punctuation means the last word is complete too
+        partial = words.pop() if words and _TOKEN.match(key[-1:]) else None
+
+        postings = []
+        for word in set(words):
+            posting = self._postings.get(word)
+            if posting is None:
+                return []
+            postings.append(posting)
+        if partial is not None:
+            expanded = self._expand(partial)
+            if not expanded:
+                return []
+            # The completions of the word being typed are one more required set
+            postings.append(
+                self._postings[expanded[0]] if len(expanded) == 1
+                else set().union(*(self._postings[word] for word in expanded))
+            )
+
+        if postings:
+            postings.sort(key=len)
+            candidates: Iterable[int] = postings[0].intersection(*postings[1:])
+        else:
+            candidates = self._entries
+        # Fetch extra to make up for questions stored more than once
+        entries = self._entries
+        best = heapq.nlargest(limit * 2, candidates, key=lambda entry_id: entries[entry_id].score)
+        return self._render([entries[entry_id] for entry_id in best], limit)
+
+    def _render(self, entries: List[_Entry], limit: int) -> List[Dict[str, Any]]:
+        # The same question can sit in several entries; suggest it once
+        seen: Set[str] = set()
+        suggestions = []
+        for entry in entries:
+            if entry.key in seen:
+                continue
+            seen.add(entry.key)
+            suggestions.append({
+                "query": entry.text,
+                "hits": entry.hits,
+                "last_used": datetime.fromtimestamp(entry.last_used).isoformat(timespec="seconds"),
+            })
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+    def _build(self, rows: List[Dict[str, Any]]) -> "SuggestionIndex":
+        index = SuggestionIndex(max_results=self.max_results, half_life_hours=self.half_life / 3600)
+        index._epoch = self._epoch
+        for row in rows:
+            index.add(row["id"], row["query_text"], row.get("created_at"))
+        return index
+
+    async def reload(self, vector_cache) -> int:
+        """Rebuild from the cache's current namespace, keeping hit counts.
+
+        Picks up entries stored by other processes. The new index is built off
+        the event loop and swapped in; stores and evictions made meanwhile are
+        applied to it again.
+        """
+        self._changes = {}
+        clears = self._clears
+        try:
+            rows = await asyncio.to_thread(vector_cache.entry_texts)
+            fresh = await asyncio.to_thread(self._build, rows)
+        finally:
+            changes, self._changes = self._changes, None
+        if clears != self._clears:
+            # The cache was cleared meanwhile; the rows read are from the old namespace
+            return len(self._entries)
+
+        for entry_id, entry in self._entries.items():
+            kept = fresh._entries.get(entry_id)
+            if kept is not None and entry.hits:
+                kept.score = entry.score * 2.0 ** ((self._epoch - fresh._epoch) / self.half_life)
+                kept.hits, kept.last_used = entry.hits, entry.last_used
+        for entry_id, change in changes.items():
+            if change is None:
+                fresh.remove(entry_id)
+            else:
+                fresh.add(entry_id, *change)
+        for name in _STATE:
+            setattr(self, name, getattr(fresh, name))
+
+        self.reloads += 1
+        self.last_reload = datetime.now().isoformat()
+        logger.info(f"Suggestion index reloaded: {len(self._entries)} cached questions")
+        return len(self._entries)
+
+    async def run(self, vector_cache) -> None:
+        """Reload now and then every ``reload_interval`` seconds (0: only now)"""
+        while True:
+            try:
+                await self.reload(vector_cache)
+            except Exception as e:
+                logger.error(f"Suggestion index reload failed: {str(e)}")
+            if self.reload_interval <= 0:
+                return
+            await asyncio.sleep(self.reload_interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "words": len(self._vocabulary),
+            "lookups": self.lookups,
+            "reloads": self.reloads,
+            "last_reload": self.last_reload,
+            "half_life_hours": self.half_life / 3600,
+        }
@@ -1,14 +1,11 @@
-from typing import Dict, Any, Optional
-from pymilvus import (
-    Collection,
-    connections,
-    utility,
-    FieldSchema,
-    CollectionSchema,
-    DataType,
-)
+from typing import Dict, Any, List, Optional, Set
+import asyncio
 import numpy as np
 import json
+from app.core.deadline import current_deadline
+from app.core.milvus_connection import MilvusConnectionManager, MilvusEndpoint, parse_endpoints
+from app.core.suggestions import SuggestionIndex
+from app.core.vector_codec import VectorCodec
 from app.utils.logger import logger
 from datetime import datetime
 
@@ -16,12 +13,12 @@ class VectorCache:
     _instance = None
     _initialized = False
 
-    def __new__(cls, config: Dict[str, Any] = None):
+    def __new__(cls, config: Dict[str, Any] = None, suggestions: Optional[SuggestionIndex] = None):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Dict[str, Any] = None, suggestions: Optional[SuggestionIndex] = None):
         """Initialize vector cache with Milvus configuration"""
         # Skip initialization if already initialized
         if VectorCache._initialized:
@@ -30,11 +27,47 @@ class VectorCache:
         if config is None:
             raise ValueError("Config is required for first initialization")
 
-        self.collection_name = "semantic_cache"
+        self.codec = VectorCodec(
+            dim=config.get("embedding_dim", 768),
+            quantization=config.get("quantization", "none"),
+            rerank_candidates=config.get("rerank_candidates", 16),
+        )
+        # Vectors from different embedding models are not comparable, so each gets a collection
+        namespace = config.get("namespace")
+        base = f"semantic_cache_{namespace}" if namespace else "semantic_cache"
+        self.collection_name = self.codec.collection_name(base)
         self.collection = None
+        # Entries live in one partition per schema version and generation; clearing the
+        # cache or changing the schema switches to a fresh partition
+        self.schema_version = config.get("schema_version") or "default"
+        self.partition: Optional[str] = None
+        # Other schema versions' partitions are dropped only once nothing was stored in them for
+        # this long, so workers of the previous deployment keep their cache through a rolling deploy
+        self.namespace_grace_period = config.get("namespace_grace_period", 24 * 3600)
+        self._background: Set[asyncio.Task] = set()
+        self._retirement: Optional[asyncio.Task] = None
         self.similarity_threshold = 0.85  # Threshold for cache hits
         self.update_threshold = 0.95  # Threshold for updating existing entries
         self.milvus_config = config
+        # Entries whose DSL failed in Elasticsearch; skipped until regenerated
+        self.quarantined: Set[int] = set()
+        # Typeahead over the cached questions, kept in step with stores and evictions
+        self.suggestions = suggestions if suggestions is not None else SuggestionIndex(enabled=False)
+        # Every proxy in the cluster: writes go to the primary, searches rotate over all
+        endpoints = parse_endpoints(config.get("endpoints") or "", config["port"])
+        self.connections = MilvusConnectionManager(
+            endpoints or [{"host": config["host"], "port": config["port"]}],
+            replicas=config.get("replicas", 1),
+            probe_interval=config.get("probe_interval", 5),
+            probe_timeout=config.get("probe_timeout", 2),
+            connect_timeout=config.get("connect_timeout", 5),
+            failure_threshold=config.get("failure_threshold", 3),
+            backoff_max=config.get("backoff_max", 30),
+        )
+        self.connections.on_change = self._endpoint_changed
+        # Collection handle per healthy endpoint alias
+        self._readers: Dict[str, Any] = {}
+        self._monitor: Optional[asyncio.Task] = None
         
         # Cache metrics
         self.total_hits = 0
@@ -49,139 +82,401 @@ class VectorCache:
             return
 
         try:
-            connections.connect(
-                alias="default",
-                host=self.milvus_config["host"],
-                port=self.milvus_config["port"]
-            )
-            await self._init_collection()
+            # pymilvus connects and loads synchronously; keep that off the event loop
+            stale = await asyncio.to_thread(self._connect)
             VectorCache._initialized = True
-            logger.info(f"Vector cache initialized: {self.collection_name}")
+            self._monitor = asyncio.create_task(self.connections.run())
+            logger.info(f"Vector cache initialized: {self.collection_name}/{self.partition}")
+            self._retire(stale)
+            self._retirement = asyncio.create_task(self._retire_idle())
         except Exception as e:
             logger.error(f"Cache initialization failed: {str(e)}")
             raise
 
-    async def _init_collection(self):
-        """Initialize or create the cache collection"""
+    def _connect(self):
+        self.connections.connect()
+        stale = self._init_collection()
+        for endpoint in self.connections.endpoints:
+            if endpoint.connected:
+                self._attach(endpoint.alias)
+        return stale
+
+    def _attach(self, alias: str) -> None:
+        """Open the collection through ``alias``, loading it if a restart left it released"""
+        from pymilvus import Collection, utility
+        from pymilvus.client.types import LoadState
+
+        collection = Collection(self.collection_name, using=alias)
+        if utility.load_state(self.collection_name, using=alias) == LoadState.NotLoad:
+            self._load(collection)
+        self._readers[alias] = collection
+
+    def _load(self, collection) -> None:
+        replicas = self.connections.replicas
+        if replicas <= 1:
+            collection.load()
+            return
         try:
-            if utility.has_collection(self.collection_name):
-                self.collection = Collection(self.collection_name)
-                self.collection.load()
-                logger.info(f"Loaded existing cache with {self.collection.num_entities} entries")
-                return
-
-            fields = [
-                FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
-                FieldSchema(name="query_vector", dtype=DataType.FLOAT_VECTOR, dim=768),
-                FieldSchema(name="query_text", dtype=DataType.VARCHAR, max_length=500),
-                FieldSchema(name="es_query", dtype=DataType.VARCHAR, max_length=4000),
-                FieldSchema(name="created_at", dtype=DataType.INT64),
-            ]
+            collection.load(replica_number=replicas)
+        except Exception as e:
+            # Already loaded with another replica count, or too few query nodes for it
+            logger.warning(f"Could not load {replicas} replicas, keeping the current load: {str(e)}")
+            collection.load()
 
-            schema = CollectionSchema(fields=fields, description="Semantic query cache")
-            self.collection = Collection(name=self.collection_name, schema=schema)
-            
-            # Use HNSW index for better accuracy
-            self.collection.create_index(
-                field_name="query_vector",
-                index_params={
-                    "metric_type": "COSINE",
-                    "index_type": "HNSW",
-                    "params": {
-                        "M": 16,
-                        "efConstruction": 200
-                    }
-                }
-            )
-            self.collection.load()
+    def _endpoint_changed(self, endpoint: MilvusEndpoint) -> None:
+        """Follow an endpoint going down or coming back; runs in the probing thread"""
+        if self.collection is None:
+            return
+        if not endpoint.connected:
+            self._readers.pop(endpoint.alias, None)
+        elif endpoint.alias not in self._readers:
+            try:
+                self._attach(endpoint.alias)
+            except Exception as e:
+                logger.error(f"Failed to reattach cache collection via {endpoint.alias}: {str(e)}")
+        primary = self.connections.primary
+        if primary in self._readers and self.collection is not self._readers[primary]:
+            self.collection = self._readers[primary]
+            logger.info(f"Cache writes now go to Milvus endpoint {primary}")
+
+    def _reader(self):
+        """(alias, collection) for the next read, rotating over healthy endpoints"""
+        alias = self.connections.next_reader()
+        collection = self._readers.get(alias)
+        if collection is None:
+            return self.connections.primary, self.collection
+        return alias, collection
+
+    async def close(self) -> None:
+        for task in (self._monitor, self._retirement):
+            if task is not None:
+                task.cancel()
+        self._monitor = self._retirement = None
+        await asyncio.to_thread(self.connections.disconnect)
+
+    def _init_collection(self) -> List[str]:
+        """Initialize or create the cache collection; returns partitions left to retire"""
+        from pymilvus import Collection, utility
+
+        primary = self.connections.primary
+        try:
+            if utility.has_collection(self.collection_name, using=primary):
+                self.collection = Collection(self.collection_name, using=primary)
+                if self.dimension != self.codec.dim:
+                    raise ValueError(
+                        f"Collection {self.collection_name} has dimension {self.dimension}, "
+                        f"embeddings have {self.codec.dim}"
+                    )
+                stale = self._select_partition()
+                self._load(self.collection)
+                logger.info(f"Loaded existing cache with {self._partition_entities()} entries")
+                return stale
+
+            self._create_collection()
+            self._create_index()
+            self._select_partition()
+            self._load(self.collection)
             logger.info("Created new cache collection")
+            return []
 
         except Exception as e:
             logger.error(f"Collection initialization failed: {str(e)}")
             raise
 
+    def _create_collection(self):
+        from pymilvus import Collection, FieldSchema, CollectionSchema, DataType
+
+        fields = [
+            FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
+            *self.codec.fields(),
+            FieldSchema(name="query_text", dtype=DataType.VARCHAR, max_length=500),
+            FieldSchema(name="es_query", dtype=DataType.VARCHAR, max_length=4000),
+            FieldSchema(name="created_at", dtype=DataType.INT64),
+        ]
+
+        schema = CollectionSchema(fields=fields, description="Semantic query cache")
+        self.collection = Collection(name=self.collection_name, schema=schema, using=self.connections.primary)
+
+    def _create_index(self):
+        for field_name, index_params in self.codec.index_params():
+            self.collection.create_index(field_name=field_name, index_params=index_params)
+
+    @property
+    def dimension(self) -> int:
+        """Vector dimension of the live collection"""
+        for field in self.collection.schema.fields:
+            if field.name == self.codec.full_field:
+                return field.params["dim"]
+        raise ValueError(f"Collection has no {self.codec.full_field} field")
+
+    def recreate_collection(self) -> None:
+        """Drop the collection and create it empty and unindexed, ready for a bulk load"""
+        from pymilvus import utility
+
+        primary = self.connections.primary
+        if utility.has_collection(self.collection_name, using=primary):
+            utility.drop_collection(self.collection_name, using=primary)
+        self._create_collection()
+        self._readers = {primary: self.collection}
+        self._select_partition()
+        self.quarantined.clear()
+        self.suggestions.clear()
+
+    def _partition_prefix(self) -> str:
+        return f"v_{self.schema_version}_"
+
+    def _generations(self) -> List[int]:
+        prefix = self._partition_prefix()
+        return sorted(
+            int(p.name[len(prefix):])
+            for p in self.collection.partitions
+            if p.name.startswith(prefix) and p.name[len(prefix):].isdigit()
+        )
+
+    def _select_partition(self) -> List[str]:
+        """Use the newest generation of this schema version; return its older generations"""
+        prefix = self._partition_prefix()
+        generations = self._generations()
+        if generations:
+            self.partition = f"{prefix}{generations[-1]}"
+        else:
+            self.partition = f"{prefix}0"
+            self.collection.create_partition(self.partition)
+            logger.info(f"Created cache namespace {self.partition}")
+        return [f"{prefix}{generation}" for generation in generations[:-1]]
+
+    def _idle_partitions(self) -> List[str]:
+        """Partitions of other schema versions nothing was stored in for the grace period"""
+        cutoff = int(datetime.now().timestamp() - self.namespace_grace_period)
+        idle = []
+        for partition in self.collection.partitions:
+            if partition.name.startswith(self._partition_prefix()):
+                continue
+            recent = self.collection.query(
+                expr=f"created_at >= {cutoff}",
+                output_fields=["id"],
+                partition_names=[partition.name],
+                limit=1,
+            )
+            if not recent:
+                idle.append(partition.name)
+        return idle
+
+    async def _retire_idle(self) -> None:
+        """Drop other schema versions' namespaces once idle, checking every quarter grace period"""
+        while True:
+            if self.collection and self.connections.available:
+                try:
+                    idle = await asyncio.to_thread(self._idle_partitions)
+                    if idle:
+                        await asyncio.to_thread(self._drop_partitions, idle)
+                except Exception as e:
+                    logger.error(f"Retiring idle cache namespaces failed: {str(e)}")
+            await asyncio.sleep(max(60, min(3600, self.namespace_grace_period / 4)))
+
+    def _partition_entities(self) -> int:
+        return self.collection.partition(self.partition).num_entities
+
+    def sync_partition(self) -> bool:
+        """Follow a switch made by another process (a clear); True when the namespace changed"""
+        generations = self._generations()
+        if generations and self.partition != f"{self._partition_prefix()}{generations[-1]}":
+            self.partition = f"{self._partition_prefix()}{generations[-1]}"
+            self.quarantined.clear()
+            # Refilled from the new namespace by the next suggestion reload
+            self.suggestions.clear()
+            logger.info(f"Switched to cache namespace {self.partition}")
+            return True
+        return False
+
+    def _drop_partitions(self, names: List[str]) -> None:
+        for name in names:
+            try:
+                partition = self.collection.partition(name)
+                if partition is None:
+                    continue
+                if name == "_default":
+                    # Entries from before namespacing; the default partition cannot be dropped
+                    if partition.num_entities:
+                        self.collection.delete("id >= 0", partition_name=name)
+                    continue
+                partition.release()
+                self.collection.drop_partition(name)
+                logger.info(f"Dropped retired cache namespace {name}")
+            except Exception as e:
+                logger.error(f"Failed to drop cache namespace {name}: {str(e)}")
+
+    def _retire(self, names: List[str]) -> None:
+        """Drop old namespaces in the background; requests already use the new one"""
+        if not names:
+            return
+        task = asyncio.create_task(asyncio.to_thread(self._drop_partitions, names))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _exclusion_expr(self) -> Optional[str]:
+        if not self.quarantined:
+            return None
+        return f"id not in {sorted(self.quarantined)}"
+
+    def _nearest(
+        self,
+        vector: np.ndarray,
+        output_fields: List[str],
+        expr: Optional[str] = None,
+        timeout: Optional[float] = None,
+        collection=None,
+    ):
+        """Closest entry to a prepared vector as (hit, cosine similarity), or None"""
+        results = (collection or self.collection).search(
+            data=[self.codec.search_vector(vector)],
+            anns_field=self.codec.vector_field,
+            param=self.codec.search_params,
+            limit=self.codec.candidates,
+            expr=expr,
+            partition_names=[self.partition],
+            output_fields=output_fields + self.codec.rerank_fields,
+            timeout=timeout,
+        )
+        if not results:
+            return None
+        return self.codec.best(results[0], vector)
+
     async def find_query(self, query: str, embedding: list) -> Optional[Dict]:
         """Find semantically similar query in cache"""
+        entry = await self.find_entry(query, embedding)
+        return entry["es_query"] if entry else None
+
+    async def find_entry(
+        self, query: str, embedding: list, floor: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Find a similar cache entry: its id, original question and DSL.
+
+        With ``floor``, the closest entry below the hit threshold but at or
+        above ``floor`` is returned too, marked ``below_threshold`` (still a miss).
+        """
         if not self.collection:
             self._record_miss(query)
             return None
+        if not self.connections.available:
+            # A miss now rather than a connect timeout per request until Milvus is back
+            self.connections.skipped_lookups += 1
+            self._record_miss(query)
+            return None
 
+        # Bounded by the request deadline; an expired one is the caller's error, not a miss
+        deadline = current_deadline()
+        timeout = deadline.timeout("cache_lookup") if deadline is not None else None
+        alias, collection = self._reader()
         try:
-            search_vector = np.array(embedding, dtype=np.float32).flatten().tolist()
-
-            # Search with stricter parameters
-            results = self.collection.search(
-                data=[search_vector],
-                anns_field="query_vector",
-                param={
-                    "metric_type": "L2",
-                    "params": {
-                        "nprobe": 32,  # Increased for better accuracy
-                        "ef": 64       # Search scope
-                    }
-                },
-                limit=1,
-                output_fields=["query_text", "es_query"]
+            # Off the event loop, so a cancelled request stops waiting and other requests keep running
+            nearest = await asyncio.to_thread(
+                self._nearest,
+                self.codec.prepare(embedding),
+                ["query_text", "es_query"],
+                expr=self._exclusion_expr(),
+                timeout=timeout,
+                collection=collection,
             )
-
-            if not results or not results[0]:
+            self.connections.record_success(alias)
+            if nearest is None:
                 self._record_miss(query)
                 return None
 
-            hit = results[0][0]
-            similarity = 1 - (hit.distance / 2)  # Convert L2 distance to similarity
+            hit, similarity = nearest
+            entry = {
+                "id": hit.id,
+                "query_text": hit.entity.get("query_text"),
+                "similarity": similarity,
+            }
 
             if similarity >= self.similarity_threshold:
-                self._record_hit(query, hit.entity.get("query_text"), similarity)
-                return json.loads(hit.entity.get("es_query"))
+                self._record_hit(query, entry["query_text"], similarity)
+                return {**entry, "es_query": json.loads(hit.entity.get("es_query"))}
 
-            self._record_miss(query, hit.entity.get("query_text"), similarity)
+            self._record_miss(query, entry["query_text"], similarity)
+            if floor is not None and similarity >= floor:
+                return {**entry, "es_query": json.loads(hit.entity.get("es_query")), "below_threshold": True}
             return None
 
         except Exception as e:
             logger.error(f"Cache lookup failed: {str(e)}")
             self._record_miss(query)
+            # Neither a retired namespace nor running out of request deadline says anything about the endpoint
+            switched = await asyncio.to_thread(self._try_sync_partition)
+            if not switched and (deadline is None or not deadline.expired):
+                self.connections.record_failure(alias, e)
             return None
 
-    async def store_query(self, query: str, embedding: list, es_query: Dict):
-        """Store query in cache"""
+    def _try_sync_partition(self) -> bool:
+        # A failed call may mean another process retired our namespace
+        try:
+            return self.sync_partition()
+        except Exception as e:
+            logger.error(f"Cache namespace check failed: {str(e)}")
+            return False
+
+    def quarantine(self, entry_id: int) -> None:
+        """Stop serving an entry without deleting it, pending regeneration"""
+        self.quarantined.add(entry_id)
+        self.suggestions.remove(entry_id)
+
+    def _delete(self, entry_id: int) -> None:
+        self.collection.delete(f"id in [{entry_id}]")
+        self.collection.flush()
+
+    async def delete_entry(self, entry_id: int) -> None:
         if not self.collection:
             return
-
         try:
-            vector = np.array(embedding, dtype=np.float32).flatten().tolist()
-            
-            # Check for very similar existing queries
-            existing_results = self.collection.search(
-                data=[vector],
-                anns_field="query_vector",
-                param={
-                    "metric_type": "L2",
-                    "params": {"nprobe": 32, "ef": 64}
-                },
-                limit=1,
-                output_fields=["query_text", "id"]
-            )
+            await asyncio.to_thread(self._delete, entry_id)
+            self.quarantined.discard(entry_id)
+            self.suggestions.remove(entry_id)
+        except Exception as e:
+            logger.error(f"Failed to delete cache entry {entry_id}: {str(e)}")
+            raise
 
-            # Only update if extremely similar
-            similarity = 1 - (existing_results[0][0].distance / 2) if existing_results and existing_results[0] else 0
-            if similarity >= self.update_threshold:
-                hit = existing_results[0][0]
-                expr = f"id == {hit.id}"
-                self.collection.delete(expr)
-                self.collection.flush()
-                logger.info(f"Updated existing cache entry (similarity: {similarity:.2%}) for query: '{query}'")
-            
-            # Store new entry
-            entity = {
-                "query_vector": vector,
-                "query_text": query,
-                "es_query": json.dumps(es_query),
-                "created_at": int(datetime.now().timestamp())
-            }
+    def _store(self, query: str, vector: np.ndarray, es_query: Dict, created_at: int) -> tuple:
+        """Insert an entry, replacing a near-identical one; returns (new id, replaced hit, similarity)"""
+        # Check for very similar existing queries
+        nearest = self._nearest(vector, ["query_text"])
 
-            self.collection.insert([entity])
+        # Only update if extremely similar
+        similarity = nearest[1] if nearest else 0
+        replaced = None
+        if similarity >= self.update_threshold:
+            replaced = nearest[0]
+            self.collection.delete(f"id == {replaced.id}")
             self.collection.flush()
+
+        result = self.collection.insert([
+            *self.codec.encode(vector[np.newaxis]),
+            [query],
+            [json.dumps(es_query)],
+            [created_at],
+        ], partition_name=self.partition)
+        self.collection.flush()
+        return result.primary_keys[0], replaced, similarity
+
+    async def store_query(self, query: str, embedding: list, es_query: Dict) -> Optional[int]:
+        """Store query in cache, returning the new entry's id"""
+        if not self.collection:
+            return None
+        if not self.connections.available:
+            self.connections.skipped_writes += 1
+            return None
+
+        primary = self.connections.primary
+        try:
+            vector = self.codec.prepare(embedding)
+            created_at = int(datetime.now().timestamp())
+            entry_id, replaced, similarity = await asyncio.to_thread(
+                self._store, query, vector, es_query, created_at
+            )
+            if replaced is not None:
+                self.suggestions.remove(replaced.id)
+                logger.info(f"Updated existing cache entry (similarity: {similarity:.2%}) for query: '{query}'")
+            self.suggestions.add(entry_id, query, created_at)
             
             self.last_stored = {
                 "query": query,
@@ -191,9 +486,13 @@ class VectorCache:
             }
             
             logger.info(f"Query cached: '{query}' (action: {self.last_stored['action']})")
+            self.connections.record_success(primary)
+            return entry_id
 
         except Exception as e:
             logger.error(f"Failed to cache query: {str(e)}")
+            if not await asyncio.to_thread(self._try_sync_partition):
+                self.connections.record_failure(primary, e)
             raise
 
     def _record_hit(self, query: str, matched_query: str, similarity: float):
@@ -225,12 +524,18 @@ class VectorCache:
         try:
             total_queries = self.total_hits + self.total_misses
             hit_rate = (self.total_hits / total_queries * 100) if total_queries > 0 else 0
+            total_entries = 0
+            if self.collection and self.connections.available:
+                total_entries = await asyncio.to_thread(self._partition_entities)
             
             return {
                 "cache_size": {
-                    "total_entries": self.collection.num_entities if self.collection else 0,
-                    "dimension": 768,
-                    "collection_name": self.collection_name
+                    "total_entries": total_entries,
+                    **self.codec.describe(),
+                    "quarantined_entries": len(self.quarantined),
+                    "collection_name": self.collection_name,
+                    "namespace": self.partition,
+                    "schema_version": self.schema_version,
                 },
                 "performance": {
                     "total_queries": total_queries,
@@ -246,8 +551,11 @@ class VectorCache:
                 "settings": {
                     "similarity_threshold": self.similarity_threshold,
                     "update_threshold": self.update_threshold,
-                    "milvus_host": self.milvus_config["host"],
-                    "milvus_port": self.milvus_config["port"]
+                    "milvus_endpoints": [
+                        f"{endpoint.host}:{endpoint.port}" for endpoint in self.connections.endpoints
+                    ],
+                    "milvus_replicas": self.connections.replicas,
+                    "milvus_available": self.connections.available,
                 },
                 "last_updated": datetime.now().isoformat()
             }
@@ -255,34 +563,117 @@ class VectorCache:
             logger.error(f"Failed to get cache stats: {str(e)}")
             raise
 
+    async def get_cached_queries(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Return the most recently cached entries with their parsed DSL"""
+        if not self.collection:
+            return []
+
+        try:
+            expr = "id >= 0"
+            if self.quarantined:
+                expr += f" and {self._exclusion_expr()}"
+            rows = await asyncio.to_thread(
+                self._reader()[1].query,
+                expr=expr,
+                output_fields=["query_text", "es_query", "created_at"],
+                partition_names=[self.partition],
+                limit=16384,
+            )
+            rows.sort(key=lambda row: row.get("created_at", 0), reverse=True)
+            return [
+                {
+                    "query_text": row["query_text"],
+                    "es_query": json.loads(row["es_query"]),
+                    "created_at": row.get("created_at"),
+                }
+                for row in rows[:limit]
+            ]
+        except Exception as e:
+            logger.error(f"Failed to read cached queries: {str(e)}")
+            raise
+
     async def clear(self):
-        """Clear the vector cache and reset statistics"""
+        """Switch to a fresh, empty namespace and reset statistics.
+
+        The swap is one attribute assignment, so requests see either the old
+        entries or none; the old partition is dropped in the background instead
+        of deleting rows, which would leave tombstones until compaction.
+        """
         try:
             if self.collection:
-                # Delete all entities instead of dropping collection
-                expr = "id >= 0"  # Match all entities
-                self.collection.delete(expr)
-                self.collection.flush()  # Ensure changes are persisted
-                
+                old = self.partition
+                new = f"{self._partition_prefix()}{max(self._generations(), default=-1) + 1}"
+                await asyncio.to_thread(self._create_partition, new)
+                self.partition = new
+
                 # Reset statistics
+                self.quarantined.clear()
+                self.suggestions.clear()
                 self.total_hits = 0
                 self.total_misses = 0
                 self.last_hit = None
                 self.last_miss = None
                 self.last_stored = None
-                
-                logger.info("Cache entries and statistics cleared")
+
+                self._retire([old])
+                logger.info(f"Cache cleared: switched namespace {old} -> {new}")
         except Exception as e:
             logger.error(f"Failed to clear cache: {str(e)}")
             raise
 
-    async def _generate_embedding(self, query: str) -> list:
-        """Generate embeddings optimized for HR domain"""
+    def _create_partition(self, name: str) -> None:
+        self.collection.create_partition(name).load()
+
+    def invalidate_fields(self, fields: List[str], batch_size: int = 1000) -> int:
+        """Delete entries whose DSL references any of ``fields``; returns how many"""
+        from app.core.cache_namespace import references_fields
+
+        stale: List[int] = []
+        iterator = self.collection.query_iterator(
+            batch_size=batch_size,
+            expr="id >= 0",
+            output_fields=["es_query"],
+            partition_names=[self.partition],
+        )
         try:
-            # Preprocess query for HR context
-            hr_query = f"job search: {query}"  # Add domain context
-            embedding = self.embedding_model.encode(hr_query, normalize_embeddings=True)
-            return embedding.tolist()
-        except Exception as e:
-            logger.error(f"Failed to generate embedding: {str(e)}")
-            raise
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                stale.extend(
+                    row["id"] for row in batch if references_fields(json.loads(row["es_query"]), fields)
+                )
+        finally:
+            iterator.close()
+
+        for start in range(0, len(stale), batch_size):
+            self.collection.delete(
+                f"id in {stale[start:start + batch_size]}", partition_name=self.partition
+            )
+        for entry_id in stale:
+            self.suggestions.remove(entry_id)
+        if stale:
+            self.collection.flush()
+        logger.info(f"Invalidated {len(stale)} cache entries referencing {', '.join(fields)}")
+        return len(stale)
+
+    def entry_texts(self, batch_size: int = 5000) -> List[Dict[str, Any]]:
+        """Id, question and creation time of every servable entry, for the suggestion index"""
+        if not self.collection:
+            return []
+        rows: List[Dict[str, Any]] = []
+        iterator = self._reader()[1].query_iterator(
+            batch_size=batch_size,
+            expr=self._exclusion_expr() or "id >= 0",
+            output_fields=["query_text", "created_at"],
+            partition_names=[self.partition],
+        )
+        try:
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                rows.extend(batch)
+        finally:
+            iterator.close()
+        return rows
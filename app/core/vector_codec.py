@@ -0,0 +1,165 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+QUANTIZATIONS = ("none", "float16", "int8", "binary")
+
+# The collection predating configurable vectors keeps its name
+LEGACY_DIM = 768
+
+
+class VectorCodec:
+    """How cache vectors are shaped, stored, indexed and compared in Milvus.
+
+    ``none`` and ``float16`` keep an HNSW graph over the stored vectors;
+    ``int8`` is Milvus scalar quantization (IVF_SQ8); ``binary`` indexes one
+    sign bit per dimension with Hamming distance and re-ranks the nearest
+    ``rerank_candidates`` by cosine against a memory-mapped float16 copy.
+    Every mode reports cosine similarity, so thresholds mean the same thing.
+    """
+
+    vector_field = "query_vector"
+    rerank_field = "rerank_vector"
+
+    def __init__(self, dim: int = LEGACY_DIM, quantization: str = "none", rerank_candidates: int = 16):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(
+                f"Unknown vector quantization '{quantization}' (available: {', '.join(QUANTIZATIONS)})"
+            )
+        if quantization == "binary" and dim % 8:
+            raise ValueError(f"Binary vectors need a dimension divisible by 8, got {dim}")
+        self.dim = dim
+        self.quantization = quantization
+        self.rerank_candidates = rerank_candidates
+
+    def collection_name(self, base: str) -> str:
+        """Collections are per vector schema so a config change never mixes layouts"""
+        if self.dim == LEGACY_DIM and self.quantization == "none":
+            return base
+        return f"{base}_d{self.dim}_{self.quantization}"
+
+    @property
+    def binary(self) -> bool:
+        return self.quantization == "binary"
+
+    @property
+    def full_field(self) -> str:
+        """Field holding the full-precision vector, for snapshots and re-ranking"""
+        return self.rerank_field if self.binary else self.vector_field
+
+    @property
+    def rerank_fields(self) -> List[str]:
+        return [self.rerank_field] if self.binary else []
+
+    @property
+    def candidates(self) -> int:
+        return self.rerank_candidates if self.binary else 1
+
+    def fields(self) -> List[Any]:
+        """Vector fields of the collection schema, in insert order"""
+        from pymilvus import FieldSchema, DataType
+
+        if self.binary:
+            return [
+                FieldSchema(name=self.vector_field, dtype=DataType.BINARY_VECTOR, dim=self.dim),
+                # Only read for the few re-rank candidates, so it can stay on disk
+                FieldSchema(
+                    name=self.rerank_field, dtype=DataType.FLOAT16_VECTOR, dim=self.dim, mmap_enabled=True
+                ),
+            ]
+        dtype = DataType.FLOAT16_VECTOR if self.quantization == "float16" else DataType.FLOAT_VECTOR
+        return [FieldSchema(name=self.vector_field, dtype=dtype, dim=self.dim)]
+
+    def index_params(self) -> List[Tuple[str, Dict[str, Any]]]:
+        if self.binary:
+            return [
+                (self.vector_field, {
+                    "metric_type": "HAMMING",
+                    "index_type": "BIN_IVF_FLAT",
+                    "params": {"nlist": 128},
+                }),
+                (self.rerank_field, {"metric_type": "COSINE", "index_type": "FLAT", "params": {}}),
+            ]
+        if self.quantization == "int8":
+            return [(self.vector_field, {
+                "metric_type": "COSINE",
+                "index_type": "IVF_SQ8",
+                "params": {"nlist": 128},
+            })]
+        # Use HNSW index for better accuracy
+        return [(self.vector_field, {
+            "metric_type": "COSINE",
+            "index_type": "HNSW",
+            "params": {"M": 16, "efConstruction": 200},
+        })]
+
+    @property
+    def search_params(self) -> Dict[str, Any]:
+        if self.binary:
+            return {"metric_type": "HAMMING", "params": {"nprobe": 32}}
+        if self.quantization == "int8":
+            return {"metric_type": "COSINE", "params": {"nprobe": 32}}
+        return {"metric_type": "COSINE", "params": {"ef": 64}}
+
+    def prepare(self, embedding: Sequence[float]) -> np.ndarray:
+        """Unit-length float32 vector of the configured dimension"""
+        vector = np.asarray(embedding, dtype=np.float32).flatten()
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Embedding has dimension {vector.shape[0]}, cache expects {self.dim}")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, vectors: np.ndarray) -> List[List[Any]]:
+        """Insert columns for the vector fields of a (count, dim) block"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        if self.binary:
+            bits = np.packbits(vectors > 0, axis=1)
+            return [[row.tobytes() for row in bits], list(vectors.astype(np.float16))]
+        if self.quantization == "float16":
+            return [list(vectors.astype(np.float16))]
+        return [vectors.tolist()]
+
+    def search_vector(self, vector: np.ndarray) -> Any:
+        if self.binary:
+            return np.packbits(vector > 0).tobytes()
+        if self.quantization == "float16":
+            return vector.astype(np.float16)
+        return vector.tolist()
+
+    @staticmethod
+    def decode(value: Any) -> np.ndarray:
+        """float32 vector from a query or search result field"""
+        # pymilvus returns float16 vectors as raw bytes, sometimes wrapped in a list
+        if isinstance(value, list) and value and isinstance(value[0], (bytes, bytearray)):
+            value = value[0]
+        if isinstance(value, (bytes, bytearray)):
+            return np.frombuffer(value, dtype=np.float16).astype(np.float32)
+        return np.asarray(value, dtype=np.float32)
+
+    def best(self, hits: Sequence[Any], vector: np.ndarray) -> Optional[Tuple[Any, float]]:
+        """Closest hit and its cosine similarity; binary candidates are re-ranked"""
+        if not hits:
+            return None
+        if not self.binary:
+            return hits[0], float(hits[0].distance)
+        scored = [
+            (hit, float(np.dot(self.decode(hit.entity.get(self.rerank_field)), vector)))
+            for hit in hits
+        ]
+        return max(scored, key=lambda item: item[1])
+
+    def bytes_per_entry(self) -> Dict[str, int]:
+        """Vector bytes per entry that stay resident in memory and that only live on disk"""
+        resident = {"none": 4, "float16": 2, "int8": 1}.get(self.quantization)
+        if resident is not None:
+            return {"resident": resident * self.dim, "disk": 0}
+        return {"resident": self.dim // 8, "disk": 2 * self.dim}
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "dimension": self.dim,
+            "quantization": self.quantization,
+            "rerank_candidates": self.rerank_candidates if self.binary else None,
+            "vector_bytes_per_entry": self.bytes_per_entry(),
+        }
@@ -1,8 +1,41 @@
-import uvicorn
+import time
+
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.api import health
+from app.api.maintenance import profiling as maintenance_profiling
+from app.api.maintenance import queries as maintenance_queries
 from app.api.v1.search import router as search_router
+from app.core.container import ServiceContainer
+from app.middleware.compression import add_compression_middleware
+from app.middleware.deadline import add_deadline_middleware
 from app.middleware.error_handlers import add_error_handlers
-from app.config import get_settings
+from app.middleware.profiling import add_profiling_middleware
+from app.middleware.request_context import add_request_context_middleware
+from app.config import Config, get_settings
+from app.utils.logger import logger
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    container = ServiceContainer.get_instance()
+    container.readiness.app_import_seconds = app.state.import_seconds
+    logger.info(f"App imported in {app.state.import_seconds}s")
+    # Before warm-up, so blocking calls during it are caught too
+    container.diagnostics.start()
+
+    mode = Config.get_config()["startup"]["warmup"]
+    if mode == "blocking":
+        await container.ensure_ready()
+    elif mode == "background":
+        container.start_warm_up()
+
+    yield
+
+    await container.close()
+
 
 def create_app() -> FastAPI:
     settings = get_settings()
@@ -11,20 +44,32 @@ def create_app() -> FastAPI:
         title="HRLens API",
         description="HR Analytics and Search API",
         version="1.0.0",
-        debug=settings.debug
+        debug=settings.debug,
+        lifespan=lifespan,
     )
     
     # Add routers
+    app.include_router(health.router)
     app.include_router(search_router, prefix="/api/v1")
+    app.include_router(maintenance_queries.router, prefix="/api/v1")
+    app.include_router(maintenance_profiling.router, prefix="/api/v1")
     
     # Add error handlers
     add_error_handlers(app)
-    
+
+    add_compression_middleware(app)
+    add_deadline_middleware(app)
+    add_profiling_middleware(app)
+    add_request_context_middleware(app)
+
+    app.state.import_seconds = round(time.perf_counter() - _import_started, 3)
     return app
 
 app = create_app()
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
@@ -1,4 +1,15 @@
 from .cors import add_cors_middleware
+from .compression import add_compression_middleware
+from .deadline import add_deadline_middleware
 from .error_handlers import add_error_handlers
+from .profiling import add_profiling_middleware
+from .request_context import add_request_context_middleware
 
-__all__ = ["add_cors_middleware", "add_error_handlers"]
+__all__ = [
+    "add_cors_middleware",
+    "add_compression_middleware",
+    "add_deadline_middleware",
+    "add_error_handlers",
+    "add_profiling_middleware",
+    "add_request_context_middleware",
+]
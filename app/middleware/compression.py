@@ -0,0 +1,114 @@
+from fastapi import FastAPI
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import Config
+from typing import Optional
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding the client accepts (brotli over gzip)"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """Compress complete responses above a size threshold with brotli or gzip.
+
+    Streamed responses (more than one body message) pass through untouched so
+    exports keep their bounded memory.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 5,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(body, compresslevel=self.gzip_level)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def add_compression_middleware(app: FastAPI) -> None:
+    """Add response compression to the application"""
+    settings = Config.get_config()["api"]["compression"]
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings["minimum_size"],
+        gzip_level=settings["gzip_level"],
+        brotli_quality=settings["brotli_quality"],
+    )
@@ -0,0 +1,99 @@
+from fastapi import FastAPI
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import Config
+from app.core.container import ServiceContainer
+from app.core.deadline import CancellationStats, Deadline, deadline_var
+from app.utils.logger import logger
+import asyncio
+
+
+class DeadlineMiddleware:
+    """Give each request a deadline and cancel its work when the client disconnects.
+
+    The deadline is read from ``header`` in milliseconds, or ``default``
+    seconds, and capped at ``maximum``. Once the request body has been read
+    the connection is watched; a disconnect before the response is sent
+    cancels the handler, which stops the embedding, cache lookup, LLM wait
+    and Elasticsearch search in progress.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        stats: CancellationStats,
+        header: str = "X-Request-Timeout-Ms",
+        default: float = 30.0,
+        maximum: float = 120.0,
+    ):
+        self.app = app
+        self.stats = stats
+        self.header = header
+        self.default = default
+        self.maximum = maximum
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline.from_header(Headers(scope=scope).get(self.header), self.default, self.maximum)
+        body_read = asyncio.Event()
+        disconnected = asyncio.Event()
+        responded = False
+
+        async def receive_wrapper() -> Message:
+            if body_read.is_set():
+                # The watcher owns the connection from here on
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_read.set()
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal responded
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                responded = True
+            await send(message)
+
+        async def watch() -> None:
+            await body_read.wait()
+            if (await receive())["type"] == "http.disconnect":
+                disconnected.set()
+
+        token = deadline_var.set(deadline)
+        handler = asyncio.create_task(self.app(scope, receive_wrapper, send_wrapper))
+        watcher = asyncio.create_task(watch())
+        try:
+            await asyncio.wait({handler, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            # Servers also report a disconnect once the response is complete; that is not one
+            if not handler.done() and disconnected.is_set() and not responded:
+                self.stats.record_disconnect(deadline.stage)
+                logger.info(f"Client disconnected during {deadline.stage}; cancelling {scope['path']}")
+                handler.cancel()
+                # Let it unwind; there is nobody left to send an error to
+                await asyncio.wait({handler})
+                handler.cancelled() or handler.exception()
+                return
+            await handler
+        finally:
+            watcher.cancel()
+            if not handler.done():
+                handler.cancel()
+            deadline_var.reset(token)
+
+
+def add_deadline_middleware(app: FastAPI) -> None:
+    """Add request deadlines and cancellation on client disconnect to the application"""
+    settings = Config.get_config()["deadline"]
+    app.add_middleware(
+        DeadlineMiddleware,
+        stats=ServiceContainer.get_instance().cancellations,
+        header=settings["header"],
+        default=settings["default"],
+        maximum=settings["maximum"],
+    )
@@ -1,11 +1,42 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
+from app.core.admission import OverloadedError
+from app.core.cache_feedback import KnownBadQueryError
+from app.core.container import ServiceContainer
+from app.core.deadline import DeadlineExceededError
 from app.utils.logger import logger
 
 
 def add_error_handlers(app: FastAPI) -> None:
     """Add global error handlers to the application"""
 
+    @app.exception_handler(OverloadedError)
+    async def overloaded_exception_handler(
+        request: Request, exc: OverloadedError
+    ) -> JSONResponse:
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": exc.reason},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    @app.exception_handler(KnownBadQueryError)
+    async def known_bad_query_exception_handler(
+        request: Request, exc: KnownBadQueryError
+    ) -> JSONResponse:
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": exc.reason},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    @app.exception_handler(DeadlineExceededError)
+    async def deadline_exceeded_exception_handler(
+        request: Request, exc: DeadlineExceededError
+    ) -> JSONResponse:
+        ServiceContainer.get_instance().cancellations.record_deadline(exc.stage)
+        return JSONResponse(status_code=exc.status_code, content={"detail": exc.reason})
+
     @app.exception_handler(Exception)
     async def global_exception_handler(
         request: Request, exc: Exception
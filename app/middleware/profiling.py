@@ -0,0 +1,52 @@
+from fastapi import FastAPI
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.container import ServiceContainer
+from app.core.diagnostics import RequestProfiler
+from app.utils.logger import request_id_var
+
+
+class ProfilingMiddleware:
+    """Sample the stacks of search requests that ask for it (header or armed from the admin API).
+
+    The profile id, the request id, is returned in ``X-Profile-ID``; the
+    collapsed stacks are served by ``/api/v1/maintenance/profiling``.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler, header: str = "X-Profile", prefix: str = "/api/v1/search"):
+        self.app = app
+        self.profiler = profiler
+        self.header = header.lower()
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = self.profiler
+        # Disabled costs one attribute check per request
+        if (
+            scope["type"] != "http"
+            or not (profiler.header_enabled or profiler.armed)
+            or not scope["path"].startswith(self.prefix)
+            or not profiler.wanted(Headers(scope=scope).get(self.header))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.start(scope["path"], request_id_var.get())
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-ID", profile.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop(profile)
+
+
+def add_profiling_middleware(app: FastAPI, prefix: str = "/api/v1/search") -> None:
+    """Add on-demand request profiling of the search routes under ``prefix`` to the application"""
+    diagnostics = ServiceContainer.get_instance().diagnostics
+    app.add_middleware(
+        ProfilingMiddleware, profiler=diagnostics.requests, header=diagnostics.profile_header, prefix=prefix
+    )
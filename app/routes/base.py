@@ -1,5 +1,5 @@
 from fastapi import FastAPI
-from app.api.maintenance import cache
+from app.api.maintenance import cache, profiling, queries
 from app.api.v1 import search
 from app.api import health
 
@@ -9,3 +9,5 @@ def add_routes(app: FastAPI) -> None:
 
     app.include_router(search.router, prefix="/api")
     app.include_router(cache.router, prefix="/api")
+    app.include_router(queries.router, prefix="/api")
+    app.include_router(profiling.router, prefix="/api")
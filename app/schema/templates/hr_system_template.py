@@ -1,15 +1,30 @@
+from functools import lru_cache
 import json
 from app.utils.path_utils import get_schema_path
 
-schema_path = get_schema_path()
 
-# Read mapping file
-with open(schema_path / "elasticsearch" / "mapping.json", "r") as f:
-    es_mapping = json.dumps(json.load(f), indent=2)
+@lru_cache()
+def get_es_mapping() -> str:
+    """Pretty-printed mapping.json, read on first use rather than at import"""
+    with open(get_schema_path() / "elasticsearch" / "mapping.json", "r") as f:
+        return json.dumps(json.load(f), indent=2)
+
+
+@lru_cache()
+def get_documentation() -> str:
+    """DOCUMENT.md contents, read on first use rather than at import"""
+    with open(get_schema_path() / "docs" / "DOCUMENT.md", "r") as f:
+        return f.read()
+
+
+def __getattr__(name: str):
+    # Keep `from ... import documentation, es_mapping` working without import-time I/O
+    if name == "es_mapping":
+        return get_es_mapping()
+    if name == "documentation":
+        return get_documentation()
+    raise AttributeError(name)
 
-# Read documentation file
-with open(schema_path / "docs" / "DOCUMENT.md", "r") as f:
-    documentation = f.read()
 
 HR_SYSTEM_TEMPLATE = """You are an expert in Elasticsearch and HR systems, specializing in converting natural language queries into Elasticsearch DSL queries. 
 
@@ -32,6 +47,9 @@ IMPORTANT GUIDELINES:
    - "aggs" must be at ROOT level, not inside query
    - "size" must be at ROOT level, not inside query
    - "sort" must be at ROOT level, not inside query
+7. Prefer the precomputed "derived" fields (tenure_years, current_salary, raise_count,
+   last_raise_date, leave_days.*, on_leave) over nested queries on salary_history or
+   leave_records and over scripts; use nested only for conditions on individual records
 
 Example query formats:
 
@@ -101,4 +119,4 @@ Convert this natural language query into a complete, properly structured Elastic
 """
 
 # Export variables needed by SearchAgent
-__all__ = ["HR_SYSTEM_TEMPLATE", "documentation", "es_mapping"]
+__all__ = ["HR_SYSTEM_TEMPLATE", "get_documentation", "get_es_mapping"]
@@ -0,0 +1,47 @@
+from typing import Any, Dict, Union
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+class RawJSON:
+    """Already-encoded JSON bytes to be spliced into a response unchanged"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":"), default=str).encode()
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def splice_object(fields: Dict[str, Any]) -> bytes:
+    """Build a JSON object whose RawJSON values are copied in without re-encoding.
+
+    Lets a multi-megabyte Elasticsearch body go from socket to client without
+    being parsed into Python objects and serialized again.
+    """
+    parts = [b"{"]
+    for key, value in fields.items():
+        if len(parts) > 1:
+            parts.append(b",")
+        parts.append(dumps(key))
+        parts.append(b":")
+        parts.append(value.data if isinstance(value, RawJSON) else dumps(value))
+    parts.append(b"}")
+    # A single join copies the raw body exactly once
+    return b"".join(parts)
@@ -1,11 +1,121 @@
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from app.config import Config
+import atexit
+import json
 import os
-from typing import Optional
+import queue
+import random
+import threading
+import time
+from typing import Any, Optional
+
+# Correlates every record logged while handling one request
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Compact single-line JSON records"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "file": f"{record.filename}:{record.lineno}",
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the writer thread and drops them rather than block when full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Message formatting happens on the writer thread; only resolve the traceback here
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LazyJSON:
+    """Defers JSON encoding until a record is actually formatted"""
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+
+    def __str__(self) -> str:
+        return json.dumps(self.payload, default=str, separators=(",", ":"))
+
+
+class PayloadSampler:
+    """Sample and rate-limit verbose payload logs on the request path"""
+
+    def __init__(self, sample_rate: float, max_per_second: float):
+        self.sample_rate = sample_rate
+        self.max_per_second = max_per_second
+        self._tokens = max_per_second
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def allow(self) -> bool:
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.suppressed += 1
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.max_per_second, self._tokens + (now - self._last) * self.max_per_second
+            )
+            self._last = now
+            if self._tokens < 1:
+                self.suppressed += 1
+                return False
+            self._tokens -= 1
+            return True
 
 
 class LoggerSetup:
     _instance: Optional[logging.Logger] = None
+    _listener: Optional[QueueListener] = None
+    _queue_handler: Optional[NonBlockingQueueHandler] = None
+    _sampler: Optional[PayloadSampler] = None
 
     @classmethod
     def get_logger(cls, name: str = "app") -> logging.Logger:
@@ -13,38 +123,67 @@ class LoggerSetup:
             cls._instance = cls._setup_logger(name)
         return cls._instance
 
-    @staticmethod
-    def _setup_logger(name: str) -> logging.Logger:
+    @classmethod
+    def _setup_logger(cls, name: str) -> logging.Logger:
+        settings = Config.get_config()["logging"]
         logger = logging.getLogger(name)
-        logger.setLevel(logging.DEBUG)
+        logger.setLevel(settings["level"].upper())
 
         # Avoid duplicate handlers
         if not logger.handlers:
+            formatter = (
+                JsonFormatter() if settings["format"] == "json" else logging.Formatter(TEXT_FORMAT)
+            )
+
             # Console handler
             console_handler = logging.StreamHandler()
-            console_handler.setLevel(logging.INFO)
-            console_format = logging.Formatter(
-                "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s"
-            )
-            console_handler.setFormatter(console_format)
+            console_handler.setFormatter(formatter)
 
             # File handler with rotation
-            log_dir = "logs"
+            log_dir = os.path.dirname(settings["file_path"]) or "."
             os.makedirs(log_dir, exist_ok=True)
             file_handler = RotatingFileHandler(
-                f"{log_dir}/app.log", maxBytes=10485760, backupCount=5  # 10MB
+                settings["file_path"], maxBytes=10485760, backupCount=5  # 10MB
             )
-            file_handler.setLevel(logging.INFO)
-            file_format = logging.Formatter(
-                "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s"
+            file_handler.setFormatter(formatter)
+
+            # Writes and rotation happen on the listener thread, never in the event loop
+            log_queue: queue.Queue = queue.Queue(maxsize=settings["queue_size"])
+            cls._queue_handler = NonBlockingQueueHandler(log_queue)
+            cls._queue_handler.addFilter(RequestIdFilter())
+            cls._listener = QueueListener(
+                log_queue, console_handler, file_handler, respect_handler_level=True
             )
-            file_handler.setFormatter(file_format)
+            cls._listener.start()
+            atexit.register(cls._listener.stop)
 
-            logger.addHandler(console_handler)
-            logger.addHandler(file_handler)
+            logger.addHandler(cls._queue_handler)
 
+        cls._sampler = PayloadSampler(
+            settings["payload_sample_rate"], settings["payload_max_per_second"]
+        )
         return logger
 
+    @classmethod
+    def get_stats(cls) -> dict:
+        return {
+            "dropped_records": cls._queue_handler.dropped if cls._queue_handler else 0,
+            "queued_records": cls._queue_handler.queue.qsize() if cls._queue_handler else 0,
+            "suppressed_payloads": cls._sampler.suppressed if cls._sampler else 0,
+        }
+
 
 # Create a default logger instance
 logger = LoggerSetup.get_logger()
+
+
+def log_payload(message: str, payload: Any) -> None:
+    """Log a large request payload at DEBUG, or a sampled, rate-limited share at INFO.
+
+    ``message`` is a %-format string with one ``%s`` for the payload, which is
+    only encoded if the record is emitted.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, LazyJSON(payload))
+    elif logger.isEnabledFor(logging.INFO) and LoggerSetup._sampler.allow():
+        logger.info(message, LazyJSON(payload), extra={"sampled": True})
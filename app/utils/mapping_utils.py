@@ -0,0 +1,55 @@
+from functools import lru_cache
+from typing import Dict, Any, List
+from app.utils.path_utils import get_schema_path
+import copy
+import json
+
+
+@lru_cache()
+def _read_mapping() -> Dict[str, Any]:
+    with open(get_schema_path() / "elasticsearch" / "mapping.json", "r") as f:
+        return json.load(f)
+
+
+def load_mapping() -> Dict[str, Any]:
+    """Returns a copy of mapping.json that callers may modify."""
+    return copy.deepcopy(_read_mapping())
+
+
+@lru_cache()
+def field_types() -> Dict[str, str]:
+    """Returns every leaf field path in the mapping with its type.
+
+    Multi-fields are included as ``<field>.<sub>`` (e.g. ``first_name.keyword``).
+    """
+    fields: Dict[str, str] = {}
+
+    def walk(properties: Dict[str, Any], prefix: str) -> None:
+        for name, spec in properties.items():
+            path = f"{prefix}{name}"
+            if "properties" in spec:
+                walk(spec["properties"], f"{path}.")
+                continue
+            fields[path] = spec.get("type", "object")
+            for sub, sub_spec in spec.get("fields", {}).items():
+                fields[f"{path}.{sub}"] = sub_spec.get("type", "object")
+
+    walk(_read_mapping()["mappings"]["properties"], "")
+    return fields
+
+
+@lru_cache()
+def nested_paths() -> List[str]:
+    """Returns the paths of all nested objects in the mapping."""
+    paths: List[str] = []
+
+    def walk(properties: Dict[str, Any], prefix: str) -> None:
+        for name, spec in properties.items():
+            path = f"{prefix}{name}"
+            if spec.get("type") == "nested":
+                paths.append(path)
+            if "properties" in spec:
+                walk(spec["properties"], f"{path}.")
+
+    walk(_read_mapping()["mappings"]["properties"], "")
+    return paths
@@ -0,0 +1,92 @@
+"""Snapshot export/import throughput for the semantic cache file format.
+
+Writes synthetic cache entries through SnapshotWriter, then reads them back
+the way ``import_collection`` does (mapped float16 block -> insert columns
+for the chosen quantization) and preloads the local cache. Milvus itself is
+not involved, so the numbers are the snapshot side of an export or import:
+
+    python -m benchmarks.bench_cache_snapshot --count 1000000 --dim 768
+"""
+from app.core.cache_snapshot import SnapshotReader, SnapshotWriter, load_local_cache
+from app.core.local_cache import LocalQueryCache
+from app.core.vector_codec import QUANTIZATIONS, VectorCodec
+from app.utils.logger import logger
+import argparse
+import json
+import logging
+import numpy as np
+import os
+import shutil
+import tempfile
+import time
+
+DSL = json.dumps({
+    "size": 20,
+    "query": {"bool": {"must": [
+        {"term": {"employment_details.department.name": "Engineering"}},
+        {"range": {"salary_info.base_salary": {"gte": 100000}}},
+    ]}},
+})
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main(args) -> None:
+    logger.setLevel(logging.WARNING)
+    rng = np.random.default_rng(args.seed)
+    path = tempfile.mkdtemp(prefix="cache_snapshot_", dir=args.dir)
+    try:
+        started = time.perf_counter()
+        writer = SnapshotWriter(path, args.dim)
+        for start in range(0, args.count, args.batch_size):
+            size = min(args.batch_size, args.count - start)
+            vectors = rng.standard_normal((size, args.dim), dtype=np.float32)
+            rows = [
+                {"query_text": f"employees in engineering earning over {i}", "es_query": DSL, "created_at": i}
+                for i in range(start, start + size)
+            ]
+            writer.add(vectors, rows)
+        writer.close()
+        export_seconds = time.perf_counter() - started
+        snapshot_bytes = directory_size(path)
+
+        sample = rng.standard_normal(args.dim, dtype=np.float32).tolist()
+        json_vector_bytes = len(json.dumps(sample))
+
+        codec = VectorCodec(args.dim, args.quantization)
+        started = time.perf_counter()
+        reader = SnapshotReader(path)
+        imported = 0
+        for vectors, rows in reader.batches(args.batch_size):
+            payload = codec.encode(vectors)  # what pymilvus receives per insert
+            imported += len(payload[0])
+        import_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        loaded = load_local_cache(LocalQueryCache(max_entries=args.local_cache), path)
+        preload_seconds = time.perf_counter() - started
+
+        mb = snapshot_bytes / 1e6
+        print(f"entries:            {args.count} x {args.dim}")
+        print(f"snapshot size:      {mb:.1f} MB ({snapshot_bytes / args.count:.0f} B/entry; "
+              f"float32 JSON vectors alone would be ~{json_vector_bytes} B/entry)")
+        print(f"export (write):     {export_seconds:.2f}s  {args.count / export_seconds:,.0f} entries/s  "
+              f"{mb / export_seconds:.0f} MB/s")
+        print(f"import (read+prep): {import_seconds:.2f}s  {imported / import_seconds:,.0f} entries/s")
+        print(f"local cache load:   {preload_seconds:.2f}s  ({loaded} newest entries)")
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default="none")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--local-cache", type=int, default=1024)
+    parser.add_argument("--dir", default=None, help="where to write the temporary snapshot")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,158 @@
+"""Wasted LLM and Elasticsearch work from clients that give up, with and without cancellation.
+
+A share of clients abandon their request after a fixed patience, as a browser
+tab closing or an upstream timeout would. Without cancellation their requests
+run to the end, holding LLM slots and Elasticsearch capacity that the patient
+clients are queued for. With cancellation (what the deadline middleware does
+on disconnect) queued generations and searches are dropped, and LLM calls
+already under way are left to finish into the cache:
+
+    python -m benchmarks.bench_cancellation --clients 300 --impatient 0.4 --patience-ms 1000
+"""
+from app.core.admission import AdmissionController
+from app.core.cache_feedback import CacheFeedback
+from app.core.deadline import CancellationStats
+from app.core.degraded import DegradedMode
+from app.core.local_cache import LocalQueryCache
+from app.core.search_agent import SearchAgent
+from app.core.speculation import Speculator
+from app.core.suggestions import SuggestionIndex
+from app.utils.logger import logger
+import argparse
+import asyncio
+import logging
+import numpy as np
+import random
+import time
+
+
+class FakeResponse:
+    content = '{"query": {"match_all": {}}}'
+
+
+class FakeChain:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        await asyncio.sleep(self.seconds)
+        return FakeResponse()
+
+
+class FakeEmbeddings:
+    async def embed_query(self, query):
+        await asyncio.sleep(0.03)
+        return [0.0]
+
+
+class FakeVectorCache:
+    partition = "v_default_0"
+
+    async def find_entry(self, query, embedding, floor=None):
+        await asyncio.sleep(0.01)
+        return None
+
+    async def store_query(self, query, embedding, es_query):
+        return None
+
+
+class FakeElasticsearch:
+    """Search nodes with a fixed number of search threads"""
+
+    def __init__(self, seconds: float, threads: int):
+        self.seconds = seconds
+        self._threads = asyncio.Semaphore(threads)
+        self.searches = 0
+
+    async def search(self, body):
+        async with self._threads:
+            self.searches += 1
+            await asyncio.sleep(self.seconds)
+        return {"hits": {"hits": []}}
+
+
+def build_agent(args) -> SearchAgent:
+    # Bypass __init__ so no LLM client is constructed
+    agent = SearchAgent.__new__(SearchAgent)
+    agent.chain = FakeChain(args.llm_ms / 1000)
+    agent.embedder = FakeEmbeddings()
+    agent.vector_cache = FakeVectorCache()
+    agent.admission = AdmissionController(max_concurrency=args.llm_slots, max_queue=10000, queue_timeout=600)
+    agent.speculator = Speculator(enabled=False)
+    agent.local_cache = LocalQueryCache(max_entries=0)
+    agent.feedback = CacheFeedback()
+    agent.degraded = DegradedMode(enabled=False)
+    agent.cancellations = CancellationStats()
+    agent.suggestions = SuggestionIndex(enabled=False)
+    agent._calling = set()
+    agent._background = set()
+    return agent
+
+
+async def run(args, cancel: bool) -> dict:
+    agent = build_agent(args)
+    es = FakeElasticsearch(args.es_ms / 1000, args.es_threads)
+    rng = random.Random(args.seed)
+    patient_latencies = []
+    requests = []
+
+    async def handle(query: str) -> None:
+        es_query, _ = await agent.generate_es_query(query)
+        await es.search(es_query)
+
+    async def client(index: int, impatient: bool) -> None:
+        started = time.perf_counter()
+        request = asyncio.create_task(handle(f"contract history of employee emp{index:05d}"))
+        requests.append(request)
+        if not impatient:
+            await request
+            patient_latencies.append((time.perf_counter() - started) * 1000)
+            return
+        await asyncio.wait({request}, timeout=args.patience_ms / 1000)
+        if cancel and not request.done():
+            request.cancel()
+
+    clients = []
+    for i in range(args.clients):
+        clients.append(asyncio.create_task(client(i, rng.random() < args.impatient)))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*clients)
+    # Abandoned requests that were not cancelled still run to the end
+    await asyncio.gather(*requests, return_exceptions=True)
+    await asyncio.gather(*agent._background)
+    return {
+        "p50": np.percentile(patient_latencies, 50),
+        "p99": np.percentile(patient_latencies, 99),
+        "llm_calls": agent.chain.calls,
+        "es_searches": es.searches,
+        **agent.cancellations.get_stats(),
+    }
+
+
+async def main(args) -> None:
+    logger.setLevel(logging.WARNING)
+    print(f"{args.clients} clients at {args.rate}/s, {args.impatient:.0%} give up after {args.patience_ms:.0f}ms; "
+          f"LLM {args.llm_ms:.0f}ms x {args.llm_slots} slots, ES {args.es_ms:.0f}ms x {args.es_threads} threads")
+    print(f"{'cancellation':>12} {'patient p50':>12} {'p99':>8} {'LLM calls':>10} {'ES searches':>12} "
+          f"{'LLM cancelled':>14} {'LLM kept':>9}")
+    for cancel in (False, True):
+        result = await run(args, cancel)
+        print(f"{'on' if cancel else 'off':>12} {result['p50']:>10.0f}ms {result['p99']:>6.0f}ms "
+              f"{result['llm_calls']:>10} {result['es_searches']:>12} "
+              f"{result['llm_cancelled']:>14} {result['llm_kept']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=12, help="client arrivals per second")
+    parser.add_argument("--impatient", type=float, default=0.4, help="share of clients that give up")
+    parser.add_argument("--patience-ms", type=float, default=1000)
+    parser.add_argument("--llm-ms", type=float, default=800)
+    parser.add_argument("--llm-slots", type=int, default=8)
+    parser.add_argument("--es-ms", type=float, default=80)
+    parser.add_argument("--es-threads", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,109 @@
+"""Size and time of exporting search hits as JSON, Arrow IPC and Parquet.
+
+Generates employees with generate_test_data, pages them like a point-in-time
+scan, and encodes every page with each format. Reports the bytes sent, the
+server-side encoding time and the time for a client to load the result into
+a flat pandas DataFrame (json_normalize for JSON):
+
+    python -m benchmarks.bench_columnar_export --docs 20000 --batch-size 5000
+"""
+from app.core.columnar_export import ColumnarExporter
+from app.utils.json_utils import dumps
+from app.utils.logger import logger
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import logging
+import random
+import time
+
+import generate_test_data
+
+
+def generate_hits(count: int, seed: int) -> list:
+    random.seed(seed)
+    generate_test_data.fake.seed_instance(seed)
+    return [
+        {"_id": str(seq), "_source": generate_test_data.generate_employee(seq, count)}
+        for seq in range(1, count + 1)
+    ]
+
+
+async def encode_columnar(hits: list, batch_size: int, fmt: str, table=None) -> bytes:
+    async def pages():
+        for start in range(0, len(hits), batch_size):
+            yield hits[start:start + batch_size]
+
+    exporter = ColumnarExporter(table=table)
+    return b"".join([chunk async for chunk in exporter.stream(pages(), fmt)])
+
+
+def encode_json(hits: list, batch_size: int, compress: bool) -> bytes:
+    # One search response per page, as a client paging /search today would receive
+    body = b"\n".join(
+        dumps({"hits": {"hits": hits[start:start + batch_size]}}) for start in range(0, len(hits), batch_size)
+    )
+    return gzip.compress(body, 5) if compress else body
+
+
+def load_json(data: bytes, compressed: bool):
+    import pandas as pd
+
+    if compressed:
+        data = gzip.decompress(data)
+    sources = [hit["_source"] for line in data.split(b"\n") for hit in json.loads(line)["hits"]["hits"]]
+    return pd.json_normalize(sources)
+
+
+def load_arrow(data: bytes):
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+def load_parquet(data: bytes):
+    import pyarrow.parquet as pq
+
+    return pq.read_table(io.BytesIO(data)).to_pandas()
+
+
+async def main(args) -> None:
+    logger.setLevel(logging.WARNING)
+    started = time.perf_counter()
+    hits = generate_hits(args.docs, args.seed)
+    print(f"generated {args.docs} employees in {time.perf_counter() - started:.1f}s; pages of {args.batch_size}")
+
+    results = []
+    for name, compress in (("json", False), ("json+gzip", True)):
+        started = time.perf_counter()
+        data = encode_json(hits, args.batch_size, compress)
+        encode_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        frame = load_json(data, compress)
+        results.append((name, len(data), encode_ms, (time.perf_counter() - started) * 1000, frame.shape))
+    for name, fmt, loader in (("arrow", "arrow", load_arrow), ("parquet", "parquet", load_parquet)):
+        started = time.perf_counter()
+        data = await encode_columnar(hits, args.batch_size, fmt)
+        encode_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        frame = loader(data)
+        results.append((name, len(data), encode_ms, (time.perf_counter() - started) * 1000, frame.shape))
+
+    started = time.perf_counter()
+    data = await encode_columnar(hits, args.batch_size, "parquet", table="leave_records")
+    child_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{'format':>10} {'bytes':>12} {'encode ms':>10} {'load ms':>9}  dataframe")
+    for name, size, encode_ms, load_ms, shape in results:
+        print(f"{name:>10} {size:>12,} {encode_ms:>10.0f} {load_ms:>9.0f}  {shape[0]} x {shape[1]}")
+    print(f"leave_records child table as parquet: {len(data):,} bytes in {child_ms:.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,148 @@
+"""Bandwidth and server time saved by ETags when dashboards re-poll the same question.
+
+Drives /search in-process with a stub Elasticsearch (fixed latency, a
+generated result page) and a stub agent that resolves every poll to the
+same DSL. Each setup polls --polls times; with If-None-Match the client
+sends back the last ETag, and every --write-every polls a document write
+changes the index marker so the next poll gets a full response again:
+
+    python -m benchmarks.bench_conditional --polls 500 --hits 100 --es-ms 15
+"""
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from fastapi.testclient import TestClient
+from app.api.v1 import search as search_api
+from app.core.conditional import IndexChangeMarker
+from app.core.container import ServiceContainer
+from app.main import app
+from app.utils.json_utils import dumps
+from app.utils.logger import logger
+from generate_test_data import generate_batch
+import argparse
+import asyncio
+import logging
+import time
+
+DSL = {"query": {"term": {"employment_details.department": "Engineering"}}, "size": 100}
+
+
+class StubIndices:
+    def __init__(self):
+        self.writes = 0
+        self.calls = 0
+
+    async def stats(self, **kwargs):
+        self.calls += 1
+        return {
+            "_all": {"primaries": {"indexing": {"index_total": self.writes, "delete_total": 0},
+                                   "refresh": {"external_total": self.writes}}},
+            "indices": {"hr_lens_v1": {"uuid": "stub"}},
+        }
+
+
+class StubES:
+    def __init__(self, body: bytes, latency: float):
+        self.body = body
+        self.latency = latency
+        self.searches = 0
+        self.indices = StubIndices()
+
+    def options(self, **kwargs):
+        return self
+
+    async def search_raw(self, body):
+        self.searches += 1
+        await asyncio.sleep(self.latency)
+        return self.body
+
+
+class StubAgent:
+    async def generate_es_query(self, query):
+        return dict(DSL), {"cache_hit": True, "tier": "local_cache", "start_time": time.time()}
+
+    def report_execution(self, *args, **kwargs):
+        pass
+
+
+class StubCache:
+    partition = "v_default_0"
+
+
+class StubProfiler:
+    def observe(self, *args, **kwargs):
+        pass
+
+
+def result_page(hits: int) -> bytes:
+    documents = generate_batch(1, hits, hits, 7)
+    return dumps({
+        "took": 12,
+        "timed_out": False,
+        "hits": {
+            "total": {"value": hits, "relation": "eq"},
+            "hits": [{"_index": "hr_lens_v1", "_id": d["employee_id"], "_source": d} for d in documents],
+        },
+    })
+
+
+def poll(args, es: StubES, conditional: bool) -> dict:
+    client = TestClient(app)
+    marker = IndexChangeMarker(es, "hr_lens", ttl=0)
+    app.dependency_overrides = {
+        search_api.get_services: lambda: (es, StubCache(), StubAgent()),
+        search_api.get_rollups: lambda: None,
+        search_api.get_profiler: StubProfiler,
+        search_api.get_change_marker: lambda: marker,
+    }
+    etag, sent, not_modified = None, 0, 0
+    searches = es.searches
+    wall, cpu = time.perf_counter(), time.process_time()
+    for i in range(args.polls):
+        if args.write_every and i and i % args.write_every == 0:
+            es.indices.writes += 1
+        headers = {"Accept-Encoding": "gzip"}
+        if conditional and etag:
+            headers["If-None-Match"] = etag
+        response = client.post("/api/v1/search", json={"query": "engineers"}, headers=headers)
+        assert response.status_code in (200, 304), response.status_code
+        not_modified += response.status_code == 304
+        # Bytes on the wire: compressed body plus headers
+        sent += int(response.headers.get("content-length", 0)) + sum(
+            len(k) + len(v) + 4 for k, v in response.headers.items()
+        )
+        etag = response.headers.get("etag", etag)
+    return {
+        "ms": (time.perf_counter() - wall) / args.polls * 1000,
+        "cpu_ms": (time.process_time() - cpu) / args.polls * 1000,
+        "kb": sent / args.polls / 1024,
+        "not_modified": not_modified,
+        "searches": es.searches - searches,
+    }
+
+
+def main(args) -> None:
+    logger.setLevel(logging.WARNING)
+    es = StubES(result_page(args.hits), args.es_ms / 1000)
+    print(f"{'setup':<22}{'per poll':>10}{'cpu':>9}{'sent':>10}{'304s':>6}{'ES searches':>13}")
+    results = {}
+    for name, conditional in (("always full", False), ("If-None-Match", True)):
+        results[name] = poll(args, es, conditional)
+        r = results[name]
+        print(f"{name:<22}{r['ms']:>8.2f}ms{r['cpu_ms']:>7.2f}ms{r['kb']:>8.1f}KB"
+              f"{r['not_modified']:>6}{r['searches']:>13}")
+    full, conditional = results["always full"], results["If-None-Match"]
+    print(f"\nbytes sent -{1 - conditional['kb'] / full['kb']:.1%}, "
+          f"process CPU -{1 - conditional['cpu_ms'] / full['cpu_ms']:.1%}, "
+          f"latency -{1 - conditional['ms'] / full['ms']:.1%} per poll "
+          f"(client included); {ServiceContainer.get_instance().conditional.get_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=500)
+    parser.add_argument("--hits", type=int, default=100, help="documents in the result page")
+    parser.add_argument("--es-ms", type=float, default=15.0, help="stub Elasticsearch latency")
+    parser.add_argument("--write-every", type=int, default=50, help="polls between index writes, 0 for none")
+    main(parser.parse_args())
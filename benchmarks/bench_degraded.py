@@ -0,0 +1,157 @@
+"""Request latency and answering tier through an LLM latency spike, with and without degraded mode.
+
+Replays four phases (healthy, spike, recovery, recovered) of cache hits, near
+misses and novel questions against simulated embedding, Milvus and LLM latencies.
+With degraded mode each request returns within the latency budget, the
+circuit breaker stops waiting on the LLM during the spike, and during recovery
+a single probe closes it again while the other requests are still answered
+from fallback tiers:
+
+    python -m benchmarks.bench_degraded --llm-ms 600 --spike-ms 6000 --budget-ms 1500
+"""
+from app.core.admission import AdmissionController
+from app.core.cache_feedback import CacheFeedback
+from app.core.deadline import CancellationStats
+from app.core.degraded import DegradedMode
+from app.core.local_cache import LocalQueryCache
+from app.core.search_agent import SearchAgent
+from app.core.speculation import Speculator
+from app.core.suggestions import SuggestionIndex
+from app.utils.logger import logger
+from collections import Counter
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+POPULAR = ["average salary by department", "employees on maternity leave", "headcount per branch"]
+NEAR = ["engineers in sales earning over 90k", "women in hr hired after 2019"]
+DSL = {"query": {"match_all": {}}}
+
+
+class FakeResponse:
+    content = '{"query": {"match_all": {}}}'
+
+
+class FakeChain:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(self.seconds)
+        return FakeResponse()
+
+
+class FakeEmbeddings:
+    async def embed_query(self, query):
+        await asyncio.sleep(0.05)
+        return [0.0]
+
+
+class FakeVectorCache:
+    partition = "v_default_0"
+
+    async def find_entry(self, query, embedding, floor=None):
+        await asyncio.sleep(0.02)
+        for question in POPULAR:
+            if question in query:
+                return {"id": 1, "query_text": question, "es_query": DSL, "similarity": 0.93}
+        for question in NEAR:
+            if question in query and floor is not None:
+                return {"id": 2, "query_text": question, "es_query": DSL, "similarity": 0.78,
+                        "below_threshold": True}
+        return None
+
+    async def store_query(self, query, embedding, es_query):
+        return None
+
+
+def build_agent(args, degraded: bool) -> SearchAgent:
+    # Bypass __init__ so no LLM client is constructed
+    agent = SearchAgent.__new__(SearchAgent)
+    agent.chain = FakeChain(args.llm_ms / 1000)
+    agent.embedder = FakeEmbeddings()
+    agent.vector_cache = FakeVectorCache()
+    agent.admission = AdmissionController(max_concurrency=64, max_queue=10000)
+    agent.speculator = Speculator(enabled=False)
+    agent.local_cache = LocalQueryCache(max_entries=0)
+    agent.feedback = CacheFeedback()
+    agent.degraded = DegradedMode(
+        enabled=degraded,
+        latency_budget=args.budget_ms / 1000,
+        failure_threshold=args.failure_threshold,
+        reset_timeout=args.reset_seconds,
+    )
+    agent.cancellations = CancellationStats()
+    agent.suggestions = SuggestionIndex(enabled=False)
+    agent._calling = set()
+    agent._background = set()
+    return agent
+
+
+def workload(count: int, rng: random.Random) -> list:
+    queries = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.4:
+            queries.append(f"{rng.choice(POPULAR)} {i}")
+        elif roll < 0.6:
+            queries.append(f"{rng.choice(NEAR)} {i}")
+        else:
+            queries.append(f"contract history of employee emp{i:05d}")
+    return queries
+
+
+async def run_phase(agent: SearchAgent, queries: list, parallel: int) -> tuple:
+    latencies, tiers = [], Counter()
+    semaphore = asyncio.Semaphore(parallel)
+
+    async def one(query):
+        async with semaphore:
+            started = time.perf_counter()
+            _, metrics = await agent.generate_es_query(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            tiers[metrics["tier"]] += 1
+
+    await asyncio.gather(*(one(query) for query in queries))
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+    return p(0.5), p(0.99), latencies[-1], tiers
+
+
+async def main(args) -> None:
+    logger.setLevel(logging.ERROR)
+    phases = [
+        ("healthy", args.llm_ms),
+        ("spike", args.spike_ms),
+        ("recovery", args.llm_ms),
+        ("recovered", args.llm_ms),
+    ]
+    print(f"budget {args.budget_ms:.0f}ms, LLM {args.llm_ms:.0f}ms -> {args.spike_ms:.0f}ms during the spike")
+    for degraded in (False, True):
+        agent = build_agent(args, degraded)
+        rng = random.Random(args.seed)
+        print(f"degraded mode {'on' if degraded else 'off'}:")
+        for name, llm_ms in phases:
+            agent.chain.seconds = llm_ms / 1000
+            p50, p99, worst, tiers = await run_phase(agent, workload(args.queries, rng), args.parallel)
+            print(f"  {name:<10} p50={p50:>6.0f}ms p99={p99:>6.0f}ms max={worst:>6.0f}ms  "
+                  f"tiers={dict(tiers)}  llm breaker={agent.degraded.llm.state}")
+            if name == "spike" and degraded:
+                # Give the breaker time to half-open before traffic recovers
+                await asyncio.sleep(args.reset_seconds)
+        await asyncio.gather(*agent._background)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=120, help="requests per phase")
+    parser.add_argument("--llm-ms", type=float, default=600)
+    parser.add_argument("--spike-ms", type=float, default=6000)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--failure-threshold", type=int, default=5)
+    parser.add_argument("--reset-seconds", type=float, default=2)
+    parser.add_argument("--parallel", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
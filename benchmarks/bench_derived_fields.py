@@ -0,0 +1,141 @@
+"""Nested and scripted queries vs the same questions on index-time derived fields.
+
+Times deriving the fields for generated employees, then (unless --derive-only)
+runs each question both ways against a running Elasticsearch with the HR index
+loaded by generate_test_data.py, which writes the derived fields:
+
+    python -m benchmarks.bench_derived_fields --repeat 30
+    python -m benchmarks.bench_derived_fields --derive-only --docs 20000
+"""
+from elasticsearch import AsyncElasticsearch
+from app.config import Config
+from app.core.derived_fields import derive_fields
+from datetime import date, datetime, timezone
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import generate_test_data
+
+YEAR_MS = 365.25 * 24 * 3600 * 1000
+
+
+def queries(today: date) -> dict:
+    """Question -> (nested/scripted DSL, derived-field DSL)"""
+    now_ms = int(datetime(today.year, today.month, today.day, tzinfo=timezone.utc).timestamp() * 1000)
+    year_start = date(today.year, 1, 1).isoformat()
+    return {
+        "tenure over 5 years": (
+            {"query": {"bool": {"filter": {"script": {"script": {
+                "source": "doc['employment_details.hire_date'].size() > 0 && "
+                          "params.now - doc['employment_details.hire_date'].value.toInstant().toEpochMilli() "
+                          "> params.years * params.year_ms",
+                "params": {"now": now_ms, "years": 5, "year_ms": YEAR_MS},
+            }}}}}},
+            {"query": {"range": {"derived.tenure_years": {"gt": 5}}}},
+        ),
+        "salary above 100k": (
+            {"query": {"nested": {
+                "path": "salary_info.salary_history",
+                "query": {"range": {"salary_info.salary_history.amount": {"gt": 100000}}},
+            }}},
+            {"query": {"range": {"derived.current_salary": {"gt": 100000}}}},
+        ),
+        "over 10 approved leave days this year": (
+            {"size": 0, "aggs": {"employees": {
+                "terms": {"field": "employee_id", "size": 65000},
+                "aggs": {
+                    "leaves": {
+                        "nested": {"path": "leave_records"},
+                        "aggs": {"approved": {
+                            "filter": {"bool": {"filter": [
+                                {"term": {"leave_records.status": "Approved"}},
+                                {"range": {"leave_records.start_date": {"gte": year_start}}},
+                            ]}},
+                            "aggs": {"days": {"sum": {"script": {
+                                "source": "(doc['leave_records.end_date'].value.toInstant().toEpochMilli() - "
+                                          "doc['leave_records.start_date'].value.toInstant().toEpochMilli()) "
+                                          "/ 86400000L + 1",
+                            }}}},
+                        }},
+                    },
+                    "over": {"bucket_selector": {
+                        "buckets_path": {"days": "leaves>approved>days"},
+                        "script": "params.days > 10",
+                    }},
+                },
+            }}},
+            {"size": 0, "query": {"range": {"derived.leave_days.approved_this_year": {"gt": 10}}}},
+        ),
+        "raises per employee": (
+            {"size": 0, "aggs": {"employees": {
+                "terms": {"field": "employee_id", "size": 65000},
+                "aggs": {"history": {"nested": {"path": "salary_info.salary_history"}}},
+            }}},
+            {"size": 0, "aggs": {"raises": {"terms": {"field": "derived.raise_count"}}}},
+        ),
+        "on leave now": (
+            {"query": {"nested": {
+                "path": "leave_records",
+                "query": {"bool": {"filter": [
+                    {"term": {"leave_records.status": "Approved"}},
+                    {"range": {"leave_records.start_date": {"lte": "now/d"}}},
+                    {"range": {"leave_records.end_date": {"gte": "now/d"}}},
+                ]}},
+            }}},
+            {"query": {"term": {"derived.on_leave": True}}},
+        ),
+    }
+
+
+def bench_derive(docs: int, seed: int) -> None:
+    random.seed(seed)
+    generate_test_data.fake.seed_instance(seed)
+    employees = [generate_test_data.generate_employee(seq, docs) for seq in range(1, docs + 1)]
+    started = time.perf_counter()
+    for employee in employees:
+        derive_fields(employee)
+    elapsed = time.perf_counter() - started
+    print(f"derived fields for {docs} employees in {elapsed * 1000:.0f}ms "
+          f"({docs / elapsed:,.0f} docs/s, {elapsed / docs * 1e6:.1f}us each)\n")
+
+
+async def bench_queries(args) -> None:
+    es_config = Config.get_config()["elasticsearch"]
+    index = es_config["elasticsearch_index"]
+    es = AsyncElasticsearch(hosts=es_config["hosts"], request_timeout=120)
+    try:
+        print(f"{'question':<40}{'nested/script p50':>19}{'derived p50':>13}{'speedup':>9}{'hits':>16}")
+        for name, (original, derived) in queries(date.today()).items():
+            timings = {"original": [], "derived": []}
+            totals = {}
+            for _ in range(args.repeat):
+                for kind, dsl in (("original", original), ("derived", derived)):
+                    started = time.perf_counter()
+                    # Bypass the shard request cache so each run does the work
+                    response = await es.search(
+                        index=index, body=dsl, request_cache=False, track_total_hits=True
+                    )
+                    timings[kind].append(time.perf_counter() - started)
+                    totals[kind] = response["hits"]["total"]["value"]
+            original_ms = statistics.median(timings["original"]) * 1000
+            derived_ms = statistics.median(timings["derived"]) * 1000
+            hits = f"{totals['original']}/{totals['derived']}"
+            print(f"{name:<40}{original_ms:>17.1f}ms{derived_ms:>11.1f}ms"
+                  f"{original_ms / derived_ms:>8.1f}x{hits:>16}")
+    finally:
+        await es.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--docs", type=int, default=10000, help="employees to derive fields for")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--derive-only", action="store_true", help="skip the Elasticsearch queries")
+    args = parser.parse_args()
+    bench_derive(args.docs, args.seed)
+    if not args.derive_only:
+        asyncio.run(bench_queries(args))
@@ -0,0 +1,81 @@
+"""Throughput and latency of concurrent cache-lookup embeddings, direct vs micro-batched.
+
+The provider is simulated like the OpenAI embeddings endpoint: every call
+costs a fixed round trip plus a little per input, and only a limited number
+of calls run at once (the HTTP connection pool). Each concurrency level runs
+a closed loop of that many clients:
+
+    python -m benchmarks.bench_embedding_batcher --levels 1,10,50,100,500
+"""
+from app.core.embedding_batcher import EmbeddingBatcher
+from app.core.embeddings import EmbeddingProvider
+from app.utils.logger import logger
+import argparse
+import asyncio
+import logging
+import numpy as np
+import time
+
+
+class SimulatedProvider(EmbeddingProvider):
+    name = "simulated"
+
+    def __init__(self, dim: int, call_ms: float, per_item_ms: float, connections: int):
+        super().__init__(dim)
+        self.call_seconds = call_ms / 1000
+        self.per_item_seconds = per_item_ms / 1000
+        self._connections = asyncio.Semaphore(connections)
+
+    async def _embed(self, texts):
+        async with self._connections:
+            await asyncio.sleep(self.call_seconds + self.per_item_seconds * len(texts))
+        return [[0.0] * self.dim for _ in texts]
+
+
+async def run_level(embedder, clients: int, per_client: int) -> dict:
+    latencies = []
+
+    async def client(index: int) -> None:
+        for i in range(per_client):
+            started = time.perf_counter()
+            await embedder.embed_query(f"employees in department {index} hired after {2000 + i}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": np.percentile(latencies, 50),
+        "p99": np.percentile(latencies, 99),
+    }
+
+
+async def main(args) -> None:
+    logger.setLevel(logging.WARNING)
+    print(f"provider: {args.call_ms}ms per call + {args.per_item_ms}ms per input, "
+          f"{args.connections} connections; batcher: max {args.max_batch}, wait <= {args.max_wait_ms}ms")
+    print(f"{'clients':>7} {'mode':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'calls':>7} {'avg batch':>9}")
+    for clients in [int(level) for level in args.levels.split(",")]:
+        per_client = max(1, args.requests // clients)
+        for mode in ("direct", "batched"):
+            provider = SimulatedProvider(args.dim, args.call_ms, args.per_item_ms, args.connections)
+            embedder = provider
+            if mode == "batched":
+                embedder = EmbeddingBatcher(provider, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+            result = await run_level(embedder, clients, per_client)
+            print(f"{clients:>7} {mode:>8} {result['throughput']:>9,.0f} {result['p50']:>8.1f} "
+                  f"{result['p99']:>8.1f} {provider.calls:>7} {provider.texts / provider.calls:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", default="1,10,50,100,500")
+    parser.add_argument("--requests", type=int, default=2000, help="approximate requests per level")
+    parser.add_argument("--call-ms", type=float, default=40)
+    parser.add_argument("--per-item-ms", type=float, default=0.2)
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--dim", type=int, default=768)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,89 @@
+"""Embedding latency per provider: one question at a time, and batched throughput.
+
+The hashing embedder always runs. Add a local model directory (ONNX or
+sentence-transformers) and/or the OpenAI API to compare the in-process path
+against the network call every cache lookup currently waits for:
+
+    python -m benchmarks.bench_embeddings --model-path models/bge-small-en --openai
+"""
+from app.core.embeddings import (
+    HashingEmbeddingProvider,
+    LocalEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+)
+from app.utils.logger import logger
+import argparse
+import asyncio
+import logging
+import numpy as np
+import random
+import time
+
+TEMPLATES = [
+    "employees in {dept} earning over {n}",
+    "who joined the {dept} team after {year}",
+    "average salary by branch in {dept}",
+    "list {dept} staff with more than {n} leave days",
+    "how many people in {dept} were promoted in {year}",
+]
+DEPARTMENTS = ["engineering", "sales", "finance", "human resources", "marketing", "operations"]
+
+
+def questions(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [
+        rng.choice(TEMPLATES).format(
+            dept=rng.choice(DEPARTMENTS), n=rng.randint(1, 200) * 1000, year=rng.randint(2010, 2024)
+        )
+        for _ in range(count)
+    ]
+
+
+async def measure(provider, texts: list, batch_size: int) -> dict:
+    await asyncio.to_thread(provider.warm_up)
+    await provider.embed_query(texts[0])
+
+    latencies = []
+    for text in texts:
+        started = time.perf_counter()
+        await provider.embed_query(text)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        await provider.embed_documents(texts[i:i + batch_size])
+    batched = time.perf_counter() - started
+    return {
+        "p50": np.percentile(latencies, 50),
+        "p95": np.percentile(latencies, 95),
+        "sequential": len(texts) / (sum(latencies) / 1000),
+        "batched": len(texts) / batched,
+    }
+
+
+async def run(args) -> None:
+    logger.setLevel(logging.WARNING)
+    texts = questions(args.queries, args.seed)
+    providers = [HashingEmbeddingProvider(args.dim)]
+    if args.model_path:
+        providers.append(LocalEmbeddingProvider(args.dim, args.model_path, batch_size=args.batch_size))
+    if args.openai:
+        providers.append(OpenAIEmbeddingProvider(args.dim))
+
+    print(f"{args.queries} questions, dimension {args.dim}, batches of {args.batch_size}")
+    print(f"{'provider':<36} {'p50 ms':>8} {'p95 ms':>8} {'one-by-one/s':>13} {'batched/s':>10}")
+    for provider in providers:
+        result = await measure(provider, texts, args.batch_size)
+        print(f"{provider.name:<36} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+              f"{result['sequential']:>13,.0f} {result['batched']:>10,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--model-path", default=None, help="local ONNX or sentence-transformers model")
+    parser.add_argument("--openai", action="store_true", help="also call the OpenAI API")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
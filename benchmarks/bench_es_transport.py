@@ -0,0 +1,128 @@
+"""Tail latency of hedged vs plain Elasticsearch searches against stub nodes.
+
+Two local stub nodes answer ``_search`` after a base latency, with a small
+fraction of requests stalled to mimic GC pauses or a busy node:
+
+    python -m benchmarks.bench_es_transport --requests 2000 --slow-rate 0.05
+"""
+from elasticsearch import AsyncElasticsearch
+from app.core.hedging import HedgedSearcher
+import argparse
+import asyncio
+import json
+import random
+import time
+
+RESPONSE = json.dumps(
+    {"took": 1, "timed_out": False, "hits": {"total": {"value": 0, "relation": "eq"}, "hits": []}}
+).encode()
+
+
+class StubNode:
+    """Minimal HTTP/1.1 keep-alive server that looks like an Elasticsearch node"""
+
+    def __init__(self, base_latency: float, slow_latency: float, slow_rate: float, seed: int):
+        self.base_latency = base_latency
+        self.slow_latency = slow_latency
+        self.slow_rate = slow_rate
+        self.rng = random.Random(seed)
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+
+                slow = self.rng.random() < self.slow_rate
+                await asyncio.sleep(self.slow_latency if slow else self.base_latency)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"X-Elastic-Product: Elasticsearch\r\n"
+                    + f"Content-Length: {len(RESPONSE)}\r\n\r\n".encode()
+                    + RESPONSE
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def summarize(name: str, latencies: list) -> None:
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+
+    print(
+        f"{name:<10} p50={pct(50):7.1f}ms  p95={pct(95):7.1f}ms  "
+        f"p99={pct(99):7.1f}ms  max={ordered[-1] * 1000:7.1f}ms"
+    )
+
+
+async def run(searcher, requests: int, concurrency: int) -> list:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await searcher.search(index="hr_lens", body={"query": {"match_all": {}}})
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies
+
+
+async def main(args):
+    nodes = [
+        StubNode(args.base_ms / 1000, args.slow_ms / 1000, args.slow_rate, seed=i)
+        for i in range(2)
+    ]
+    hosts = [await node.start() for node in nodes]
+    options = {"connections_per_node": args.concurrency, "max_retries": 0, "request_timeout": 10}
+
+    plain = AsyncElasticsearch(hosts=hosts, **options)
+    await run(plain, 100, args.concurrency)  # warm connections
+    summarize("plain", await run(plain, args.requests, args.concurrency))
+    await plain.close()
+
+    hedged = HedgedSearcher(hosts, options, percentile=args.percentile, min_delay=0.005)
+    await run(hedged, 100, args.concurrency)  # warm connections and the latency window
+    summarize("hedged", await run(hedged, args.requests, args.concurrency))
+    stats = hedged.get_stats()
+    print(
+        f"hedges sent: {stats['hedges_sent']} "
+        f"({stats['hedges_sent'] / stats['requests']:.1%}), won: {stats['hedges_won']}"
+    )
+    await hedged.close()
+
+    for node in nodes:
+        await node.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--base-ms", type=float, default=5)
+    parser.add_argument("--slow-ms", type=float, default=200)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--percentile", type=float, default=95)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+"""Per-request logging overhead: synchronous handlers vs the queued pipeline.
+
+Simulates request handlers that log a search payload plus two short lines,
+with a file handler that occasionally stalls like a busy disk or a rotation:
+
+    python -m benchmarks.bench_logging --requests 5000 --stall-ms 5 --stall-rate 0.01
+"""
+from logging.handlers import QueueListener, RotatingFileHandler
+from app.utils.logger import JsonFormatter, LazyJSON, NonBlockingQueueHandler, PayloadSampler, TEXT_FORMAT
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import statistics
+import tempfile
+import time
+
+PAYLOAD = {
+    "size": 100,
+    "query": {"bool": {"must": [
+        {"term": {"employment_details.department.name": "Engineering"}},
+        {"range": {"salary_info.base_salary": {"gte": 100000}}},
+    ]}},
+    "aggs": {"by_position": {"terms": {"field": "employment_details.position"}}},
+}
+
+
+class StallingFileHandler(RotatingFileHandler):
+    def __init__(self, *args, stall: float, stall_rate: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stall = stall
+        self.stall_rate = stall_rate
+
+    def emit(self, record):
+        if random.random() < self.stall_rate:
+            time.sleep(self.stall)
+        super().emit(record)
+
+
+def build(name: str, path: str, args, queued: bool):
+    log = logging.getLogger(name)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    stream = logging.StreamHandler(open(os.devnull, "w"))
+    file_handler = StallingFileHandler(
+        path, maxBytes=1_000_000, backupCount=2, stall=args.stall_ms / 1000, stall_rate=args.stall_rate
+    )
+    if not queued:
+        for handler in (stream, file_handler):
+            handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+            log.addHandler(handler)
+        return log, None
+    for handler in (stream, file_handler):
+        handler.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(maxsize=10000)
+    log.addHandler(NonBlockingQueueHandler(log_queue))
+    listener = QueueListener(log_queue, stream, file_handler)
+    listener.start()
+    return log, listener
+
+
+async def run(log, requests: int, queued: bool) -> list:
+    sampler = PayloadSampler(sample_rate=0.01, max_per_second=5)
+    costs = []
+
+    async def handle(i):
+        started = time.perf_counter()
+        if queued:
+            if sampler.allow():
+                log.info("Executing search with query: %s", LazyJSON(PAYLOAD))
+        else:
+            log.info(f"Executing search with query:\n{json.dumps(PAYLOAD, indent=2)}")
+        log.info("Cache hit for query: '%s'", f"question {i}")
+        log.info("POST /api/v1/search 200")
+        costs.append(time.perf_counter() - started)
+        await asyncio.sleep(0)
+
+    await asyncio.gather(*(handle(i) for i in range(requests)))
+    return costs
+
+
+def report(name: str, costs: list, wall: float) -> None:
+    ordered = sorted(costs)
+    print(
+        f"{name:<8} mean={statistics.mean(costs) * 1e6:8.1f}us  "
+        f"p99={ordered[int(len(ordered) * 0.99)] * 1e6:8.1f}us  "
+        f"max={ordered[-1] * 1000:6.2f}ms  wall={wall:.2f}s"
+    )
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, queued in (("sync", False), ("queued", True)):
+            log, listener = build(f"bench.{name}", os.path.join(tmp, f"{name}.log"), args, queued)
+            started = time.perf_counter()
+            costs = asyncio.run(run(log, args.requests, queued))
+            report(name, costs, time.perf_counter() - started)
+            if listener:
+                listener.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--stall-ms", type=float, default=5)
+    parser.add_argument("--stall-rate", type=float, default=0.01)
+    main(parser.parse_args())
@@ -0,0 +1,140 @@
+"""Semantic-cache lookups through a Milvus restart, with and without the connection manager.
+
+Simulates Milvus proxies in-process: a healthy search takes --search-ms, one
+against a stopped proxy fails after --failure-ms (the gRPC deadline). Lookups
+arrive at --rate per second while the first proxy is down for --outage
+seconds. Each setup reports lookup latency, how many lookups reached a
+working proxy, waited out a failure or were skipped as misses, and how long
+after the restart lookups were served again:
+
+    python -m benchmarks.bench_milvus_failover --outage 2 --rate 200
+"""
+from app.core.milvus_connection import MilvusConnectionManager, MilvusEndpoint
+from app.utils.logger import logger
+import argparse
+import asyncio
+import logging
+import numpy as np
+import time
+
+
+class FakeCluster:
+    def __init__(self, args):
+        self.args = args
+        self.down: dict = {}
+
+    def stop(self, index: int, seconds: float) -> None:
+        self.down[index] = time.monotonic() + seconds
+
+    def is_up(self, index: int) -> bool:
+        return time.monotonic() >= self.down.get(index, 0)
+
+    async def search(self, index: int) -> None:
+        if not self.is_up(index):
+            await asyncio.sleep(self.args.failure_ms / 1000)
+            raise ConnectionError(f"proxy {index} unavailable")
+        await asyncio.sleep(self.args.search_ms / 1000)
+
+
+class FakeManager(MilvusConnectionManager):
+    def __init__(self, cluster: FakeCluster, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cluster = cluster
+
+    def _connect(self, endpoint: MilvusEndpoint) -> None:
+        self._ping(endpoint)
+
+    def _ping(self, endpoint: MilvusEndpoint) -> None:
+        if not self.cluster.is_up(self.endpoints.index(endpoint)):
+            time.sleep(self.probe_timeout)
+            raise ConnectionError("ping timed out")
+
+
+async def scenario(args, endpoints: int, managed: bool) -> dict:
+    cluster = FakeCluster(args)
+    manager = FakeManager(
+        cluster,
+        [{"host": f"proxy-{i}", "port": 19530} for i in range(endpoints)],
+        probe_interval=args.probe_interval,
+        probe_timeout=args.failure_ms / 1000,
+        failure_threshold=3,
+        backoff_initial=args.probe_interval / 2,
+        backoff_max=args.probe_interval * 4,
+    )
+    manager.connect()
+    monitor = asyncio.create_task(manager.run()) if managed else None
+
+    latencies, served, failed, restart_at, recovered = [], 0, 0, None, None
+
+    async def lookup() -> None:
+        nonlocal served, failed, recovered
+        started = time.perf_counter()
+        try:
+            if not managed:
+                # Before: one connection, every lookup goes to it
+                await cluster.search(0)
+            elif not manager.available:
+                manager.skipped_lookups += 1
+                return
+            else:
+                alias = manager.next_reader()
+                index = int(alias.rsplit("_", 1)[1])
+                try:
+                    await cluster.search(index)
+                    manager.record_success(alias)
+                except ConnectionError as e:
+                    manager.record_failure(alias, e)
+                    raise
+            served += 1
+            if restart_at is not None and recovered is None and time.monotonic() >= restart_at:
+                recovered = time.monotonic() - restart_at
+        except ConnectionError:
+            failed += 1
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    tasks = []
+    total = int(args.rate * (args.outage + args.after + 1))
+    for i in range(total):
+        if i == args.rate:
+            cluster.stop(0, args.outage)
+            restart_at = time.monotonic() + args.outage
+        tasks.append(asyncio.create_task(lookup()))
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.gather(*tasks)
+    if monitor is not None:
+        monitor.cancel()
+    ms = np.array(latencies) * 1000
+    return {
+        "served": served / total,
+        "p50": np.percentile(ms, 50),
+        "mean": ms.mean(),
+        "timeouts": failed,
+        "recovered": recovered,
+        "skipped": manager.skipped_lookups,
+    }
+
+
+async def main(args) -> None:
+    logger.setLevel(logging.CRITICAL)
+    print(f"{'setup':<28}{'served':>8}{'p50':>9}{'mean':>9}{'timed out':>11}{'skipped':>9}{'recovered after':>17}")
+    for name, endpoints, managed in (
+        ("one connection (before)", 1, False),
+        ("managed, 1 endpoint", 1, True),
+        ("managed, 2 endpoints", 2, True),
+    ):
+        result = await scenario(args, endpoints, managed)
+        recovered = "-" if result["recovered"] is None else f"{result['recovered'] * 1000:.0f}ms"
+        print(f"{name:<28}{result['served']:>8.1%}{result['p50']:>7.1f}ms{result['mean']:>7.1f}ms"
+              f"{result['timeouts']:>11}{result['skipped']:>9}{recovered:>17}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=int, default=200, help="lookups per second")
+    parser.add_argument("--outage", type=float, default=2.0, help="seconds the first proxy is down")
+    parser.add_argument("--after", type=float, default=1.0, help="seconds of traffic after the restart")
+    parser.add_argument("--search-ms", type=float, default=2.0)
+    parser.add_argument("--failure-ms", type=float, default=200.0)
+    parser.add_argument("--probe-interval", type=float, default=0.25)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+"""Overhead of the profiling hooks on a synthetic async request workload.
+
+Each request does some CPU work on the loop, awaits simulated I/O and
+a gathered pair of sub-tasks, then more CPU work. The workload runs with
+diagnostics off, with the event-loop lag monitor and memory snapshots on,
+and with every request profiled. Then one request makes a blocking call
+to show what the monitor and the profile record:
+
+    python -m benchmarks.bench_profiling --requests 3000 --concurrency 50
+"""
+from app.core.diagnostics import Diagnostics, collapsed
+from app.utils.logger import logger
+import argparse
+import asyncio
+import logging
+import numpy as np
+import time
+
+
+def cpu_work(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+async def fetch(delay: float) -> None:
+    await asyncio.sleep(delay)
+
+
+async def handle(args, blocking: float = 0) -> None:
+    cpu_work(args.work)
+    await asyncio.sleep(args.io_ms / 1000)
+    await asyncio.gather(
+        asyncio.create_task(fetch(args.io_ms / 1000)), asyncio.create_task(fetch(args.io_ms / 2000))
+    )
+    if blocking:
+        # A synchronous client call made on the event loop
+        time.sleep(blocking)
+    cpu_work(args.work)
+
+
+async def run(args, diagnostics: Diagnostics, profile_all: bool) -> dict:
+    diagnostics.start()
+    await asyncio.sleep(0.1)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def request() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            profile = diagnostics.requests.start("/bench") if profile_all else None
+            try:
+                await handle(args)
+            finally:
+                if profile is not None:
+                    diagnostics.requests.stop(profile)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    diagnostics.close()
+    ms = np.array(latencies) * 1000
+    return {"rps": args.requests / elapsed, "p50": np.percentile(ms, 50), "p99": np.percentile(ms, 99)}
+
+
+async def demo(args) -> None:
+    diagnostics = Diagnostics(loop_monitor=True, stall_threshold=0.05)
+    diagnostics.start()
+    await asyncio.sleep(0.1)
+
+    async def profiled() -> str:
+        profile = diagnostics.requests.start("/bench")
+        try:
+            await handle(args, blocking=0.2)
+        finally:
+            diagnostics.requests.stop(profile)
+        return profile.id
+
+    profile_id = await asyncio.create_task(profiled())
+    await asyncio.sleep(0.1)
+    diagnostics.close()
+    print("\nloop stall stacks (ms blocked):")
+    print(collapsed(diagnostics.loop.stacks).rstrip())
+    print("\nprofile of the blocking request (samples, heaviest first):")
+    for line in collapsed(diagnostics.requests.get(profile_id).stacks).splitlines()[:6]:
+        print(line)
+
+
+async def main(args) -> None:
+    logger.setLevel(logging.ERROR)
+    print(f"{'setup':<34}{'req/s':>8}{'p50':>9}{'p99':>9}")
+    baseline = None
+    for name, diagnostics, profile_all in (
+        ("diagnostics off", Diagnostics(), False),
+        ("loop monitor + memory snapshots", Diagnostics(loop_monitor=True, memory_interval=1), False),
+        ("every request profiled", Diagnostics(), True),
+    ):
+        result = await run(args, diagnostics, profile_all)
+        baseline = baseline or result["rps"]
+        print(f"{name:<34}{result['rps']:>8.0f}{result['p50']:>7.1f}ms{result['p99']:>7.1f}ms"
+              f"  ({result['rps'] / baseline - 1:+.1%} throughput)")
+    await demo(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--work", type=int, default=5000, help="loop iterations of CPU work per step")
+    parser.add_argument("--io-ms", type=float, default=2.0)
+    asyncio.run(main(parser.parse_args()))
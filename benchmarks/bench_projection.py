@@ -0,0 +1,96 @@
+"""Payload size and decode cost of full vs projected hits for list queries.
+
+Filters generated employees the way Elasticsearch applies ``_source``
+includes/excludes and compares the serialized response size and the time to
+encode and decode it (a proxy for wire + ``dict(response)`` cost):
+
+    python -m benchmarks.bench_projection --sizes 10 100 1000
+"""
+from app.core.projection import SourceProjector
+from generate_test_data import generate_batch
+import argparse
+import json
+import time
+
+QUERIES = [
+    (
+        "list engineers in Berlin",
+        {"query": {"bool": {"must": [
+            {"term": {"employment_details.position": "Software Engineer"}},
+            {"term": {"address.city": "Berlin"}},
+        ]}}},
+    ),
+    (
+        "show salaries in the finance department",
+        {"query": {"term": {"employment_details.department.name": "Finance"}}},
+    ),
+]
+
+
+def _matches(path: str, patterns: list) -> bool:
+    return any(path == p or path.startswith(f"{p}.") or p.startswith(f"{path}.") for p in patterns)
+
+
+def filter_source(doc, includes: list, excludes: list, prefix: str = ""):
+    """Approximation of Elasticsearch _source filtering for plain field paths"""
+    result = {}
+    for key, value in doc.items():
+        path = f"{prefix}{key}"
+        if any(path == e or path.startswith(f"{e}.") for e in excludes):
+            continue
+        if includes and not _matches(path, includes):
+            continue
+        if isinstance(value, dict) and not any(path == i for i in includes):
+            nested = filter_source(value, includes, excludes, f"{path}.")
+            if nested:
+                result[key] = nested
+        else:
+            result[key] = value
+    return result
+
+
+def response_for(docs: list) -> dict:
+    return {
+        "took": 3,
+        "timed_out": False,
+        "hits": {
+            "total": {"value": len(docs), "relation": "eq"},
+            "hits": [{"_index": "hr_lens", "_id": str(i), "_score": 1.0, "_source": d} for i, d in enumerate(docs)],
+        },
+    }
+
+
+def measure(response: dict, rounds: int) -> tuple:
+    encoded = json.dumps(response).encode()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        json.loads(json.dumps(response))
+    return len(encoded), (time.perf_counter() - started) / rounds
+
+
+def main(args):
+    projector = SourceProjector()
+    docs = generate_batch(0, max(args.sizes), max(args.sizes), seed=1)
+
+    for question, dsl in QUERIES:
+        projected, applied = projector.apply(dsl, question)
+        includes = projected["_source"]["includes"]
+        excludes = projected["_source"]["excludes"]
+        print(f"\n{question!r}: {len(includes)} fields included")
+        print(f"{'hits':>6} {'full KB':>10} {'proj KB':>10} {'ratio':>7} {'full ms':>9} {'proj ms':>9}")
+        for size in args.sizes:
+            full = response_for(docs[:size])
+            slim = response_for([filter_source(d, includes, excludes) for d in docs[:size]])
+            full_bytes, full_time = measure(full, args.rounds)
+            slim_bytes, slim_time = measure(slim, args.rounds)
+            print(
+                f"{size:>6} {full_bytes / 1024:>10.1f} {slim_bytes / 1024:>10.1f} "
+                f"{full_bytes / slim_bytes:>6.1f}x {full_time * 1000:>9.2f} {slim_time * 1000:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--rounds", type=int, default=20)
+    main(parser.parse_args())
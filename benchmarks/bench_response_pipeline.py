@@ -0,0 +1,83 @@
+"""Serialization time and allocations for /search responses at several sizes.
+
+Compares the previous path (decode, ``dict(response)``, ``jsonable_encoder`` and
+stdlib ``json``) with orjson re-encoding and raw byte splicing, then reports
+gzip and brotli cost for the encoded body:
+
+    python -m benchmarks.bench_response_pipeline --hits 10 100 1000 3000
+"""
+from fastapi.encoders import jsonable_encoder
+from app.middleware.compression import brotli
+from app.utils.json_utils import RawJSON, dumps, loads, splice_object
+from generate_test_data import generate_batch
+import argparse
+import gzip
+import json
+import statistics
+import time
+import tracemalloc
+
+METRICS = {"cache_hit": True, "projection": "none", "search_time": 0.012}
+
+
+def legacy(raw: bytes) -> bytes:
+    results = dict(json.loads(raw))
+    content = jsonable_encoder({"results": results, "metrics": METRICS})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def reencode(raw: bytes) -> bytes:
+    return splice_object({"results": loads(raw), "metrics": METRICS})
+
+
+def passthrough(raw: bytes) -> bytes:
+    return splice_object({"results": RawJSON(raw), "metrics": METRICS})
+
+
+def measure(fn, raw: bytes, rounds: int) -> tuple:
+    times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn(raw)
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times) * 1000, peak / 1024
+
+
+def main(args):
+    docs = generate_batch(0, max(args.hits), max(args.hits), seed=1)
+    print(f"{'hits':>6} {'body KB':>9} {'path':<12} {'ms':>8} {'peak KB':>10}")
+    for count in args.hits:
+        raw = dumps({
+            "took": 5,
+            "timed_out": False,
+            "hits": {
+                "total": {"value": count, "relation": "eq"},
+                "hits": [{"_index": "hr_lens", "_id": str(i), "_source": d} for i, d in enumerate(docs[:count])],
+            },
+        })
+        for name, fn in (("legacy", legacy), ("orjson", reencode), ("passthrough", passthrough)):
+            ms, peak = measure(fn, raw, args.rounds)
+            print(f"{count:>6} {len(raw) / 1024:>9.0f} {name:<12} {ms:>8.2f} {peak:>10.0f}")
+
+        body = passthrough(raw)
+        started = time.perf_counter()
+        gz = gzip.compress(body, compresslevel=5)
+        gz_ms = (time.perf_counter() - started) * 1000
+        line = f"{'':>16} gzip: {len(body) / len(gz):.1f}x in {gz_ms:.1f}ms"
+        if brotli is not None:
+            started = time.perf_counter()
+            br = brotli.compress(body, quality=4)
+            br_ms = (time.perf_counter() - started) * 1000
+            line += f", br: {len(body) / len(br):.1f}x in {br_ms:.1f}ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hits", type=int, nargs="+", default=[10, 100, 1000, 3000])
+    parser.add_argument("--rounds", type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+"""Live aggregation vs rollup answers for the common HR aggregate questions.
+
+Needs a running Elasticsearch with the HR index loaded (see generate_test_data.py).
+Refreshes the rollup index, then times each query both ways:
+
+    python -m benchmarks.bench_rollups --repeat 50
+"""
+from elasticsearch import AsyncElasticsearch
+from app.config import Config
+from app.core.rollups import RollupManager, SALARY
+import argparse
+import asyncio
+import statistics
+import time
+
+QUERIES = {
+    "headcount by department": {
+        "size": 0,
+        "aggs": {"departments": {"terms": {"field": "employment_details.department.name"}}},
+    },
+    "salary stats per department": {
+        "size": 0,
+        "aggs": {"departments": {
+            "terms": {"field": "employment_details.department.name", "size": 50},
+            "aggs": {"salary": {"stats": {"field": SALARY}}},
+        }},
+    },
+    "leave type distribution": {
+        "size": 0,
+        "aggs": {"leaves": {
+            "nested": {"path": "leave_records"},
+            "aggs": {"types": {"terms": {"field": "leave_records.leave_type"}}},
+        }},
+    },
+    "employees by branch": {
+        "size": 0,
+        "aggs": {"branches": {"terms": {"field": "branch.branch_name", "size": 100}}},
+    },
+}
+
+
+async def main(args) -> None:
+    config = Config.get_config()
+    es_config = config["elasticsearch"]
+    es = AsyncElasticsearch(hosts=es_config["hosts"], request_timeout=120)
+    try:
+        manager = RollupManager(es, es_config["elasticsearch_index"], config["rollups"]["index"])
+        started = time.perf_counter()
+        await manager.refresh(full=args.full)
+        print(f"rollup refresh: {(time.perf_counter() - started) * 1000:.0f}ms\n")
+
+        print(f"{'query':<30}{'live p50':>12}{'rollup p50':>14}{'speedup':>10}")
+        for name, dsl in QUERIES.items():
+            live, rolled = [], []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                # Bypass the shard request cache so each run does the aggregation work
+                await es.search(
+                    index=es_config["elasticsearch_index"], body=dsl, request_cache=False
+                )
+                live.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                answer = manager.answer(dsl)
+                rolled.append(time.perf_counter() - started)
+                if answer is None:
+                    raise RuntimeError(f"Rollups did not match: {name}")
+
+            live_ms = statistics.median(live) * 1000
+            rollup_ms = statistics.median(rolled) * 1000
+            print(f"{name:<30}{live_ms:>10.2f}ms{rollup_ms:>12.4f}ms{live_ms / rollup_ms:>9.0f}x")
+    finally:
+        await es.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--full", action="store_true", help="force a full rollup rebuild first")
+    asyncio.run(main(parser.parse_args()))
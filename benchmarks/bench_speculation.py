@@ -0,0 +1,163 @@
+"""Speculative LLM generation vs the sequential embed -> lookup -> generate path.
+
+Replays a stream of paraphrased popular questions (semantic cache hits) mixed
+with novel ones (misses) against simulated embedding, Milvus and LLM latencies:
+
+    python -m benchmarks.bench_speculation --queries 400 --novel-share 0.3 --llm-ms 600
+"""
+from app.core.admission import AdmissionController
+from app.core.cache_feedback import CacheFeedback
+from app.core.deadline import CancellationStats
+from app.core.degraded import DegradedMode
+from app.core.local_cache import LocalQueryCache
+from app.core.search_agent import SearchAgent
+from app.core.speculation import Speculator
+from app.core.suggestions import SuggestionIndex
+from app.utils.logger import logger
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+
+POPULAR = [
+    "engineers in the london office",
+    "average salary by department",
+    "employees on maternity leave",
+    "managers hired after 2020",
+    "headcount per branch",
+    "people with python skills",
+]
+FILLERS = ["show me", "list", "find", "which are the", "give me all", "i need"]
+
+
+class FakeResponse:
+    content = '{"query": {"match_all": {}}}'
+
+
+class FakeChain:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started = 0
+        self.completed = 0
+
+    async def ainvoke(self, inputs):
+        self.started += 1
+        await asyncio.sleep(self.seconds)
+        self.completed += 1
+        return FakeResponse()
+
+
+class FakeEmbeddings:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def embed_query(self, query):
+        await asyncio.sleep(self.seconds)
+        return [0.0]
+
+
+class FakeVectorCache:
+    partition = "v_default_0"
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def find_entry(self, query, embedding, floor=None):
+        await asyncio.sleep(self.seconds)
+        for entry_id, question in enumerate(POPULAR):
+            if question in query:
+                return {"id": entry_id, "query_text": question, "es_query": {"query": {"match_all": {}}}}
+        return None
+
+    async def store_query(self, query, embedding, es_query):
+        return None
+
+
+def workload(count: int, novel_share: float, seed: int) -> list:
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        if rng.random() < novel_share:
+            queries.append(f"contract history of employee emp{i:05d} in team t{rng.randint(0, 10**6)}")
+        else:
+            queries.append(f"{rng.choice(FILLERS)} {rng.choice(POPULAR)} {rng.randint(0, 10**6)}")
+    return queries
+
+
+def build_agent(args, speculate: bool) -> SearchAgent:
+    # Bypass __init__ so no LLM client is constructed
+    agent = SearchAgent.__new__(SearchAgent)
+    agent.chain = FakeChain(args.llm_ms / 1000)
+    agent.embedder = FakeEmbeddings(args.embed_ms / 1000)
+    agent.vector_cache = FakeVectorCache(args.lookup_ms / 1000)
+    agent.admission = AdmissionController(max_concurrency=args.concurrency, max_queue=1000)
+    agent.speculator = Speculator(
+        enabled=speculate,
+        miss_threshold=args.threshold,
+        max_wasted_per_minute=args.max_wasted_per_minute,
+    )
+    agent.local_cache = LocalQueryCache()
+    agent.feedback = CacheFeedback()
+    agent.degraded = DegradedMode()
+    agent.cancellations = CancellationStats()
+    agent.suggestions = SuggestionIndex(enabled=False)
+    agent._calling = set()
+    agent._background = set()
+    return agent
+
+
+async def replay(agent: SearchAgent, queries: list, parallel: int) -> dict:
+    latencies = {True: [], False: []}
+    semaphore = asyncio.Semaphore(parallel)
+
+    async def one(query):
+        async with semaphore:
+            started = time.perf_counter()
+            _, metrics = await agent.generate_es_query(query)
+            latencies[metrics["cache_hit"]].append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(query) for query in queries))
+    return latencies
+
+
+def report(name: str, agent: SearchAgent, latencies: dict) -> None:
+    def ms(values, p):
+        if not values:
+            return "-"
+        ordered = sorted(values)
+        return f"{ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000:.0f}"
+
+    misses, hits = latencies[False], latencies[True]
+    stats = agent.speculator.get_stats()
+    print(
+        f"{name:<12} miss p50={ms(misses, .5)}ms p95={ms(misses, .95)}ms  "
+        f"hit p50={ms(hits, .5)}ms  mean={statistics.mean(misses + hits) * 1000:.0f}ms  "
+        f"llm calls={agent.chain.started} wasted={stats['wasted_generations']} "
+        f"precision={stats['precision']} recall={stats['miss_recall']}"
+    )
+
+
+async def main(args) -> None:
+    logger.setLevel(logging.WARNING)
+    queries = workload(args.queries, args.novel_share, args.seed)
+    for name, speculate in (("sequential", False), ("speculative", True)):
+        agent = build_agent(args, speculate)
+        latencies = await replay(agent, queries, args.parallel)
+        report(name, agent, latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--novel-share", type=float, default=0.3)
+    parser.add_argument("--embed-ms", type=float, default=60)
+    parser.add_argument("--lookup-ms", type=float, default=25)
+    parser.add_argument("--llm-ms", type=float, default=600)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--max-wasted-per-minute", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
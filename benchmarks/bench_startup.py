@@ -0,0 +1,52 @@
+"""Cold import time of the API process, with and without deferred heavy imports.
+
+Each run is a fresh interpreter. "lazy" imports ``app.main`` as uvicorn does;
+"eager" additionally imports the modules warm-up loads in the background,
+which is what every cold start paid before imports were deferred:
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+from app.core.container import HEAVY_MODULES
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import time, sys
+started = time.perf_counter()
+import app.main
+{extra}
+print(time.perf_counter() - started)
+print(",".join(m for m in {heavy!r} if m in sys.modules) or "none")
+"""
+
+
+def measure(extra: str, runs: int) -> tuple:
+    times, loaded = [], ""
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "bench")}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", PROBE.format(extra=extra, heavy=HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=env,
+        ).stdout.strip().splitlines()
+        times.append(float(output[-2]))
+        loaded = output[-1]
+    return statistics.median(times), loaded
+
+
+def main(args):
+    eager_imports = "\n".join(f"import {module}" for module in HEAVY_MODULES)
+    for name, extra in (("lazy", ""), ("eager", eager_imports)):
+        seconds, loaded = measure(extra, args.runs)
+        print(f"{name:<6} import app.main: {seconds:.3f}s  heavy modules loaded: {loaded}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,122 @@
+"""Typeahead latency of the suggestion index over a large semantic cache.
+
+Fills the index with synthetic HR questions, spreads Zipf-distributed hits
+over them, then replays users typing sampled questions one keystroke at a
+time and reports lookup latency percentiles, along with the cost of the
+incremental updates (store, hit, evict) and of building the index:
+
+    python -m benchmarks.bench_suggestions --entries 100000 --typed 500
+"""
+from app.core.suggestions import SuggestionIndex
+from app.utils.logger import logger
+import argparse
+import logging
+import numpy as np
+import random
+import time
+import tracemalloc
+
+OPENINGS = [
+    "how many", "show me", "list", "find", "which", "who are the", "count", "what is the average",
+    "give me", "compare",
+]
+SUBJECTS = [
+    "employees", "managers", "engineers", "contractors", "interns", "staff", "new hires",
+    "team leads", "directors", "analysts",
+]
+FILTERS = [
+    "in the {dept} department", "at the {branch} branch", "hired in {year}", "on sick leave",
+    "on annual leave", "with more than {n} years of tenure", "earning over {salary}",
+    "with a raise since {year}", "reporting to {name}", "with pending leave requests",
+    "who joined after {year}", "in {dept} at {branch}",
+]
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "Finance", "HR", "Legal", "Support", "Operations", "Research"]
+BRANCHES = ["Seoul", "Busan", "London", "Berlin", "Austin", "Toronto", "Sydney", "Paris", "Tokyo", "Dublin"]
+NAMES = ["Kim", "Lee", "Park", "Smith", "Garcia", "Chen", "Müller", "Nguyen", "Okafor", "Rossi"]
+
+
+def question(rng: random.Random) -> str:
+    parts = [rng.choice(OPENINGS), rng.choice(SUBJECTS)]
+    for template in rng.sample(FILTERS, rng.randint(1, 2)):
+        parts.append(template.format(
+            dept=rng.choice(DEPARTMENTS),
+            branch=rng.choice(BRANCHES),
+            year=rng.randint(2000, 2025),
+            n=rng.randint(1, 20),
+            salary=f"{rng.randint(4, 20) * 10}k",
+            name=f"{rng.choice(NAMES)} {rng.randint(1, 999)}",
+        ))
+    return " ".join(parts)
+
+
+def percentiles(samples: list) -> str:
+    us = np.array(samples) * 1e6
+    return (f"p50 {np.percentile(us, 50):7.1f}us  p99 {np.percentile(us, 99):7.1f}us  "
+            f"max {us.max():8.1f}us")
+
+
+def main(args) -> None:
+    logger.setLevel(logging.WARNING)
+    rng = random.Random(args.seed)
+    texts = [question(rng) for _ in range(args.entries)]
+    now = time.time()
+    created = [now - rng.uniform(0, 90 * 86400) for _ in texts]
+
+    tracemalloc.start()
+    index = SuggestionIndex(max_results=10)
+    started = time.perf_counter()
+    for entry_id, (text, at) in enumerate(zip(texts, created)):
+        index.add(entry_id, text, at)
+    build = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"indexed {args.entries} questions ({len(index._vocabulary)} words) in {build:.2f}s, "
+          f"{memory / 2**20:.0f}MB")
+
+    # Popular questions get most of the hits
+    weights = 1 / np.arange(1, args.entries + 1) ** 1.1
+    popular = np.random.default_rng(args.seed).choice(args.entries, size=args.hits, p=weights / weights.sum())
+    timings = []
+    for entry_id in popular:
+        started = time.perf_counter()
+        index.record_hit(int(entry_id))
+        timings.append(time.perf_counter() - started)
+    print(f"{'record hit':<14}{percentiles(timings)}")
+
+    timings = []
+    for i in range(args.updates):
+        entry_id = args.entries + i
+        started = time.perf_counter()
+        index.add(entry_id, question(rng))
+        timings.append(time.perf_counter() - started)
+    print(f"{'store':<14}{percentiles(timings)}")
+
+    timings = []
+    for entry_id in rng.sample(range(args.entries), args.updates):
+        started = time.perf_counter()
+        index.remove(entry_id)
+        timings.append(time.perf_counter() - started)
+    print(f"{'evict':<14}{percentiles(timings)}")
+
+    # Keystroke by keystroke, as a typeahead box sends them
+    timings, empty = [], 0
+    for text in rng.sample(texts, args.typed):
+        for end in range(1, len(text) + 1):
+            started = time.perf_counter()
+            found = index.suggest(text[:end])
+            timings.append(time.perf_counter() - started)
+            empty += not found
+    print(f"{'suggest':<14}{percentiles(timings)}  over {len(timings)} keystrokes, "
+          f"{empty / len(timings):.1%} with no suggestion")
+    under = np.mean(np.array(timings) < 0.001)
+    print(f"{under:.2%} of lookups answered in under 1ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--hits", type=int, default=200000)
+    parser.add_argument("--updates", type=int, default=2000, help="stores and evictions to time")
+    parser.add_argument("--typed", type=int, default=500, help="questions typed one key at a time")
+    parser.add_argument("--seed", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,157 @@
+"""Memory, lookup latency and hit agreement of the semantic cache vector layouts.
+
+For each embedding dimension and quantization (see app/core/vector_codec.py)
+the cache entries are encoded the way Milvus stores them, every query is
+answered by brute force over the encoded vectors, and the hit/miss decision at
+the similarity threshold is compared with full-dimension float32. Latencies
+are single-threaded numpy scans, so they show the relative cost of scoring
+each layout rather than Milvus index latency (numpy converts float16 in
+software, which overstates that row). Reduced dimensions truncate and
+re-normalise, which is how shortened text-embedding-3 vectors behave; their
+false hits show how far the similarity threshold needs recalibrating.
+
+    python -m benchmarks.bench_vector_quantization --entries 50000 --dims 768,512,256
+    python -m benchmarks.bench_vector_quantization --snapshot /backups/cache-snapshot
+"""
+from app.core.cache_snapshot import SnapshotReader
+from app.core.vector_codec import QUANTIZATIONS, VectorCodec
+import argparse
+import numpy as np
+import time
+
+BLOCK = 4096
+
+# Set bits per byte value, for Hamming distance over packed codes
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+def synthetic(args, rng) -> np.ndarray:
+    """Entries clustered by topic, with most signal in the leading dimensions"""
+    scale = 1 / np.sqrt(1 + np.arange(args.base_dim) / 64)
+    topics = rng.standard_normal((args.topics, args.base_dim)) * scale
+    labels = rng.integers(0, args.topics, args.entries)
+    noise = rng.standard_normal((args.entries, args.base_dim)) * scale
+    return normalize(topics[labels] + 0.8 * noise)
+
+
+def make_queries(entries: np.ndarray, args, rng):
+    """Perturbed stored entries, from close paraphrases to new questions on the same topic"""
+    base = entries[rng.integers(0, len(entries), args.queries)]
+    noise = rng.standard_normal(base.shape).astype(np.float32) / np.sqrt(base.shape[1])
+    # Spread similarities across the threshold so borderline decisions are exercised
+    strength = rng.uniform(0.2, 1.2, (args.queries, 1)).astype(np.float32)
+    return normalize(base + strength * noise)
+
+
+class Index:
+    """Brute-force scorer over one encoded layout"""
+
+    def __init__(self, vectors: np.ndarray, quantization: str, rerank: int):
+        self.quantization = quantization
+        self.rerank = rerank
+        if quantization == "none":
+            self.data = vectors
+        elif quantization == "float16":
+            self.data = vectors.astype(np.float16)
+        elif quantization == "int8":
+            # Per-dimension min/max scalar quantization, as IVF_SQ8 trains it
+            self.low = vectors.min(axis=0)
+            self.step = np.maximum(vectors.max(axis=0) - self.low, 1e-12) / 255
+            self.data = np.round((vectors - self.low) / self.step).astype(np.uint8)
+        else:
+            self.data = np.packbits(vectors > 0, axis=1)
+            self.full = vectors.astype(np.float16)
+
+    def nearest(self, query: np.ndarray):
+        if self.quantization == "none":
+            scores = self.data @ query
+        elif self.quantization == "float16":
+            scores = np.concatenate([
+                self.data[i:i + BLOCK].astype(np.float32) @ query
+                for i in range(0, len(self.data), BLOCK)
+            ])
+        elif self.quantization == "int8":
+            weights = query * self.step
+            offset = float(query @ self.low)
+            scores = np.concatenate([
+                self.data[i:i + BLOCK].astype(np.float32) @ weights + offset
+                for i in range(0, len(self.data), BLOCK)
+            ])
+        else:
+            bits = np.packbits(query > 0)
+            distances = POPCOUNT[np.bitwise_xor(self.data, bits)].sum(axis=1)
+            candidates = np.argpartition(distances, self.rerank)[:self.rerank]
+            rescored = self.full[candidates].astype(np.float32) @ query
+            best = int(np.argmax(rescored))
+            return int(candidates[best]), float(rescored[best])
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+
+def evaluate(entries: np.ndarray, queries: np.ndarray, quantization: str, args):
+    index = Index(entries, quantization, args.rerank)
+    answers, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        answers.append(index.nearest(query))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return answers, np.array(latencies)
+
+
+def decisions(answers, threshold: float):
+    """Entry id served for each query, or -1 for a miss"""
+    return np.array([entry if score >= threshold else -1 for entry, score in answers])
+
+
+def main(args) -> None:
+    rng = np.random.default_rng(args.seed)
+    if args.snapshot:
+        reader = SnapshotReader(args.snapshot)
+        entries = normalize(np.asarray(reader.vectors[:args.entries], dtype=np.float32))
+    else:
+        entries = synthetic(args, rng)
+    queries = make_queries(entries, args, rng)
+    full_dim = entries.shape[1]
+    dims = [int(d) for d in args.dims.split(",") if int(d) <= full_dim]
+
+    baseline_answers, _ = evaluate(entries, queries, "none", args)
+    baseline = decisions(baseline_answers, args.threshold)
+    print(f"entries: {len(entries)} x {full_dim}  queries: {len(queries)}  "
+          f"threshold: {args.threshold}  baseline hit rate: {np.mean(baseline >= 0):.1%}")
+    print(f"{'dim':>5} {'storage':>8} {'resident B':>10} {'disk B':>7} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'same top1':>9} {'hit agree':>9} {'lost hits':>9} {'false hits':>10}")
+
+    for dim in dims:
+        entries_d = normalize(entries[:, :dim])
+        queries_d = normalize(queries[:, :dim])
+        for quantization in args.modes.split(","):
+            codec = VectorCodec(dim, quantization, args.rerank)
+            answers, latencies = evaluate(entries_d, queries_d, quantization, args)
+            served = decisions(answers, args.threshold)
+            top1 = np.mean([a[0] == b[0] for a, b in zip(answers, baseline_answers)])
+            lost = np.sum((baseline >= 0) & (served != baseline))
+            false = np.sum((served >= 0) & (served != baseline))
+            memory = codec.bytes_per_entry()
+            print(f"{dim:>5} {quantization:>8} {memory['resident']:>10} {memory['disk']:>7} "
+                  f"{np.percentile(latencies, 50):>7.2f} {np.percentile(latencies, 95):>7.2f} "
+                  f"{top1:>9.1%} {np.mean(served == baseline):>9.1%} {lost:>9} {false:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--base-dim", type=int, default=768, help="synthetic embedding size")
+    parser.add_argument("--dims", default="768,512,256")
+    parser.add_argument("--modes", default=",".join(QUANTIZATIONS))
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--rerank", type=int, default=16, help="binary re-rank candidates")
+    parser.add_argument("--snapshot", default=None, help="use vectors from a cache snapshot")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
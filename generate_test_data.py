@@ -1,16 +1,36 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import gzip
+import os
 import random
 import json
+import time
 from faker import Faker
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, helpers
 import uuid
 from app.config import get_settings
-from app.utils.path_utils import get_schema_path
+from app.core.derived_fields import with_derived_fields
+from app.core.index_manager import IndexManager
 
 # Initialize Faker and settings
 fake = Faker()
 settings = get_settings()
 
+REFERENCE_DATE_ENV = "TEST_DATA_REFERENCE_DATE"
+
+
+def reference_date(value: str = None) -> datetime:
+    """Midnight of ``value`` (YYYY-MM-DD), else of TEST_DATA_REFERENCE_DATE, else of today"""
+    value = value or os.getenv(REFERENCE_DATE_ENV)
+    return datetime.combine(date.fromisoformat(value) if value else date.today(), datetime.min.time())
+
+
+# Reference point for all relative dates: the same seed and reference date produce the same
+# documents. Read from the environment so generator processes agree with the parent.
+REFERENCE_DATE = reference_date()
+
 # Constants
 DEPARTMENTS = [
     {"id": "DEP-001", "name": "Engineering"},
@@ -45,14 +65,21 @@ LEAVE_TYPES = [
 ]
 LEAVE_STATUS = ["Pending", "Approved", "Rejected", "Cancelled"]
 
+# Bulk loading defaults
+DEFAULT_COUNT = 1000
+DEFAULT_SEED = 42
+DEFAULT_BATCH_SIZE = 5000  # documents generated per worker task
+DEFAULT_CHUNK_SIZE = 2000  # documents per _bulk request
+DEFAULT_MAX_CHUNK_BYTES = 20 * 1024 * 1024  # 20MB per _bulk request
+
 
-def generate_employee_id():
-    return f"EMP-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:4]}"
+def generate_employee_id(seq: int) -> str:
+    return f"EMP-{REFERENCE_DATE.strftime('%Y%m%d')}-{seq:04d}"
 
 
 def generate_salary_history(base_salary):
     history = []
-    date = datetime.now() - timedelta(days=random.randint(365, 1095))
+    date = REFERENCE_DATE - timedelta(days=random.randint(365, 1095))
 
     for _ in range(random.randint(1, 4)):
         history.append(
@@ -72,11 +99,11 @@ def generate_salary_history(base_salary):
 def generate_leave_records():
     records = []
     for _ in range(random.randint(0, 5)):
-        start_date = datetime.now() - timedelta(days=random.randint(1, 365))
+        start_date = REFERENCE_DATE - timedelta(days=random.randint(1, 365))
         end_date = start_date + timedelta(days=random.randint(1, 14))
         records.append(
             {
-                "leave_id": f"LEAVE-{uuid.uuid4().hex[:8]}",
+                "leave_id": f"LEAVE-{uuid.UUID(int=random.getrandbits(128)).hex[:8]}",
                 "leave_type": random.choice(LEAVE_TYPES),
                 "start_date": start_date.strftime("%Y-%m-%d"),
                 "end_date": end_date.strftime("%Y-%m-%d"),
@@ -87,20 +114,25 @@ def generate_leave_records():
     return records
 
 
-def generate_employee():
+def generate_employee(seq: int = 1, total: int = DEFAULT_COUNT):
     department = random.choice(DEPARTMENTS)
     base_salary = random.randint(30000, 150000)
-    hire_date = fake.date_between(start_date="-10y", end_date="today")
+    hire_date = fake.date_between(
+        start_date=REFERENCE_DATE.date() - timedelta(days=3650),
+        end_date=REFERENCE_DATE.date(),
+    )
 
     return {
-        "employee_id": generate_employee_id(),
+        "employee_id": generate_employee_id(seq),
         "personal_info": {
             "first_name": fake.first_name(),
             "last_name": fake.last_name(),
             "email": fake.email(),
             "phone": fake.phone_number(),
-            "date_of_birth": fake.date_of_birth(
-                minimum_age=20, maximum_age=65
+            # Ages against the reference date; Faker's date_of_birth counts from today
+            "date_of_birth": fake.date_between(
+                start_date=REFERENCE_DATE.date() - timedelta(days=round(65 * 365.25)),
+                end_date=REFERENCE_DATE.date() - timedelta(days=round(20 * 365.25)),
             ).strftime("%Y-%m-%d"),
             "gender": random.choice(["Male", "Female", "Other"]),
             "marital_status": random.choice(
@@ -111,7 +143,7 @@ def generate_employee():
             "hire_date": hire_date.strftime("%Y-%m-%d"),
             "position": random.choice(POSITIONS),
             "department": department,
-            "manager_id": generate_employee_id(),
+            "manager_id": generate_employee_id(random.randint(1, total)),
             "employment_status": random.choice(EMPLOYMENT_STATUS),
             "employment_type": random.choice(EMPLOYMENT_TYPES),
         },
@@ -133,33 +165,262 @@ def generate_employee():
             "branch_name": f"{fake.city()} Branch",
             "location": {"lat": float(fake.latitude()), "lon": float(fake.longitude())},
         },
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat(),
+        "created_at": REFERENCE_DATE.isoformat(),
+        "updated_at": REFERENCE_DATE.isoformat(),
     }
 
 
-def main():
-    # Initialize Elasticsearch client
-    es = Elasticsearch(settings.elasticsearch_host)
+def generate_batch(start: int, size: int, total: int, seed: int) -> list:
+    """Generate employees [start, start + size) in a worker process.
+
+    Each batch reseeds from (seed, start), so the output is identical regardless
+    of worker count or scheduling order.
+    """
+    batch_seed = seed * 1_000_003 + start
+    random.seed(batch_seed)
+    fake.seed_instance(batch_seed)
+    return [generate_employee(seq, total) for seq in range(start + 1, start + size + 1)]
+
+
+def iter_generated(count: int, seed: int, workers: int, batch_size: int):
+    """Yield employees in order, generated across a process pool.
+
+    At most ``2 * workers`` batches are in flight so memory stays bounded
+    however large ``count`` is.
+    """
+    if workers <= 1:
+        for start in range(0, count, batch_size):
+            yield from generate_batch(start, min(batch_size, count - start), count, seed)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        starts = iter(range(0, count, batch_size))
+
+        def submit_next() -> bool:
+            start = next(starts, None)
+            if start is None:
+                return False
+            pending.append(
+                executor.submit(
+                    generate_batch, start, min(batch_size, count - start), count, seed
+                )
+            )
+            return True
 
-    # Get schema path and read mapping file
-    schema_path = get_schema_path()
-    with open(schema_path / "elasticsearch" / "mapping.json", "r") as f:
-        mapping = json.load(f)
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
 
-    # Create index with mapping
-    if es.indices.exists(index=settings.elasticsearch_index):
-        es.indices.delete(index=settings.elasticsearch_index)
+        while pending:
+            batch = pending.popleft().result()
+            submit_next()
+            yield from batch
 
-    es.indices.create(index=settings.elasticsearch_index, body=mapping)
 
-    # Generate and index employees
-    for _ in range(1000):
-        employee = generate_employee()
-        es.index(index=settings.elasticsearch_index, document=employee)
+def _open_ndjson(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_ndjson(path: str, index: str, employees) -> int:
+    """Write employees as _bulk-compatible NDJSON (action line + source line)"""
+    written = 0
+    with _open_ndjson(path, "w") as f:
+        for employee in employees:
+            f.write(json.dumps({"index": {"_index": index, "_id": employee["employee_id"]}}))
+            f.write("\n")
+            f.write(json.dumps(employee))
+            f.write("\n")
+            written += 1
+    return written
+
+
+def read_ndjson(path: str):
+    """Read employees back from an NDJSON file written by write_ndjson"""
+    with _open_ndjson(path, "r") as f:
+        for line in f:
+            action = json.loads(line)
+            if "index" in action:
+                continue
+            yield action
+
+
+def to_actions(index: str, employees):
+    for employee in employees:
+        yield {"_index": index, "_id": employee["employee_id"], "_source": employee}
+
+
+class BulkLoadSettings:
+    """Relax refresh and replication on an existing index for the duration of a bulk load"""
+
+    def __init__(self, es: Elasticsearch, index: str):
+        self.es = es
+        self.index = index
+        self._original = {}
+
+    def __enter__(self):
+        # index may be an alias, so settings are keyed by the concrete index names
+        response = self.es.indices.get_settings(
+            index=self.index, include_defaults=True, flat_settings=True
+        )
+        for name, current in response.items():
+            merged = {**current.get("defaults", {}), **current.get("settings", {})}
+            self._original[name] = {
+                "index.refresh_interval": merged.get("index.refresh_interval", "1s"),
+                "index.number_of_replicas": merged.get("index.number_of_replicas", "1"),
+            }
+            self.es.indices.put_settings(
+                index=name,
+                settings={"index.refresh_interval": "-1", "index.number_of_replicas": 0},
+            )
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for name, original in self._original.items():
+            self.es.indices.put_settings(index=name, settings=original)
+        self.es.indices.refresh(index=self.index)
+
+
+def bulk_load(
+    es: Elasticsearch,
+    index: str,
+    employees,
+    threads: int = 4,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+) -> int:
+    """Stream employees into the index with the bulk helpers, returning the count indexed"""
+    actions = to_actions(index, employees)
+    if threads > 1:
+        results = helpers.parallel_bulk(
+            es,
+            actions,
+            thread_count=threads,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            queue_size=threads * 2,
+        )
+    else:
+        results = helpers.streaming_bulk(
+            es,
+            actions,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            max_retries=3,
+        )
+
+    indexed = 0
+    for ok, info in results:
+        if not ok:
+            raise RuntimeError(f"Bulk indexing failed: {info}")
+        indexed += 1
+    return indexed
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate and bulk load HR test data")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="number of employees")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="deterministic seed")
+    parser.add_argument(
+        "--reference-date",
+        help=f"YYYY-MM-DD that relative dates count back from (default: ${REFERENCE_DATE_ENV} or today)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="generator processes"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="documents per worker task"
+    )
+    parser.add_argument("--threads", type=int, default=4, help="parallel _bulk senders")
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="documents per _bulk request"
+    )
+    parser.add_argument(
+        "--max-chunk-bytes",
+        type=int,
+        default=DEFAULT_MAX_CHUNK_BYTES,
+        help="maximum bytes per _bulk request",
+    )
+    parser.add_argument(
+        "--index", default=settings.elasticsearch_index, help="alias the app reads through"
+    )
+    parser.add_argument(
+        "--profile", default="default", help="settings profile from index_profiles.json"
+    )
+    parser.add_argument(
+        "--output", help="write NDJSON (optionally .gz) instead of indexing into Elasticsearch"
+    )
+    parser.add_argument("--input", help="load documents from an NDJSON file instead of generating")
+    parser.add_argument(
+        "--keep-index",
+        action="store_true",
+        help="append to the live index instead of building a new version and swapping the alias",
+    )
+    parser.add_argument("--keep-old", action="store_true", help="keep the previous index version")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global REFERENCE_DATE
+
+    args = parse_args(argv)
+    started = time.perf_counter()
+    if args.reference_date:
+        REFERENCE_DATE = reference_date(args.reference_date)
+        # Generator processes started with spawn re-read it from the environment
+        os.environ[REFERENCE_DATE_ENV] = args.reference_date
+
+    if args.input:
+        employees = read_ndjson(args.input)
+    else:
+        print(f"Generating {args.count} employees with seed {args.seed} as of {REFERENCE_DATE.date()}")
+        employees = iter_generated(args.count, args.seed, args.workers, args.batch_size)
+    # Same ingest stage as live writes (ElasticsearchClient.index_employee), as of the reference date
+    as_of = REFERENCE_DATE.date()
+    employees = (with_derived_fields(employee, as_of) for employee in employees)
+
+    if args.output:
+        total = write_ndjson(args.output, args.index, employees)
+        elapsed = time.perf_counter() - started
+        print(
+            f"Wrote {total} employee records to {args.output} "
+            f"in {elapsed:.1f}s ({total / elapsed:,.0f} docs/sec)"
+        )
+        return
+
+    # Initialize Elasticsearch client
+    es = Elasticsearch(settings.elasticsearch_host, request_timeout=120)
+    bulk_args = dict(
+        threads=args.threads,
+        chunk_size=args.chunk_size,
+        max_chunk_bytes=args.max_chunk_bytes,
+    )
+
+    if args.keep_index:
+        target = args.index
+        with BulkLoadSettings(es, target):
+            total = bulk_load(es, target, employees, **bulk_args)
+    else:
+        # Load into a fresh version and swap the alias so readers never see a partial index
+        manager = IndexManager(es, args.index)
+        target = manager.create_index(args.profile)
+        try:
+            manager.relax_for_load(target)
+            total = bulk_load(es, target, employees, **bulk_args)
+            manager.restore_profile(target, args.profile)
+        except Exception:
+            es.indices.delete(index=target, ignore_unavailable=True)
+            raise
+        old_indices = manager.swap_alias(target)
+        if not args.keep_old:
+            manager.delete_indices(old_indices)
 
+    elapsed = time.perf_counter() - started
     print(
-        f"Successfully generated and indexed 1000 employee records in index: {settings.elasticsearch_index}"
+        f"Successfully generated and indexed {total} employee records in index: {target} "
+        f"in {elapsed:.1f}s ({total / elapsed:,.0f} docs/sec)"
     )
 
 
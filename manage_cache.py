@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import json
+from app.core.cache_snapshot import SnapshotReader, export_collection, import_collection
+from app.core.container import ServiceContainer
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export, restore and invalidate the semantic cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="stream the collection into a snapshot directory")
+    export.add_argument("path")
+    export.add_argument("--batch-size", type=int, default=5000)
+
+    restore = sub.add_parser("import", help="bulk-load a snapshot into the collection")
+    restore.add_argument("path")
+    restore.add_argument("--batch-size", type=int, default=10000)
+    restore.add_argument(
+        "--replace", action="store_true", help="drop the collection first and build the index once"
+    )
+    restore.add_argument(
+        "--force", action="store_true", help="import a snapshot taken under another schema version"
+    )
+
+    invalidate = sub.add_parser(
+        "invalidate", help="delete cached entries whose DSL references the given fields"
+    )
+    invalidate.add_argument("fields", nargs="+", help="field paths; parents cover their sub-fields")
+
+    inspect = sub.add_parser("inspect", help="show a snapshot's manifest")
+    inspect.add_argument("path")
+
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """One event loop for the whole command, so the Milvus monitor lives and dies with it"""
+    # Same collection and namespace the service uses for the configured models and schema
+    vector_cache = ServiceContainer.get_instance().get_vector_cache()
+    try:
+        await vector_cache.initialize()
+        if args.command == "invalidate":
+            invalidated = await asyncio.to_thread(vector_cache.invalidate_fields, args.fields)
+            return {"invalidated": invalidated, "namespace": vector_cache.partition}
+        if args.command == "export":
+            return await asyncio.to_thread(
+                export_collection, vector_cache, args.path, batch_size=args.batch_size
+            )
+        return await asyncio.to_thread(
+            import_collection,
+            vector_cache,
+            args.path,
+            batch_size=args.batch_size,
+            replace=args.replace,
+            force=args.force,
+        )
+    finally:
+        await vector_cache.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "inspect":
+        print(json.dumps(SnapshotReader(args.path).manifest, indent=2))
+        return
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
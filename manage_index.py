@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import json
+import urllib.request
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+from app.config import Config
+from app.core.index_manager import IndexManager
+from app.core.rollups import RollupManager
+from app.core.vector_cache import VectorCache
+from app.utils.logger import logger
+
+
+async def cached_queries(limit: int) -> list:
+    """The most recent cached DSL, read in one event loop so the Milvus monitor lives and dies with it"""
+    vector_cache = VectorCache(Config.get_config()["milvus"])
+    try:
+        await vector_cache.initialize()
+        entries = await vector_cache.get_cached_queries(limit)
+        return [entry["es_query"] for entry in entries]
+    finally:
+        await vector_cache.close()
+
+
+def top_queries(api_url: str, limit: int) -> list:
+    """Example DSL of the most executed query shapes, from a running API's query profiler"""
+    url = f"{api_url.rstrip('/')}/api/v1/maintenance/top-queries?limit={limit}"
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return [item["dsl"] for item in json.load(response)["data"]]
+
+
+def load_warm_queries(limit: int, api_url: str = "") -> list:
+    """DSL to warm with: the top queries of a running API, else the most recent cached DSL"""
+    if limit <= 0:
+        return []
+    if api_url:
+        try:
+            queries = top_queries(api_url, limit)
+            if queries:
+                return queries
+            logger.warning(f"{api_url} has no query statistics yet, warming with recent cached queries")
+        except Exception as e:
+            logger.warning(f"Could not read top queries from {api_url}, warming with recent cached queries: {str(e)}")
+    try:
+        return asyncio.run(cached_queries(limit))
+    except Exception as e:
+        logger.warning(f"Skipping warm-up, semantic cache unavailable: {str(e)}")
+        return []
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Manage versioned HR indices behind an alias")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("status", help="show the alias and its versioned indices")
+
+    create = sub.add_parser("create", help="create an empty versioned index")
+    create.add_argument("--profile", default="default")
+
+    migrate = sub.add_parser("migrate", help="reindex into a new version and swap the alias")
+    migrate.add_argument("--profile", default="default")
+    migrate.add_argument("--slices", default="auto", help="reindex slices ('auto' or a number)")
+    migrate.add_argument(
+        "--warm", type=int, default=50, help="number of cached DSL queries to warm with"
+    )
+    migrate.add_argument(
+        "--warm-from",
+        default="http://localhost:8000",
+        help="API whose most executed queries to warm with ('' for recent cached queries)",
+    )
+    migrate.add_argument("--keep-old", action="store_true", help="keep the previous index")
+
+    swap = sub.add_parser("swap", help="point the alias at an existing index")
+    swap.add_argument("index")
+    swap.add_argument("--keep-old", action="store_true", help="keep the previous index")
+
+    derive = sub.add_parser(
+        "derive", help="recompute derived fields (tenure, leave totals, ...); run daily"
+    )
+    derive.add_argument("--index", help="index to update (default: the alias)")
+
+    rollups = sub.add_parser("rollups", help="refresh the aggregate rollup index")
+    rollups.add_argument("--full", action="store_true", help="rebuild every dimension")
+
+    return parser.parse_args(argv)
+
+
+async def refresh_rollups(config: dict, full: bool) -> dict:
+    settings = Config.get_config()["rollups"]
+    es = AsyncElasticsearch(hosts=config["hosts"], request_timeout=120)
+    try:
+        manager = RollupManager(
+            es,
+            config["elasticsearch_index"],
+            settings["index"],
+            full_rebuild_interval=settings["full_rebuild_interval"],
+        )
+        return await manager.refresh(full=full)
+    finally:
+        await es.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = Config.get_config()["elasticsearch"]
+    es = Elasticsearch(hosts=config["hosts"], request_timeout=120)
+    manager = IndexManager(es, config["elasticsearch_index"])
+
+    if args.command == "status":
+        print(json.dumps(manager.status(), indent=2))
+    elif args.command == "create":
+        print(manager.create_index(args.profile))
+    elif args.command == "migrate":
+        slices = int(args.slices) if args.slices.isdigit() else args.slices
+        new_index = manager.migrate(
+            profile_name=args.profile,
+            slices=slices,
+            warm_queries=load_warm_queries(args.warm, args.warm_from),
+            keep_old=args.keep_old,
+        )
+        print(f"Alias {manager.alias} now serves {new_index}")
+    elif args.command == "swap":
+        old_indices = manager.swap_alias(args.index)
+        if not args.keep_old:
+            manager.delete_indices(old_indices)
+        print(f"Alias {manager.alias} now serves {args.index}")
+    elif args.command == "derive":
+        print(json.dumps(manager.refresh_derived(args.index), indent=2))
+    elif args.command == "rollups":
+        print(json.dumps(asyncio.run(refresh_rollups(config, args.full)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import pytest
+
+# Settings require a key at import time; no test talks to OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+
+class FakeResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeChain:
+    """Stands in for prompt | LLM; ``content`` may be an exception to raise"""
+
+    def __init__(self, seconds: float = 0.0, content='{"query": {"match_all": {}}}'):
+        self.seconds = seconds
+        self.content = content
+        self.started = 0
+        self.completed = 0
+
+    async def ainvoke(self, inputs):
+        self.started += 1
+        await asyncio.sleep(self.seconds)
+        if isinstance(self.content, Exception):
+            raise self.content
+        self.completed += 1
+        return FakeResponse(self.content)
+
+
+class FakeEmbedder:
+    def __init__(self, seconds: float = 0.0, error: Exception = None):
+        self.seconds = seconds
+        self.error = error
+        self.calls = 0
+
+    async def embed_query(self, text):
+        self.calls += 1
+        await asyncio.sleep(self.seconds)
+        if self.error is not None:
+            raise self.error
+        return [0.0]
+
+
+class FakeVectorCache:
+    """Exact-text semantic cache; ``entries`` maps a question to its cached entry"""
+
+    partition = "v_default_0"
+
+    def __init__(self, seconds: float = 0.0, entries: dict = None):
+        self.seconds = seconds
+        self.entries = entries or {}
+        self.stored = []
+        self.quarantined = []
+        self.deleted = []
+
+    async def find_entry(self, query, embedding, floor=None):
+        await asyncio.sleep(self.seconds)
+        return self.entries.get(query)
+
+    async def store_query(self, query, embedding, es_query):
+        self.stored.append((query, es_query))
+        return 100 + len(self.stored)
+
+    async def delete_entry(self, entry_id):
+        self.deleted.append(entry_id)
+
+    def quarantine(self, entry_id):
+        self.quarantined.append(entry_id)
+
+
+@pytest.fixture
+def make_agent():
+    """Build a SearchAgent around fakes, without an LLM client; keyword arguments replace parts"""
+    from app.core.admission import AdmissionController
+    from app.core.cache_feedback import CacheFeedback
+    from app.core.deadline import CancellationStats
+    from app.core.degraded import DegradedMode
+    from app.core.local_cache import LocalQueryCache
+    from app.core.search_agent import SearchAgent
+    from app.core.speculation import Speculator
+    from app.core.suggestions import SuggestionIndex
+
+    def build(**parts):
+        agent = SearchAgent.__new__(SearchAgent)
+        agent.chain = FakeChain()
+        agent.embedder = FakeEmbedder()
+        agent.vector_cache = FakeVectorCache()
+        agent.admission = AdmissionController()
+        agent.speculator = Speculator()
+        agent.local_cache = LocalQueryCache()
+        agent.feedback = CacheFeedback()
+        agent.degraded = DegradedMode(enabled=False)
+        agent.cancellations = CancellationStats()
+        agent.suggestions = SuggestionIndex(enabled=False)
+        agent._regenerating = set()
+        agent._calling = set()
+        agent._background = set()
+        for name, part in parts.items():
+            setattr(agent, name, part)
+        return agent
+
+    return build
+
+
+class LegacyTimeoutError(Exception):
+    """asyncio.TimeoutError on Python 3.9 and 3.10, unrelated to the builtin TimeoutError"""
+
+
+@pytest.fixture
+def legacy_timeouts(monkeypatch):
+    """Time out the way asyncio did before 3.11, so handlers for the builtin alone are caught out"""
+    wait_for = asyncio.wait_for
+
+    async def legacy_wait_for(awaitable, timeout):
+        try:
+            return await wait_for(awaitable, timeout)
+        except TimeoutError:
+            raise LegacyTimeoutError() from None
+
+    monkeypatch.setattr(asyncio, "TimeoutError", LegacyTimeoutError)
+    monkeypatch.setattr(asyncio, "wait_for", legacy_wait_for)
@@ -0,0 +1,77 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.admission import AdmissionController, OverloadedError
+from app.middleware.error_handlers import add_error_handlers
+import asyncio
+import pytest
+
+
+def test_concurrency_is_bounded_and_queue_overflow_is_rejected():
+    admission = AdmissionController(max_concurrency=2, max_queue=1, queue_timeout=1)
+    release = asyncio.Event()
+    peak = {"active": 0}
+
+    async def generate():
+        async with admission.admit():
+            peak["active"] = max(peak["active"], admission.get_stats()["active"])
+            await release.wait()
+
+    async def scenario():
+        running = [asyncio.create_task(generate()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert not admission.has_capacity()
+        assert admission.get_stats()["queue_depth"] == 1
+
+        with pytest.raises(OverloadedError) as rejected:
+            await generate()
+        release.set()
+        await asyncio.gather(*running)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429
+    assert rejected.retry_after >= 1
+    stats = admission.get_stats()
+    assert peak["active"] == 2
+    assert stats["admitted"] == 3
+    assert stats["rejected_queue_full"] == 1
+    assert stats["max_queue_depth_seen"] == 1
+    assert stats["active"] == stats["queue_depth"] == 0
+
+
+def test_queued_request_times_out_with_503():
+    admission = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=0.02)
+
+    async def scenario():
+        async with admission.admit():
+            with pytest.raises(OverloadedError) as timed_out:
+                async with admission.admit():
+                    pass
+        return timed_out.value
+
+    timed_out = asyncio.run(scenario())
+    assert timed_out.status_code == 503
+    assert admission.rejected_timeout == 1
+    assert admission.has_capacity()
+
+
+def test_retry_after_grows_with_the_queue():
+    admission = AdmissionController(max_concurrency=2)
+    admission._avg_seconds = 3.0
+    assert admission.retry_after() == 2
+    admission._waiting = 5
+    assert admission.retry_after() == 9
+
+
+def test_overload_is_served_with_retry_after_header():
+    app = FastAPI()
+    add_error_handlers(app)
+
+    @app.get("/generate")
+    async def generate():
+        raise OverloadedError(429, 7, "LLM queue is full")
+
+    response = TestClient(app).get("/generate")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "7"
+    assert response.json() == {"detail": "LLM queue is full"}
@@ -0,0 +1,92 @@
+from elasticsearch import ConnectionError as ESConnectionError
+from app.core.cache_feedback import CacheFeedback, KnownBadQueryError, summarize_response
+import asyncio
+import json
+import pytest
+import time
+
+ENTRY = {"id": 5, "query_text": "engineers", "es_query": {"query": {"term": {"dept": "Eng"}}}}
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def test_summary_reads_raw_and_parsed_responses():
+    raw = b'{"took":17,"timed_out":false,"hits":{"total":{"value":0,"relation":"eq"},"hits":[]}}'
+    assert summarize_response(raw) == (17, 0)
+    assert summarize_response({"took": 3, "hits": {"total": {"value": 9}}}) == (3, 9)
+    assert summarize_response(b"{}") == (None, None)
+
+
+def test_quarantine_reasons():
+    feedback = CacheFeedback(latency_budget_ms=100, max_errors=2, max_slow=2)
+    assert feedback.record_error(1, "q", 400, "parsing_exception").startswith("rejected")
+    assert feedback.record_error(2, "q", 500, "shard failure") is None
+    assert feedback.record_error(2, "q", 503, "shard failure").startswith("failed 2 times")
+    assert feedback.record_success(3, "q", 150, 10) is None
+    assert "over the 100ms budget" in feedback.record_success(3, "q", 150, 10)
+    # Empty results are tracked, never quarantined
+    for _ in range(5):
+        assert feedback.record_success(4, "q", 5, 0) is None
+    assert [e["id"] for e in feedback.get_stats()["worst_entries"]] == [2, 1, 3]
+
+
+def test_negative_cache_expires_and_is_bounded():
+    feedback = CacheFeedback(negative_ttl=60, max_negative=2)
+    feedback.add_negative("Bad question", "no valid query")
+    with pytest.raises(KnownBadQueryError) as known:
+        feedback.check_negative("  bad QUESTION ")
+    assert known.value.status_code == 422 and known.value.retry_after == 60
+
+    feedback.add_negative("second", "x")
+    feedback.add_negative("third", "x")
+    stats = feedback.get_stats()
+    assert stats["negative_cache_size"] == 2 and stats["negative_cache_evicted"] == 1
+    feedback.check_negative("bad question")
+
+    feedback._negative["third"] = (time.monotonic() - 1, "x")
+    feedback.check_negative("third")
+    assert "third" not in feedback._negative
+
+
+def test_invalid_dsl_is_not_regenerated_for_the_same_question(make_agent):
+    agent = make_agent()
+    agent.chain.content = "not json"
+
+    async def scenario():
+        with pytest.raises(json.JSONDecodeError):
+            await agent.generate_es_query("nonsense")
+        with pytest.raises(KnownBadQueryError):
+            await agent.generate_es_query("Nonsense")
+
+    asyncio.run(scenario())
+    assert agent.chain.started == 1
+    assert agent.feedback.get_stats()["negative_cache_hits"] == 1
+
+
+def test_rejected_entry_is_quarantined_and_regenerated(make_agent):
+    agent = make_agent()
+    agent.local_cache.put(ENTRY["query_text"], ENTRY["es_query"], ENTRY["id"])
+    metrics = {"cache_entry": ENTRY}
+
+    async def scenario():
+        agent.report_execution(metrics, error=BadRequest("parsing_exception"))
+        # Already regenerating: a second report does not start another
+        agent.report_execution(metrics, error=BadRequest("parsing_exception"))
+        await asyncio.gather(*agent._background)
+
+    asyncio.run(scenario())
+    assert agent.vector_cache.quarantined == [ENTRY["id"]]
+    assert ENTRY["query_text"] not in agent.local_cache
+    assert agent.vector_cache.deleted == [ENTRY["id"]]
+    assert agent.vector_cache.stored == [(ENTRY["query_text"], {"query": {"match_all": {}}})]
+    assert agent.feedback.regenerated == 1 and agent.chain.started == 1
+
+
+def test_unreachable_cluster_is_not_the_entrys_fault(make_agent):
+    agent = make_agent()
+    for _ in range(5):
+        agent.report_execution({"cache_entry": ENTRY}, error=ESConnectionError("refused"))
+    assert agent.feedback.get_stats()["tracked_entries"] == 0
+    assert agent.vector_cache.quarantined == []
@@ -0,0 +1,164 @@
+from app.core.cache_namespace import references_fields, schema_version
+from app.core.suggestions import SuggestionIndex
+from app.core.vector_cache import VectorCache
+from datetime import datetime
+import asyncio
+import json
+import re
+
+NOW = int(datetime.now().timestamp())
+DAY = 24 * 3600
+
+
+class FakePartition:
+    def __init__(self, name, rows=()):
+        self.name = name
+        self.rows = list(rows)
+        self.released = False
+
+    @property
+    def num_entities(self):
+        return len(self.rows)
+
+    def load(self):
+        pass
+
+    def release(self):
+        self.released = True
+
+
+class FakeIterator:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def next(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeCollection:
+    """Partitions of rows with id, created_at and es_query, queried the way the cache does"""
+
+    def __init__(self, partitions):
+        self._partitions = {name: FakePartition(name, rows) for name, rows in partitions.items()}
+        self.flushes = 0
+
+    @property
+    def partitions(self):
+        return list(self._partitions.values())
+
+    def partition(self, name):
+        return self._partitions.get(name)
+
+    def create_partition(self, name):
+        self._partitions[name] = FakePartition(name)
+        return self._partitions[name]
+
+    def drop_partition(self, name):
+        del self._partitions[name]
+
+    def query(self, expr, output_fields, partition_names, limit):
+        cutoff = int(re.fullmatch(r"created_at >= (\d+)", expr).group(1))
+        rows = self._partitions[partition_names[0]].rows
+        return [{"id": row["id"]} for row in rows if row["created_at"] >= cutoff][:limit]
+
+    def query_iterator(self, batch_size, expr, output_fields, partition_names):
+        return FakeIterator(self._partitions[partition_names[0]].rows)
+
+    def delete(self, expr, partition_name):
+        ids = set(json.loads(expr[len("id in "):]))
+        partition = self._partitions[partition_name]
+        partition.rows = [row for row in partition.rows if row["id"] not in ids]
+
+    def flush(self):
+        self.flushes += 1
+
+
+def cache(partitions, grace=DAY) -> VectorCache:
+    # Bypass the process-wide singleton
+    vector_cache = object.__new__(VectorCache)
+    vector_cache.__init__({
+        "host": "localhost", "port": 19530, "schema_version": "new", "namespace_grace_period": grace,
+    }, suggestions=SuggestionIndex())
+    vector_cache.collection = FakeCollection(partitions)
+    return vector_cache
+
+
+def row(entry_id, age=0, dsl=None):
+    return {"id": entry_id, "created_at": NOW - age, "es_query": json.dumps(dsl or {})}
+
+
+def test_newest_generation_is_used_and_only_older_ones_retire():
+    vector_cache = cache({"v_new_0": [], "v_new_2": [], "v_old_5": [], "_default": []})
+    assert vector_cache._select_partition() == ["v_new_0"]
+    assert vector_cache.partition == "v_new_2"
+
+    fresh = cache({"v_old_0": []})
+    assert fresh._select_partition() == []
+    assert fresh.partition == "v_new_0" and fresh.collection.partition("v_new_0")
+
+
+def test_other_schema_versions_retire_only_once_idle():
+    vector_cache = cache({
+        "v_new_0": [row(1, age=2 * DAY)],
+        "v_old_0": [row(2, age=2 * DAY), row(3, age=60)],
+        "v_older_0": [row(4, age=2 * DAY)],
+        "_default": [],
+    })
+    vector_cache._select_partition()
+    idle = vector_cache._idle_partitions()
+    assert idle == ["v_older_0", "_default"]
+
+    vector_cache._drop_partitions(idle)
+    assert [p.name for p in vector_cache.collection.partitions] == ["v_new_0", "v_old_0", "_default"]
+
+
+def test_clear_switches_namespace_and_drops_the_old_one():
+    vector_cache = cache({"v_new_0": [row(1)]})
+    vector_cache._select_partition()
+    vector_cache.quarantined.add(1)
+
+    async def scenario():
+        await vector_cache.clear()
+        assert vector_cache.partition == "v_new_1"
+        await asyncio.gather(*vector_cache._background)
+
+    asyncio.run(scenario())
+    assert [p.name for p in vector_cache.collection.partitions] == ["v_new_1"]
+    assert not vector_cache.quarantined
+
+
+def test_follows_a_clear_made_by_another_process():
+    vector_cache = cache({"v_new_0": []})
+    vector_cache._select_partition()
+    assert not vector_cache.sync_partition()
+    vector_cache.collection.create_partition("v_new_1")
+    assert vector_cache.sync_partition()
+    assert vector_cache.partition == "v_new_1"
+
+
+def test_invalidation_deletes_only_entries_touching_the_fields():
+    salary = {"query": {"range": {"salary_info.base_salary": {"gte": 1}}}}
+    department = {"query": {"term": {"employment_details.department.name": "Sales"}}}
+    whole_object = {"query": {"exists": {"field": "salary_info"}}}
+    vector_cache = cache({"v_new_0": [row(1, dsl=salary), row(2, dsl=department), row(3, dsl=whole_object)]})
+    vector_cache._select_partition()
+    for entry_id in (1, 2, 3):
+        vector_cache.suggestions.add(entry_id, f"question {entry_id}", NOW)
+
+    assert vector_cache.invalidate_fields(["salary_info.base_salary"]) == 2
+    assert [r["id"] for r in vector_cache.collection.partition("v_new_0").rows] == [2]
+    assert vector_cache.collection.flushes == 1
+    assert [s["query"] for s in vector_cache.suggestions.suggest("question")] == ["question 2"]
+
+
+def test_references_fields_and_schema_versions():
+    dsl = {"query": {"nested": {"path": "leave_records", "query": {"term": {"leave_records.leave_type": "sick"}}}}}
+    assert references_fields(dsl, ["leave_records.leave_type"])
+    assert references_fields(dsl, ["leave_records"])
+    assert not references_fields(dsl, ["salary_info"])
+    assert schema_version("gpt-4o", "openai") == schema_version("gpt-4o", "openai")
+    assert schema_version("gpt-4o", "openai") != schema_version("gpt-4o-mini", "openai")
@@ -0,0 +1,162 @@
+from app.core.cache_snapshot import SnapshotReader, export_collection, import_collection, load_local_cache
+from app.core.local_cache import LocalQueryCache
+from app.core.vector_codec import VectorCodec
+import json
+import numpy as np
+import pytest
+
+DIM = 16
+
+
+class FakeIterator:
+    def __init__(self, rows, batch_size):
+        self.batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+
+    def next(self):
+        return self.batches.pop(0) if self.batches else []
+
+    def close(self):
+        pass
+
+
+class FakeCollection:
+    def __init__(self, codec, rows=()):
+        self.codec = codec
+        self.rows = list(rows)
+        self.inserted = []
+        self.flushes = 0
+
+    def query_iterator(self, batch_size, expr, output_fields, partition_names):
+        return FakeIterator(self.rows, batch_size)
+
+    def insert(self, columns, partition_name):
+        self.inserted.append((columns, partition_name))
+
+    def flush(self):
+        self.flushes += 1
+
+    def load(self):
+        pass
+
+
+class FakeVectorCache:
+    collection_name = "query_cache"
+    schema_version = "abc123"
+
+    def __init__(self, codec, rows=(), partition="v_abc123_0"):
+        self.codec = codec
+        self.dimension = codec.dim
+        self.partition = partition
+        self.collection = FakeCollection(codec, rows)
+        self.recreated = self.indexed = False
+
+    def _partition_prefix(self):
+        return f"v_{self.schema_version}_"
+
+    def recreate_collection(self):
+        self.recreated = True
+
+    def _create_index(self):
+        self.indexed = True
+
+
+def entries(codec, count):
+    vectors = np.random.default_rng(3).normal(size=(count, DIM)).astype(np.float32)
+    field = codec.encode(vectors)[-1]
+    rows = [
+        {
+            "id": 1000 + i,
+            codec.full_field: field[i],
+            "query_text": f"question {i}",
+            "es_query": json.dumps({"query": {"term": {"n": i}}}),
+            "created_at": 1_700_000_000 + i,
+        }
+        for i in range(count)
+    ]
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True), rows
+
+
+@pytest.mark.parametrize("quantization", ["none", "float16", "binary"])
+def test_export_import_round_trip(tmp_path, quantization):
+    codec = VectorCodec(DIM, quantization)
+    vectors, rows = entries(codec, 7)
+    source = FakeVectorCache(codec, rows)
+
+    manifest = export_collection(source, str(tmp_path), batch_size=3)
+    assert manifest["count"] == 7 and manifest["namespace"] == "v_abc123_0"
+    reader = SnapshotReader(str(tmp_path))
+    assert reader.vectors.dtype == np.float16 and reader.vectors.shape == (7, DIM)
+    assert [row["id"] for row in reader.rows()] == [row["id"] for row in rows]
+
+    target = FakeVectorCache(codec, partition="v_abc123_4")
+    assert import_collection(target, str(tmp_path), batch_size=4, replace=True)["imported"] == 7
+    assert target.recreated and target.indexed and target.collection.flushes == 1
+    assert [len(columns[-1]) for columns, _ in target.collection.inserted] == [4, 3]
+    assert {partition for _, partition in target.collection.inserted} == {"v_abc123_4"}
+    # The full-precision vectors are the last vector column, before question, DSL and time
+    imported = np.stack([
+        codec.decode(v) for columns, _ in target.collection.inserted for v in columns[-4]
+    ])
+    np.testing.assert_allclose(imported, vectors, atol=2e-3)
+    questions = [q for columns, _ in target.collection.inserted for q in columns[-3]]
+    assert questions == [row["query_text"] for row in rows]
+
+
+def test_import_rejects_another_dimension(tmp_path):
+    codec = VectorCodec(DIM)
+    export_collection(FakeVectorCache(codec, entries(codec, 2)[1]), str(tmp_path))
+    with pytest.raises(ValueError, match="dimension"):
+        import_collection(FakeVectorCache(VectorCodec(8)), str(tmp_path))
+
+
+def test_import_refuses_another_schema_version_unless_forced(tmp_path):
+    codec = VectorCodec(DIM)
+    export_collection(FakeVectorCache(codec, entries(codec, 2)[1]), str(tmp_path))
+    target = FakeVectorCache(codec, partition="v_def456_0")
+    target.schema_version = "def456"
+    with pytest.raises(ValueError, match="schema version def456"):
+        import_collection(target, str(tmp_path), replace=True)
+    # Refused before anything was dropped
+    assert not target.recreated and not target.collection.inserted
+    assert import_collection(target, str(tmp_path), force=True)["imported"] == 2
+
+
+def test_local_cache_warms_from_the_newest_entries_without_ids(tmp_path):
+    codec = VectorCodec(DIM)
+    source = FakeVectorCache(codec, entries(codec, 5)[1])
+    export_collection(source, str(tmp_path))
+    cache = LocalQueryCache(max_entries=3)
+
+    assert load_local_cache(cache, str(tmp_path), source) == 3
+    assert list(cache._entries) == ["question 2", "question 3", "question 4"]
+    assert cache.get("question 4")["es_query"] == {"query": {"term": {"n": 4}}}
+    # Snapshot ids mean nothing once restored elsewhere
+    assert {entry["id"] for entry in cache._entries.values()} == {None}
+    assert cache.namespace == "v_abc123_0"
+
+
+def test_local_cache_skips_snapshots_of_another_schema_version(tmp_path):
+    codec = VectorCodec(DIM)
+    source = FakeVectorCache(codec, entries(codec, 2)[1])
+    export_collection(source, str(tmp_path))
+    source.schema_version = "def456"
+    cache = LocalQueryCache()
+    assert load_local_cache(cache, str(tmp_path), source) == 0
+    assert len(cache) == 0
+
+
+def test_local_cache_skips_generations_that_are_not_current(tmp_path):
+    codec = VectorCodec(DIM)
+    source = FakeVectorCache(codec, entries(codec, 2)[1])
+    export_collection(source, str(tmp_path))
+    cache = LocalQueryCache()
+
+    # Cleared since the export
+    source.partition = "v_abc123_1"
+    assert load_local_cache(cache, str(tmp_path), source) == 0
+
+    # Warmed before Milvus is up: dropped once the current namespace is known
+    source.partition = None
+    assert load_local_cache(cache, str(tmp_path), source) == 2
+    cache.set_namespace("v_abc123_1")
+    assert len(cache) == 0
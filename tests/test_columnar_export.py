@@ -0,0 +1,107 @@
+from app.core.columnar_export import ColumnarExporter, _coerce_date, export_body
+from generate_test_data import generate_batch
+from datetime import datetime
+import asyncio
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+DOCS = generate_batch(1, 6, 6, 7)
+HITS = [{"_id": doc["employee_id"], "_source": doc} for doc in DOCS]
+
+
+async def pages(size=4):
+    for start in range(0, len(HITS), size):
+        yield HITS[start:start + size]
+
+
+def collect(exporter, fmt) -> bytes:
+    async def scenario():
+        return b"".join([chunk async for chunk in exporter.stream(pages(), fmt)])
+
+    return asyncio.run(scenario())
+
+
+def test_export_body_keeps_only_the_filtering_parts():
+    dsl = {"query": {"term": {"a": 1}}, "size": 10, "sort": ["b"], "aggs": {"x": {}}}
+    assert export_body(dsl) == {"query": {"term": {"a": 1}}}
+    assert export_body({"size": 0}, ["employee_id"]) == {
+        "query": {"match_all": {}}, "_source": {"includes": ["employee_id"]},
+    }
+
+
+def test_selected_fields_become_typed_columns():
+    exporter = ColumnarExporter(["employee_id", "employment_details.hire_date", "branch.location"])
+    assert exporter.source_fields == ["employee_id", "employment_details.hire_date", "branch.location"]
+    batch = exporter.to_batch(HITS)
+    assert batch.schema.names == [
+        "_id", "employee_id", "employment_details.hire_date", "branch.location.lat", "branch.location.lon",
+    ]
+    assert batch.schema.field("employment_details.hire_date").type == pa.timestamp("us")
+    assert batch.column("employment_details.hire_date")[0].as_py() == datetime.fromisoformat(
+        DOCS[0]["employment_details"]["hire_date"]
+    )
+    assert batch.column("branch.location.lat").to_pylist() == [d["branch"]["location"]["lat"] for d in DOCS]
+
+
+def test_nested_table_has_one_row_per_record():
+    exporter = ColumnarExporter(table="salary_info.salary_history")
+    batch = exporter.to_batch(HITS)
+    expected = [
+        (doc["employee_id"], record["amount"])
+        for doc in DOCS for record in doc["salary_info"]["salary_history"]
+    ]
+    assert batch.column("employee_id").to_pylist() == [employee for employee, _ in expected]
+    # Mapped as float, so compared at float32 precision
+    assert batch.column("salary_info.salary_history.amount").to_pylist() == pytest.approx(
+        [amount for _, amount in expected], rel=1e-6
+    )
+    with pytest.raises(ValueError, match="Unknown table"):
+        ColumnarExporter(table="address")
+
+
+def test_unusual_values_fall_back_to_per_value_conversion():
+    exporter = ColumnarExporter(["employee_id", "employment_details.hire_date", "salary_info.base_salary"])
+    batch = exporter.to_batch([{"_id": "x", "_source": {
+        "employee_id": ["E1", "E2"],
+        "employment_details": {"hire_date": 1_600_000_000_000},
+        "salary_info": {"base_salary": "95000"},
+    }}])
+    assert batch.to_pylist() == [{
+        "_id": "x",
+        "employee_id": "E1; E2",
+        "employment_details.hire_date": datetime(2020, 9, 13, 12, 26, 40),
+        "salary_info.base_salary": 95000.0,
+    }]
+    assert _coerce_date("2024-01-01T10:00:00+02:00") == "2024-01-01T08:00:00"
+    assert _coerce_date("not a date") is None
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_streamed_files_read_back(fmt):
+    exporter = ColumnarExporter(["employee_id", "salary_info.base_salary"])
+    data = collect(exporter, fmt)
+    if fmt == "arrow":
+        table = pa.ipc.open_stream(data).read_all()
+    else:
+        table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == len(DOCS)
+    assert table.column("employee_id").to_pylist() == [d["employee_id"] for d in DOCS]
+    assert table.column("salary_info.base_salary").to_pylist() == [
+        float(d["salary_info"]["base_salary"]) for d in DOCS
+    ]
+
+
+def test_missing_pyarrow_is_reported_with_the_reason(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.api.v1 import search as search_api
+    from app.core import columnar_export
+    from app.main import app
+
+    monkeypatch.setattr(columnar_export, "pa", None)
+    monkeypatch.setattr(columnar_export, "IMPORT_ERROR", "numpy.core.multiarray failed to import")
+    monkeypatch.setitem(app.dependency_overrides, search_api.get_services, lambda: (None, None, None))
+    response = TestClient(app).post("/api/v1/search/export", json={"query": "engineers", "format": "arrow"})
+    assert response.status_code == 501
+    assert "numpy.core.multiarray failed to import" in response.json()["detail"]
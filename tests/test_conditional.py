@@ -0,0 +1,227 @@
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+from app.api.v1 import search as search_api
+from app.core.conditional import (
+    ConditionalStats,
+    IndexChangeMarker,
+    date_math_bucket,
+    if_none_match,
+    search_etag,
+)
+from app.main import app
+from app.utils.json_utils import dumps
+import asyncio
+import pytest
+
+DSL = {"query": {"term": {"employment_details.department": "Engineering"}}, "size": 10}
+
+
+class FakeIndices:
+    def __init__(self, seconds=0.0):
+        self.seconds = seconds
+        self.writes = 0
+        self.uuid = "first"
+        self.error = None
+        self.calls = 0
+
+    async def stats(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.seconds)
+        if self.error is not None:
+            raise self.error
+        return {
+            "_all": {"primaries": {"indexing": {"index_total": self.writes, "delete_total": 0},
+                                   "refresh": {"external_total": self.writes}}},
+            "indices": {"hr_v1": {"uuid": self.uuid}},
+        }
+
+
+class FakeES:
+    def __init__(self, seconds=0.0):
+        self.indices = FakeIndices(seconds)
+        self.searches = 0
+
+    def options(self, **kwargs):
+        return self
+
+    async def search(self, body):
+        self.searches += 1
+        return {"took": 3, "hits": {"total": {"value": 1, "relation": "eq"}, "hits": [{"_id": "E1"}]}}
+
+    async def search_raw(self, body):
+        return dumps(await self.search(body))
+
+
+def test_etag_depends_on_the_dsl_and_the_state_markers():
+    etag = search_etag(DSL, "marker", "v_default_0")
+    assert etag.startswith('W/"') and len(etag) == 36
+    # Key order does not matter
+    assert search_etag(dict(reversed(DSL.items())), "marker", "v_default_0") == etag
+    assert search_etag({**DSL, "size": 20}, "marker", "v_default_0") != etag
+    assert search_etag(DSL, "changed", "v_default_0") != etag
+    assert search_etag(DSL, "marker", "v_default_1") != etag
+
+
+def test_date_math_is_bucketed_by_its_finest_rounding():
+    now = datetime.now(timezone.utc)
+    assert date_math_bucket('{"gte":"2024-01-01"}') == ""
+    assert date_math_bucket('{"gte":"now-1y/M","lt":"now/d"}') == now.strftime("%Y-%m-%d")
+    assert date_math_bucket('{"gte":"now-7d/d","lt":"now+1h/h"}') == now.strftime("%Y-%m-%dT%H")
+    # Unrounded now changes constantly: not cacheable
+    assert date_math_bucket('{"gte":"now-7d/d","lt":"now"}') is None
+    assert search_etag({"query": {"range": {"hire_date": {"gte": "now-30d"}}}}, "marker") is None
+    assert search_etag({"query": {"range": {"hire_date": {"gte": "now-30d/d"}}}}, "marker") is not None
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = 'W/"abc"'
+    assert if_none_match('W/"abc"', etag)
+    assert if_none_match('"abc"', etag)
+    assert if_none_match('W/"xyz", "abc"', etag)
+    assert if_none_match("*", etag)
+    assert not if_none_match('W/"xyz"', etag)
+    assert not if_none_match(None, etag) and not if_none_match("", etag)
+
+
+def test_marker_changes_with_writes_and_index_swaps():
+    es = FakeES()
+    marker = IndexChangeMarker(es, "hr", ttl=0)
+
+    async def main():
+        first = await marker.current()
+        assert await marker.current() == first
+        es.indices.writes += 1
+        second = await marker.current()
+        es.indices.uuid = "second"
+        third = await marker.current()
+        return first, second, third
+
+    first, second, third = asyncio.run(main())
+    assert len({first, second, third}) == 3
+    assert marker.changes == 2
+
+
+def test_marker_is_cached_and_concurrent_callers_share_one_read():
+    es = FakeES(seconds=0.05)
+    marker = IndexChangeMarker(es, "hr", ttl=60)
+
+    async def main():
+        values = await asyncio.gather(*(marker.current() for _ in range(5)))
+        es.indices.writes += 1
+        # Within the TTL the stale value is served
+        return values, await marker.current()
+
+    values, cached = asyncio.run(main())
+    assert len(set(values)) == 1 and cached == values[0]
+    assert es.indices.calls == 1
+
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_read():
+    es = FakeES(seconds=0.05)
+    marker = IndexChangeMarker(es, "hr")
+
+    async def main():
+        cancelled = asyncio.create_task(marker.current())
+        waiting = asyncio.create_task(marker.current())
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        return await waiting
+
+    assert asyncio.run(main()) is not None
+    assert es.indices.calls == 1
+
+
+def test_marker_is_none_when_stats_fail():
+    es = FakeES()
+    es.indices.error = ConnectionError("stats unavailable")
+    marker = IndexChangeMarker(es, "hr", ttl=60)
+    assert asyncio.run(marker.current()) is None
+    assert marker.failures == 1
+    # A failure is not cached
+    es.indices.error = None
+    assert asyncio.run(marker.current()) is not None
+
+
+def test_stats_count_what_not_modified_responses_saved():
+    stats = ConditionalStats(max_tracked=1)
+    stats.record_full('W/"a"', 1000, 0.02, conditional=False)
+    stats.record_not_modified('W/"a"')
+    stats.record_not_modified('W/"a"')
+    stats.record_full('W/"b"', 500, 0.01, conditional=True)
+    # Evicted: counted, but nothing known to be saved
+    stats.record_not_modified('W/"a"')
+    result = stats.get_stats()
+    assert result["not_modified"] == 3 and result["conditional_requests"] == 4
+    assert result["bytes_saved"] == 2000
+    assert result["execution_seconds_saved"] == 0.04
+    assert result["not_modified_rate"] == "75.00%"
+
+
+class FakeAgent:
+    def __init__(self, dsl):
+        self.dsl = dsl
+
+    async def generate_es_query(self, query):
+        return dict(self.dsl), {"cache_hit": True, "tier": "local_cache"}
+
+    def report_execution(self, *args, **kwargs):
+        pass
+
+
+class FakeCache:
+    partition = "v_default_0"
+
+
+class FakeProfiler:
+    def observe(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def search(monkeypatch):
+    es = FakeES()
+    marker = IndexChangeMarker(es, "hr", ttl=0)
+    agent = FakeAgent(DSL)
+    monkeypatch.setattr(app, "dependency_overrides", {
+        search_api.get_services: lambda: (es, FakeCache(), agent),
+        search_api.get_rollups: lambda: None,
+        search_api.get_profiler: FakeProfiler,
+        search_api.get_change_marker: lambda: marker,
+    })
+    client = TestClient(app)
+
+    def post(etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return client.post("/api/v1/search", json={"query": "engineers"}, headers=headers)
+
+    post.es, post.agent = es, agent
+    return post
+
+
+def test_matching_if_none_match_is_answered_without_searching(search):
+    full = search()
+    assert full.status_code == 200 and full.json()["results"]["hits"]["hits"] == [{"_id": "E1"}]
+    etag = full.headers["etag"]
+    searches = search.es.searches
+
+    response = search(etag)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag and response.content == b""
+    assert search.es.searches == searches
+
+
+def test_a_write_to_the_index_invalidates_the_etag(search):
+    etag = search().headers["etag"]
+    search.es.indices.writes += 1
+    response = search(etag)
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_responses_are_not_tagged_when_they_cannot_be_validated(search):
+    search.es.indices.error = ConnectionError("stats unavailable")
+    assert "etag" not in search().headers
+    search.es.indices.error = None
+    search.agent.dsl = {"query": {"range": {"employment_details.hire_date": {"gte": "now-30d"}}}}
+    response = search('W/"anything"')
+    assert response.status_code == 200 and "etag" not in response.headers
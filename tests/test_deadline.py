@@ -0,0 +1,142 @@
+from app.core.deadline import CancellationStats, Deadline, DeadlineExceededError, deadline_var
+from app.core.degraded import DegradedMode
+from app.middleware.deadline import DeadlineMiddleware
+import asyncio
+import pytest
+import time
+
+
+def test_deadline_from_header_is_clamped():
+    assert Deadline.from_header("250", default=30, maximum=120).seconds == 0.25
+    assert Deadline.from_header("soon", default=30, maximum=120).seconds == 30
+    assert Deadline.from_header(None, default=30, maximum=120).seconds == 30
+    assert Deadline.from_header("600000", default=30, maximum=120).seconds == 120
+    assert Deadline.from_header("-5", default=30, maximum=120).seconds == 0
+
+
+def test_expired_deadline_names_the_stage():
+    deadline = Deadline(0)
+    with pytest.raises(DeadlineExceededError) as exceeded:
+        deadline.timeout("elasticsearch")
+    assert exceeded.value.stage == "elasticsearch" and exceeded.value.status_code == 504
+    assert 0 < Deadline(5).timeout("llm") <= 5
+
+
+def test_deadline_shorter_than_the_budget_is_not_degraded():
+    async def scenario():
+        token = deadline_var.set(Deadline(0.02))
+        try:
+            await DegradedMode(latency_budget=5).within_budget(asyncio.sleep(1), time.perf_counter(), "llm")
+        finally:
+            deadline_var.reset(token)
+
+    with pytest.raises(DeadlineExceededError, match="during llm"):
+        asyncio.run(scenario())
+
+
+def test_expired_deadline_fails_the_search_with_a_deadline_error(make_agent, legacy_timeouts):
+    agent = make_agent(degraded=DegradedMode(latency_budget=5))
+    agent.chain.seconds = 1
+
+    async def scenario():
+        token = deadline_var.set(Deadline(0.05))
+        try:
+            await agent.generate_es_query("who joined last week")
+        finally:
+            deadline_var.reset(token)
+            await asyncio.gather(*agent._background)
+
+    # A 504 rather than a generic search failure
+    with pytest.raises(DeadlineExceededError, match="during llm"):
+        asyncio.run(scenario())
+    assert agent.degraded.llm.failures == 0
+    assert agent.cancellations.llm_kept == 1
+
+
+def run_middleware(app, disconnect_after: float, headers=()):
+    """Drive the middleware as a server would: the body, then a disconnect"""
+    stats = CancellationStats()
+    middleware = DeadlineMiddleware(app, stats)
+    sent = []
+
+    async def scenario():
+        messages = asyncio.Queue()
+        await messages.put({"type": "http.request", "body": b"{}", "more_body": False})
+
+        async def disconnect():
+            await asyncio.sleep(disconnect_after)
+            await messages.put({"type": "http.disconnect"})
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.create_task(disconnect())
+        scope = {"type": "http", "path": "/api/v1/search", "headers": list(headers)}
+        await middleware(scope, messages.get, send)
+
+    asyncio.run(scenario())
+    return stats, sent
+
+
+def test_client_disconnect_cancels_the_handler():
+    progress = {}
+
+    async def app(scope, receive, send):
+        await receive()
+        deadline_var.get().stage = "llm"
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            progress["cancelled"] = True
+            raise
+
+    stats, sent = run_middleware(app, disconnect_after=0.02)
+    assert progress == {"cancelled": True}
+    assert sent == []
+    assert stats.get_stats()["disconnects_by_stage"] == {"llm": 1}
+
+
+def test_disconnect_after_the_response_is_not_counted():
+    async def app(scope, receive, send):
+        await receive()
+        assert deadline_var.get().seconds == 0.5
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    stats, sent = run_middleware(app, disconnect_after=0, headers=[(b"x-request-timeout-ms", b"500")])
+    assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+    assert stats.get_stats()["disconnects"] == 0
+
+
+def test_disconnect_during_the_llm_call_keeps_the_generation_for_the_cache(make_agent):
+    agent = make_agent()
+    agent.chain.seconds = 0.05
+
+    async def scenario():
+        request = asyncio.create_task(agent.generate_es_query("who joined last week"))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        await asyncio.gather(request, return_exceptions=True)
+        await asyncio.gather(*agent._background)
+
+    asyncio.run(scenario())
+    stats = agent.cancellations.get_stats()
+    assert stats["llm_kept"] == 1 and stats["llm_kept_cached"] == 1
+    assert agent.vector_cache.stored == [("who joined last week", {"query": {"match_all": {}}})]
+
+
+def test_disconnect_while_queued_for_the_llm_cancels_the_generation(make_agent):
+    from app.core.admission import AdmissionController
+
+    agent = make_agent(admission=AdmissionController(max_concurrency=1))
+
+    async def scenario():
+        async with agent.admission.admit():
+            request = asyncio.create_task(agent.generate_es_query("who joined last week"))
+            await asyncio.sleep(0.01)
+            request.cancel()
+            await asyncio.gather(request, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert agent.cancellations.llm_cancelled == 1
+    assert agent.chain.started == 0 and agent.vector_cache.stored == []
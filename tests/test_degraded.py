@@ -0,0 +1,109 @@
+from app.core.degraded import CircuitBreaker, DegradedMode
+from app.core.rule_compiler import RuleCompiler
+import asyncio
+import pytest
+import time
+
+CANDIDATE = {
+    "id": 3, "query_text": "engineers in london", "similarity": 0.78, "below_threshold": True,
+    "es_query": {"query": {"term": {"branch.city": "London"}}},
+}
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker("llm", failure_threshold=2, reset_timeout=30, slow_call=1)
+    breaker.record_failure("timeout")
+    assert breaker.allow()
+    # A slow success is a failure too
+    breaker.record_success(5)
+    assert breaker.state == "open" and not breaker.allow() and breaker.rejected == 1
+
+    breaker._opened_at = time.monotonic() - 31
+    assert breaker.allow() and breaker.state == "half_open"
+    # One probe at a time
+    assert not breaker.allow()
+    breaker.record_failure("still down")
+    assert breaker.state == "open" and breaker.trips == 2
+
+    breaker._opened_at = time.monotonic() - 31
+    assert breaker.allow()
+    breaker.record_success(0.2)
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_rules_cover_common_questions():
+    rules = RuleCompiler()
+    counted = rules.compile("How many software engineers in Engineering earn over 90k?")
+    assert counted["size"] == 0 and counted["track_total_hits"] is True
+    assert counted["query"]["bool"]["filter"] == [
+        {"term": {"employment_details.position": "Software Engineer"}},
+        {"term": {"employment_details.department.name": "Engineering"}},
+        {"range": {"salary_info.base_salary": {"gt": 90000.0}}},
+    ]
+    hired = rules.compile("women in HR hired after 2020")["query"]["bool"]["filter"]
+    assert {"range": {"employment_details.hire_date": {"gte": "2021-01-01"}}} in hired
+    assert rules.compile("what is the weather") is None
+
+
+def test_fallback_tiers_best_first():
+    degraded = DegradedMode()
+    assert degraded.fallback("anything", CANDIDATE) == (CANDIDATE["es_query"], "cached_below_threshold")
+    assert degraded.fallback("employees on sick leave", None)[1] == "rules"
+    dsl, tier = degraded.fallback("tell me about Priya", None)
+    assert tier == "multi_match"
+    assert dsl["query"]["multi_match"]["query"] == "tell me about Priya"
+    assert not any(f.startswith("leave_records.") for f in dsl["query"]["multi_match"]["fields"])
+
+
+@pytest.mark.parametrize("legacy", [False, True])
+def test_slow_llm_degrades_within_budget_and_still_fills_the_cache(make_agent, request, legacy):
+    if legacy:
+        request.getfixturevalue("legacy_timeouts")
+    agent = make_agent(degraded=DegradedMode(latency_budget=0.05))
+    agent.chain.seconds = 0.15
+
+    async def scenario():
+        started = time.perf_counter()
+        answer = await agent.generate_es_query("employees on sick leave")
+        elapsed = time.perf_counter() - started
+        assert agent.vector_cache.stored == []
+        await asyncio.gather(*agent._background)
+        return answer, elapsed
+
+    (es_query, metrics), elapsed = asyncio.run(scenario())
+    assert elapsed < 0.12
+    assert metrics["degraded"] and metrics["tier"] == "rules"
+    assert es_query["query"]["bool"]["filter"][0]["nested"]["path"] == "leave_records"
+    assert agent.vector_cache.stored == [("employees on sick leave", {"query": {"match_all": {}}})]
+    assert agent.degraded.llm.failures == 1
+    assert agent.degraded.llm.last_failure == "over latency budget"
+
+
+def test_slow_embedding_is_an_overrun_not_a_provider_error(make_agent, legacy_timeouts):
+    agent = make_agent(degraded=DegradedMode(latency_budget=0.05))
+    agent.embedder.seconds = 0.15
+    es_query, metrics = asyncio.run(agent.generate_es_query("employees on sick leave"))
+    assert metrics["degraded"]
+    assert agent.degraded.embeddings.last_failure == "over latency budget"
+
+
+def test_open_llm_circuit_serves_the_closest_cached_entry(make_agent):
+    agent = make_agent(degraded=DegradedMode(failure_threshold=1))
+    agent.degraded.llm.record_failure("down")
+    agent.vector_cache.entries = {"engineers in london?": CANDIDATE}
+
+    es_query, metrics = asyncio.run(agent.generate_es_query("engineers in london?"))
+    assert es_query == CANDIDATE["es_query"]
+    assert metrics["tier"] == "cached_below_threshold" and metrics["similarity"] == 0.78
+    assert agent.chain.started == 0
+
+
+def test_embedding_failure_still_answers_from_the_llm(make_agent):
+    agent = make_agent(degraded=DegradedMode())
+    agent.embedder.error = ConnectionError("refused")
+    es_query, metrics = asyncio.run(agent.generate_es_query("who joined last week"))
+    assert metrics["tier"] == "llm" and metrics["degraded"]
+    assert "embedding failed" in metrics["degraded_reason"]
+    # Nothing to store the vector under; only the exact-match cache remembers it
+    assert agent.vector_cache.stored == []
+    assert "who joined last week" in agent.local_cache
@@ -0,0 +1,134 @@
+from app.core import index_manager as index_manager_module
+from app.core.derived_fields import derive_fields, slug, with_derived_fields
+from app.core.elasticsearch_client import ElasticsearchClient
+from app.core.index_manager import IndexManager
+from datetime import date, datetime
+import asyncio
+
+AS_OF = date(2024, 6, 15)
+
+
+def employee():
+    return {
+        "employee_id": "E1",
+        "employment_details": {"hire_date": "2020-06-15"},
+        "salary_info": {
+            "base_salary": 50000,
+            "salary_history": [
+                {"effective_date": "2022-01-01", "amount": 60000},
+                {"effective_date": "2020-06-15", "amount": 50000},
+                {"effective_date": "2023-01-01", "amount": 55000},
+                # Not in effect yet on AS_OF
+                {"effective_date": "2025-01-01", "amount": 90000},
+            ],
+        },
+        "leave_records": [
+            {"leave_type": "Annual Leave", "status": "Approved", "start_date": "2023-12-30", "end_date": "2024-01-02"},
+            {"leave_type": "Sick Leave", "status": "Approved", "start_date": "2024-06-14", "end_date": "2024-06-16"},
+            {"leave_type": "Annual Leave", "status": "Pending", "start_date": "2024-07-01", "end_date": "2024-07-05"},
+            {"leave_type": "Sick Leave", "status": "Rejected", "start_date": "2024-02-01"},
+        ],
+    }
+
+
+def test_slug():
+    assert slug("Sick Leave") == "sick_leave"
+    assert slug("R&D  Team") == "r_d_team"
+
+
+def test_salary_facts_ignore_future_history():
+    derived = derive_fields(employee(), AS_OF)
+    assert derived["as_of"] == "2024-06-15"
+    assert derived["tenure_years"] == round(1461 / 365.25, 2)
+    assert derived["current_salary"] == 55000
+    # Sorted by date: 50000 -> 60000 is a raise, 60000 -> 55000 is not
+    assert derived["raise_count"] == 1
+    assert derived["last_raise_date"] == "2022-01-01"
+
+
+def test_without_history_or_hire_date():
+    derived = derive_fields({"salary_info": {"base_salary": 40000}}, AS_OF)
+    assert derived["tenure_years"] is None
+    assert derived["current_salary"] == 40000
+    assert derived["raise_count"] == 0
+    assert derived["last_raise_date"] is None
+    assert derived["leave_days"]["total"] == 0
+    assert derived["on_leave"] is False
+
+
+def test_leave_days_by_status_and_type():
+    leave = derive_fields(employee(), AS_OF)["leave_days"]
+    assert leave["total"] == 4 + 3 + 5 + 1
+    assert leave["approved"] == 7
+    # Only Jan 1-2 of the year-spanning leave falls in 2024
+    assert leave["approved_this_year"] == 2 + 3
+    assert leave["by_status"] == {"pending": 5, "approved": 7, "rejected": 1, "cancelled": 0}
+    assert leave["approved_by_type"] == {
+        "annual_leave": 4,
+        "sick_leave": 3,
+        "maternity_leave": 0,
+        "paternity_leave": 0,
+        "unpaid_leave": 0,
+    }
+
+
+def test_on_leave_counts_approved_leave_only():
+    assert derive_fields(employee(), AS_OF)["on_leave"] is True
+    # Inside the pending leave only
+    assert derive_fields(employee(), date(2024, 7, 2))["on_leave"] is False
+
+
+def test_with_derived_fields_sets_the_object_in_place():
+    document = employee()
+    assert with_derived_fields(document, AS_OF) is document
+    assert document["derived"] == derive_fields(employee(), AS_OF)
+
+
+class FakeAsyncES:
+    def __init__(self):
+        self.indexed = []
+
+    async def index(self, index, id, document, refresh):
+        self.indexed.append((index, id, document))
+        return {"result": "created"}
+
+
+def test_index_employee_stamps_updated_at_and_derived_fields():
+    client = ElasticsearchClient({"elasticsearch_index": "hr"})
+    client._client = FakeAsyncES()
+    document = employee()
+
+    assert asyncio.run(client.index_employee(document)) == "created"
+
+    index, doc_id, written = client._client.indexed[0]
+    assert (index, doc_id) == ("hr", "E1")
+    assert datetime.fromisoformat(written["updated_at"]).tzinfo is not None
+    assert "derived" in written
+    # The caller's document is not modified
+    assert "updated_at" not in document and "derived" not in document
+
+
+def test_refresh_derived_writes_changed_documents_with_a_new_updated_at(monkeypatch):
+    current = with_derived_fields(employee(), AS_OF)
+    # Two documents are already current, one was written without derived fields
+    unchanged = with_derived_fields({**employee(), "employee_id": "E2", "leave_records": []}, AS_OF)
+    stale = {**employee(), "employee_id": "E3"}
+    hits = [{"_index": "hr_v1", "_id": doc["employee_id"], "_source": doc} for doc in (current, unchanged, stale)]
+    actions = []
+
+    def fake_scan(es, index, query, size):
+        return iter(hits)
+
+    def fake_bulk(es, updates, chunk_size, raise_on_error):
+        actions.extend(updates)
+        return len(actions), []
+
+    monkeypatch.setattr(index_manager_module.helpers, "scan", fake_scan)
+    monkeypatch.setattr(index_manager_module.helpers, "bulk", fake_bulk)
+
+    result = IndexManager(None, "hr").refresh_derived(as_of=AS_OF)
+
+    assert result == {"scanned": 3, "updated": 1}
+    assert [action["_id"] for action in actions] == ["E3"]
+    assert actions[0]["doc"]["derived"] == derive_fields(stale, AS_OF)
+    assert datetime.fromisoformat(actions[0]["doc"]["updated_at"]).tzinfo is not None
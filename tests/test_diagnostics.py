@@ -0,0 +1,182 @@
+from collections import Counter
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.diagnostics import (
+    Diagnostics,
+    LoopLagMonitor,
+    MemorySnapshots,
+    RequestProfiler,
+    await_stack,
+    collapsed,
+)
+from app.middleware.profiling import ProfilingMiddleware
+import asyncio
+import time
+import tracemalloc
+
+
+def blocking_call(seconds: float) -> None:
+    # A synchronous client call made on the event loop
+    time.sleep(seconds)
+
+
+async def waiting_child() -> None:
+    await asyncio.sleep(0.15)
+
+
+async def handler() -> None:
+    await asyncio.gather(asyncio.create_task(waiting_child()))
+    blocking_call(0.1)
+
+
+def test_collapsed_puts_the_heaviest_stack_first():
+    assert collapsed(Counter({"a;b": 2, "a;c": 5})) == "a;c 5\na;b 2\n"
+    assert collapsed(Counter()) == "\n"
+
+
+def test_await_stack_follows_the_awaits():
+    async def outer():
+        await waiting_child()
+
+    async def main():
+        task = asyncio.create_task(outer())
+        await asyncio.sleep(0.01)
+        stack = await_stack(task.get_coro())
+        task.cancel()
+        return stack
+
+    stack = asyncio.run(main())
+    assert [frame.split(" ", 1)[0] for frame in stack] == ["outer", "waiting_child", "sleep"]
+
+
+def test_profiles_sample_the_request_and_its_child_tasks():
+    profiler = RequestProfiler(interval=0.005)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        profile = profiler.start("/api/v1/search", "request-1")
+        assert loop.get_task_factory() is not None
+        try:
+            await handler()
+        finally:
+            profiler.stop(profile)
+        # Only installed while profiles are active
+        assert loop.get_task_factory() is None
+        return profile
+
+    profile = asyncio.run(main())
+    stacks = collapsed(profile.stacks)
+    assert profile.samples > 10 and profile.seconds >= 0.25
+    assert "task waiting_child;waiting_child" in stacks and "(waiting)" in stacks
+    # While blocked the loop thread's stack is recorded, not the awaits
+    assert any("blocking_call" in stack and "(waiting)" not in stack for stack in profile.stacks)
+    assert profiler.get("request-1") is profile
+    assert profiler.get_stats()["profiles"][0]["id"] == "request-1"
+
+
+def test_profiles_are_bounded_and_cleared():
+    profiler = RequestProfiler(max_profiles=2)
+
+    async def main():
+        for i in range(3):
+            profiler.stop(profiler.start("/api/v1/search", f"request-{i}"))
+
+    asyncio.run(main())
+    assert list(profiler.profiles) == ["request-1", "request-2"]
+    profiler.clear()
+    assert profiler.get("request-2") is None
+
+
+def test_header_and_armed_requests_are_wanted():
+    profiler = RequestProfiler()
+    assert not profiler.wanted("1")
+    profiler.arm(2)
+    assert profiler.wanted(None) and profiler.wanted(None) and not profiler.wanted(None)
+    profiler.header_enabled = True
+    assert profiler.wanted("1") and not profiler.wanted(None)
+
+
+def test_loop_monitor_records_the_stack_that_blocked_the_loop():
+    monitor = LoopLagMonitor(interval=0.01, stall_threshold=0.05)
+
+    async def main():
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        blocking_call(0.3)
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(main())
+    assert monitor.stall_count == 1
+    assert monitor.stalls[0]["blocked_ms"] >= 250
+    assert [frame.split(" ", 1)[0] for frame in monitor.stalls[0]["stack"][-2:]] == ["main", "blocking_call"]
+    blocked = sum(count for stack, count in monitor.stacks.items() if "blocking_call" in stack)
+    assert 150 <= blocked <= 350
+    assert monitor.get_stats()["stalls"] == 1
+
+
+def test_memory_snapshots_report_allocation_sites_while_tracing():
+    memory = MemorySnapshots(tracemalloc_frames=5)
+    assert memory.take()["rss_mb"] > 0
+    assert "top" not in memory.snapshots[-1] and not memory.allocation_stacks()
+
+    tracemalloc.start(5)
+    try:
+        memory.take()
+        retained = [bytearray(1024) for _ in range(512)]
+        snapshot = memory.take()
+    finally:
+        tracemalloc.stop()
+    assert any("test_diagnostics.py" in site["site"] for site in snapshot["growth"])
+    assert any("test_diagnostics.py" in stack for stack in memory.allocation_stacks())
+    assert len(retained) == 512
+
+
+def test_diagnostics_start_only_enabled_monitors():
+    async def main(diagnostics):
+        diagnostics.start()
+        tasks = len(diagnostics._tasks)
+        diagnostics.close()
+        return tasks
+
+    assert asyncio.run(main(Diagnostics())) == 0
+    assert asyncio.run(main(Diagnostics(loop_monitor=True, memory_interval=60))) == 2
+
+
+def profiled_app(profiler: RequestProfiler) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/api/v1/search")
+    async def search():
+        await handler()
+        return {"status": "success"}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return TestClient(app)
+
+
+def test_middleware_profiles_requests_that_ask_for_it():
+    profiler = RequestProfiler(header_enabled=True)
+    client = profiled_app(profiler)
+
+    assert "X-Profile-ID" not in client.post("/api/v1/search").headers
+    response = client.post("/api/v1/search", headers={"X-Profile": "1"})
+    profile = profiler.get(response.headers["X-Profile-ID"])
+    assert profile.path == "/api/v1/search"
+    assert any("blocking_call" in stack for stack in profile.stacks)
+    # Only search requests are profiled
+    assert "X-Profile-ID" not in client.get("/health", headers={"X-Profile": "1"}).headers
+
+
+def test_middleware_profiles_armed_requests_without_the_header():
+    profiler = RequestProfiler()
+    client = profiled_app(profiler)
+
+    assert "X-Profile-ID" not in client.post("/api/v1/search", headers={"X-Profile": "1"}).headers
+    profiler.arm(1)
+    assert "X-Profile-ID" in client.post("/api/v1/search").headers
+    assert "X-Profile-ID" not in client.post("/api/v1/search").headers
@@ -0,0 +1,95 @@
+from app.core.embedding_batcher import EmbeddingBatcher
+from app.core.embeddings import EmbeddingProvider
+import asyncio
+import pytest
+
+
+class FakeProvider(EmbeddingProvider):
+    """One-dimensional vectors of the text length; texts containing 'poison' fail their call"""
+
+    name = "fake"
+
+    def __init__(self):
+        super().__init__(1)
+        self.batches = []
+
+    async def _embed(self, texts):
+        self.batches.append(list(texts))
+        await asyncio.sleep(0)
+        if any("poison" in text for text in texts):
+            raise RuntimeError("provider rejected the batch")
+        return [[float(len(text))] for text in texts]
+
+
+def test_concurrent_queries_share_one_call_and_duplicates_are_embedded_once():
+    provider = FakeProvider()
+    batcher = EmbeddingBatcher(provider, max_batch=64)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.embed_query(t) for t in ["a", "bb", "a", "ccc"]))
+
+    assert asyncio.run(scenario()) == [[1.0], [2.0], [1.0], [3.0]]
+    assert provider.batches == [["a", "bb", "ccc"]]
+    stats = batcher.get_stats()["batching"]
+    assert stats["batches"] == 1 and stats["deduplicated"] == 1 and stats["largest_batch"] == 4
+
+
+def test_batches_are_capped_at_max_batch():
+    provider = FakeProvider()
+    batcher = EmbeddingBatcher(provider, max_batch=2)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.embed_query(str(i) * i) for i in range(1, 6)))
+
+    assert asyncio.run(scenario()) == [[float(i)] for i in range(1, 6)]
+    assert [len(batch) for batch in provider.batches] == [2, 2, 1]
+
+
+def test_a_failed_batch_fans_errors_out_to_their_own_callers():
+    provider = FakeProvider()
+    batcher = EmbeddingBatcher(provider)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.embed_query("fine"),
+            batcher.embed_query("poison pill"),
+            batcher.embed_query("also fine"),
+            return_exceptions=True,
+        )
+
+    fine, poisoned, also_fine = asyncio.run(scenario())
+    assert fine == [4.0] and also_fine == [9.0]
+    assert isinstance(poisoned, RuntimeError)
+    assert batcher.fallbacks == 1
+    # One batch, then one retry per question
+    assert len(provider.batches) == 4
+
+
+def test_a_lone_failure_is_not_retried():
+    provider = FakeProvider()
+    batcher = EmbeddingBatcher(provider)
+    with pytest.raises(RuntimeError):
+        asyncio.run(batcher.embed_query("poison"))
+    assert len(provider.batches) == 1 and batcher.fallbacks == 0
+
+
+def test_abandoned_callers_are_not_embedded():
+    provider = FakeProvider()
+    batcher = EmbeddingBatcher(provider)
+
+    async def scenario():
+        gone = asyncio.create_task(batcher.embed_query("gone"))
+        kept = asyncio.create_task(batcher.embed_query("kept"))
+        await asyncio.sleep(0)
+        gone.cancel()
+        return await kept
+
+    assert asyncio.run(scenario()) == [4.0]
+    assert provider.batches == [["kept"]]
+
+
+def test_window_opens_only_under_load():
+    batcher = EmbeddingBatcher(FakeProvider(), max_batch=64, max_wait=0.005)
+    assert batcher.window() == 0.0
+    batcher._interval = 0.0005
+    assert batcher.window() == 0.005
@@ -0,0 +1,68 @@
+from app.core.embeddings import (
+    EmbeddingProvider,
+    HashingEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+    ThreadPoolEmbeddingProvider,
+    create_embedding_provider,
+    fit_dimension,
+)
+import asyncio
+import numpy as np
+import pytest
+
+
+def test_fit_dimension_truncates_and_renormalizes():
+    fitted = fit_dimension(np.array([[3.0, 4.0, 12.0], [0.0, 0.0, 1.0]]), 2)
+    np.testing.assert_allclose(fitted, [[0.6, 0.8], [0.0, 0.0]])
+    with pytest.raises(ValueError, match="produces 3 dimensions"):
+        fit_dimension(np.ones((1, 3)), 4)
+
+
+def test_hashing_embedder_is_deterministic_and_wording_sensitive():
+    embedder = HashingEmbeddingProvider(64)
+
+    async def embed():
+        return await embedder.embed_documents([
+            "engineers in London", "  ENGINEERS in london", "engineers in the london office", "payroll errors",
+        ])
+
+    first, again = asyncio.run(embed()), asyncio.run(embed())
+    assert first == again
+    vectors = np.array(first)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1, atol=1e-6)
+    np.testing.assert_allclose(vectors[0], vectors[1])
+    similarity = vectors @ vectors[0]
+    assert similarity[2] > similarity[3]
+    stats = embedder.get_stats()
+    assert stats["calls"] == 2 and stats["texts"] == 8 and stats["dimension"] == 64
+
+
+def test_large_batches_split_across_the_pool():
+    embedder = HashingEmbeddingProvider(16, batch_size=3, workers=2)
+    texts = [f"question {i}" for i in range(10)]
+    vectors = asyncio.run(embedder.embed_documents(texts))
+    single = asyncio.run(HashingEmbeddingProvider(16, batch_size=100).embed_documents(texts))
+    assert vectors == single
+
+
+def test_providers_and_namespaces():
+    settings = {"provider": "hashing", "ngram": 4, "model": "", "model_path": "", "batch_size": 8, "workers": 1}
+    hashing = create_embedding_provider(settings, 32)
+    assert hashing.namespace == "hashing_4gram" and hashing.dim == 32
+    # The model the cache was first built with keeps the original collection
+    assert OpenAIEmbeddingProvider(768).namespace is None
+    assert OpenAIEmbeddingProvider(768, "text-embedding-3-large").namespace == "openai_text_embedding_3_large"
+    with pytest.raises(ValueError, match="EMBEDDING_MODEL_PATH"):
+        create_embedding_provider({**settings, "provider": "local"}, 32)
+    with pytest.raises(ValueError, match="Unknown embedding provider"):
+        create_embedding_provider({**settings, "provider": "other"}, 32)
+
+
+def test_providers_missing_their_hook_fail_when_built():
+    class Unfinished(ThreadPoolEmbeddingProvider):
+        name = "unfinished"
+
+    with pytest.raises(TypeError, match="_encode"):
+        Unfinished(8)
+    with pytest.raises(TypeError, match="_embed"):
+        EmbeddingProvider(8)
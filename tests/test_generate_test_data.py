@@ -0,0 +1,31 @@
+from datetime import date, datetime
+import generate_test_data
+
+
+def test_output_does_not_depend_on_worker_count():
+    serial = list(generate_test_data.iter_generated(25, seed=7, workers=1, batch_size=10))
+    parallel = list(generate_test_data.iter_generated(25, seed=7, workers=3, batch_size=10))
+    assert len(serial) == 25
+    assert serial == parallel
+
+
+def test_same_seed_and_reference_date_give_the_same_documents(monkeypatch):
+    monkeypatch.setattr(generate_test_data, "REFERENCE_DATE", datetime(2025, 1, 1))
+    first = generate_test_data.generate_batch(0, 10, 10, seed=3)
+    assert first == generate_test_data.generate_batch(0, 10, 10, seed=3)
+    assert first != generate_test_data.generate_batch(0, 10, 10, seed=4)
+
+    for employee in first:
+        assert employee["employee_id"].startswith("EMP-20250101-")
+        assert employee["employment_details"]["hire_date"] <= "2025-01-01"
+        born = date.fromisoformat(employee["personal_info"]["date_of_birth"])
+        assert 19 <= (date(2025, 1, 1) - born).days / 365.25 <= 66
+
+
+def test_reference_date_comes_from_argument_then_environment(monkeypatch):
+    monkeypatch.setenv(generate_test_data.REFERENCE_DATE_ENV, "2024-02-03")
+    assert generate_test_data.reference_date() == datetime(2024, 2, 3)
+    assert generate_test_data.reference_date("2023-05-06") == datetime(2023, 5, 6)
+
+    monkeypatch.delenv(generate_test_data.REFERENCE_DATE_ENV)
+    assert generate_test_data.reference_date().date() == date.today()
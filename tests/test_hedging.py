@@ -0,0 +1,115 @@
+from app.core.hedging import HedgedSearcher, LatencyTracker
+import asyncio
+
+
+class FakeNode:
+    def __init__(self, name: str, seconds: float):
+        self.name = name
+        self.seconds = seconds
+        self.calls = 0
+        self.cancelled = False
+
+    def options(self, **kwargs):
+        return self
+
+    async def search(self, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.seconds)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.name
+
+
+async def searcher(*nodes: FakeNode) -> HedgedSearcher:
+    searcher = HedgedSearcher(["http://node-a:9200", "http://node-b:9200"], {}, min_delay=0.01)
+    await searcher.close()
+    searcher.clients = list(nodes)
+    for _ in range(20):
+        searcher.latency.record(0.01)
+    return searcher
+
+
+def test_percentile_needs_enough_samples():
+    tracker = LatencyTracker(refresh_every=1)
+    for i in range(19):
+        tracker.record(i / 100)
+    assert tracker.percentile(95) is None
+    tracker.record(1.0)
+    assert tracker.percentile(95) == 1.0
+    assert tracker.percentile(50) == 0.1
+
+
+def test_fast_primary_is_not_hedged():
+    async def run():
+        fast, other = FakeNode("a", 0), FakeNode("b", 0)
+        hedged = await searcher(fast, other)
+        assert await hedged.search(index="hr") == "a"
+        return hedged, other
+
+    hedged, other = asyncio.run(run())
+    assert hedged.hedges_sent == 0
+    assert other.calls == 0
+
+
+def test_slow_primary_is_hedged_and_cancelled_when_the_hedge_wins():
+    async def run():
+        slow, fast = FakeNode("a", 1), FakeNode("b", 0)
+        hedged = await searcher(slow, fast)
+        result = await hedged.search(index="hr")
+        await asyncio.sleep(0)
+        return hedged, slow, result
+
+    hedged, slow, result = asyncio.run(run())
+    assert result == "b"
+    assert (hedged.hedges_sent, hedged.hedges_won) == (1, 1)
+    assert slow.cancelled
+
+
+def test_hedge_is_sent_to_a_different_node_than_the_primary():
+    async def run():
+        a, b = FakeNode("a", 1), FakeNode("b", 1)
+        hedged = await searcher(a, b)
+        for _ in range(2):
+            task = asyncio.create_task(hedged.search(index="hr"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return a, b
+
+    a, b = asyncio.run(run())
+    # Each request went to both nodes exactly once: primary on one, hedge on the other
+    assert (a.calls, b.calls) == (2, 2)
+
+
+def test_hedging_needs_the_flag_and_two_hosts():
+    from app.core.elasticsearch_client import ElasticsearchClient
+
+    async def run():
+        single = ElasticsearchClient({"hosts": ["http://a:9200"], "hedging": {"enabled": True}})
+        disabled = ElasticsearchClient({"hosts": ["http://a:9200", "http://b:9200"], "hedging": {"enabled": False}})
+        enabled = ElasticsearchClient({"hosts": ["http://a:9200", "http://b:9200"], "hedging": {"enabled": True}})
+        try:
+            return single.hedger, disabled.hedger, len(enabled.hedger.clients)
+        finally:
+            await enabled.close()
+
+    assert asyncio.run(run()) == (None, None, 2)
+
+
+def test_cancelling_during_the_hedge_delay_cancels_the_primary():
+    async def run():
+        slow, other = FakeNode("a", 1), FakeNode("b", 1)
+        hedged = await searcher(slow, other)
+        hedged.min_delay = 0.5
+        task = asyncio.create_task(hedged.search(index="hr"))
+        await asyncio.sleep(0.02)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+        return hedged, slow, other
+
+    hedged, slow, other = asyncio.run(run())
+    assert slow.cancelled
+    assert hedged.hedges_sent == 0 and other.calls == 0
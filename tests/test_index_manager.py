@@ -0,0 +1,127 @@
+from app.core.index_manager import IndexManager
+from app.core.query_profiler import QueryProfiler
+import pytest
+
+
+class FakeIndices:
+    def __init__(self, log, aliases):
+        self.log = log
+        self.aliases = aliases
+
+    def exists(self, index):
+        return True
+
+    def get_alias(self, name):
+        return {index: {} for index in self.aliases}
+
+    def create(self, index, settings, mappings):
+        self.log.append(("create", index))
+
+    def put_settings(self, index, settings):
+        self.log.append(("settings", index, settings))
+
+    def refresh(self, index):
+        self.log.append(("refresh", index))
+
+    def update_aliases(self, actions):
+        self.log.append(("aliases", actions))
+
+    def delete(self, index, **kwargs):
+        self.log.append(("delete", index))
+
+
+class FakeTasks:
+    def get(self, task_id):
+        return {"completed": True, "response": {"total": 1, "failures": []}}
+
+
+class FakeES:
+    def __init__(self, aliases=("hr_v1",), fail_on_catch_up=False):
+        self.log = []
+        self.indices = FakeIndices(self.log, list(aliases))
+        self.tasks = FakeTasks()
+        self.fail_on_catch_up = fail_on_catch_up
+
+    def reindex(self, source, dest, **kwargs):
+        query = source.get("query")
+        self.log.append(("reindex", query))
+        if query is not None and self.fail_on_catch_up:
+            raise RuntimeError("catch-up failed")
+        return {"task": "task-1"}
+
+    def search(self, index, body, request_cache):
+        self.log.append(("search", index))
+
+
+def manager(es: FakeES) -> IndexManager:
+    manager = IndexManager(es, "hr")
+    manager.refresh_derived = lambda index: None
+    return manager
+
+
+def test_profile_sets_eager_global_ordinals_on_keywords_only():
+    body = IndexManager.build_index_body(IndexManager.load_profile("performance"))
+    position = body["mappings"]["properties"]["employment_details"]["properties"]["position"]
+    assert position["eager_global_ordinals"] is True
+    assert body["settings"]["index"]["sort.field"] == ["employment_details.hire_date", "salary_info.base_salary"]
+
+    with pytest.raises(ValueError):
+        IndexManager.build_index_body({"eager_global_ordinals": ["employment_details.hire_date"]})
+
+
+def test_legacy_index_is_replaced_in_the_same_alias_request():
+    es = FakeES(aliases=())
+    old = manager(es).swap_alias("hr_v2")
+    assert old == []
+    (_, actions), = [entry for entry in es.log if entry[0] == "aliases"]
+    assert actions == [
+        {"remove_index": {"index": "hr"}},
+        {"add": {"index": "hr_v2", "alias": "hr", "is_write_index": True}},
+    ]
+
+
+def test_migrate_catches_up_on_writes_under_a_write_block_before_the_swap():
+    es = FakeES()
+    new_index = manager(es).migrate(warm_queries=[{"query": {"match_all": {}}}])
+    steps = [entry[0] for entry in es.log]
+
+    block = es.log.index(("settings", "hr", {"index.blocks.write": True}))
+    reindexes = [i for i, entry in enumerate(es.log) if entry[0] == "reindex"]
+    assert es.log[reindexes[0]][1] is None
+    catch_up = es.log[reindexes[1]][1]
+    assert set(catch_up["range"]["updated_at"]) == {"gte"}
+    # Warm-up, then block, then the catch-up copy, then the swap and the delete
+    assert steps.index("search") < block < reindexes[1] < steps.index("aliases") < steps.index("delete")
+    assert ("delete", "hr_v1") in es.log
+    assert new_index.startswith("hr_v")
+
+
+def test_failed_catch_up_lifts_the_block_and_removes_the_new_index():
+    es = FakeES(fail_on_catch_up=True)
+    with pytest.raises(RuntimeError):
+        manager(es).migrate()
+    assert ("settings", "hr", {"index.blocks.write": False}) in es.log
+    assert not any(entry[0] == "aliases" for entry in es.log)
+    assert es.log[-1][0] == "delete" and es.log[-1][1].startswith("hr_v")
+
+
+def test_keep_old_leaves_the_previous_index_writable():
+    es = FakeES()
+    manager(es).migrate(keep_old=True)
+    assert es.log[-1] == ("settings", "hr_v1", {"index.blocks.write": False})
+    assert not any(entry[0] == "delete" for entry in es.log)
+
+
+def test_top_queries_rank_by_executions_and_skip_failing_shapes():
+    profiler = QueryProfiler(sample_rate=0)
+    popular = {"query": {"term": {"department": "Sales"}}}
+    rare = {"query": {"range": {"salary": {"gte": 1}}}}
+    broken = {"query": {"bogus": {}}}
+    for _ in range(3):
+        profiler.observe(None, popular, "q", 5, 6)
+    profiler.observe(None, rare, "q", 5, 6)
+    profiler.observe(None, broken, "q", None, 6, error=True)
+
+    top = profiler.most_executed(10)
+    assert [entry["dsl"] for entry in top] == [popular, rare]
+    assert top[0]["count"] == 3
@@ -0,0 +1,98 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.middleware.request_context import add_request_context_middleware
+from app.utils.logger import (
+    JsonFormatter,
+    LazyJSON,
+    NonBlockingQueueHandler,
+    PayloadSampler,
+    RequestIdFilter,
+    request_id_var,
+)
+import json
+import logging
+import queue
+import sys
+
+
+def record(msg="hello %s", args=("world",), **extra) -> logging.LogRecord:
+    entry = logging.makeLogRecord({"name": "app", "levelname": "INFO", "msg": msg, "args": args})
+    entry.__dict__.update(extra)
+    return entry
+
+
+def test_json_formatter_includes_request_id_and_extras():
+    token = request_id_var.set("req-1")
+    try:
+        entry = record(duration_ms=1.5)
+        RequestIdFilter().filter(entry)
+    finally:
+        request_id_var.reset(token)
+    line = json.loads(JsonFormatter().format(entry))
+    assert line["msg"] == "hello world"
+    assert line["request_id"] == "req-1"
+    assert line["duration_ms"] == 1.5
+    assert "args" not in line
+
+    untagged = json.loads(JsonFormatter().format(record()))
+    assert "request_id" not in untagged
+
+
+def test_queue_handler_drops_when_full_and_resolves_tracebacks():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        failed = record(exc_info=sys.exc_info())
+    handler.handle(failed)
+    handler.handle(record())
+
+    assert handler.dropped == 1
+    queued = handler.queue.get_nowait()
+    assert queued.exc_info is None
+    assert "ValueError: boom" in queued.exc_text
+    assert "ValueError: boom" in json.loads(JsonFormatter().format(queued))["exc"]
+
+
+def test_lazy_json_encodes_only_when_formatted():
+    class Payload:
+        encoded = 0
+
+        def __str__(self):
+            Payload.encoded += 1
+            return "payload"
+
+    lazy = LazyJSON({"value": Payload()})
+    assert Payload.encoded == 0
+    assert str(lazy) == '{"value":"payload"}'
+    assert Payload.encoded == 1
+
+
+def test_sampler_rate_limits_and_counts_suppressed():
+    sampler = PayloadSampler(sample_rate=1.0, max_per_second=3)
+    allowed = [sampler.allow() for _ in range(10)]
+    assert sum(allowed) == 3
+    assert sampler.suppressed == 7
+
+    never = PayloadSampler(sample_rate=0.0, max_per_second=100)
+    assert not any(never.allow() for _ in range(10))
+    assert never.suppressed == 10
+
+
+def test_middleware_echoes_or_assigns_request_id():
+    app = FastAPI()
+    add_request_context_middleware(app)
+
+    @app.get("/ping")
+    async def ping():
+        return {"request_id": request_id_var.get()}
+
+    client = TestClient(app)
+    response = client.get("/ping", headers={"X-Request-ID": "abc"})
+    assert response.headers["x-request-id"] == "abc"
+    assert response.json() == {"request_id": "abc"}
+
+    assigned = client.get("/ping")
+    assert assigned.headers["x-request-id"] == assigned.json()["request_id"]
+    assert len(assigned.headers["x-request-id"]) == 32
+    assert request_id_var.get() is None
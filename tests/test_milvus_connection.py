@@ -0,0 +1,167 @@
+from app.core.milvus_connection import MilvusConnectionManager, MilvusEndpoint, parse_endpoints
+from app.core.vector_cache import VectorCache
+import asyncio
+import pytest
+import time
+
+
+class FakeManager(MilvusConnectionManager):
+    """Endpoints are up unless their index is in ``down``"""
+
+    def __init__(self, count=2, down=(), **options):
+        super().__init__([{"host": f"proxy-{i}", "port": 19530} for i in range(count)], **options)
+        self.down = set(down)
+        self.pings = 0
+
+    def _connect(self, endpoint: MilvusEndpoint) -> None:
+        self._ping(endpoint)
+
+    def _ping(self, endpoint: MilvusEndpoint) -> None:
+        self.pings += 1
+        if self.endpoints.index(endpoint) in self.down:
+            raise ConnectionError(f"{endpoint.host} unavailable")
+
+
+def test_parse_endpoints():
+    assert parse_endpoints(" a:1, b ,,[::1]:3", 19530) == [
+        {"host": "a", "port": 1},
+        {"host": "b", "port": 19530},
+        {"host": "[::1]", "port": 3},
+    ]
+    assert parse_endpoints("") == []
+    with pytest.raises(ValueError):
+        MilvusConnectionManager([])
+
+
+def test_connect_marks_unreachable_endpoints_down():
+    manager = FakeManager(3, down={0})
+    manager.connect()
+    assert [endpoint.connected for endpoint in manager.endpoints] == [False, True, True]
+    assert manager.primary == "milvus_1"
+    assert manager.endpoints[0].last_error == "proxy-0 unavailable"
+
+    with pytest.raises(ConnectionError, match="No Milvus endpoint reachable"):
+        FakeManager(2, down={0, 1}).connect()
+
+
+def test_reads_rotate_over_healthy_endpoints():
+    manager = FakeManager(3, down={1})
+    manager.connect()
+    assert [manager.next_reader() for _ in range(4)] == ["milvus_0", "milvus_2", "milvus_0", "milvus_2"]
+    assert manager.endpoints[0].requests == 2
+    assert manager.endpoints[1].requests == 0
+
+
+def test_consecutive_failures_take_an_endpoint_out():
+    manager = FakeManager(2, failure_threshold=3)
+    manager.connect()
+    manager.record_failure("milvus_0", TimeoutError("deadline"))
+    manager.record_failure("milvus_0", TimeoutError("deadline"))
+    # A success in between starts the count again
+    manager.record_success("milvus_0")
+    manager.record_failure("milvus_0", TimeoutError("deadline"))
+    manager.record_failure("milvus_0", TimeoutError("deadline"))
+    assert manager.endpoints[0].connected
+    manager.record_failure("milvus_0", TimeoutError("deadline"))
+    assert not manager.endpoints[0].connected
+    assert manager.primary == "milvus_1"
+    assert {manager.next_reader() for _ in range(3)} == {"milvus_1"}
+    # Unknown aliases and endpoints already out are ignored
+    manager.record_failure("milvus_9", TimeoutError("deadline"))
+    manager.record_failure("milvus_0", TimeoutError("deadline"))
+    assert manager.endpoints[0].failures == 3
+
+
+def test_reconnects_back_off_and_outages_are_recorded():
+    manager = FakeManager(1, failure_threshold=1, backoff_initial=10, backoff_max=30)
+    manager.connect()
+    manager.down.add(0)
+    manager.probe()
+    endpoint = manager.endpoints[0]
+    assert not manager.available and manager.next_reader() is None
+    assert manager.get_stats()["current_outage_seconds"] is not None
+
+    # Not due yet: no reconnect attempt
+    pings = manager.pings
+    manager.probe()
+    assert manager.pings == pings
+    # Failed reconnects wait twice as long each time, up to backoff_max, with jitter
+    for longest in (20, 30, 30):
+        endpoint.next_attempt = 0
+        manager.probe()
+        assert longest / 2 - 1 <= endpoint.next_attempt - time.monotonic() <= longest
+
+    manager.down.clear()
+    endpoint.next_attempt = 0
+    manager.probe()
+    assert manager.available and endpoint.reconnects == 1 and endpoint.attempts == 0
+    stats = manager.get_stats()
+    assert stats["current_outage_seconds"] is None
+    assert [outage["reason"] for outage in stats["outages"]] == ["proxy-0 unavailable"]
+
+
+def test_run_reconnects_a_restarted_endpoint():
+    manager = FakeManager(1, probe_interval=10, backoff_initial=0.02, backoff_max=0.02)
+    manager.connect()
+    manager.down.add(0)
+    manager.record_failure("milvus_0", ConnectionError("gone"))
+    manager.record_failure("milvus_0", ConnectionError("gone"))
+    manager.record_failure("milvus_0", ConnectionError("gone"))
+    assert not manager.available
+
+    async def restart():
+        monitor = asyncio.create_task(manager.run())
+        await asyncio.sleep(0.1)
+        manager.down.clear()
+        # The monitor retries on the backoff schedule, not the probe interval
+        for _ in range(50):
+            await asyncio.sleep(0.02)
+            if manager.available:
+                break
+        monitor.cancel()
+
+    asyncio.run(restart())
+    assert manager.available
+    assert manager.endpoints[0].reconnects == 1
+
+
+def test_a_failing_change_handler_does_not_stop_failover():
+    manager = FakeManager(2, failure_threshold=1)
+    manager.connect()
+    manager.on_change = lambda endpoint: 1 / 0
+    manager.record_failure("milvus_0", ConnectionError("gone"))
+    assert manager.primary == "milvus_1"
+
+
+def vector_cache(endpoints="proxy-0:19530,proxy-1:19530") -> VectorCache:
+    # Bypass the process-wide singleton
+    cache = object.__new__(VectorCache)
+    cache.__init__({"host": "localhost", "port": 19530, "endpoints": endpoints, "failure_threshold": 1})
+    return cache
+
+
+def test_cache_follows_endpoints_going_down_and_coming_back():
+    cache = vector_cache()
+    for endpoint in cache.connections.endpoints:
+        endpoint.connected = True
+    cache._readers = {"milvus_0": "collection via 0", "milvus_1": "collection via 1"}
+    cache.collection = "collection via 0"
+    cache._attach = lambda alias: cache._readers.__setitem__(alias, f"collection via {alias[-1]}")
+
+    cache.connections.record_failure("milvus_0", ConnectionError("gone"))
+    assert cache.collection == "collection via 1"
+    assert cache._reader() == ("milvus_1", "collection via 1")
+
+    cache.connections._mark_up(cache.connections.endpoints[0])
+    # Writes move back to the first configured endpoint once it is healthy
+    assert cache.collection == "collection via 0"
+    assert {cache._reader()[0] for _ in range(2)} == {"milvus_0", "milvus_1"}
+
+
+def test_lookups_are_skipped_while_no_endpoint_is_healthy():
+    cache = vector_cache()
+    cache.collection = "collection via 0"
+    assert not cache.connections.available
+    assert asyncio.run(cache.find_entry("engineers", [0.0] * 8)) is None
+    assert cache.connections.skipped_lookups == 1
+    assert cache.total_misses == 1
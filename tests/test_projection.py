@@ -0,0 +1,59 @@
+from app.core.projection import SUMMARY_FIELDS, SourceProjector, dsl_field_names
+import copy
+import pytest
+
+DSL = {
+    "query": {
+        "bool": {
+            "filter": [
+                {"term": {"employment_details.department.name": "Sales"}},
+                {"range": {"salary_info.base_salary": {"gte": 90000}, "boost": 2}},
+            ]
+        }
+    },
+    "sort": [{"employment_details.hire_date": "desc"}],
+}
+
+
+def test_field_names_cover_clauses_and_sorts_but_not_parameters():
+    assert dsl_field_names(DSL) == {
+        "employment_details.department.name",
+        "salary_info.base_salary",
+        "employment_details.hire_date",
+    }
+    assert dsl_field_names({"multi_match": {"fields": ["personal_info.first_name^2"]}}) == {
+        "personal_info.first_name"
+    }
+
+
+def test_list_query_returns_summary_intent_and_queried_fields():
+    projector = SourceProjector()
+    original = copy.deepcopy(DSL)
+    projected, applied = projector.apply(DSL, "who in sales earns the most and what are their raises")
+
+    assert DSL == original
+    includes = projected["_source"]["includes"]
+    assert set(SUMMARY_FIELDS) <= set(includes)
+    assert {"salary_info.base_salary", "employment_details.hire_date"} <= set(includes)
+    # "raises" asks for salary history, a nested path kept whole
+    assert "salary_info.salary_history" in includes
+    assert projected["_source"]["excludes"] == ["leave_records"]
+    assert applied["mode"] == "source"
+
+
+def test_aggregations_and_explicit_source_are_left_alone():
+    projector = SourceProjector()
+    aggregation = {"size": 0, "aggs": {"by": {"terms": {"field": "branch.branch_id"}}}}
+    assert projector.apply(aggregation, "count")[1] == {"mode": "none", "reason": "aggregation"}
+    explicit = {"query": {"match_all": {}}, "_source": ["employee_id"]}
+    assert projector.apply(explicit, "list")[1]["reason"] == "explicit_in_dsl"
+
+
+def test_requested_fields_use_docvalues_only_when_all_have_them():
+    projector = SourceProjector()
+    projected, applied = projector.apply(DSL, "list", ["employee_id", "salary_info.base_salary"], use_docvalues=True)
+    assert applied["mode"] == "docvalues"
+    assert projected["_source"] is False
+
+    with pytest.raises(ValueError):
+        projector.apply(DSL, "list", ["not_a_field"])
@@ -0,0 +1,71 @@
+from app.core.query_profiler import QueryProfiler, fingerprint, query_shape
+import asyncio
+import pytest
+
+
+def dsl(department, size=10, values=("a",)):
+    return {
+        "size": size,
+        "query": {"bool": {"filter": [
+            {"term": {"employment_details.department.name": department}},
+            {"terms": {"skills.name": list(values)}},
+        ]}},
+        "_source": ["employee_id"],
+    }
+
+
+def test_shape_keeps_structure_and_drops_literals():
+    assert query_shape(dsl("Sales")) == {
+        "size": "<=10",
+        "query": {"bool": {"filter": [
+            {"term": {"employment_details.department.name": "?"}},
+            {"terms": {"skills.name": ["?"]}},
+        ]}},
+        "_source": ["employee_id"],
+    }
+    assert fingerprint(dsl("Sales")) == fingerprint(dsl("Engineering", values=("a", "b", "c")))
+    assert fingerprint(dsl("Sales")) != fingerprint(dsl("Sales", size=5000))
+    assert fingerprint({"sort": [{"a": "desc"}]}) != fingerprint({"sort": [{"b": "desc"}]})
+
+
+class FakeES:
+    def __init__(self):
+        self.bodies = []
+
+    async def search(self, body):
+        self.bodies.append(body)
+        return {"took": 40, "profile": {"shards": []}}
+
+
+def test_slow_queries_are_profiled_once_per_cooldown():
+    profiler = QueryProfiler(slow_ms=100, sample_rate=1.0, profile_cooldown=300)
+    es = FakeES()
+
+    async def scenario():
+        fp = profiler.observe(es, dsl("Sales"), "who is in sales", took_ms=250, round_trip_ms=260)
+        profiler.observe(es, dsl("HR"), "who is in hr", took_ms=300, round_trip_ms=310)
+        await asyncio.gather(*profiler._background)
+        return fp
+
+    fp = asyncio.run(scenario())
+    assert len(es.bodies) == 1 and es.bodies[0]["profile"] is True
+    detail = profiler.detail(fp)
+    assert detail["count"] == 2
+    assert detail["sources"] == ["who is in sales", "who is in hr"]
+    assert detail["profile"]["profile"] == {"shards": []}
+    assert profiler.get_stats()["profiles_taken"] == 1
+
+
+def test_ranking_and_bounded_fingerprints():
+    profiler = QueryProfiler(sample_rate=0, max_fingerprints=2)
+    profiler.observe(None, {"size": 1}, "a", took_ms=50, round_trip_ms=60)
+    for _ in range(3):
+        profiler.observe(None, {"size": 500}, "b", took_ms=10, round_trip_ms=12)
+    assert [row["count"] for row in profiler.top(sort="count")] == [3, 1]
+    assert profiler.top(sort="total_took_ms")[0]["total_took_ms"] == 50
+    with pytest.raises(ValueError):
+        profiler.top(sort="nope")
+
+    profiler.observe(None, {"from": 5}, "c", took_ms=1, round_trip_ms=1)
+    assert profiler.get_stats()["fingerprints"] == 2
+    assert profiler.detail(fingerprint({"size": 1})) is None
@@ -0,0 +1,87 @@
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+from app.core.elasticsearch_client import ElasticsearchClient
+from app.middleware.compression import CompressionMiddleware, choose_encoding
+from app.utils.json_utils import RawJSON, splice_object
+import asyncio
+import json
+
+
+def test_splice_copies_raw_bytes_into_valid_json():
+    raw = b'{"took":3,"hits":{"total":{"value":1},"hits":[{"_id":"1"}]}}'
+    body = splice_object({"status": "success", "results": RawJSON(raw), "count": 1})
+    assert raw in body
+    assert json.loads(body) == {"status": "success", "results": json.loads(raw), "count": 1}
+
+
+def test_brotli_is_preferred_and_zero_quality_refused():
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("identity") is None
+
+
+def compressed_app() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/big")
+    def big():
+        return Response(b"x" * 5000, media_type="application/json")
+
+    @app.get("/small")
+    def small():
+        return Response(b"{}", media_type="application/json")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a" * 3000, b"b" * 3000]))
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_only_large_complete_responses_are_compressed():
+    client = compressed_app()
+    headers = {"Accept-Encoding": "gzip"}
+
+    big = client.get("/big", headers=headers)
+    assert big.headers["content-encoding"] == "gzip"
+    assert big.content == b"x" * 5000
+    assert int(big.headers["content-length"]) < 5000
+
+    assert "content-encoding" not in client.get("/small", headers=headers).headers
+    streamed = client.get("/stream", headers=headers)
+    assert "content-encoding" not in streamed.headers
+    assert streamed.content == b"a" * 3000 + b"b" * 3000
+
+
+class RawNode:
+    def __init__(self):
+        self.calls = 0
+
+    def options(self, **kwargs):
+        return self
+
+    async def search(self, **kwargs):
+        self.calls += 1
+        return type("Response", (), {"body": b'{"took":1}'})()
+
+
+def test_raw_search_is_hedged_when_hedging_is_on():
+    async def run():
+        client = ElasticsearchClient({
+            "hosts": ["http://a:9200", "http://b:9200"],
+            "elasticsearch_index": "hr",
+            "hedging": {"enabled": True},
+        })
+        hedger = client.hedger
+        assert hedger.raw_clients[0] is not hedger.clients[0]
+        await hedger.close()
+        nodes = hedger.raw_clients = [RawNode(), RawNode()]
+        body = await client.search_raw({"query": {"match_all": {}}})
+        return body, nodes, hedger.requests
+
+    body, nodes, requests = asyncio.run(run())
+    assert body == b'{"took":1}'
+    assert sum(node.calls for node in nodes) == 1
+    assert requests == 1
@@ -0,0 +1,189 @@
+from elasticsearch import NotFoundError
+from app.core import rollups
+from app.core.rollups import ROLLUP_DIMENSIONS, SALARY, RollupManager
+import asyncio
+import pytest
+
+HEADCOUNT = {"size": 0, "aggs": {"departments": {
+    "terms": {"field": "employment_details.department.name"},
+    "aggs": {"salary": {"stats": {"field": SALARY}}},
+}}}
+LEAVES = {"size": 0, "aggs": {"leaves": {
+    "nested": {"path": "leave_records"},
+    "aggs": {"types": {"terms": {"field": "leave_records.leave_type"}}},
+}}}
+
+
+def values(doc, path):
+    """Values at a dotted path, descending into lists of nested objects"""
+    found = [doc]
+    for part in path.split("."):
+        found = [
+            item.get(part) for value in found
+            for item in (value if isinstance(value, list) else [value])
+            if isinstance(item, dict) and item.get(part) is not None
+        ]
+    return [v for value in found for v in (value if isinstance(value, list) else [value])]
+
+
+class FakeIndices:
+    def __init__(self, es):
+        self.es = es
+
+    async def exists(self, index):
+        return self.es.side is not None
+
+    async def create(self, index, **kwargs):
+        self.es.side = {}
+
+    async def refresh(self, index):
+        pass
+
+
+class FakeES:
+    """Employee index of in-memory documents, answering the aggregations rollups send"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.side = None
+        self.searches = 0
+        self.indices = FakeIndices(self)
+
+    def _terms(self, docs, terms, aggs):
+        groups = {}
+        for doc in docs:
+            for key in values(doc, terms["field"]):
+                if "include" not in terms or key in terms["include"]:
+                    groups.setdefault(key, []).append(doc)
+        buckets = []
+        for key, members in sorted(groups.items(), key=lambda g: (-len(g[1]), g[0])):
+            bucket = {"key": key, "doc_count": len(members)}
+            for name, sub in (aggs or {}).items():
+                numbers = [v for d in members for v in values(d, sub["stats"]["field"])]
+                bucket[name] = {
+                    "count": len(numbers), "min": min(numbers), "max": max(numbers),
+                    "avg": sum(numbers) / len(numbers), "sum": sum(numbers),
+                }
+            buckets.append(bucket)
+        return {"buckets": buckets}
+
+    def _agg(self, docs, body):
+        if "nested" in body:
+            inner = [item for doc in docs for item in doc.get(body["nested"]["path"], [])]
+            prefix = body["nested"]["path"] + "."
+            # Nested documents see their own fields without the path prefix
+            scoped = [{prefix[:-1]: item} for item in inner]
+            return {"doc_count": len(inner), **{
+                name: self._agg(scoped, sub) for name, sub in body["aggs"].items()
+            }}
+        if "filter" in body:
+            field = body["filter"]["exists"]["field"]
+            return {"doc_count": sum(1 for doc in docs if values(doc, field))}
+        if "max" in body:
+            found = [v for doc in docs for v in values(doc, body["max"]["field"])]
+            return {"value_as_string": max(found)} if found else {"value": None}
+        return self._terms(docs, body["terms"], body.get("aggs"))
+
+    async def search(self, index, size=10, query=None, aggs=None, track_total_hits=None):
+        self.searches += 1
+        if index == "rollups":
+            if self.side is None:
+                raise NotFoundError("index_not_found_exception", None, {})
+            return {"hits": {"hits": [{"_source": doc} for doc in self.side.values()]}}
+        docs = self.docs
+        if query and "range" in query:
+            since = query["range"]["updated_at"]["gte"]
+            docs = [doc for doc in docs if doc["updated_at"] >= since]
+        return {
+            "hits": {"total": {"value": len(docs)}},
+            "aggregations": {name: self._agg(docs, body) for name, body in (aggs or {}).items()},
+        }
+
+
+async def fake_bulk(es, actions, raise_on_error=True):
+    for action in actions:
+        if action.get("_op_type") == "delete":
+            es.side.pop(action["_id"], None)
+        else:
+            es.side[action["_id"]] = action["_source"]
+
+
+def employee(n, department, salary, updated_at, leaves=("annual",)):
+    return {
+        "employee_id": n,
+        "employment_details": {"department": {"name": department}},
+        "branch": {"branch_name": "London"},
+        "salary_info": {"base_salary": salary},
+        "leave_records": [{"leave_type": t} for t in leaves],
+        "updated_at": updated_at,
+    }
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(rollups, "async_bulk", fake_bulk)
+    es = FakeES([
+        employee(1, "Engineering", 100, "2026-01-01T01:00:00Z"),
+        employee(2, "Engineering", 120, "2026-01-01T02:00:00Z", leaves=("annual", "sick")),
+        employee(3, "Sales", 80, "2026-01-01T03:00:00Z"),
+    ])
+    return RollupManager(es, "employees", "rollups")
+
+
+def departments(manager):
+    response, _ = manager.answer(HEADCOUNT)
+    return {b["key"]: (b["doc_count"], b["salary"]["sum"]) for b in response["aggregations"]["departments"]["buckets"]}
+
+
+def test_first_refresh_builds_every_dimension(manager):
+    summary = asyncio.run(manager.refresh())
+    assert {s["mode"] for s in summary.values()} == {"full"}
+    assert departments(manager) == {"Engineering": (2, 220), "Sales": (1, 80)}
+
+    response, meta = manager.answer(LEAVES)
+    leaves = response["aggregations"]["leaves"]
+    assert leaves["doc_count"] == 4
+    assert {b["key"]: b["doc_count"] for b in leaves["types"]["buckets"]} == {"annual": 3, "sick": 1}
+    assert meta["dimension"] == "leave_type"
+    assert response["hits"]["total"] == {"value": 3, "relation": "eq"}
+
+
+def test_updates_refresh_only_the_touched_groups(manager):
+    asyncio.run(manager.refresh())
+    manager.es.docs[2]["salary_info"]["base_salary"] = 90
+    manager.es.docs[2]["updated_at"] = "2026-01-02T00:00:00Z"
+
+    summary = asyncio.run(manager.refresh())
+    assert summary["department"]["mode"] == "incremental"
+    assert departments(manager) == {"Engineering": (2, 220), "Sales": (1, 90)}
+    assert manager.rebuilds == len(ROLLUP_DIMENSIONS)
+
+
+@pytest.mark.parametrize("change", ["move", "delete"])
+def test_totals_drift_forces_a_rebuild(manager, change):
+    asyncio.run(manager.refresh())
+    if change == "move":
+        # The old group is not among the changed ones; only the totals reveal it
+        manager.es.docs[0]["employment_details"]["department"]["name"] = "Sales"
+        manager.es.docs[0]["updated_at"] = "2026-01-02T00:00:00Z"
+        expected = {"Engineering": (1, 120), "Sales": (2, 180)}
+    else:
+        # Deletions leave no updated_at behind at all
+        del manager.es.docs[0]
+        expected = {"Engineering": (1, 120), "Sales": (1, 80)}
+
+    summary = asyncio.run(manager.refresh())
+    assert summary["department"]["mode"] == "full"
+    assert departments(manager) == expected
+    assert "department:Engineering" in manager.es.side
+
+
+def test_unsupported_or_stale_queries_run_live(manager):
+    asyncio.run(manager.refresh())
+    filtered = {**HEADCOUNT, "query": {"term": {"branch.branch_name": "London"}}}
+    assert manager.answer(filtered) is None
+    assert manager.answer({**HEADCOUNT, "size": 10}) is None
+
+    manager.max_staleness = -1
+    assert manager.answer(HEADCOUNT) is None
+    assert manager.get_stats()["stale_skipped"] == 1
@@ -0,0 +1,109 @@
+from app.core.local_cache import LocalQueryCache
+from app.core.speculation import MissPredictor, Speculator
+import asyncio
+import time
+
+HIT = {"id": 7, "query_text": "engineers in london", "es_query": {"query": {"term": {"city": "London"}}}}
+
+
+def test_miss_predictor_learns_from_outcomes():
+    predictor = MissPredictor()
+    assert predictor.miss_probability("engineers in london") == 1.0
+    for _ in range(20):
+        predictor.record("engineers in london", hit=True)
+    assert predictor.miss_probability("Engineers  in LONDON") < 0.1
+    # Half the tokens never seen: at least half a chance of missing
+    assert predictor.miss_probability("engineers in tokyo branch") >= 0.5
+
+
+def test_speculation_respects_threshold_budget_and_capacity():
+    speculator = Speculator(enabled=True, miss_threshold=0.7, max_wasted_per_minute=1)
+    assert speculator.should_speculate("novel question", has_capacity=True)
+    assert not speculator.should_speculate("novel question", has_capacity=False)
+    assert speculator.skipped_capacity == 1
+
+    # A wasted generation spends the budget
+    speculator.record("novel question", speculated=True, hit=True)
+    assert not speculator.should_speculate("another one entirely", has_capacity=True)
+    assert speculator.skipped_budget == 1
+    assert not Speculator(enabled=False).should_speculate("novel question", True)
+
+
+def test_cache_hit_cancels_the_speculative_generation(make_agent):
+    agent = make_agent(speculator=Speculator(enabled=True))
+    agent.vector_cache.entries = {HIT["query_text"]: HIT}
+    agent.vector_cache.seconds = 0.02
+    agent.chain.seconds = 1
+
+    es_query, metrics = asyncio.run(agent.generate_es_query(HIT["query_text"]))
+    assert es_query == HIT["es_query"]
+    assert metrics["speculated"] and metrics["tier"] == "cache"
+    assert agent.chain.started == 1 and agent.chain.completed == 0
+    assert agent.speculator.get_stats()["wasted_generations"] == 1
+
+
+def test_speculative_miss_overlaps_lookup_and_generation(make_agent):
+    agent = make_agent(speculator=Speculator(enabled=True))
+    agent.vector_cache.seconds = 0.05
+    agent.chain.seconds = 0.05
+
+    _, metrics = asyncio.run(agent.generate_es_query("who joined last week"))
+    assert metrics["speculated"] and metrics["tier"] == "llm"
+    stats = agent.speculator.get_stats()
+    assert stats["precision"] == 1.0
+    assert stats["seconds_saved"] > 0.03
+    assert agent.vector_cache.stored == [("who joined last week", {"query": {"match_all": {}}})]
+
+
+def test_local_cache_answers_repeats_without_embedding(make_agent):
+    agent = make_agent()
+    agent.vector_cache.entries = {HIT["query_text"]: HIT}
+
+    async def scenario():
+        await agent.generate_es_query(HIT["query_text"])
+        return await agent.generate_es_query("  Engineers in LONDON ")
+
+    es_query, metrics = asyncio.run(scenario())
+    assert metrics["tier"] == "local_cache"
+    assert metrics["cache_entry"]["id"] == HIT["id"]
+    assert es_query == HIT["es_query"]
+    assert agent.embedder.calls == 1
+
+
+def test_local_cache_follows_namespace_and_expires():
+    cache = LocalQueryCache(max_entries=2, ttl=60)
+    cache.set_namespace("v_default_0")
+    cache.put("a", {"size": 1}, entry_id=1)
+    returned = cache.get("a")
+    returned["es_query"]["size"] = 99
+    assert cache.get("a")["es_query"] == {"size": 1}
+
+    cache.set_namespace(None)
+    assert "a" in cache
+    cache.set_namespace("v_default_1")
+    assert "a" not in cache and cache.namespace_switches == 1
+
+    cache.put("b", {}, entry_id=2)
+    cache._entries["b"]["expires"] = time.monotonic() - 1
+    assert cache.get("b") is None
+    assert cache.get_stats()["expired"] == 1
+
+
+def test_local_cache_is_bounded_and_discards_by_entry():
+    cache = LocalQueryCache(max_entries=2)
+    cache.put("a", {}, entry_id=1)
+    cache.put("a again", {}, entry_id=1)
+    cache.put("b", {}, entry_id=2)
+    assert len(cache) == 2 and "a" not in cache
+    cache.discard_entry(1)
+    assert list(cache._entries) == ["b"]
+
+
+def test_agent_shares_an_empty_local_cache():
+    from app.core.search_agent import SearchAgent
+    from app.core.embeddings import HashingEmbeddingProvider
+
+    shared = LocalQueryCache()
+    agent = SearchAgent(None, None, local_cache=shared, embedder=HashingEmbeddingProvider(8))
+    # Filled later by snapshot warm-up and read by the metrics endpoint
+    assert agent.local_cache is shared
@@ -0,0 +1,100 @@
+from app.core.container import ServiceContainer
+import asyncio
+import os
+import pytest
+import subprocess
+import sys
+
+
+def container(fail: set) -> tuple:
+    """A container whose warm-up steps record their runs instead of connecting"""
+    services = ServiceContainer()
+    runs = []
+    running = {"now": 0, "peak": 0}
+
+    def step(name):
+        async def run():
+            runs.append(name)
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            if name in fail:
+                raise ConnectionError(f"{name} down")
+        return run
+
+    services._import_modules = step("imports")
+    services._warm_elasticsearch = step("elasticsearch")
+    services._warm_milvus = step("milvus")
+    services._warm_agent = step("search_agent")
+    services.get_es_client = lambda: None
+    services.get_vector_cache = lambda: None
+    services.suggestions.enabled = False
+    return services, runs, running
+
+
+def test_importing_the_app_defers_heavy_modules():
+    script = "import sys, app.main; print(sorted(m for m in ('langchain_openai', 'pymilvus', 'elasticsearch') if m in sys.modules))"
+    env = {**os.environ, "OPENAI_API_KEY": "test"}
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", script], capture_output=True, text=True, env=env)
+    assert result.stdout.strip() == "[]", result.stderr
+
+
+def test_warm_up_runs_steps_concurrently_and_reports_ready():
+    services, runs, running = container(fail=set())
+
+    async def scenario():
+        await services.ensure_ready()
+        # Ready: later requests return without starting another warm-up
+        task = services._warm_up_task
+        await services.ensure_ready()
+        return task is services._warm_up_task
+
+    assert asyncio.run(scenario())
+    assert runs[0] == "imports"
+    assert sorted(runs[1:]) == ["elasticsearch", "milvus", "search_agent"]
+    assert running["peak"] == 3
+    state = services.readiness.to_dict()
+    assert state["ready"] and state["ready_after_seconds"] is not None
+    assert all(c["status"] == "ready" for c in state["components"].values())
+
+
+def test_failed_step_blocks_readiness_and_only_it_is_retried():
+    fail = {"milvus"}
+    services, runs, _ = container(fail)
+
+    async def scenario():
+        with pytest.raises(RuntimeError, match="milvus"):
+            await services.ensure_ready()
+        assert not services.readiness.ready
+        assert services.readiness.components["milvus"]["error"] == "milvus down"
+        fail.clear()
+        await services.ensure_ready()
+
+    asyncio.run(scenario())
+    assert services.readiness.ready
+    assert runs.count("milvus") == 2
+    assert runs.count("elasticsearch") == runs.count("imports") == 1
+
+
+def test_the_app_factory_wires_the_same_middleware_as_main():
+    from app.core.factory import create_app
+    from app.main import app
+
+    def stack(application):
+        return [(m.cls.__name__, m.kwargs.get("prefix")) for m in application.user_middleware]
+
+    # Plus CORS; search routes are mounted under /api rather than /api/v1
+    assert stack(create_app()) == [
+        ("RequestContextMiddleware", None),
+        ("ProfilingMiddleware", "/api/search"),
+        ("DeadlineMiddleware", None),
+        ("CompressionMiddleware", None),
+        ("CORSMiddleware", None),
+    ]
+    assert stack(app) == [
+        ("RequestContextMiddleware", None),
+        ("ProfilingMiddleware", "/api/v1/search"),
+        ("DeadlineMiddleware", None),
+        ("CompressionMiddleware", None),
+    ]
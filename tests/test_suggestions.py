@@ -0,0 +1,145 @@
+from app.core.embeddings import HashingEmbeddingProvider
+from app.core.suggestions import SuggestionIndex
+from app.core.vector_cache import VectorCache
+import asyncio
+
+
+def test_services_share_an_empty_index():
+    from app.core.search_agent import SearchAgent
+
+    shared = SuggestionIndex()
+    # Bypass the process-wide singleton
+    vector_cache = object.__new__(VectorCache)
+    vector_cache.__init__({"host": "localhost", "port": 19530}, suggestions=shared)
+    agent = SearchAgent(None, vector_cache, suggestions=shared, embedder=HashingEmbeddingProvider(8))
+    # Stores and hits must land in the index the API suggests from
+    assert vector_cache.suggestions is shared and agent.suggestions is shared
+
+
+def index_of(*texts, **options) -> SuggestionIndex:
+    index = SuggestionIndex(**options)
+    # Newer entries score higher until they are hit
+    for entry_id, text in enumerate(texts, 1):
+        index.add(entry_id, text, index._epoch + entry_id)
+    return index
+
+
+def queries(index, prefix, limit=None):
+    return [suggestion["query"] for suggestion in index.suggest(prefix, limit)]
+
+
+def test_complete_words_are_required_and_the_last_one_is_a_prefix():
+    index = index_of("engineers in Berlin", "engineering managers", "Berlin sales team", "engineers hired in 2023")
+    assert queries(index, "eng") == ["engineers hired in 2023", "engineering managers", "engineers in Berlin"]
+    assert queries(index, "engineers ") == ["engineers hired in 2023", "engineers in Berlin"]
+    assert queries(index, "Berlin eng") == ["engineers in Berlin"]
+    assert queries(index, "BERLIN   S") == ["Berlin sales team"]
+    assert queries(index, "engineers x") == []
+    assert queries(index, "designers ") == []
+
+
+def test_hits_rank_entries_and_the_same_question_is_suggested_once():
+    index = index_of("engineers in Berlin", "Engineers  in berlin", "engineers in Paris")
+    assert queries(index, "engineers") == ["engineers in Paris", "Engineers  in berlin"]
+    index.record_hit(1)
+    index.record_hit(1)
+    index.record_hit(99)
+    suggestions = index.suggest("engineers")
+    assert [s["query"] for s in suggestions] == ["engineers in Berlin", "engineers in Paris"]
+    assert suggestions[0]["hits"] == 2
+
+
+def test_limit_caps_the_suggestions():
+    index = index_of(*(f"question {i}" for i in range(30)), max_results=5)
+    assert len(index.suggest("question")) == 5
+    assert len(index.suggest("question", 2)) == 2
+    # At most five times the default
+    assert len(index.suggest("question", 1000)) == 25
+
+
+def test_removed_entries_and_words_are_gone():
+    index = index_of("engineers in Berlin", "sales in Paris")
+    index.remove(1)
+    index.remove(1)
+    assert queries(index, "engineers") == []
+    assert queries(index, "in") == ["sales in Paris"]
+    assert "berlin" not in index._vocabulary
+    index.add(3, "engineers in Rome")
+    assert queries(index, "engineers") == ["engineers in Rome"]
+    assert len(index) == 2
+
+
+def test_clear_and_disabled():
+    index = index_of("engineers in Berlin")
+    index.clear()
+    assert len(index) == 0 and queries(index, "eng") == []
+    disabled = SuggestionIndex(enabled=False)
+    disabled.add(1, "engineers in Berlin")
+    assert len(disabled) == 0
+
+
+def test_matches_are_those_of_a_scan_of_every_entry():
+    words = ["alpha", "beta", "gamma", "delta", "alpine", "betting"]
+    texts = [
+        " ".join(word for bit, word in enumerate(words) if (i * 7 + 3) % 13 & (1 << bit) or i % (bit + 2) == 0)
+        + f" q{i}"
+        for i in range(300)
+    ]
+    index = index_of(*texts, max_results=100)
+
+    def expected(prefix, limit):
+        *required, partial = prefix.split(" ")
+        found = [
+            text for text in reversed(texts)
+            if set(required) <= set(text.split()) and any(word.startswith(partial) for word in text.split())
+        ]
+        return found[:limit]
+
+    for prefix in ["al", "alp", "alpha b", "beta gamma d", "gamma q1", "delta alpine ", "alpha beta gamma q"]:
+        for limit in (3, 40, 500):
+            assert queries(index, prefix, limit) == expected(prefix, limit), (prefix, limit)
+    # The same after hits reorder the ranking
+    for entry_id in range(1, 300, 3):
+        index.record_hit(entry_id)
+    hit_first = sorted(reversed(texts), key=lambda text: int(text.rsplit("q", 1)[1]) % 3 != 0)
+    alpha = [text for text in hit_first if "alpha" in text.split()]
+    assert queries(index, "alpha ", 40) == alpha[:40]
+
+
+class FakeCache:
+    def __init__(self, rows, during=None):
+        self.rows = rows
+        self.during = during
+
+    def entry_texts(self):
+        if self.during:
+            self.during()
+        return self.rows
+
+
+def test_reload_keeps_hits_and_applies_changes_made_meanwhile():
+    index = index_of("engineers in Berlin", "engineers in Paris")
+    index.record_hit(2)
+    rows = [
+        {"id": 1, "query_text": "engineers in Berlin", "created_at": index._epoch + 1},
+        {"id": 2, "query_text": "engineers in Paris", "created_at": index._epoch + 2},
+        # Stored by another process
+        {"id": 3, "query_text": "engineers in Rome", "created_at": index._epoch + 3},
+    ]
+
+    def during():
+        index.add(4, "engineers in Oslo", index._epoch + 4)
+        index.remove(1)
+
+    assert asyncio.run(index.reload(FakeCache(rows, during))) == 3
+    suggestions = index.suggest("engineers")
+    assert [s["query"] for s in suggestions] == ["engineers in Paris", "engineers in Oslo", "engineers in Rome"]
+    assert suggestions[0]["hits"] == 1
+    assert index.reloads == 1
+
+
+def test_reload_racing_a_clear_keeps_the_cleared_index():
+    index = index_of("engineers in Berlin")
+    rows = [{"id": 1, "query_text": "engineers in Berlin", "created_at": index._epoch}]
+    assert asyncio.run(index.reload(FakeCache(rows, index.clear))) == 0
+    assert queries(index, "eng") == []
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+from app.core.vector_codec import LEGACY_DIM, VectorCodec
+import numpy as np
+import pytest
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_layouts_get_their_own_collection():
+    assert VectorCodec().collection_name("query_cache") == "query_cache"
+    assert VectorCodec(LEGACY_DIM, "float16").collection_name("query_cache") == "query_cache_d768_float16"
+    assert VectorCodec(256, "binary").collection_name("query_cache") == "query_cache_d256_binary"
+    with pytest.raises(ValueError, match="Unknown vector quantization"):
+        VectorCodec(256, "int4")
+    with pytest.raises(ValueError, match="divisible by 8"):
+        VectorCodec(12, "binary")
+
+
+def test_prepare_normalizes_and_checks_dimension():
+    codec = VectorCodec(4)
+    np.testing.assert_allclose(codec.prepare([3, 0, 4, 0]), [0.6, 0, 0.8, 0])
+    with pytest.raises(ValueError, match="dimension 3"):
+        codec.prepare([1, 2, 3])
+
+
+@pytest.mark.parametrize("quantization,columns,resident", [
+    ("none", 1, 32), ("float16", 1, 16), ("int8", 1, 8), ("binary", 2, 1),
+])
+def test_encode_decode_per_layout(quantization, columns, resident):
+    codec = VectorCodec(8, quantization)
+    vectors = np.array([[1, -2, 3, -4, 5, -6, 7, -8], [0] * 8], dtype=np.float32)
+    encoded = codec.encode(vectors)
+    assert len(encoded) == columns
+    full = np.stack([codec.decode(v) for v in encoded[-1]])
+    np.testing.assert_allclose(full[0], vectors[0] / np.linalg.norm(vectors[0]), atol=1e-3)
+    # A zero vector stays zero instead of becoming NaN
+    assert not full[1].any()
+    assert codec.bytes_per_entry()["resident"] == resident
+    if codec.binary:
+        assert encoded[0][0] == bytes([0b10101010])
+        assert codec.search_params["metric_type"] == "HAMMING"
+    else:
+        assert codec.search_params["metric_type"] == "COSINE"
+
+
+def test_decode_accepts_pymilvus_float16_bytes():
+    raw = np.array([0.5, -1], dtype=np.float16).tobytes()
+    np.testing.assert_array_equal(VectorCodec.decode([raw]), [0.5, -1])
+    np.testing.assert_array_equal(VectorCodec.decode(raw), [0.5, -1])
+
+
+def test_binary_candidates_are_reranked_by_cosine():
+    codec = VectorCodec(8, "binary")
+    query = unit(1, 1, 1, 1, 1, 1, 1, 0.1)
+
+    def hit(name, vector, distance):
+        stored = np.asarray(vector, dtype=np.float16).tobytes()
+        return SimpleNamespace(name=name, distance=distance, entity={codec.rerank_field: stored})
+
+    # Same sign bits, so Hamming cannot tell them apart; cosine can
+    far = hit("far", unit(1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1), 0)
+    near = hit("near", unit(1, 1, 1, 1, 1, 1, 1, 0.2), 0)
+    best, similarity = codec.best([far, near], query)
+    assert best.name == "near" and similarity > 0.99
+    assert codec.best([], query) is None
+    assert VectorCodec(8).best([far], query) == (far, 0.0)